@@ -0,0 +1,5 @@
+"""
+Performance benchmarks for PixTrail.
+
+See docs/development/testing.md for how to run them.
+"""
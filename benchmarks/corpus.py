@@ -0,0 +1,264 @@
+"""
+Deterministic generator for a synthetic corpus of geotagged photos.
+
+Files are JPEG, TIFF or DNG-like images whose only real content is the EXIF
+structure PixTrail reads (IFD0 with DateTime and Make, and a GPS IFD),
+followed by filler image data. The same parameters always produce the same
+bytes, so timings are comparable between runs and machines.
+"""
+
+import json
+import os
+import random
+import shutil
+import struct
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+# Supported corpus formats and their file extensions
+FORMAT_EXTENSIONS = {'jpeg': '.jpg', 'tiff': '.tiff', 'dng': '.dng'}
+
+# Name of the file describing the parameters a corpus was generated with
+MANIFEST_NAME = 'corpus.json'
+
+# TIFF field types
+_ASCII = 2
+_BYTE = 1
+_LONG = 4
+_RATIONAL = 5
+
+
+def _dms(value: float) -> List[float]:
+    """Split decimal degrees into degrees, minutes and seconds."""
+    value = abs(value)
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    seconds = (value - degrees - minutes / 60.0) * 3600
+    return [degrees, minutes, seconds]
+
+
+def build_tiff(
+    latitude: Optional[float],
+    longitude: Optional[float],
+    altitude: float = 0.0,
+    date_str: str = '2023:01:01 12:00:00',
+    byte_order: str = '<',
+    payload_size: int = 0,
+    dng: bool = False,
+    ifd_at_end: bool = False
+) -> bytes:
+    """
+    Build a TIFF structure with IFD0, an optional GPS IFD and filler strip data.
+
+    Args:
+        latitude: Latitude in decimal degrees (None for no GPS IFD)
+        longitude: Longitude in decimal degrees
+        altitude: Altitude in meters
+        date_str: EXIF DateTime value ('YYYY:MM:DD HH:MM:SS')
+        byte_order: '<' for little-endian (II) or '>' for big-endian (MM)
+        payload_size: Size of the filler strip data in bytes
+        dng: Whether to add a DNGVersion tag
+        ifd_at_end: Place the strip data before the IFDs, as libtiff does
+
+    Returns:
+        TIFF file contents
+    """
+    def pack(fmt: str, *values: Any) -> bytes:
+        return struct.pack(byte_order + fmt, *values)
+
+    def rationals(values: Sequence[float]) -> bytes:
+        return b''.join(pack('II', int(round(v * 1000)), 1000) for v in values)
+
+    # Out-of-line values: (key, bytes)
+    blobs = [('date', date_str.encode('ascii') + b'\x00'), ('make', b'PixTrailBench\x00')]
+    if latitude is not None:
+        blobs += [
+            ('lat', rationals(_dms(latitude))),
+            ('lon', rationals(_dms(longitude))),
+            ('alt', rationals([abs(altitude)]))
+        ]
+
+    # IFD0 entries, sorted by tag: (tag, type, count, inline value or blob key)
+    ifd0_entries = [(0x010F, _ASCII, len(blobs[1][1]), 'make')]
+    if payload_size:
+        ifd0_entries += [(0x0111, _LONG, 1, 'strip'), (0x0117, _LONG, 1, pack('I', payload_size))]
+    ifd0_entries.append((0x0132, _ASCII, len(blobs[0][1]), 'date'))
+    if latitude is not None:
+        ifd0_entries.append((0x8825, _LONG, 1, 'gps'))
+    if dng:
+        ifd0_entries.append((0xC612, _BYTE, 4, b'\x01\x04\x00\x00'))
+
+    gps_entries = []
+    if latitude is not None:
+        gps_entries = [
+            (1, _ASCII, 2, (b'N' if latitude >= 0 else b'S') + b'\x00\x00\x00'),
+            (2, _RATIONAL, 3, 'lat'),
+            (3, _ASCII, 2, (b'E' if longitude >= 0 else b'W') + b'\x00\x00\x00'),
+            (4, _RATIONAL, 3, 'lon'),
+            (5, _BYTE, 1, (b'\x01' if altitude < 0 else b'\x00') + b'\x00\x00\x00'),
+            (6, _RATIONAL, 1, 'alt')
+        ]
+
+    # Lay out the file
+    ifd0_offset = 8 + (payload_size + (payload_size & 1) if ifd_at_end else 0)
+    gps_offset = ifd0_offset + 2 + 12 * len(ifd0_entries) + 4
+    offset = gps_offset + (2 + 12 * len(gps_entries) + 4 if gps_entries else 0)
+    offsets = {'gps': gps_offset, 'strip': 8 if ifd_at_end else None}
+    for key, blob in blobs:
+        offsets[key] = offset
+        offset += len(blob) + (len(blob) & 1)
+    if not ifd_at_end:
+        offsets['strip'] = offset
+
+    def ifd(entries: List[Tuple[int, int, int, Union[bytes, str]]]) -> bytes:
+        data = pack('H', len(entries))
+        for tag, field_type, count, value in entries:
+            if isinstance(value, str):
+                value = pack('I', offsets[value])
+            data += pack('HHI', tag, field_type, count) + value
+        return data + pack('I', 0)
+
+    header = (b'II' if byte_order == '<' else b'MM') + pack('H', 42) + pack('I', ifd0_offset)
+    strip = b'\x00' * payload_size
+
+    parts = [header]
+    if ifd_at_end:
+        parts += [strip, b'\x00' * (payload_size & 1)]
+    parts.append(ifd(ifd0_entries))
+    if gps_entries:
+        parts.append(ifd(gps_entries))
+    for _, blob in blobs:
+        parts += [blob, b'\x00' * (len(blob) & 1)]
+    if not ifd_at_end:
+        parts.append(strip)
+    return b''.join(parts)
+
+
+def build_jpeg(tiff_bytes: Optional[bytes], payload_size: int = 0) -> bytes:
+    """
+    Build a JPEG file with an optional APP1 EXIF segment and filler scan data.
+
+    Args:
+        tiff_bytes: TIFF structure for the APP1 segment (None for no EXIF)
+        payload_size: Size of the filler scan data in bytes
+
+    Returns:
+        JPEG file contents
+    """
+    app1 = b''
+    if tiff_bytes is not None:
+        exif = b'Exif\x00\x00' + tiff_bytes
+        app1 = b'\xff\xe1' + struct.pack('>H', len(exif) + 2) + exif
+    return (b'\xff\xd8' + app1 + b'\xff\xda' + struct.pack('>H', 2)
+            + b'\x00' * payload_size + b'\xff\xd9')
+
+
+def generate_corpus(
+    root: str,
+    count: int,
+    seed: int = 0,
+    formats: Sequence[str] = ('jpeg', 'tiff', 'dng'),
+    payload_size: Union[int, Tuple[int, int]] = (16 * 1024, 64 * 1024),
+    fan_out: int = 4,
+    depth: int = 2,
+    gps_fraction: float = 0.9
+) -> List[str]:
+    """
+    Write a synthetic corpus of geotagged photos.
+
+    Photos follow a random walk starting in Berlin, about a minute apart.
+    Consecutive photos are spread round-robin over fan_out ** depth leaf
+    directories, so recursive scans and per-directory grouping both have
+    work to do.
+
+    Args:
+        root: Directory to write the corpus to (replaced if it exists)
+        count: Number of files
+        seed: Random seed; the same parameters always produce the same files
+        formats: Formats to mix ('jpeg', 'tiff', 'dng')
+        payload_size: Filler image data per file in bytes, or a (min, max) range
+        fan_out: Number of subdirectories per directory level
+        depth: Number of directory levels (0 for a flat directory)
+        gps_fraction: Fraction of files with GPS data
+
+    Returns:
+        Sorted list of the generated file paths
+    """
+    for file_format in formats:
+        if file_format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Unsupported corpus format: {file_format}")
+
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    os.makedirs(root)
+
+    rng = random.Random(seed)
+    latitude, longitude, altitude = 52.52, 13.405, 34.0
+    timestamp = datetime(2023, 5, 1, 8, 0, 0)
+    leaves = fan_out ** depth
+    paths = []
+
+    for i in range(count):
+        file_format = formats[rng.randrange(len(formats))]
+        size = payload_size if isinstance(payload_size, int) else rng.randint(*payload_size)
+        latitude += rng.uniform(-0.001, 0.001)
+        longitude += rng.uniform(-0.001, 0.001)
+        altitude += rng.uniform(-5.0, 5.0)
+        timestamp += timedelta(seconds=rng.randint(30, 90))
+        has_gps = rng.random() < gps_fraction
+        date_str = timestamp.strftime('%Y:%m:%d %H:%M:%S')
+
+        tiff_args = (latitude, longitude, altitude) if has_gps else (None, None, 0.0)
+        if file_format == 'jpeg':
+            data = build_jpeg(build_tiff(*tiff_args, date_str), size)
+        else:
+            data = build_tiff(
+                *tiff_args, date_str,
+                byte_order='>' if rng.random() < 0.5 else '<',
+                payload_size=size,
+                dng=file_format == 'dng',
+                ifd_at_end=file_format == 'tiff'
+            )
+
+        # Spell the leaf index in base fan_out to get the directory path
+        leaf = i % leaves
+        parts = []
+        for _ in range(depth):
+            parts.append(f"d{leaf % fan_out}")
+            leaf //= fan_out
+        directory = os.path.join(root, *parts)
+        os.makedirs(directory, exist_ok=True)
+
+        path = os.path.join(directory, f"IMG_{i:06d}{FORMAT_EXTENSIONS[file_format]}")
+        with open(path, 'wb') as f:
+            f.write(data)
+        paths.append(path)
+
+    return sorted(paths)
+
+
+def ensure_corpus(root: str, count: int, **params: Any) -> str:
+    """
+    Generate a corpus unless root already holds one with the same parameters.
+
+    Args:
+        root: Corpus directory
+        count: Number of files
+        **params: Other generate_corpus parameters
+
+    Returns:
+        The corpus directory
+    """
+    manifest = dict(params, count=count)
+    manifest_path = os.path.join(root, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as f:
+            if json.load(f) == json.loads(json.dumps(manifest)):
+                return root
+    except (OSError, ValueError):
+        pass
+
+    generate_corpus(root, count, **params)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    return root
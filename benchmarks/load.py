@@ -0,0 +1,245 @@
+"""
+Load test for the PixTrail web server.
+
+Usage:
+    python -m benchmarks.load [--workers 1,2,4] [--threads N] [--clients N] [--duration SECONDS]
+
+For each worker count, a production server is started as a separate
+process (python -m pixtrail -w --workers N) and concurrent clients run
+complete sessions against it: upload photos to /api/submit-stream,
+process them with /api/process and remove the session with /api/cleanup.
+The report shows completed sessions per second and session latency, so
+the throughput of different worker counts can be compared. Processing is
+CPU-bound, so throughput only scales up to the number of cores.
+"""
+
+import argparse
+import http.client
+import io
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from .corpus import build_jpeg, build_tiff
+
+# Worker counts compared by default
+DEFAULT_WORKERS = '1,2,4'
+
+# Concurrent clients
+DEFAULT_CLIENTS = 16
+
+# Seconds each worker count is measured
+DEFAULT_DURATION = 10.0
+
+# Photos uploaded per session
+DEFAULT_PHOTOS = 20
+
+# Seconds to wait for the server to accept connections
+STARTUP_TIMEOUT = 15.0
+
+
+def build_upload(photos: int) -> Tuple[str, bytes]:
+    """
+    Build the multipart body of a session's upload.
+
+    Args:
+        photos: Number of photos in the upload
+
+    Returns:
+        Tuple of (content type, body)
+    """
+    from werkzeug.datastructures import FileStorage, MultiDict
+    from werkzeug.test import encode_multipart
+
+    values = MultiDict({'source_type': 'file'})
+    for i in range(photos):
+        date_str = f'2023:01:01 12:{i // 60 % 60:02d}:{i % 60:02d}'
+        data = build_jpeg(build_tiff(40.0 + i * 0.001, 10.0, 5.0, date_str), payload_size=50000)
+        values.add('photos', FileStorage(io.BytesIO(data), f"photo{i:04d}.jpg"))
+    boundary, body = encode_multipart(values)
+    return f'multipart/form-data; boundary={boundary}', body
+
+
+def free_port() -> int:
+    """Find a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, workers: int, threads: int) -> subprocess.Popen:
+    """
+    Start a production server and wait until it accepts connections.
+
+    Args:
+        port: Server port
+        workers: Number of worker processes
+        threads: Number of request threads per worker process
+
+    Returns:
+        Server process
+    """
+    command = [
+        sys.executable, '-m', 'pixtrail', '-w', '--no-browser',
+        '--host', '127.0.0.1', '--port', str(port),
+        '--workers', str(workers), '--threads', str(threads)
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            status, _ = request(port, 'GET', '/api/jobs/unknown')
+            if status == 404:
+                return process
+        except OSError:
+            time.sleep(0.1)
+    stop_server(process)
+    raise RuntimeError(f"Server with {workers} workers did not start")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    """Stop a server process and its workers."""
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(STARTUP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def request(port: int, method: str, path: str, body: bytes = None, content_type: str = None) -> Tuple[int, Any]:
+    """
+    Send one request to the server.
+
+    Returns:
+        Tuple of (status code, decoded JSON response or None)
+    """
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    try:
+        headers = {'Content-Type': content_type} if content_type else {}
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        data = response.read()
+    finally:
+        connection.close()
+    try:
+        return response.status, json.loads(data)
+    except ValueError:
+        return response.status, None
+
+
+def run_session(port: int, content_type: str, body: bytes) -> bool:
+    """Upload, process and clean up one session; returns whether it succeeded."""
+    status, result = request(port, 'POST', '/api/submit-stream', body, content_type)
+    if status != 200:
+        return False
+    session_id = result['session_id']
+    status, result = request(port, 'POST', f'/api/process/{session_id}')
+    ok = status == 200 and result.get('success')
+    status, _ = request(port, 'POST', f'/api/cleanup/{session_id}')
+    return bool(ok) and status == 200
+
+
+def measure(port: int, clients: int, duration: float, content_type: str, body: bytes) -> Dict[str, Any]:
+    """
+    Run sessions from concurrent clients for a fixed time.
+
+    Returns:
+        Dictionary with the number of 'sessions', 'errors', 'sessions_per_sec'
+        and the median and 95th percentile session latency in seconds
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client() -> None:
+        while time.monotonic() < deadline:
+            start = time.monotonic()
+            try:
+                ok = run_session(port, content_type, body)
+            except OSError:
+                ok = False
+            with lock:
+                if ok:
+                    latencies.append(time.monotonic() - start)
+                else:
+                    errors[0] += 1
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    latencies.sort()
+    return {
+        'sessions': len(latencies),
+        'errors': errors[0],
+        'sessions_per_sec': len(latencies) / elapsed,
+        'latency_p50': statistics.median(latencies) if latencies else None,
+        'latency_p95': latencies[int(len(latencies) * 0.95)] if latencies else None
+    }
+
+
+def main(args: List[str] = None) -> int:
+    """
+    Run the load test.
+
+    Args:
+        args: Command-line arguments (if None, use sys.argv)
+
+    Returns:
+        Exit code (0 for success, 1 if sessions failed)
+    """
+    from pixtrail.web.server import DEFAULT_THREADS
+
+    parser = argparse.ArgumentParser(description="Load test the PixTrail web server")
+    parser.add_argument("--workers", default=DEFAULT_WORKERS, help=f"Comma-separated worker counts (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS, help="Request threads per worker process")
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="Seconds per worker count")
+    parser.add_argument("--photos", type=int, default=DEFAULT_PHOTOS, help="Photos per session")
+    parser.add_argument("-o", "--output", help="Write the results as JSON to this file")
+    parsed_args = parser.parse_args(args)
+
+    content_type, body = build_upload(parsed_args.photos)
+    print(f"CPUs: {os.cpu_count()}, clients: {parsed_args.clients}, "
+          f"photos per session: {parsed_args.photos}, threads per worker: {parsed_args.threads}")
+
+    results = {}
+    for workers in [int(value) for value in parsed_args.workers.split(',')]:
+        port = free_port()
+        process = start_server(port, workers, parsed_args.threads)
+        try:
+            result = measure(port, parsed_args.clients, parsed_args.duration, content_type, body)
+        finally:
+            stop_server(process)
+        results[workers] = result
+        latency = f"{result['latency_p50']:.3f}s / {result['latency_p95']:.3f}s" if result['sessions'] else "-"
+        print(f"{workers:>3} workers: {result['sessions_per_sec']:8.2f} sessions/sec, "
+              f"p50/p95 latency {latency}, {result['errors']} errors")
+
+    first = results[min(results)]['sessions_per_sec']
+    if first:
+        for workers, result in sorted(results.items()):
+            print(f"{workers:>3} workers: {result['sessions_per_sec'] / first:5.2f}x")
+
+    if parsed_args.output:
+        with open(parsed_args.output, 'w') as f:
+            json.dump({str(workers): result for workers, result in results.items()}, f, indent=2)
+
+    return 1 if any(result['errors'] for result in results.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Run the PixTrail benchmark suites and compare them against stored baselines.
+
+Usage:
+    python -m benchmarks.run [--filter TEXT] [--update-baseline]
+
+Each benchmark is divided by the time of its suite's reference benchmark
+(see suites.py), and only these ratios are compared. The benchmarks of a
+suite take turns round by round and each ratio is taken within a round,
+so machine speed and background load affect both timings alike. A benchmark whose ratio exceeds its
+baseline ratio by more than the threshold is reported as a regression
+and makes the command exit with status 1.
+"""
+
+import argparse
+import gc
+import inspect
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import suites
+
+# Stored baselines, next to this module
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Maximum allowed ratio of relative time to baseline
+DEFAULT_THRESHOLD = 1.5
+
+# Timed rounds per suite
+DEFAULT_REPEAT = 5
+
+# Shortest duration of one timed call batch; fast benchmarks are called
+# several times per round so timer resolution matters less
+MIN_RUN_SECONDS = 0.05
+
+
+def discover(name_filter: Optional[str] = None) -> Iterator[Tuple[type, List[str]]]:
+    """
+    Find the benchmarks in the suites module.
+
+    A suite's reference benchmark comes first, and is included whenever
+    another benchmark of the suite matches the filter.
+
+    Args:
+        name_filter: Only include benchmarks whose name contains this text
+
+    Yields:
+        (suite class, method names)
+    """
+    for class_name, suite in inspect.getmembers(suites, inspect.isclass):
+        if suite.__module__ != suites.__name__:
+            continue
+        method_names = [
+            method_name for method_name in sorted(vars(suite))
+            if method_name.startswith('time_')
+            and not (name_filter and name_filter not in f"{class_name}.{method_name}")
+        ]
+        reference = getattr(suite, 'reference', None)
+        if method_names and reference:
+            method_names = [reference] + [name for name in method_names if name != reference]
+        if method_names:
+            yield suite, method_names
+
+
+def run_suite(suite: type, method_names: List[str], repeat: int) -> Optional[Dict[str, List[float]]]:
+    """
+    Time the benchmark methods of one suite.
+
+    The methods take turns: every round times each of them once, so a
+    busy moment slows down the whole round instead of a single benchmark.
+
+    Args:
+        suite: Suite class
+        method_names: Names of the time_* methods
+        repeat: Number of rounds (after one warm-up call per method)
+
+    Returns:
+        Time per call in seconds for each round, by method name, or None
+        if the suite was skipped
+    """
+    instances = []
+    try:
+        methods = {}
+        numbers = {}
+        for method_name in method_names:
+            instance = suite()
+            if hasattr(instance, 'setup'):
+                instance.setup()
+            instances.append(instance)
+            method: Callable[[], Any] = getattr(instance, method_name)
+            start = time.perf_counter()
+            method()
+            elapsed = max(time.perf_counter() - start, 1e-9)
+            methods[method_name] = method
+            numbers[method_name] = max(1, int(MIN_RUN_SECONDS / elapsed))
+
+        times: Dict[str, List[float]] = {method_name: [] for method_name in method_names}
+        for _ in range(repeat):
+            for method_name, method in methods.items():
+                number = numbers[method_name]
+                # Like timeit, keep the garbage left by other benchmarks
+                # from being collected on this one's clock
+                gc.collect()
+                gc.disable()
+                try:
+                    start = time.perf_counter()
+                    for _ in range(number):
+                        method()
+                    times[method_name].append((time.perf_counter() - start) / number)
+                finally:
+                    gc.enable()
+        return times
+    except NotImplementedError:
+        return None
+    finally:
+        for instance in instances:
+            if hasattr(instance, 'teardown'):
+                instance.teardown()
+
+
+def relative_time(times: List[float], reference_times: List[float]) -> float:
+    """Get the median ratio of a benchmark's time to its reference, round by round."""
+    return statistics.median(t / r for t, r in zip(times, reference_times))
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Any],
+    threshold: float
+) -> List[Tuple[str, float]]:
+    """
+    Find benchmarks that are slower than their baseline.
+
+    Args:
+        results: Benchmark results, with a 'relative' time (ratio to the
+                 suite's reference) for all but the reference benchmarks
+        baseline: Stored baseline document
+        threshold: Maximum allowed ratio of relative time to baseline
+
+    Returns:
+        List of (benchmark name, ratio) for each regression
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get('benchmarks', {}).get(name)
+        if not result.get('relative') or not reference or not reference.get('relative'):
+            continue
+        ratio = result['relative'] / reference['relative']
+        if ratio > threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    """Load a baseline document, or return an empty one if there is none."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def main(args: List[str] = None) -> int:
+    """
+    Run the benchmarks.
+
+    Args:
+        args: Command-line arguments (if None, use sys.argv)
+
+    Returns:
+        Exit code (0 for success, 1 if a benchmark regressed)
+    """
+    parser = argparse.ArgumentParser(description="Run the PixTrail benchmark suites")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--files", type=int, help=f"Number of corpus files (default: {suites.DEFAULT_FILES})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed rounds per suite")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file")
+    parser.add_argument("--threshold", type=float, help=f"Allowed slowdown ratio (default: from baseline, or {DEFAULT_THRESHOLD})")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("-o", "--output", help="Write the results as JSON to this file")
+    parsed_args = parser.parse_args(args)
+
+    if parsed_args.files:
+        os.environ['PIXTRAIL_BENCH_FILES'] = str(parsed_args.files)
+
+    baseline = load_baseline(parsed_args.baseline)
+    threshold = parsed_args.threshold or baseline.get('threshold', DEFAULT_THRESHOLD)
+
+    print(f"Corpus: {suites.corpus_size()} files")
+
+    results = {}
+    for suite, method_names in discover(parsed_args.filter):
+        timings = run_suite(suite, method_names, parsed_args.repeat)
+        if timings is None:
+            for method_name in method_names:
+                name = f"{suite.__name__}.{method_name}"
+                print(f"{name:<40} skipped")
+            continue
+
+        reference = getattr(suite, 'reference', None)
+        for method_name, times in timings.items():
+            name = f"{suite.__name__}.{method_name}"
+            results[name] = {
+                'seconds': min(times),
+                'median': statistics.median(times)
+            }
+            line = f"{name:<40} {min(times) * 1000:10.2f} ms"
+            if reference and method_name != reference:
+                results[name]['relative'] = relative_time(times, timings[reference])
+                line += f" {results[name]['relative']:8.3f}x {reference}"
+                stored = baseline.get('benchmarks', {}).get(name)
+                if stored and stored.get('relative'):
+                    line += f" ({results[name]['relative'] / stored['relative']:.2f}x baseline)"
+            print(line)
+
+    document = {
+        'files': suites.corpus_size(),
+        'threshold': threshold,
+        'benchmarks': results
+    }
+
+    if parsed_args.output:
+        with open(parsed_args.output, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+
+    if parsed_args.update_baseline:
+        if parsed_args.filter:
+            # Keep the baselines of the benchmarks that weren't run
+            merged = dict(baseline.get('benchmarks', {}))
+            merged.update(results)
+            document['benchmarks'] = merged
+        with open(parsed_args.baseline, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline written to {parsed_args.baseline}")
+        return 0
+
+    if baseline and baseline.get('files') != suites.corpus_size():
+        print("Baseline was recorded with a different corpus size; not comparing.")
+        return 0
+
+    regressions = compare(results, baseline, threshold)
+    for name, ratio in regressions:
+        print(f"REGRESSION: {name} is {ratio:.2f}x its baseline (threshold {threshold:.2f}x)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Benchmark suites for PixTrail.
+
+Suites follow the asv conventions: each class has an optional setup() and
+teardown(), and every time_* method is one benchmark. setup() raising
+NotImplementedError skips the suite. Run them with python -m benchmarks.run.
+
+Each suite names one of its benchmarks as its reference: a comparable
+workload, mostly the standard library or the slower code path it replaced.
+The other benchmarks are compared to their baseline as a ratio to the
+reference measured in the same round.
+"""
+
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from pixtrail.core import PixTrail
+from pixtrail.exif_reader import ExifReader
+from pixtrail.gpx_generator import GPXGenerator
+from pixtrail.points import PointTable
+from pixtrail.utils import get_image_files
+from pixtrail.web.payloads import decode_binary, decode_columns, encode_binary, encode_columns
+from pixtrail.web.track import encode_track
+
+from .corpus import ensure_corpus
+
+# Number of files in the corpus (override with PIXTRAIL_BENCH_FILES)
+DEFAULT_FILES = 500
+
+# Number of points for the sort and GPX write benchmarks
+POINT_COUNT = 20000
+
+
+def corpus_size() -> int:
+    """Get the configured number of corpus files."""
+    return int(os.environ.get('PIXTRAIL_BENCH_FILES', DEFAULT_FILES))
+
+
+def corpus_dir() -> str:
+    """Get the corpus directory, generating the corpus on first use."""
+    root = os.environ.get('PIXTRAIL_BENCH_DIR') or os.path.join(
+        tempfile.gettempdir(), 'pixtrail-bench-corpus'
+    )
+    return ensure_corpus(root, corpus_size(), seed=0)
+
+
+def synthetic_points(count: int = POINT_COUNT, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Build GPS data dictionaries in shuffled timestamp order.
+
+    Args:
+        count: Number of points
+        seed: Random seed
+
+    Returns:
+        List of dictionaries like those returned by ExifReader
+    """
+    rng = random.Random(seed)
+    start = datetime(2023, 5, 1, 8, 0, 0)
+    points = [{
+        'latitude': 52.52 + rng.uniform(-0.5, 0.5),
+        'longitude': 13.405 + rng.uniform(-0.5, 0.5),
+        'altitude': round(rng.uniform(0, 500), 1),
+        'timestamp': start + timedelta(seconds=i * 60),
+        'name': f"IMG_{i:06d}.jpg"
+    } for i in range(count)]
+    rng.shuffle(points)
+    return points
+
+
+class Scan:
+    """File discovery."""
+
+    reference = 'time_os_walk'
+
+    def setup(self) -> None:
+        self.root = corpus_dir()
+
+    def time_scan_recursive(self) -> None:
+        get_image_files(self.root, recursive=True)
+
+    def time_os_walk(self) -> None:
+        for _, _, filenames in os.walk(self.root):
+            [os.path.splitext(name)[1].lower() for name in filenames]
+
+
+class Extract:
+    """EXIF extraction."""
+
+    reference = 'time_extract_exifread'
+
+    def setup(self) -> None:
+        self.root = corpus_dir()
+        self.files = get_image_files(self.root, recursive=True)
+
+    def time_extract(self) -> None:
+        for image_path in self.files:
+            ExifReader.extract_gps_data(image_path)
+
+    def time_extract_exifread(self) -> None:
+        for image_path in self.files:
+            with open(image_path, 'rb') as f:
+                ExifReader._extract_gps_with_exifread(f, image_path)
+
+    def time_process_directory(self) -> None:
+        with redirect_stdout(io.StringIO()):
+            PixTrail().process_directory(self.root, recursive=True)
+
+    def time_iter_points(self) -> None:
+        for _ in PixTrail().iter_points(self.root, recursive=True):
+            pass
+
+
+class Sort:
+    """Sorting points by timestamp."""
+
+    reference = 'time_sort_dicts'
+
+    def setup(self) -> None:
+        self.points = synthetic_points()
+        self.table = PointTable.from_dicts(self.points)
+
+    def time_sort_dicts(self) -> None:
+        sorted(self.points, key=lambda point: point['timestamp'])
+
+    def time_sort_point_table(self) -> None:
+        self.table.sorted_by_time()
+
+
+class GPXWrite:
+    """GPX serialization."""
+
+    reference = 'time_write_gpxpy'
+
+    def setup(self) -> None:
+        self.points = synthetic_points()
+        self.table = PointTable.from_dicts(self.points)
+        self.temp_dir = tempfile.mkdtemp(prefix='pixtrail-bench-')
+        self.output_path = os.path.join(self.temp_dir, 'bench.gpx')
+
+    def teardown(self) -> None:
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def time_write_streaming(self) -> None:
+        GPXGenerator.create_gpx(self.points, self.output_path)
+
+    def time_write_point_table(self) -> None:
+        GPXGenerator.create_gpx(self.table, self.output_path)
+
+    def time_write_gpxpy(self) -> None:
+        GPXGenerator.create_gpx(self.points, self.output_path, use_gpxpy=True)
+
+
+class Payloads:
+    """Encoding and decoding of API point payloads."""
+
+    reference = 'time_decode_records'
+
+    def setup(self) -> None:
+        self.table = PointTable.from_dicts(synthetic_points())
+        self.records = json.dumps([dict(point, timestamp=point['timestamp'].isoformat())
+                                   for point in self.table.to_dicts()])
+        self.columns = json.dumps(encode_columns(self.table))
+        self.binary = encode_binary(self.table)
+
+    def time_decode_records(self) -> None:
+        PointTable.from_dicts(json.loads(self.records))
+
+    def time_decode_columns(self) -> None:
+        decode_columns(json.loads(self.columns))
+
+    def time_decode_binary(self) -> None:
+        decode_binary(self.binary)
+
+    def time_encode_columns(self) -> None:
+        json.dumps(encode_columns(self.table))
+
+    def time_encode_binary(self) -> None:
+        encode_binary(self.table)
+
+    def time_encode_track(self) -> None:
+        encode_track(self.table)
+
+
+class Analysis:
+    """Route statistics (requires NumPy)."""
+
+    reference = 'time_build_table'
+
+    def setup(self) -> None:
+        try:
+            from pixtrail.analysis import route_statistics
+        except ImportError:
+            raise NotImplementedError("NumPy is not installed")
+        self.route_statistics = route_statistics
+        self.points = synthetic_points()
+        self.table = PointTable.from_dicts(self.points)
+
+    def time_route_statistics(self) -> None:
+        self.route_statistics(self.table)
+
+    def time_build_table(self) -> None:
+        PointTable.from_dicts(self.points)
+
+
+class APIProcess:
+    """The /api/process endpoint of the web interface."""
+
+    reference = 'time_process_directory'
+
+    def setup(self) -> None:
+        try:
+            from pixtrail.web import create_app
+        except ImportError:
+            raise NotImplementedError("Web interface dependencies not installed")
+
+        self.files = get_image_files(corpus_dir(), recursive=True)
+        self.data_dir = tempfile.mkdtemp(prefix='pixtrail-bench-')
+        app = create_app()
+        app.config['PIXTRAIL_DATA_DIR'] = self.data_dir
+        self.client = app.test_client()
+        self.sessions = 0
+
+    def teardown(self) -> None:
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def time_api_process(self) -> None:
+        # The endpoint deletes the photos, so each call gets a fresh session
+        # of hard links (cheap compared to the processing itself)
+        self.sessions += 1
+        session_id = f"bench{self.sessions}"
+        session_dir = os.path.join(self.data_dir, session_id)
+        os.makedirs(session_dir)
+        for i, image_path in enumerate(self.files):
+            target = os.path.join(session_dir, f"{i:06d}_{os.path.basename(image_path)}")
+            try:
+                os.link(image_path, target)
+            except OSError:
+                shutil.copyfile(image_path, target)
+
+        with redirect_stdout(io.StringIO()):
+            response = self.client.post(f'/api/process/{session_id}')
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/process failed with status {response.status_code}")
+        shutil.rmtree(session_dir)
+
+    def time_process_directory(self) -> None:
+        with redirect_stdout(io.StringIO()):
+            PixTrail().process_directory(corpus_dir(), recursive=True)
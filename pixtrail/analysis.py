@@ -0,0 +1,165 @@
+"""
+Route statistics computed with NumPy.
+
+Computes the distance, duration, speed and elevation figures of a route,
+the same figures the web interface used to compute in the browser, over
+the columns of a PointTable at once. Requires NumPy, installed with the
+'analysis' extra (pip install pixtrail[analysis]).
+"""
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+
+import numpy as np
+
+from .points import NO_TIMESTAMP, PointTable
+
+# Mean Earth radius in kilometers
+EARTH_RADIUS_KM = 6371.0
+
+# Segments longer than this are GPS jumps and don't count (km)
+MAX_SEGMENT_DISTANCE = 10.0
+
+# Segments faster than this are GPS errors and have no speed (km/h)
+MAX_SPEED = 300.0
+
+Points = Union[PointTable, Iterable[Mapping[str, Any]]]
+
+
+def haversine(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """
+    Calculate great-circle distances with the haversine formula.
+
+    Args:
+        lat1: Latitudes of the start points in decimal degrees
+        lon1: Longitudes of the start points in decimal degrees
+        lat2: Latitudes of the end points in decimal degrees
+        lon2: Longitudes of the end points in decimal degrees
+
+    Returns:
+        Distances in kilometers
+    """
+    lat1, lon1, lat2, lon2 = np.radians(lat1), np.radians(lon1), np.radians(lat2), np.radians(lon2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def _series(values: np.ndarray, decimals: int) -> List[Optional[float]]:
+    """Round a series for JSON, with None for unknown (NaN) values."""
+    rounded = np.round(values, decimals)
+    return [None if value != value else value for value in rounded.tolist()]
+
+
+def route_statistics(points: Points) -> Optional[Dict[str, Any]]:
+    """
+    Calculate the statistics of a route.
+
+    The route runs through the points in timestamp order. If at least two
+    points have a timestamp, points without one are left out; otherwise
+    the points are taken in their given order. Points with invalid
+    coordinates are always left out.
+
+    Args:
+        points: PointTable or GPS data dictionaries
+
+    Returns:
+        Dictionary of totals (distances in km, durations in seconds, speeds
+        in km/h and elevations in m) and of 'segments' series with one
+        value per segment between consecutive points (None if unknown), or
+        None if the route has fewer than two valid points
+    """
+    table = points if isinstance(points, PointTable) else PointTable.from_dicts(points)
+    latitudes = np.frombuffer(table.latitudes, dtype=np.float64)
+    longitudes = np.frombuffer(table.longitudes, dtype=np.float64)
+    altitudes = np.frombuffer(table.altitudes, dtype=np.float64)
+    micros = np.frombuffer(table.timestamps, dtype=np.int64)
+
+    with np.errstate(invalid='ignore'):
+        valid = (np.abs(latitudes) <= 90) & (np.abs(longitudes) <= 180)
+    order = np.flatnonzero(valid)
+    if order.size < 2:
+        return None
+
+    timed = order[micros[order] != NO_TIMESTAMP]
+    if timed.size > 1:
+        order = timed[np.argsort(micros[timed], kind='stable')]
+
+    latitudes, longitudes, altitudes = latitudes[order], longitudes[order], altitudes[order]
+    distances = haversine(latitudes[:-1], longitudes[:-1], latitudes[1:], longitudes[1:])
+    counted = distances < MAX_SEGMENT_DISTANCE
+
+    stats: Dict[str, Any] = {
+        'photo_count': int(order.size),
+        'total_distance': round(float(distances[counted].sum()), 2),
+        'total_duration': 0.0,
+        'start_time': None,
+        'end_time': None
+    }
+
+    if timed.size > 1:
+        seconds = np.diff(micros[order]) / 1e6
+        stats['total_duration'] = float(micros[order[-1]] - micros[order[0]]) / 1e6
+        stats['start_time'] = table.timestamp(int(order[0])).isoformat()
+        stats['end_time'] = table.timestamp(int(order[-1])).isoformat()
+    else:
+        seconds = np.full(distances.size, np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speeds = np.where(counted & (seconds > 0), distances / seconds * 3600, np.nan)
+        speeds[speeds >= MAX_SPEED] = np.nan
+    known_speeds = speeds[~np.isnan(speeds)]
+    if known_speeds.size:
+        avg_speed = float(known_speeds.mean())
+    elif stats['total_distance'] > 0 and stats['total_duration'] > 0:
+        avg_speed = float(distances[counted].sum()) / (stats['total_duration'] / 3600)
+    else:
+        avg_speed = 0.0
+    stats['avg_speed'] = round(avg_speed, 2)
+    stats['max_speed'] = round(float(known_speeds.max()), 2) if known_speeds.size else 0.0
+
+    # Gain and loss between consecutive known elevations, skipping unknown ones
+    elevations = altitudes[~np.isnan(altitudes)]
+    changes = np.diff(elevations)
+    stats['min_elevation'] = round(float(elevations.min()), 1) if elevations.size else 0.0
+    stats['max_elevation'] = round(float(elevations.max()), 1) if elevations.size else 0.0
+    stats['elevation_gain'] = round(float(changes[changes > 0].sum()), 1)
+    stats['elevation_loss'] = round(float(-changes[changes < 0].sum()), 1)
+
+    stats['segments'] = {
+        'distance': _series(distances, 5),
+        'duration': _series(seconds, 3),
+        'speed': _series(speeds, 2),
+        'elevation_change': _series(np.diff(altitudes), 2)
+    }
+    stats['elevation_profile'] = _series(altitudes, 1)
+    return stats
+
+
+def format_report(stats: Optional[Dict[str, Any]]) -> str:
+    """
+    Format route statistics as a text report.
+
+    Args:
+        stats: Statistics from route_statistics
+
+    Returns:
+        Report text
+    """
+    if not stats:
+        return "Route statistics: not enough points with valid coordinates"
+    hours, rest = divmod(int(stats['total_duration']), 3600)
+    minutes, seconds = divmod(rest, 60)
+    lines = [
+        "Route statistics:",
+        f"  Photos: {stats['photo_count']}",
+        f"  Distance: {stats['total_distance']:.2f} km",
+        f"  Duration: {hours}h {minutes:02d}m {seconds:02d}s",
+    ]
+    if stats['start_time']:
+        lines.append(f"  Start: {stats['start_time']}")
+        lines.append(f"  End: {stats['end_time']}")
+    lines += [
+        f"  Speed: {stats['avg_speed']:.2f} km/h average, {stats['max_speed']:.2f} km/h maximum",
+        f"  Elevation: {stats['min_elevation']:.1f} m to {stats['max_elevation']:.1f} m, "
+        f"+{stats['elevation_gain']:.1f} m / -{stats['elevation_loss']:.1f} m",
+    ]
+    return "\n".join(lines)
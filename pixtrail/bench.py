@@ -0,0 +1,232 @@
+"""
+Throughput benchmark for sizing hardware on real storage.
+"""
+
+import io
+import math
+import os
+import platform
+import struct
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from typing import Any, Dict, List, Optional, Sequence
+
+from .core import PixTrail
+from .exif_reader import ExifReader, _CountingFile, _UnsupportedHeader
+from .gpx_generator import GPXGenerator
+from .utils import get_image_files
+
+# Parsers that can be timed individually
+BENCH_PARSERS = ('fast', 'exifread', 'pillow')
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _rate(count: int, seconds: float) -> Optional[float]:
+    """Items per second, or None if nothing was timed."""
+    return round(count / seconds, 1) if seconds > 0 else None
+
+
+def _time_parser(parser: str, image_path: str) -> Dict[str, Any]:
+    """
+    Extract GPS data from one file with a single parser.
+
+    Args:
+        parser: Parser name ('fast', 'exifread' or 'pillow')
+        image_path: Path to the image file
+
+    Returns:
+        Dictionary with 'seconds', 'bytes_read' and 'status'
+        ('gps', 'no_gps', 'unsupported' or 'error')
+    """
+    start = time.perf_counter()
+    with open(image_path, 'rb') as raw_file:
+        f = _CountingFile(raw_file)
+        try:
+            if parser == 'fast':
+                gps_data = ExifReader._extract_gps_fast(f, image_path)
+            elif parser == 'exifread':
+                gps_data = ExifReader._extract_gps_with_exifread(f, image_path)
+            else:
+                gps_data = ExifReader._extract_gps_with_pillow(image_path, f)
+            status = 'gps' if gps_data else 'no_gps'
+        except (_UnsupportedHeader, struct.error, IndexError, ValueError):
+            status = 'unsupported' if parser == 'fast' else 'error'
+        except Exception:
+            status = 'error'
+
+    return {
+        'seconds': time.perf_counter() - start,
+        'bytes_read': f.bytes_read,
+        'status': status
+    }
+
+
+def _benchmark_parser(parser: str, image_files: List[str]) -> Dict[str, Any]:
+    """
+    Time one parser over a list of files, one file at a time.
+
+    Args:
+        parser: Parser name
+        image_files: Paths of the image files
+
+    Returns:
+        Dictionary with per-file latency percentiles, bytes read and result counts
+    """
+    latencies = []
+    bytes_read = 0
+    counts = {'gps': 0, 'no_gps': 0, 'unsupported': 0, 'error': 0}
+
+    for image_path in image_files:
+        result = _time_parser(parser, image_path)
+        latencies.append(result['seconds'])
+        bytes_read += result['bytes_read']
+        counts[result['status']] += 1
+
+    total_seconds = sum(latencies)
+    latencies.sort()
+
+    report = {
+        'files': len(image_files),
+        'seconds': round(total_seconds, 6),
+        'files_per_sec': _rate(len(image_files), total_seconds),
+        'p50_ms': round(_percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(_percentile(latencies, 0.95) * 1000, 3),
+        'bytes_read': bytes_read,
+        'bytes_read_per_file': round(bytes_read / len(image_files)) if image_files else 0
+    }
+    report.update(counts)
+    return report
+
+
+def run_benchmark(
+    input_dir: str,
+    recursive: bool = False,
+    max_depth: Optional[int] = None,
+    workers: int = 1,
+    io_concurrency: int = 1,
+    parsers: Sequence[str] = BENCH_PARSERS,
+    sample: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Measure discovery, extraction and GPX serialization on a directory.
+
+    The end-to-end run goes first, so it sees the storage as cold as it is
+    when the benchmark starts; the per-parser runs that follow read the same
+    files again and usually hit the operating system's page cache.
+
+    Args:
+        input_dir: Directory containing image files
+        recursive: Whether to search recursively in subdirectories
+        max_depth: Maximum number of subdirectory levels to descend when
+                   recursive (None for no limit)
+        workers: Number of worker processes for the end-to-end run
+        io_concurrency: Number of concurrent file reads for the end-to-end run
+        parsers: Parsers to time individually
+        sample: Number of files (spread evenly over the input) to use for the
+                per-parser runs (None for all files)
+
+    Returns:
+        Report dictionary, suitable for JSON serialization
+
+    Raises:
+        FileNotFoundError: If input_dir does not exist
+    """
+    report = {
+        'input_dir': os.path.abspath(input_dir),
+        'recursive': recursive,
+        'max_depth': max_depth,
+        'workers': workers,
+        'io_concurrency': io_concurrency,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+    # File discovery
+    start = time.perf_counter()
+    image_files = get_image_files(input_dir, recursive, max_depth)
+    discovery_seconds = time.perf_counter() - start
+    report['discovery'] = {
+        'files': len(image_files),
+        'seconds': round(discovery_seconds, 6),
+        'files_per_sec': _rate(len(image_files), discovery_seconds)
+    }
+
+    # End-to-end: discovery, extraction and GPX writing, without the cache
+    pixtrail = PixTrail(workers=workers, io_concurrency=io_concurrency)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        gpx_path = os.path.join(temp_dir, 'bench.gpx')
+
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = pixtrail.process_directory(input_dir, recursive, max_depth)
+            extraction_seconds = time.perf_counter() - start
+
+            gpx_start = time.perf_counter()
+            gpx_written = GPXGenerator.create_gpx(result['gps_data'], gpx_path)
+            gpx_seconds = time.perf_counter() - gpx_start
+
+        points = len(result['gps_data'])
+        report['gpx'] = {
+            'points': points,
+            'seconds': round(gpx_seconds, 6) if gpx_written else None,
+            'points_per_sec': _rate(points, gpx_seconds) if gpx_written else None,
+            'bytes': os.path.getsize(gpx_path) if gpx_written else 0
+        }
+
+    total_seconds = extraction_seconds + (gpx_seconds if gpx_written else 0.0)
+    report['end_to_end'] = {
+        'files': result['stats']['total'],
+        'with_gps': result['stats']['processed'],
+        'seconds': round(total_seconds, 6),
+        'files_per_sec': _rate(result['stats']['total'], total_seconds)
+    }
+
+    # Per-parser extraction, one file at a time
+    if sample and len(image_files) > sample:
+        step = len(image_files) / sample
+        parser_files = [image_files[int(i * step)] for i in range(sample)]
+    else:
+        parser_files = image_files
+
+    report['extraction'] = {}
+    with redirect_stdout(io.StringIO()):
+        for parser in parsers:
+            report['extraction'][parser] = _benchmark_parser(parser, parser_files)
+
+    return report
+
+
+def print_summary(report: Dict[str, Any], file: Any = None) -> None:
+    """
+    Print a human-readable summary of a benchmark report.
+
+    Args:
+        report: Report returned by run_benchmark
+        file: Stream to write to (default: sys.stderr)
+    """
+    file = file or sys.stderr
+    discovery = report['discovery']
+    end_to_end = report['end_to_end']
+
+    print(f"Discovery:  {discovery['files']} files in {discovery['seconds']:.3f}s", file=file)
+    print(
+        f"End-to-end: {end_to_end['files']} files in {end_to_end['seconds']:.3f}s "
+        f"({end_to_end['files_per_sec']} files/sec, {report['workers']} workers)",
+        file=file
+    )
+    for parser, stats in report['extraction'].items():
+        print(
+            f"{parser + ':':<11} p50 {stats['p50_ms']:.3f} ms, p95 {stats['p95_ms']:.3f} ms, "
+            f"{stats['bytes_read_per_file']} bytes/file",
+            file=file
+        )
@@ -0,0 +1,144 @@
+"""
+Persistent cache of EXIF extraction results.
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .utils import parse_timestamp
+
+# Returned by ExtractionCache.get when a file is not in the cache
+# (distinct from None, which is a cached "no GPS data" result)
+MISS = object()
+
+
+def get_default_cache_path() -> str:
+    """
+    Get the default location of the extraction cache database.
+
+    Returns:
+        Path inside $XDG_CACHE_HOME (or ~/.cache) for the cache file
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'pixtrail', 'extraction-cache.sqlite3')
+
+
+class ExtractionCache:
+    """
+    SQLite-backed cache of GPS data extracted from image files.
+
+    Entries are keyed by the absolute file path and validated against the
+    file's size, modification time (ns) and inode, so any change to the
+    file invalidates its entry. Images without GPS data are cached as well.
+    The database uses WAL mode so several processes can share it.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Open (and create if needed) the cache database.
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = os.path.normpath(db_path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self.connection = sqlite3.connect(self.db_path, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS extraction ('
+            ' path TEXT PRIMARY KEY,'
+            ' size INTEGER NOT NULL,'
+            ' mtime_ns INTEGER NOT NULL,'
+            ' inode INTEGER NOT NULL,'
+            ' has_gps INTEGER NOT NULL,'
+            ' latitude REAL,'
+            ' longitude REAL,'
+            ' altitude REAL,'
+            ' timestamp TEXT'
+            ')'
+        )
+        self.connection.commit()
+
+    def __enter__(self) -> 'ExtractionCache':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.connection.close()
+
+    def get(self, image_path: str, stat_result: os.stat_result) -> Any:
+        """
+        Look up the cached extraction result for an image.
+
+        Args:
+            image_path: Path to the image file
+            stat_result: Current os.stat() result of the file
+
+        Returns:
+            Dictionary containing GPS data, None for a cached "no GPS data"
+            result, or MISS if the file is not cached or has changed
+        """
+        row = self.connection.execute(
+            'SELECT size, mtime_ns, inode, has_gps, latitude, longitude, altitude, timestamp'
+            ' FROM extraction WHERE path = ?',
+            (os.path.abspath(image_path),)
+        ).fetchone()
+
+        if row is None or tuple(row[:3]) != self._file_key(stat_result):
+            return MISS
+
+        if not row[3]:
+            return None
+
+        return {
+            'latitude': row[4],
+            'longitude': row[5],
+            'altitude': row[6],
+            'timestamp': parse_timestamp(row[7]) if row[7] else None,
+            'name': os.path.basename(image_path)
+        }
+
+    def put_many(
+        self,
+        entries: Iterable[Tuple[str, os.stat_result, Optional[Dict[str, Any]]]]
+    ) -> None:
+        """
+        Store extraction results in a single transaction.
+
+        Args:
+            entries: Iterable of (image path, os.stat() result, GPS data or None)
+        """
+        rows = []
+        for image_path, stat_result, gps_data in entries:
+            size, mtime_ns, inode = self._file_key(stat_result)
+            if gps_data:
+                timestamp = gps_data.get('timestamp')
+                rows.append((
+                    os.path.abspath(image_path), size, mtime_ns, inode, 1,
+                    gps_data['latitude'], gps_data['longitude'],
+                    gps_data.get('altitude', 0.0),
+                    timestamp.isoformat() if isinstance(timestamp, datetime) else None
+                ))
+            else:
+                rows.append((
+                    os.path.abspath(image_path), size, mtime_ns, inode, 0,
+                    None, None, None, None
+                ))
+
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO extraction VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+
+    @staticmethod
+    def _file_key(stat_result: os.stat_result) -> Tuple[int, int, int]:
+        """Return the (size, mtime_ns, inode) validation key of a file."""
+        return stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino
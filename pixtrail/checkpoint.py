@@ -0,0 +1,195 @@
+"""
+Append-only checkpoint manifest for resumable batch runs.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from .cache import MISS
+from .utils import parse_timestamp
+
+# Number of file records buffered before they are written out
+CHECKPOINT_FLUSH_INTERVAL = 256
+
+# Version of the manifest format
+CHECKPOINT_VERSION = 1
+
+
+class BatchCheckpoint:
+    """
+    Manifest of the work completed by a batch run.
+
+    The manifest is a JSON Lines file that is only ever appended to: a
+    header with the run options, one record per extracted file and one
+    record per finished directory. File records are buffered and written
+    in groups, so checkpointing costs little even at high throughput; a
+    crash loses at most the records that weren't flushed yet. A truncated
+    last line (from a crash mid-write) is ignored when the manifest is
+    loaded.
+    """
+
+    def __init__(self, path: str, options: Optional[Dict[str, Any]] = None):
+        """
+        Open a checkpoint manifest, loading the progress it records.
+
+        If the manifest was written with different options (for example a
+        different recursive setting), its progress is discarded and the
+        manifest is started over.
+
+        Args:
+            path: Path to the manifest file
+            options: Run options that must match for progress to be reused
+        """
+        self.path = os.path.normpath(path)
+        self.options = dict(options or {}, version=CHECKPOINT_VERSION)
+        self.files: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.done: Dict[str, Dict[str, Any]] = {}
+        self._buffer = []
+
+        if not self._load():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'w') as f:
+                f.write(json.dumps({'options': self.options}) + '\n')
+
+        self._file = open(self.path, 'a')
+
+    def __enter__(self) -> 'BatchCheckpoint':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _load(self) -> bool:
+        """
+        Read an existing manifest.
+
+        Returns:
+            True if the manifest exists and was written with the same options
+        """
+        try:
+            with open(self.path) as f:
+                lines = f.read().split('\n')
+        except FileNotFoundError:
+            return False
+
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            header = {}
+        if header.get('options') != self.options:
+            print(f"Warning: Checkpoint {self.path} was written with different options, starting over")
+            return False
+
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Truncated by an interrupted write
+                continue
+            if 'file' in record:
+                self.files[record['file']] = self._decode(record['gps'])
+            elif 'done' in record:
+                self.done[record['done']] = record
+
+        # Keep the file on a line boundary if the last write was cut short
+        if lines[-1]:
+            with open(self.path, 'a') as f:
+                f.write('\n')
+        return True
+
+    @staticmethod
+    def _encode(gps_data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Convert GPS data to a JSON-serializable dictionary."""
+        if not gps_data:
+            return None
+        timestamp = gps_data.get('timestamp')
+        return {
+            'latitude': gps_data['latitude'],
+            'longitude': gps_data['longitude'],
+            'altitude': gps_data.get('altitude', 0.0),
+            'timestamp': timestamp.isoformat() if isinstance(timestamp, datetime) else None
+        }
+
+    @staticmethod
+    def _decode(record: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Convert a stored record back to GPS data (without the name)."""
+        if not record:
+            return None
+        gps_data = dict(record)
+        if gps_data.get('timestamp'):
+            gps_data['timestamp'] = parse_timestamp(gps_data['timestamp'])
+        else:
+            gps_data.pop('timestamp', None)
+        return gps_data
+
+    def is_done(self, input_dir: str) -> bool:
+        """Check whether a directory was finished by an earlier run."""
+        return os.path.abspath(input_dir) in self.done
+
+    def get(self, image_path: str) -> Any:
+        """
+        Look up the recorded extraction result for a file.
+
+        Args:
+            image_path: Path to the image file
+
+        Returns:
+            Dictionary containing GPS data, None for a recorded "no GPS data"
+            result, or MISS if the file hasn't been recorded
+        """
+        key = os.path.abspath(image_path)
+        if key not in self.files:
+            return MISS
+        gps_data = self.files[key]
+        if gps_data is None:
+            return None
+        return dict(gps_data, name=os.path.basename(image_path))
+
+    def record_file(self, image_path: str, gps_data: Optional[Dict[str, Any]]) -> None:
+        """
+        Record the extraction result of a file.
+
+        Args:
+            image_path: Path to the image file
+            gps_data: Extracted GPS data, or None for an image without GPS data
+        """
+        record = {'file': os.path.abspath(image_path), 'gps': self._encode(gps_data)}
+        self._buffer.append(json.dumps(record, separators=(',', ':')))
+        if len(self._buffer) >= CHECKPOINT_FLUSH_INTERVAL:
+            self.flush()
+
+    def record_done(self, input_dir: str, output_path: Optional[str], success: bool) -> None:
+        """
+        Record that a directory is finished and flush the manifest to disk.
+
+        Args:
+            input_dir: Input directory
+            output_path: GPX file written for the directory (None if none)
+            success: Whether the GPX file was created
+        """
+        record = {'done': os.path.abspath(input_dir), 'output': output_path, 'success': success}
+        self.done[record['done']] = record
+        self._buffer.append(json.dumps(record, separators=(',', ':')))
+        self.flush(sync=True)
+
+    def flush(self, sync: bool = False) -> None:
+        """
+        Write buffered records to the manifest.
+
+        Args:
+            sync: Also ask the operating system to write them to disk
+        """
+        if self._buffer:
+            self._file.write('\n'.join(self._buffer) + '\n')
+            self._buffer = []
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """Flush buffered records and close the manifest."""
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
@@ -3,12 +3,18 @@ Command-line interface for the PixTrail package.
 """
 
 import argparse
+import json
 import os
 import sys
-from typing import List, Optional
+import time
+from typing import Any, List, Optional
 
+from .bench import BENCH_PARSERS, print_summary, run_benchmark
+from .cache import get_default_cache_path
+from .checkpoint import BatchCheckpoint
 from .core import PixTrail
-from .utils import ensure_directory, get_default_output_path
+from .progress import make_progress_bar
+from .utils import ensure_directory, get_default_output_path, parse_size
 
 
 def parse_args(args: List[str] = None) -> argparse.Namespace:
@@ -22,7 +28,8 @@ def parse_args(args: List[str] = None) -> argparse.Namespace:
         Parsed arguments
     """
     parser = argparse.ArgumentParser(
-        description="Extract GPS data from photos and create GPX files"
+        description="Extract GPS data from photos and create GPX files",
+        epilog="Run 'pixtrail bench --help' to measure throughput on a directory"
     )
     
     # Create a group for input arguments
@@ -61,6 +68,58 @@ def parse_args(args: List[str] = None) -> argparse.Namespace:
         help="Search for images recursively in subdirectories"
     )
     
+    parser.add_argument(
+        "--checkpoint",
+        metavar="FILE",
+        help="Record batch progress in FILE and resume from it when restarted"
+    )
+    
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes for EXIF extraction (0 = one per CPU, default: 1)"
+    )
+    
+    parser.add_argument(
+        "--io-concurrency",
+        type=int,
+        default=1,
+        help="Number of concurrent file reads per process, for network filesystems (default: 1)"
+    )
+    
+    parser.add_argument(
+        "--cache",
+        metavar="PATH",
+        help=f"Extraction cache database (default: {get_default_cache_path()})"
+    )
+    
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't use the extraction cache"
+    )
+    
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="Show a progress bar with the processing rate and time remaining"
+    )
+    
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write points in the order the photos are found instead of sorting them "
+             "by time, without keeping them in memory (single directory only)"
+    )
+    
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print the distance, duration, speed and elevation statistics of each route "
+             "(requires NumPy: pip install pixtrail[analysis])"
+    )
+    
     parser.add_argument(
         "-v", "--verbose",
         action="store_true",
@@ -87,6 +146,45 @@ def parse_args(args: List[str] = None) -> argparse.Namespace:
         help="Don't automatically open a browser when starting the web interface"
     )
     
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Serve the web interface from this many worker processes (default: 1)"
+    )
+    
+    parser.add_argument(
+        "--threads",
+        type=int,
+        help="Request threads per worker process of the web interface (default: 16)"
+    )
+    
+    parser.add_argument(
+        "--data-dir",
+        help="Directory for the sessions of the web interface, e.g. on a tmpfs "
+             "(default: $PIXTRAIL_DATA_DIR or ~/.cache/pixtrail/web-sessions)"
+    )
+    
+    parser.add_argument(
+        "--session-ttl",
+        type=float,
+        help="Seconds an unused web session is kept before it is removed, 0 to keep "
+             "sessions until the quota is exceeded (default: 86400)"
+    )
+    
+    parser.add_argument(
+        "--cache-quota",
+        type=parse_size,
+        help="Maximum total size of the web sessions, e.g. 500M or 2G; the least "
+             "recently used sessions are removed beyond it (default: no limit)"
+    )
+    
+    parser.add_argument(
+        "--result-cache-size",
+        type=parse_size,
+        help="Maximum size of the web interface's cache of results for photos and "
+             "GPX files uploaded again, e.g. 64M; 0 disables it (default: 256M)"
+    )
+    
     # Require at least one mode (input dir, batch, or web)
     if args is None:
         args = sys.argv[1:]
@@ -102,6 +200,74 @@ def parse_args(args: List[str] = None) -> argparse.Namespace:
     return parser.parse_args(args)
 
 
+def parse_bench_args(args: List[str]) -> argparse.Namespace:
+    """
+    Parse the arguments of the bench mode.
+    
+    Args:
+        args: Command-line arguments following 'bench'
+        
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="pixtrail bench",
+        description="Measure discovery, extraction and GPX writing throughput on a directory"
+    )
+    
+    parser.add_argument(
+        "input_dir",
+        help="Directory containing photos"
+    )
+    
+    parser.add_argument(
+        "-r", "--recursive",
+        action="store_true",
+        help="Search for images recursively in subdirectories"
+    )
+    
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        help="Maximum number of subdirectory levels to descend (default: no limit)"
+    )
+    
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes for the end-to-end run (0 = one per CPU, default: 1)"
+    )
+    
+    parser.add_argument(
+        "--io-concurrency",
+        type=int,
+        default=1,
+        help="Number of concurrent file reads for the end-to-end run (default: 1)"
+    )
+    
+    parser.add_argument(
+        "--parsers",
+        nargs="+",
+        choices=BENCH_PARSERS,
+        default=list(BENCH_PARSERS),
+        help="Parsers to time individually (default: all)"
+    )
+    
+    parser.add_argument(
+        "--sample",
+        type=int,
+        help="Number of files used for the per-parser timings (default: all)"
+    )
+    
+    parser.add_argument(
+        "-o", "--output",
+        help="Write the JSON report to this file instead of standard output"
+    )
+    
+    return parser.parse_args(args)
+
+
 def main(args: List[str] = None) -> int:
     """
     Main entry point for the command-line interface.
@@ -112,21 +278,92 @@ def main(args: List[str] = None) -> int:
     Returns:
         Exit code (0 for success, non-zero for failure)
     """
+    if args is None:
+        args = sys.argv[1:]
+    
+    if args and args[0] == "bench":
+        return run_bench(parse_bench_args(args[1:]))
+    
     # Parse arguments
     parsed_args = parse_args(args)
     
     # Check which mode to use
     if parsed_args.web:
         return start_web_interface(parsed_args)
-    elif parsed_args.batch:
-        return process_batch(PixTrail(), parsed_args)
+    
+    if parsed_args.stream and (parsed_args.batch or parsed_args.stats):
+        print("Error: --stream can't be combined with --batch or --stats")
+        return 1
+    
+    # Fail before processing if the statistics can't be computed afterwards
+    if parsed_args.stats:
+        try:
+            from . import analysis
+        except ImportError:
+            print("Error: Route statistics require NumPy")
+            print("Install with: pip install pixtrail[analysis]")
+            return 1
+    
+    pixtrail = PixTrail(
+        workers=parsed_args.jobs,
+        io_concurrency=parsed_args.io_concurrency,
+        cache_path=None if parsed_args.no_cache else (parsed_args.cache or get_default_cache_path()),
+        progress_callback=make_progress_bar() if parsed_args.progress else None
+    )
+    
+    if parsed_args.batch:
+        return process_batch(pixtrail, parsed_args)
     elif parsed_args.input_dir:
-        return process_single(PixTrail(), parsed_args)
+        return process_single(pixtrail, parsed_args)
     else:
         print("Error: No operation mode specified")
         return 1
 
 
+def run_bench(args: argparse.Namespace) -> int:
+    """
+    Run the throughput benchmark and output a JSON report.
+    
+    Args:
+        args: Parsed bench arguments
+        
+    Returns:
+        Exit code (0 for success, non-zero for failure)
+    """
+    if not os.path.isdir(args.input_dir):
+        print(f"Error: Input directory does not exist: {args.input_dir}")
+        return 1
+    
+    workers = args.jobs if args.jobs != 0 else (os.cpu_count() or 1)
+    
+    try:
+        report = run_benchmark(
+            args.input_dir,
+            recursive=args.recursive,
+            max_depth=args.max_depth,
+            workers=workers,
+            io_concurrency=args.io_concurrency,
+            parsers=args.parsers,
+            sample=args.sample
+        )
+    except Exception as e:
+        print(f"Error running benchmark: {e}")
+        return 1
+    
+    report_json = json.dumps(report, indent=2)
+    
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            report_file.write(report_json + '\n')
+        print_summary(report, sys.stdout)
+        print(f"Benchmark report written to {args.output}")
+    else:
+        print_summary(report)
+        print(report_json)
+    
+    return 0
+
+
 def start_web_interface(args: argparse.Namespace) -> int:
     """
     Start the web interface.
@@ -139,13 +376,40 @@ def start_web_interface(args: argparse.Namespace) -> int:
     """
     try:
         # Import web server module here to avoid dependency issues if not needed
-        from .web import start_server
+        from .web import run_server, start_server
+        from .web.server import DEFAULT_THREADS
+        
+        config = {}
+        if args.data_dir:
+            config['PIXTRAIL_DATA_DIR'] = os.path.abspath(args.data_dir)
+        if args.session_ttl is not None:
+            config['PIXTRAIL_SESSION_TTL'] = args.session_ttl or None
+        if args.cache_quota is not None:
+            config['PIXTRAIL_CACHE_QUOTA'] = args.cache_quota
+        if args.result_cache_size is not None:
+            config['PIXTRAIL_RESULT_CACHE_SIZE'] = args.result_cache_size
         
         print(f"Starting PixTrail web interface on http://{args.host}:{args.port}")
+        if args.workers is not None or args.threads is not None:
+            if (args.workers is not None and args.workers < 1) or (args.threads is not None and args.threads < 1):
+                print("Error: --workers and --threads must be at least 1")
+                return 1
+            run_server(
+                host=args.host,
+                port=args.port,
+                workers=args.workers or 1,
+                threads=args.threads or DEFAULT_THREADS,
+                open_browser=not args.no_browser,
+                config=config
+            )
+            print("Server stopped")
+            return 0
+        
         app, server = start_server(
             host=args.host,
             port=args.port,
-            open_browser=not args.no_browser
+            open_browser=not args.no_browser,
+            config=config
         )
         
         # Keep the server running
@@ -205,7 +469,8 @@ def process_single(pixtrail: PixTrail, args: argparse.Namespace) -> int:
             if args.recursive:
                 print("Searching recursively in subdirectories")
         
-        success = pixtrail.process_and_generate(
+        generate = pixtrail.stream_and_generate if args.stream else pixtrail.process_and_generate
+        success = generate(
             input_dir,
             output_path,
             args.recursive
@@ -215,6 +480,8 @@ def process_single(pixtrail: PixTrail, args: argparse.Namespace) -> int:
             # Get the actual output path for display
             actual_output = output_path if output_path else get_default_output_path(input_dir)
             print(f"GPX file created successfully: {actual_output}")
+            if args.stats:
+                print_route_statistics(pixtrail.gps_data_list)
             return 0
         else:
             print("Failed to create GPX file")
@@ -225,10 +492,52 @@ def process_single(pixtrail: PixTrail, args: argparse.Namespace) -> int:
         return 1
 
 
+def print_route_statistics(gps_data: Any) -> None:
+    """
+    Print the route statistics report of --stats.
+    
+    Args:
+        gps_data: PointTable or GPS data dictionaries of the route
+    """
+    from .analysis import format_report, route_statistics
+    print(format_report(route_statistics(gps_data)))
+
+
+def get_batch_output_path(dir_path: str, output_dir: Optional[str]) -> str:
+    """
+    Get the GPX output path for a directory in batch mode.
+    
+    Args:
+        dir_path: Input directory
+        output_dir: Output directory for all GPX files (None to write each
+                    file into its input directory)
+        
+    Returns:
+        Output GPX file path
+    """
+    if not output_dir:
+        # Use auto-naming in the input directory
+        return get_default_output_path(dir_path)
+    
+    # If output directory is specified, use it with auto-naming
+    dir_name = os.path.basename(os.path.normpath(dir_path))
+    # Clean directory name for use in filename
+    dir_name = ''.join(c for c in dir_name if c.isalnum() or c in (' ', '_', '-'))
+    dir_name = dir_name.strip()
+    if not dir_name:
+        dir_name = "PixTrail"
+    return os.path.join(output_dir, f"{dir_name}.gpx")
+
+
 def process_batch(pixtrail: PixTrail, args: argparse.Namespace) -> int:
     """
     Process multiple directories and generate GPX files for each.
     
+    The files of all directories go through one shared work queue, so a
+    large directory doesn't hold up the others. Each GPX file is written as
+    soon as its directory is finished. With --checkpoint, progress is
+    recorded so a restarted run skips finished directories and files.
+    
     Args:
         pixtrail: PixTrail object
         args: Parsed arguments
@@ -248,59 +557,92 @@ def process_batch(pixtrail: PixTrail, args: argparse.Namespace) -> int:
         print("Error: No valid directories to process")
         return 1
     
-    # Process each directory
+    # Ensure output directory exists
+    if args.output_dir and not ensure_directory(args.output_dir):
+        print(f"Error: Could not create output directory: {args.output_dir}")
+        return 1
+    
+    dir_count = len(valid_dirs)
     success_count = 0
     fail_count = 0
+    total_files = 0
     
-    for dir_path in valid_dirs:
+    checkpoint = None
+    if args.checkpoint:
         try:
-            if args.verbose:
-                print(f"\nProcessing directory: {dir_path}")
-                if args.recursive:
-                    print("Searching recursively in subdirectories")
-            
-            # Determine output path for this directory
-            if args.output_dir:
-                # If output directory is specified, use it with auto-naming
-                dir_name = os.path.basename(os.path.normpath(dir_path))
-                # Clean directory name for use in filename
-                dir_name = ''.join(c for c in dir_name if c.isalnum() or c in (' ', '_', '-'))
-                dir_name = dir_name.strip()
-                if not dir_name:
-                    dir_name = "PixTrail"
-                output_path = os.path.join(args.output_dir, f"{dir_name}.gpx")
-                
-                # Ensure output directory exists
-                if not ensure_directory(args.output_dir):
-                    print(f"Error: Could not create output directory: {args.output_dir}")
+            checkpoint = BatchCheckpoint(args.checkpoint, {'recursive': args.recursive})
+        except OSError as e:
+            print(f"Error: Could not open checkpoint {args.checkpoint}: {e}")
+            return 1
+        
+        # Directories finished by an earlier run keep their result
+        remaining_dirs = []
+        for dir_path in valid_dirs:
+            if checkpoint.is_done(dir_path):
+                if checkpoint.done[os.path.abspath(dir_path)]['success']:
+                    success_count += 1
+                else:
                     fail_count += 1
-                    continue
             else:
-                # Use auto-naming in the input directory
-                output_path = None
-            
-            # Process and generate GPX file
-            success = pixtrail.process_and_generate(
-                dir_path,
-                output_path,
-                args.recursive
+                remaining_dirs.append(dir_path)
+        if len(remaining_dirs) < len(valid_dirs):
+            print(f"Resuming from checkpoint: {len(valid_dirs) - len(remaining_dirs)} directories already finished")
+        valid_dirs = remaining_dirs
+    
+    if args.verbose:
+        print(f"Processing {len(valid_dirs)} directories")
+        if args.recursive:
+            print("Searching recursively in subdirectories")
+    
+    start_time = time.perf_counter()
+    
+    try:
+        for dir_path, result in pixtrail.process_directories(valid_dirs, args.recursive, checkpoint=checkpoint):
+            stats = result['stats']
+            total_files += stats['total']
+            seconds = result['seconds']
+            rate = stats['total'] / seconds if seconds > 0 else 0.0
+            print(
+                f"{dir_path}: {stats['processed']} of {stats['total']} images with GPS data "
+                f"in {seconds:.2f}s ({rate:.1f} files/sec)"
             )
+            if stats.get('resumed'):
+                print(f"  {stats['resumed']} files taken from the checkpoint")
+            
+            output_path = None
+            success = False
+            if result['gps_data']:
+                try:
+                    output_path = get_batch_output_path(dir_path, args.output_dir)
+                    success = pixtrail.generate_gpx(output_path, result['gps_data'])
+                except Exception as e:
+                    print(f"Error processing directory {dir_path}: {e}")
             
             if success:
-                # Get the actual output path for display
-                actual_output = output_path if output_path else get_default_output_path(dir_path)
-                print(f"GPX file created successfully: {actual_output}")
+                print(f"GPX file created successfully: {output_path}")
+                if args.stats:
+                    print_route_statistics(result['gps_data'])
                 success_count += 1
             else:
                 print(f"Failed to create GPX file for directory: {dir_path}")
                 fail_count += 1
-        
-        except Exception as e:
-            print(f"Error processing directory {dir_path}: {e}")
-            fail_count += 1
+            
+            if checkpoint:
+                checkpoint.record_done(dir_path, output_path if success else None, success)
+    
+    except Exception as e:
+        print(f"Error during batch processing: {e}")
+        fail_count += dir_count - success_count - fail_count
+    
+    finally:
+        if checkpoint:
+            checkpoint.close()
     
     # Print summary
+    elapsed = time.perf_counter() - start_time
+    rate = total_files / elapsed if elapsed > 0 else 0.0
     print(f"\nBatch processing completed: {success_count} succeeded, {fail_count} failed")
+    print(f"Processed {total_files} files in {elapsed:.2f}s ({rate:.1f} files/sec)")
     
     # Return success if at least one directory was processed successfully
     return 0 if success_count > 0 else 1
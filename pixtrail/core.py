@@ -3,24 +3,445 @@ Core functionality for the PixTrail package.
 """
 
 import os
-from typing import Dict, List, Optional, Any, Union
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Any, Tuple, Union
 
+from .cache import MISS, ExtractionCache
+from .checkpoint import BatchCheckpoint
 from .exif_reader import ExifReader
 from .gpx_generator import GPXGenerator
-from .utils import get_image_files, ensure_directory, get_default_output_path
+from .points import PointTable
+from .progress import ProgressCallback, ProgressReporter
+from .utils import get_image_files, iter_image_entries, ensure_directory, get_default_output_path
+
+# Compact form of a GPS point used to pass results between processes:
+# (latitude, longitude, altitude, timestamp, name)
+GPSTuple = Tuple[float, float, float, Optional[datetime], str]
+
+# Upper bound for the number of files sent to a worker process in one task
+MAX_CHUNK_SIZE = 256
+
+# Number of files per worker process task when the total is not known in advance
+STREAM_CHUNK_SIZE = 64
+
+# Maximum number of discovered files waiting for extraction in iter_points
+DISCOVERY_QUEUE_SIZE = 1024
+
+# Number of new extraction results written to the cache per transaction
+CACHE_COMMIT_INTERVAL = 1000
+
+
+def _extract_gps_tuple(image_path: str) -> Optional[GPSTuple]:
+    """
+    Extract GPS data from an image and return it as a compact tuple.
+
+    Runs inside worker processes, so it must stay a module-level function.
+
+    Args:
+        image_path: Path to the image file
+
+    Returns:
+        GPS tuple or None if no GPS data is found
+    """
+    gps_data = ExifReader.extract_gps_data(image_path, timestamp_fallback=False)
+    if not gps_data:
+        return None
+    return (
+        gps_data['latitude'],
+        gps_data['longitude'],
+        gps_data.get('altitude', 0.0),
+        gps_data.get('timestamp'),
+        gps_data.get('name', os.path.basename(image_path))
+    )
+
+
+def _ordered_thread_map(
+    func: Callable[[str], Any],
+    items: Iterable[str],
+    concurrency: int
+) -> Iterator[Any]:
+    """
+    Apply func to items on a thread pool, yielding results in input order.
+
+    At most 2 * concurrency calls are in flight at any time, so results are
+    not buffered for the whole input.
+
+    Args:
+        func: Function to apply
+        items: Input items
+        concurrency: Number of threads
+
+    Yields:
+        Results of func, in the order of items
+    """
+    window = concurrency * 2
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _extract_gps_chunk(image_paths: List[str], io_concurrency: int) -> List[Optional[GPSTuple]]:
+    """
+    Extract GPS tuples for a chunk of images inside a worker process.
+
+    Args:
+        image_paths: Paths of the images in this chunk
+        io_concurrency: Number of threads overlapping file reads (1 for sequential)
+
+    Returns:
+        GPS tuples (or None) in the order of image_paths
+    """
+    if io_concurrency > 1:
+        return list(_ordered_thread_map(_extract_gps_tuple, image_paths, io_concurrency))
+    return [_extract_gps_tuple(image_path) for image_path in image_paths]
+
+
+def _extract_gps_dicts(image_paths: List[str]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Extract GPS data for a chunk of images in the current process.
+
+    Args:
+        image_paths: Paths of the images in this chunk
+
+    Returns:
+        GPS dictionaries (or None) in the order of image_paths
+    """
+    return [
+        ExifReader.extract_gps_data(image_path, timestamp_fallback=False)
+        for image_path in image_paths
+    ]
+
+
+def _tuple_to_gps_data(gps_tuple: GPSTuple) -> Dict[str, Any]:
+    """Convert a compact GPS tuple back to the dictionary format."""
+    return {
+        'latitude': gps_tuple[0],
+        'longitude': gps_tuple[1],
+        'altitude': gps_tuple[2],
+        'timestamp': gps_tuple[3],
+        'name': gps_tuple[4]
+    }
+
+
+def _prefetch(iterable: Iterable[Any], maxsize: int) -> Iterator[Any]:
+    """
+    Iterate over iterable in a background thread through a bounded queue.
+
+    The producer runs ahead of the consumer by at most maxsize items.
+    Exceptions raised by the producer are re-raised in the consumer.
+
+    Args:
+        iterable: Items to produce
+        maxsize: Maximum number of items waiting in the queue
+
+    Yields:
+        Items of iterable, in order
+    """
+    items = queue.Queue(maxsize)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item: Any) -> bool:
+        # Block while the queue is full, but give up once the consumer is gone
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except BaseException as e:
+            put((done, e))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
 
 
 class PixTrail:
     """Main class for extracting GPS data from images and generating GPX files."""
     
-    def __init__(self):
-        """Initialize the PixTrail object."""
-        self.gps_data_list = []
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        io_concurrency: Optional[int] = None,
+        cache_path: Optional[str] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        cache_class: Callable[[str], ExtractionCache] = ExtractionCache
+    ):
+        """
+        Initialize the PixTrail object.
+        
+        Args:
+            workers: Number of worker processes used for EXIF extraction
+                     (None or 1 for sequential processing, 0 for one per CPU)
+            io_concurrency: Number of file reads kept in flight by a thread pool
+                            (None or 1 for sequential reads). Useful on network
+                            filesystems where extraction waits on I/O, not CPU.
+                            Combined with workers, each process uses its own pool.
+            cache_path: Path to the persistent extraction cache database
+                        (None to disable caching)
+            progress_callback: Function receiving progress reports while
+                               directories are processed, at most every
+                               PROGRESS_EVERY files or PROGRESS_INTERVAL
+                               seconds (see ProgressReporter.report)
+            cache_class: Class (or factory) opening the cache at cache_path;
+                         any object with ExtractionCache's get(), put_many()
+                         and close() methods can be used
+        """
+        self.gps_data_list = PointTable()
+        if workers == 0:
+            workers = os.cpu_count() or 1
+        self.workers = workers or 1
+        self.io_concurrency = io_concurrency or 1
+        self.cache_path = cache_path
+        self.progress_callback = progress_callback
+        self.cache_class = cache_class
+    
+    def _progress(self, stats: Dict[str, Any]) -> Optional[ProgressReporter]:
+        """
+        Create a progress reporter if a progress callback is set.
+        
+        Args:
+            stats: Statistics dictionary with the counts to report
+            
+        Returns:
+            ProgressReporter, or None if progress isn't reported
+        """
+        if self.progress_callback is None:
+            return None
+        return ProgressReporter(self.progress_callback, stats)
+    
+    def _open_cache(self) -> Optional[ExtractionCache]:
+        """
+        Open the extraction cache if caching is enabled.
+        
+        Returns:
+            Open ExtractionCache, or None if caching is disabled or unavailable
+        """
+        if not self.cache_path:
+            return None
+        try:
+            return self.cache_class(self.cache_path)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Warning: Extraction cache unavailable ({e}), continuing without it")
+            return None
+    
+    def _extract_stream(
+        self,
+        image_files: Iterable[Union[str, os.DirEntry]],
+        cache: Optional[ExtractionCache] = None,
+        stats: Optional[Dict[str, Any]] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Extract GPS data from a stream of image files, in input order.
+        
+        Files are grouped into chunks and extracted inline, on a thread pool
+        (io_concurrency) or on a process pool (workers), with a bounded number
+        of chunks in flight, so memory use does not grow with the input.
+        Cached results are resolved without extraction and new results are
+        written back to the cache.
+        
+        Args:
+            image_files: Image file paths or os.DirEntry objects (whose cached
+                         stat info is reused for cache lookups)
+            cache: Open extraction cache (None to disable caching)
+            stats: Statistics dictionary that receives 'cache_hits' and
+                   'cache_misses' when caching is enabled
+            chunk_size: Number of files per worker process task
+            
+        Yields:
+            Dictionary containing GPS data, or None for images without GPS data
+        """
+        if stats is None:
+            stats = {}
+        if cache:
+            stats.setdefault('cache_hits', 0)
+            stats.setdefault('cache_misses', 0)
+        
+        # Small inputs aren't worth the cost of starting a pool
+        small_input = isinstance(image_files, list) and len(image_files) <= 1
+        
+        if self.workers > 1 and not small_input:
+            executor = ProcessPoolExecutor(max_workers=self.workers)
+            window = self.workers * 2
+        elif self.io_concurrency > 1 and not small_input:
+            executor = ThreadPoolExecutor(max_workers=self.io_concurrency)
+            window = self.io_concurrency * 2
+            chunk_size = 1
+        else:
+            executor = None
+            window = 1
+            chunk_size = 1
+        
+        def submit(paths: List[str]) -> Any:
+            # Returns a Future, or the results themselves when run inline
+            if not paths:
+                return []
+            if isinstance(executor, ProcessPoolExecutor):
+                return executor.submit(_extract_gps_chunk, paths, self.io_concurrency)
+            if executor is not None:
+                return executor.submit(_extract_gps_dicts, paths)
+            return _extract_gps_dicts(paths)
+        
+        # Chunks in flight: (files, cached results or MISS, Future or results)
+        pending = deque()
+        cache_writes = []
+        
+        def resolve() -> Iterator[Optional[Dict[str, Any]]]:
+            files, cached_results, results = pending.popleft()
+            if isinstance(results, Future):
+                results = results.result()
+            extracted = iter(results)
+            for (image_path, stat_result), cached in zip(files, cached_results):
+                if cached is not MISS:
+                    yield ExifReader.apply_timestamp_fallback(cached)
+                    continue
+                gps_data = next(extracted)
+                if isinstance(gps_data, tuple):
+                    gps_data = _tuple_to_gps_data(gps_data)
+                # Undated photos are cached without the fallback timestamp,
+                # so every run assigns its own
+                if cache:
+                    cache_writes.append((image_path, stat_result, gps_data))
+                yield ExifReader.apply_timestamp_fallback(gps_data)
+            if cache and len(cache_writes) >= CACHE_COMMIT_INTERVAL:
+                cache.put_many(cache_writes)
+                del cache_writes[:]
+        
+        def flush(files: List[Tuple[str, Any]], cached_results: List[Any]) -> None:
+            missed = [path for (path, _), cached in zip(files, cached_results) if cached is MISS]
+            pending.append((files, cached_results, submit(missed)))
+        
+        try:
+            files = []
+            cached_results = []
+            for item in image_files:
+                if isinstance(item, str):
+                    image_path = item
+                    stat_result = os.stat(item) if cache else None
+                else:
+                    image_path = item.path
+                    stat_result = item.stat() if cache else None
+                
+                cached = cache.get(image_path, stat_result) if cache else MISS
+                if cache:
+                    stats['cache_misses' if cached is MISS else 'cache_hits'] += 1
+                
+                files.append((image_path, stat_result))
+                cached_results.append(cached)
+                if len(files) >= chunk_size:
+                    flush(files, cached_results)
+                    files = []
+                    cached_results = []
+                
+                while len(pending) >= window:
+                    yield from resolve()
+            
+            if files:
+                flush(files, cached_results)
+            while pending:
+                yield from resolve()
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+            if cache and cache_writes:
+                cache.put_many(cache_writes)
+    
+    def iter_points(
+        self,
+        input_dir: str,
+        recursive: bool = False,
+        max_depth: Optional[int] = None,
+        stats: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream GPS points from the images in a directory.
+        
+        Directory discovery runs in a background thread that feeds a bounded
+        queue, and extraction keeps a bounded number of files in flight, so
+        memory use does not depend on the number of photos. Points are
+        yielded in discovery order (not sorted) as soon as they are extracted.
+        
+        Args:
+            input_dir: Directory containing image files
+            recursive: Whether to search recursively in subdirectories
+            max_depth: Maximum number of subdirectory levels to descend when
+                       recursive (None for no limit)
+            stats: Optional dictionary that is updated with 'total', 'processed'
+                   and 'skipped' counts (and cache counts) while iterating
+        
+        Yields:
+            Dictionaries containing GPS data, for images with GPS data only
+        
+        Raises:
+            FileNotFoundError: If input_dir does not exist
+        """
+        if stats is None:
+            stats = {}
+        stats.update({'total': 0, 'processed': 0, 'skipped': 0})
+        
+        def discovered(entries: Iterator[os.DirEntry]) -> Iterator[os.DirEntry]:
+            for entry in entries:
+                stats['total'] += 1
+                yield entry
+        
+        entries = _prefetch(
+            iter_image_entries(input_dir, recursive, max_depth),
+            DISCOVERY_QUEUE_SIZE
+        )
+        cache = self._open_cache()
+        progress = self._progress(stats)
+        try:
+            for gps_data in self._extract_stream(discovered(entries), cache, stats):
+                if gps_data:
+                    stats['processed'] += 1
+                    yield gps_data
+                else:
+                    stats['skipped'] += 1
+                if progress:
+                    progress.tick()
+            if progress:
+                progress.report(finished=True)
+        finally:
+            entries.close()
+            if cache:
+                cache.close()
     
     def process_directory(
         self, 
         input_dir: str, 
-        recursive: bool = False
+        recursive: bool = False,
+        max_depth: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Process all image files in a directory and extract GPS data.
@@ -28,63 +449,183 @@ class PixTrail:
         Args:
             input_dir: Directory containing image files
             recursive: Whether to search recursively in subdirectories
+            max_depth: Maximum number of subdirectory levels to descend when
+                       recursive (None for no limit)
         
         Returns:
             Dictionary containing:
-            - gps_data: List of dictionaries containing GPS data extracted from images
+            - gps_data: PointTable with the GPS data extracted from images
+                        (rows read like the dictionaries from ExifReader)
             - stats: Dictionary with statistics about processed files
+                     (including cache_hits and cache_misses when caching is enabled)
         """
         # Get image files
         try:
-            image_files = get_image_files(input_dir, recursive)
+            image_files = get_image_files(input_dir, recursive, max_depth)
         except FileNotFoundError as e:
             print(f"Error: {e}")
-            return {'gps_data': [], 'stats': {'total': 0, 'processed': 0, 'skipped': 0}}
+            return {'gps_data': PointTable(), 'stats': {'total': 0, 'processed': 0, 'skipped': 0}}
         
         if not image_files:
             print(f"No image files found in directory: {input_dir}")
-            return {'gps_data': [], 'stats': {'total': 0, 'processed': 0, 'skipped': 0}}
+            return {'gps_data': PointTable(), 'stats': {'total': 0, 'processed': 0, 'skipped': 0}}
         
         print(f"Found {len(image_files)} image files.")
         
         # Process each image file
-        self.gps_data_list = []
-        processed_count = 0
-        skipped_count = 0
+        self.gps_data_list = PointTable()
+        stats = {'total': len(image_files), 'processed': 0, 'skipped': 0}
+        cache_stats = {}
+        cache = self._open_cache()
+        progress = self._progress(stats)
         
-        for image_file in image_files:
-            gps_data = ExifReader.extract_gps_data(image_file)
-            
-            if gps_data:
-                self.gps_data_list.append(gps_data)
-                processed_count += 1
-            else:
-                skipped_count += 1
+        # Spread the files evenly over the worker processes
+        chunk_size = max(1, min(MAX_CHUNK_SIZE, len(image_files) // (self.workers * 4)))
+        
+        try:
+            for gps_data in self._extract_stream(image_files, cache, cache_stats, chunk_size):
+                if gps_data:
+                    self.gps_data_list.append_dict(gps_data)
+                    stats['processed'] += 1
+                else:
+                    stats['skipped'] += 1
+                if progress:
+                    progress.tick()
+        finally:
+            if cache:
+                cache.close()
+        if progress:
+            progress.report(finished=True)
                 
-        print(f"Processed {processed_count} images with GPS data. Skipped {skipped_count} images without GPS data.")
+        print(f"Processed {stats['processed']} images with GPS data. Skipped {stats['skipped']} images without GPS data.")
+        if cache_stats:
+            print(f"Extraction cache: {cache_stats['cache_hits']} hits, {cache_stats['cache_misses']} misses.")
         
-        stats = {
-            'total': len(image_files),
-            'processed': processed_count,
-            'skipped': skipped_count
-        }
+        stats.update(cache_stats)
         
         return {
             'gps_data': self.gps_data_list,
             'stats': stats
         }
     
+    def process_directories(
+        self,
+        input_dirs: List[str],
+        recursive: bool = False,
+        max_depth: Optional[int] = None,
+        checkpoint: Optional[BatchCheckpoint] = None
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Process several directories through one shared file-level work queue.
+        
+        The files of all directories are fed to a single extraction pipeline,
+        so the worker pool stays busy across directory boundaries and one
+        large directory doesn't leave the other workers idle. Results are
+        regrouped per directory and each directory is yielded, in input
+        order, as soon as its last file has been extracted.
+        
+        Args:
+            input_dirs: Directories containing image files
+            recursive: Whether to search recursively in subdirectories
+            max_depth: Maximum number of subdirectory levels to descend when
+                       recursive (None for no limit)
+            checkpoint: Checkpoint manifest; files it has results for are not
+                        extracted again, and new results are recorded in it
+        
+        Yields:
+            (input directory, result) tuples, where result is a dictionary with:
+            - gps_data: PointTable with the GPS data extracted from images
+            - stats: Dictionary with statistics about processed files
+                     ('resumed' counts files taken from the checkpoint)
+            - seconds: Time between the previous directory finishing and this one
+        """
+        # Discover all files first, so work can be split evenly
+        batches = []
+        for input_dir in input_dirs:
+            try:
+                image_files = get_image_files(input_dir, recursive, max_depth)
+            except FileNotFoundError as e:
+                print(f"Error: {e}")
+                image_files = []
+            batches.append((input_dir, image_files))
+        
+        # Only files without a checkpointed result go to the workers; the
+        # stream yields their results in the same order
+        to_extract = [
+            image_path
+            for _, image_files in batches
+            for image_path in image_files
+            if checkpoint is None or checkpoint.get(image_path) is MISS
+        ]
+        chunk_size = max(1, min(MAX_CHUNK_SIZE, len(to_extract) // (self.workers * 4)))
+        
+        # Progress covers all directories together
+        overall = {
+            'total': sum(len(image_files) for _, image_files in batches),
+            'processed': 0,
+            'skipped': 0
+        }
+        progress = self._progress(overall)
+        
+        cache = self._open_cache()
+        extracted = self._extract_stream(to_extract, cache, chunk_size=chunk_size)
+        last_finished = time.perf_counter()
+        try:
+            for input_dir, image_files in batches:
+                gps_data_list = PointTable()
+                skipped_count = 0
+                resumed_count = 0
+                
+                for image_path in image_files:
+                    gps_data = checkpoint.get(image_path) if checkpoint else MISS
+                    if gps_data is MISS:
+                        gps_data = next(extracted)
+                        if checkpoint:
+                            checkpoint.record_file(image_path, gps_data)
+                    else:
+                        resumed_count += 1
+                    
+                    if gps_data:
+                        gps_data_list.append_dict(gps_data)
+                        overall['processed'] += 1
+                    else:
+                        skipped_count += 1
+                        overall['skipped'] += 1
+                    if progress:
+                        progress.tick()
+                
+                now = time.perf_counter()
+                stats = {
+                    'total': len(image_files),
+                    'processed': len(gps_data_list),
+                    'skipped': skipped_count
+                }
+                if checkpoint:
+                    stats['resumed'] = resumed_count
+                yield input_dir, {
+                    'gps_data': gps_data_list,
+                    'stats': stats,
+                    'seconds': now - last_finished
+                }
+                last_finished = time.perf_counter()
+            if progress:
+                progress.report(finished=True)
+        finally:
+            extracted.close()
+            if cache:
+                cache.close()
+    
     def generate_gpx(
         self, 
         output_path: Optional[str] = None, 
-        gps_data_list: Optional[List[Dict[str, Any]]] = None
+        gps_data_list: Optional[Union[List[Dict[str, Any]], PointTable]] = None
     ) -> bool:
         """
         Generate a GPX file from the extracted GPS data.
         
         Args:
             output_path: Path where the GPX file will be saved
-            gps_data_list: List of dictionaries containing GPS data
+            gps_data_list: List of dictionaries containing GPS data, or a PointTable
                           (if None, use the data extracted by process_directory)
         
         Returns:
@@ -145,4 +686,51 @@ class PixTrail:
                 'output_path': final_output_path
             }
         else:
-            return False
\ No newline at end of file
+            return False
+    
+    def stream_and_generate(
+        self,
+        input_dir: str,
+        output_path: Optional[str] = None,
+        recursive: bool = False
+    ) -> Union[bool, Dict[str, Any]]:
+        """
+        Process all images in a directory and stream their points to a GPX file.
+        
+        Unlike process_and_generate, points are written in the order the
+        photos are found, not sorted by time, and are not kept in memory, so
+        memory use does not depend on the number of photos.
+        
+        Args:
+            input_dir: Directory containing image files
+            output_path: Path where the GPX file will be saved (if None, use automatic naming)
+            recursive: Whether to search recursively in subdirectories
+        
+        Returns:
+            If successful: Dictionary with success status and statistics
+            If failed: False
+        """
+        final_output_path = output_path or get_default_output_path(input_dir)
+        ensure_directory(os.path.dirname(os.path.abspath(final_output_path)))
+        
+        stats = {}
+        try:
+            success = GPXGenerator.write_gpx_stream(
+                self.iter_points(input_dir, recursive, stats=stats),
+                final_output_path
+            )
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            return False
+        
+        print(f"Processed {stats['processed']} images with GPS data. Skipped {stats['skipped']} images without GPS data.")
+        if 'cache_hits' in stats:
+            print(f"Extraction cache: {stats['cache_hits']} hits, {stats['cache_misses']} misses.")
+        
+        if success:
+            return {
+                'success': True,
+                'stats': stats,
+                'output_path': final_output_path
+            }
+        return False
\ No newline at end of file
@@ -2,25 +2,196 @@
 Module for extracting EXIF GPS data from image files.
 """
 
+import io
 import os
+import struct
 from datetime import datetime
-from typing import Dict, Optional, Tuple, Any
+from typing import BinaryIO, Dict, List, Optional, Tuple, Any
 
 import exifread
 from PIL import Image
 from PIL.ExifTags import TAGS, GPSTAGS
 
 
+# Size of the first block read from TIFF-based files (TIFF, DNG, NEF, CR2, ...).
+# IFD0 and the GPS IFD almost always live in this region.
+TIFF_HEADER_BLOCK = 64 * 1024
+
+# Maximum number of JPEG marker segments inspected before giving up on
+# finding the APP1 EXIF segment.
+MAX_JPEG_SEGMENTS = 32
+
+# EXIF tag IDs used by the fast path
+_TAG_DATETIME = 0x0132
+_TAG_GPS_IFD = 0x8825
+_GPS_LATITUDE_REF = 1
+_GPS_LATITUDE = 2
+_GPS_LONGITUDE_REF = 3
+_GPS_LONGITUDE = 4
+_GPS_ALTITUDE_REF = 5
+_GPS_ALTITUDE = 6
+
+# Byte size of each TIFF field type
+_TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
+
+
+class _UnsupportedHeader(Exception):
+    """Raised when the fast path can't handle a file and exifread must take over."""
+
+
+class _CountingFile:
+    """File wrapper that counts (and optionally records) the bytes read through it."""
+
+    def __init__(self, fh: BinaryIO, record: Optional[bytearray] = None):
+        self._fh = fh
+        self.bytes_read = 0
+        self.record = record
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fh.read(size)
+        self.bytes_read += len(data)
+        if self.record is not None:
+            self.record += data
+        return data
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._fh, name)
+
+
+class _TiffReader:
+    """
+    Minimal TIFF structure reader used by the header-only fast path.
+
+    Reads are served from an in-memory buffer when possible and fall back
+    to bounded seek/read calls on the file for data outside the buffer.
+    """
+
+    def __init__(self, fh: _CountingFile, buffer: bytes, base: int, file_backed: bool):
+        """
+        Initialize the reader.
+
+        Args:
+            fh: Counting file handle of the image
+            buffer: Bytes already read, starting at the TIFF header
+            base: File offset of the TIFF header
+            file_backed: Whether offsets outside the buffer may be read from the file
+        """
+        self.fh = fh
+        self.buffer = buffer
+        self.base = base
+        self.file_backed = file_backed
+
+        if buffer[:4] in (b'II*\x00', b'II+\x00'):
+            self.endian = '<'
+        elif buffer[:4] in (b'MM\x00*', b'MM\x00+'):
+            self.endian = '>'
+        else:
+            raise _UnsupportedHeader("Not a TIFF header")
+        if buffer[2:4] in (b'+\x00', b'\x00+'):
+            raise _UnsupportedHeader("BigTIFF is not supported")
+
+    def read(self, offset: int, size: int) -> bytes:
+        """Read size bytes at offset (relative to the TIFF header)."""
+        if offset < 0 or size < 0:
+            raise _UnsupportedHeader("Invalid offset")
+        end = offset + size
+        if end <= len(self.buffer):
+            return self.buffer[offset:end]
+        if not self.file_backed:
+            raise _UnsupportedHeader("Offset outside EXIF segment")
+        self.fh.seek(self.base + offset)
+        data = self.fh.read(size)
+        if len(data) != size:
+            raise _UnsupportedHeader("Unexpected end of file")
+        return data
+
+    def unpack(self, fmt: str, offset: int) -> Tuple:
+        """Unpack a struct at offset using the file's byte order."""
+        fmt = self.endian + fmt
+        return struct.unpack(fmt, self.read(offset, struct.calcsize(fmt)))
+
+    def read_ifd(self, offset: int) -> Dict[int, Tuple[int, int, bytes]]:
+        """
+        Read the entries of an IFD.
+
+        Returns:
+            Dictionary mapping tag IDs to (type, count, raw value or offset bytes)
+        """
+        (count,) = self.unpack('H', offset)
+        data = self.read(offset + 2, count * 12)
+        entries = {}
+        for i in range(count):
+            tag, field_type, value_count = struct.unpack(
+                self.endian + 'HHI', data[i * 12:i * 12 + 8]
+            )
+            entries[tag] = (field_type, value_count, data[i * 12 + 8:i * 12 + 12])
+        return entries
+
+    def value(self, entry: Tuple[int, int, bytes]) -> bytes:
+        """Return the raw bytes of an IFD entry value."""
+        field_type, count, raw = entry
+        if field_type not in _TIFF_TYPE_SIZES:
+            raise _UnsupportedHeader(f"Unknown field type: {field_type}")
+        size = _TIFF_TYPE_SIZES[field_type] * count
+        if size <= 4:
+            return raw[:size]
+        (offset,) = struct.unpack(self.endian + 'I', raw)
+        return self.read(offset, size)
+
+    def ascii(self, entry: Tuple[int, int, bytes]) -> str:
+        """Decode an ASCII entry."""
+        return self.value(entry).split(b'\x00', 1)[0].decode('ascii', 'replace').strip()
+
+    def integer(self, entry: Tuple[int, int, bytes]) -> int:
+        """Decode the first value of a BYTE, SHORT or LONG entry."""
+        field_type = entry[0]
+        raw = self.value(entry)
+        if field_type in (1, 7):
+            return raw[0]
+        if field_type == 3:
+            return struct.unpack(self.endian + 'H', raw[:2])[0]
+        if field_type == 4:
+            return struct.unpack(self.endian + 'I', raw[:4])[0]
+        raise _UnsupportedHeader(f"Unexpected integer type: {field_type}")
+
+    def rationals(self, entry: Tuple[int, int, bytes]) -> List[float]:
+        """Decode a RATIONAL or SRATIONAL entry to a list of floats."""
+        field_type, count, _ = entry
+        if field_type not in (5, 10):
+            raise _UnsupportedHeader(f"Unexpected rational type: {field_type}")
+        code = 'I' if field_type == 5 else 'i'
+        values = struct.unpack(self.endian + code * (2 * count), self.value(entry))
+        result = []
+        for i in range(count):
+            num, den = values[2 * i], values[2 * i + 1]
+            if den == 0:
+                raise _UnsupportedHeader("Zero denominator in rational")
+            result.append(num / den)
+        return result
+
+
 class ExifReader:
     """Class for reading EXIF data from image files, focusing on GPS information."""
 
     @staticmethod
-    def extract_gps_data(image_path: str) -> Optional[Dict[str, Any]]:
+    def extract_gps_data(
+        image_path: str,
+        io_stats: Optional[Dict[str, Any]] = None,
+        timestamp_fallback: bool = True
+    ) -> Optional[Dict[str, Any]]:
         """
         Extract GPS data from an image file.
 
+        The header-only fast path is tried first. Files it can't handle are
+        passed to exifread, with Pillow as the last resort.
+
         Args:
             image_path: Path to the image file
+            io_stats: Optional dictionary that receives 'bytes_read' (bytes read
+                      by the fast path and exifread) and 'parser' (the parser
+                      that produced the result: 'fast', 'exifread' or 'pillow')
+            timestamp_fallback: Use the current time for images without a valid
+                                DateTime tag (False leaves the timestamp None)
 
         Returns:
             Dictionary containing GPS information (latitude, longitude, altitude, timestamp)
@@ -29,71 +200,68 @@ class ExifReader:
         if not os.path.isfile(image_path):
             raise FileNotFoundError(f"Image file not found: {image_path}")
 
-        # Try using exifread first (more reliable for GPS data)
-        try:
-            with open(image_path, 'rb') as f:
-                tags = exifread.process_file(f, details=False)
-            
-            if not tags:
-                return None
+        gps_data = ExifReader._extract_gps_any(image_path, {} if io_stats is None else io_stats)
+        if timestamp_fallback:
+            gps_data = ExifReader.apply_timestamp_fallback(gps_data)
+        return gps_data
 
-            gps_data = {}
+    @staticmethod
+    def apply_timestamp_fallback(gps_data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Use the current time as the timestamp of GPS data without one.
 
-            # Check if image has GPS data
-            if 'GPS GPSLatitude' in tags and 'GPS GPSLongitude' in tags:
-                lat = ExifReader._convert_to_degrees(tags['GPS GPSLatitude'].values)
-                lon = ExifReader._convert_to_degrees(tags['GPS GPSLongitude'].values)
-                
-                # Check latitude and longitude references (N/S, E/W)
-                if 'GPS GPSLatitudeRef' in tags:
-                    lat_ref = tags['GPS GPSLatitudeRef'].values
-                    if lat_ref == 'S':
-                        lat = -lat
-                
-                if 'GPS GPSLongitudeRef' in tags:
-                    lon_ref = tags['GPS GPSLongitudeRef'].values
-                    if lon_ref == 'W':
-                        lon = -lon
-                
-                gps_data['latitude'] = lat
-                gps_data['longitude'] = lon
-                
-                # Get altitude if available
-                if 'GPS GPSAltitude' in tags:
-                    alt = float(tags['GPS GPSAltitude'].values[0].num) / float(tags['GPS GPSAltitude'].values[0].den)
-                    
-                    # Check altitude reference (above/below sea level)
-                    if 'GPS GPSAltitudeRef' in tags and tags['GPS GPSAltitudeRef'].values[0] == 1:
-                        alt = -alt
-                    
-                    gps_data['altitude'] = alt
-                else:
-                    gps_data['altitude'] = 0.0
-            else:
-                # No GPS data found
-                return None
-            
-            # Get timestamp
-            if 'Image DateTime' in tags:
-                date_str = str(tags['Image DateTime'])
+        Args:
+            gps_data: GPS data dictionary or None
+
+        Returns:
+            The GPS data, copied with the current time if its timestamp was None
+        """
+        if gps_data and gps_data.get('timestamp') is None:
+            gps_data = dict(gps_data, timestamp=datetime.now())
+        return gps_data
+
+    @staticmethod
+    def _extract_gps_any(image_path: str, io_stats: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Run the fast path, exifread and Pillow in turn on an image file.
+
+        Args:
+            image_path: Path to the image file
+            io_stats: Dictionary that receives 'bytes_read' and 'parser'
+
+        Returns:
+            GPS data with a None timestamp if the image has no valid DateTime
+            tag, or None if no GPS data is found
+        """
+        io_stats['bytes_read'] = 0
+
+        # Try the header-only parser first
+        try:
+            with open(image_path, 'rb') as raw_file:
+                f = _CountingFile(raw_file)
                 try:
-                    # EXIF DateTime format: 'YYYY:MM:DD HH:MM:SS'
-                    timestamp = datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S')
-                    gps_data['timestamp'] = timestamp
-                except ValueError:
-                    # If DateTime format is incorrect, try to use current time
-                    gps_data['timestamp'] = datetime.now()
-            else:
-                # No timestamp found
-                gps_data['timestamp'] = datetime.now()
-                
-            # Add filename as name
-            gps_data['name'] = os.path.basename(image_path)
-                
-            return gps_data
-            
+                    gps_data = ExifReader._extract_gps_fast(f, image_path)
+                    io_stats['parser'] = 'fast'
+                    return gps_data
+                except (_UnsupportedHeader, struct.error, IndexError, ValueError):
+                    pass
+                finally:
+                    io_stats['bytes_read'] += f.bytes_read
+        except OSError:
+            pass
+
+        # Try using exifread next (more reliable for GPS data)
+        io_stats['parser'] = 'exifread'
+        try:
+            with open(image_path, 'rb') as raw_file:
+                f = _CountingFile(raw_file)
+                try:
+                    return ExifReader._extract_gps_with_exifread(f, image_path)
+                finally:
+                    io_stats['bytes_read'] += f.bytes_read
         except Exception as e:
             # Fallback to Pillow if exifread fails
+            io_stats['parser'] = 'pillow'
             try:
                 return ExifReader._extract_gps_with_pillow(image_path)
             except Exception as pillow_e:
@@ -101,18 +269,245 @@ class ExifReader:
                 return None
     
     @staticmethod
-    def _extract_gps_with_pillow(image_path: str) -> Optional[Dict[str, Any]]:
+    def extract_gps_from_header(header: bytes, image_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Extract GPS data from the first bytes of a JPEG or TIFF-based image.
+
+        Only the header-only fast path is used, so the rest of the file is
+        never needed. This lets GPS data be read from a file that is still
+        being received, such as an upload.
+
+        Args:
+            header: Bytes from the start of the image file
+            image_name: Name of the image file (used for the waypoint name)
+
+        Returns:
+            Dictionary containing GPS information or None if the image has no GPS data
+
+        Raises:
+            ValueError: If the header is too short to contain the GPS data,
+                        or the format isn't handled by the fast path
+        """
+        f = _CountingFile(io.BytesIO(header))
+        try:
+            return ExifReader.apply_timestamp_fallback(ExifReader._extract_gps_fast(f, image_name))
+        except (_UnsupportedHeader, struct.error, IndexError, ValueError) as e:
+            raise ValueError(f"Can't read GPS data from header of {image_name}: {e}")
+
+    @staticmethod
+    def extract_gps_fast(image_path: str, record: Optional[bytearray] = None) -> Optional[Dict[str, Any]]:
+        """
+        Extract GPS data from an image file with the header-only fast path only.
+
+        Args:
+            image_path: Path to the image file
+            record: Optional bytearray that receives the bytes read, in order
+
+        Returns:
+            Dictionary containing GPS information or None if the image has no GPS data
+
+        Raises:
+            ValueError: If the format isn't handled by the fast path
+            OSError: If the file can't be read
+        """
+        with open(image_path, 'rb') as raw_file:
+            f = _CountingFile(raw_file, record)
+            try:
+                return ExifReader.apply_timestamp_fallback(ExifReader._extract_gps_fast(f, image_path))
+            except (_UnsupportedHeader, struct.error, IndexError, ValueError) as e:
+                raise ValueError(f"Can't read GPS data from header of {image_path}: {e}")
+
+    @staticmethod
+    def _extract_gps_with_exifread(f: BinaryIO, image_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Extract GPS data using exifread.
+        
+        Args:
+            f: Open binary file object of the image
+            image_path: Path to the image file (used for the point name)
+            
+        Returns:
+            Dictionary containing GPS information or None if no GPS data is found
+        """
+        tags = exifread.process_file(f, details=False)
+        
+        if not tags:
+            return None
+
+        gps_data = {}
+
+        # Check if image has GPS data
+        if 'GPS GPSLatitude' in tags and 'GPS GPSLongitude' in tags:
+            lat = ExifReader._convert_to_degrees(tags['GPS GPSLatitude'].values)
+            lon = ExifReader._convert_to_degrees(tags['GPS GPSLongitude'].values)
+            
+            # Check latitude and longitude references (N/S, E/W)
+            if 'GPS GPSLatitudeRef' in tags:
+                lat_ref = tags['GPS GPSLatitudeRef'].values
+                if lat_ref == 'S':
+                    lat = -lat
+            
+            if 'GPS GPSLongitudeRef' in tags:
+                lon_ref = tags['GPS GPSLongitudeRef'].values
+                if lon_ref == 'W':
+                    lon = -lon
+            
+            gps_data['latitude'] = lat
+            gps_data['longitude'] = lon
+            
+            # Get altitude if available
+            if 'GPS GPSAltitude' in tags:
+                alt = float(tags['GPS GPSAltitude'].values[0].num) / float(tags['GPS GPSAltitude'].values[0].den)
+                
+                # Check altitude reference (above/below sea level)
+                if 'GPS GPSAltitudeRef' in tags and tags['GPS GPSAltitudeRef'].values[0] == 1:
+                    alt = -alt
+                
+                gps_data['altitude'] = alt
+            else:
+                gps_data['altitude'] = 0.0
+        else:
+            # No GPS data found
+            return None
+        
+        # Get timestamp
+        if 'Image DateTime' in tags:
+            date_str = str(tags['Image DateTime'])
+            try:
+                # EXIF DateTime format: 'YYYY:MM:DD HH:MM:SS'
+                timestamp = datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S')
+                gps_data['timestamp'] = timestamp
+            except ValueError:
+                # DateTime format is incorrect
+                gps_data['timestamp'] = None
+        else:
+            # No timestamp found
+            gps_data['timestamp'] = None
+            
+        # Add filename as name
+        gps_data['name'] = os.path.basename(image_path)
+            
+        return gps_data
+
+    @staticmethod
+    def _extract_gps_fast(f: _CountingFile, image_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Extract GPS data by reading only the EXIF header of a JPEG or TIFF-based file.
+
+        JPEG files are scanned marker by marker until the APP1 EXIF segment is
+        found; nothing after the segment is read. TIFF-based raw formats are
+        read through bounded seeks to IFD0 and the GPS IFD.
+
+        Args:
+            f: Counting file handle of the image
+            image_path: Path to the image file (used for the waypoint name)
+
+        Returns:
+            Dictionary containing GPS information or None if the file has no GPS data
+
+        Raises:
+            _UnsupportedHeader: If the file layout is not handled by the fast path
+        """
+        start = f.read(4)
+        if len(start) < 4:
+            raise _UnsupportedHeader("File too short")
+
+        if start[:2] == b'\xff\xd8':
+            # JPEG: walk the marker segments looking for APP1 "Exif\0\0"
+            f.seek(2)
+            reader = None
+            for _ in range(MAX_JPEG_SEGMENTS):
+                header = f.read(4)
+                if len(header) < 4 or header[0] != 0xFF:
+                    raise _UnsupportedHeader("Invalid JPEG marker")
+                marker = header[1]
+                while marker == 0xFF:
+                    # Skip fill bytes
+                    header = header[1:] + f.read(1)
+                    marker = header[1]
+                if marker in (0xD9, 0xDA):
+                    # End of image or start of scan: no EXIF segment
+                    return None
+                (length,) = struct.unpack('>H', header[2:4])
+                if length < 2:
+                    raise _UnsupportedHeader("Invalid JPEG segment length")
+                if marker == 0xE1 and length > 8:
+                    segment = f.read(length - 2)
+                    if segment[:6] == b'Exif\x00\x00':
+                        reader = _TiffReader(f, segment[6:], 0, file_backed=False)
+                        break
+                else:
+                    f.seek(length - 2, os.SEEK_CUR)
+            if reader is None:
+                raise _UnsupportedHeader("EXIF segment not found")
+        elif start in (b'II*\x00', b'MM\x00*'):
+            # TIFF-based file: buffer the start, seek for anything beyond it
+            f.seek(0)
+            reader = _TiffReader(f, f.read(TIFF_HEADER_BLOCK), 0, file_backed=True)
+        else:
+            raise _UnsupportedHeader("Unsupported file format")
+
+        (ifd0_offset,) = reader.unpack('I', 4)
+        ifd0 = reader.read_ifd(ifd0_offset)
+        if _TAG_GPS_IFD not in ifd0:
+            return None
+
+        gps = reader.read_ifd(reader.integer(ifd0[_TAG_GPS_IFD]))
+        if _GPS_LATITUDE not in gps or _GPS_LONGITUDE not in gps:
+            return None
+
+        lat = ExifReader._convert_to_degrees(reader.rationals(gps[_GPS_LATITUDE]))
+        lon = ExifReader._convert_to_degrees(reader.rationals(gps[_GPS_LONGITUDE]))
+
+        # Check latitude and longitude references (N/S, E/W)
+        if _GPS_LATITUDE_REF in gps and reader.ascii(gps[_GPS_LATITUDE_REF]) == 'S':
+            lat = -lat
+        if _GPS_LONGITUDE_REF in gps and reader.ascii(gps[_GPS_LONGITUDE_REF]) == 'W':
+            lon = -lon
+
+        gps_data = {'latitude': lat, 'longitude': lon}
+
+        # Get altitude if available
+        if _GPS_ALTITUDE in gps:
+            alt = reader.rationals(gps[_GPS_ALTITUDE])[0]
+            if _GPS_ALTITUDE_REF in gps and reader.integer(gps[_GPS_ALTITUDE_REF]) == 1:
+                alt = -alt
+            gps_data['altitude'] = alt
+        else:
+            gps_data['altitude'] = 0.0
+
+        # Get timestamp
+        gps_data['timestamp'] = None
+        if _TAG_DATETIME in ifd0:
+            try:
+                gps_data['timestamp'] = datetime.strptime(
+                    reader.ascii(ifd0[_TAG_DATETIME]), '%Y:%m:%d %H:%M:%S'
+                )
+            except ValueError:
+                pass
+
+        # Add filename as name
+        gps_data['name'] = os.path.basename(image_path)
+
+        return gps_data
+
+    @staticmethod
+    def _extract_gps_with_pillow(
+        image_path: str,
+        f: Optional[BinaryIO] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Extract GPS data using Pillow as a fallback method.
         
         Args:
             image_path: Path to the image file
+            f: Open binary file object to read instead of opening image_path
             
         Returns:
             Dictionary containing GPS information or None if no GPS data is found
         """
         try:
-            image = Image.open(image_path)
+            image = Image.open(f if f is not None else image_path)
             exif_data = image._getexif()
             
             if not exif_data:
@@ -169,9 +564,9 @@ class ExifReader:
                         timestamp = datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S')
                         result['timestamp'] = timestamp
                     except ValueError:
-                        result['timestamp'] = datetime.now()
+                        result['timestamp'] = None
                 else:
-                    result['timestamp'] = datetime.now()
+                    result['timestamp'] = None
                 
                 return result
             
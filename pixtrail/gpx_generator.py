@@ -2,26 +2,353 @@
 Module for generating GPX files from GPS data extracted from images.
 """
 
+import itertools
 import os
+import shutil
+import tempfile
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import BinaryIO, Dict, Iterable, List, Optional, Any, TextIO, Tuple, Union
+from xml.sax.saxutils import escape
 
 import gpxpy
 import gpxpy.gpx
 
+try:
+    import fcntl
+except ImportError:  # Windows: appends aren't serialized between processes
+    fcntl = None
+
+from .points import PointTable
+
+GPX_CREATOR = "PixTrail - GPS Photo Tracker"
+
+# Document header and footer as serialized by gpxpy for a GPX 1.1 file
+GPX_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<gpx xmlns="http://www.topografix.com/GPX/1/1"'
+    ' xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
+    ' xsi:schemaLocation="http://www.topografix.com/GPX/1/1'
+    ' http://www.topografix.com/GPX/1/1/gpx.xsd"'
+    f' version="1.1" creator="{GPX_CREATOR}">'
+)
+GPX_TRACK_START = '\n  <trk>\n    <trkseg>'
+GPX_TRACK_END = '\n    </trkseg>\n  </trk>'
+GPX_FOOTER = '\n</gpx>'
+
+# Number of points serialized before each write to the output file
+WRITE_BATCH_SIZE = 1000
+
+# Files written by add_waypoints_to_gpx keep a run of spaces between the last
+# waypoint and the track, so new waypoints can be written in place. A
+# fixed-width comment after the <gpx> start tag records the byte range of
+# that gap: <!-- pixtrail-append-gap START END -->
+APPEND_MARKER = b'<!-- pixtrail-append-gap '
+APPEND_MARKER_FORMAT = '<!-- pixtrail-append-gap {:016d} {:016d} -->'
+APPEND_TAIL = (GPX_TRACK_END + GPX_FOOTER).encode('utf-8')
+APPEND_TRACK_START = b'\n  <trk>'
+
+# Bounds of the gap, which is otherwise a quarter of the file size
+MIN_APPEND_GAP = 4096
+MAX_APPEND_GAP = 1024 * 1024
+
+# Chunk size for copying the file when the track is moved
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def _format_number(value: Any) -> str:
+    """Format a number the way gpxpy does (no scientific notation)."""
+    if isinstance(value, float):
+        result = str(value)
+        if 'e' not in result:
+            return result
+        return format(value, '.10f').rstrip('0').rstrip('.')
+    return str(value)
+
+
+def _format_point(point: Dict[str, Any], tag: str, indent: str, with_name: bool) -> str:
+    """
+    Serialize a waypoint or track point, byte-compatible with gpxpy.
+    
+    Args:
+        point: Dictionary containing GPS data
+        tag: Element name ('wpt' or 'trkpt')
+        indent: Indentation of the element
+        with_name: Whether to write the name element
+        
+    Returns:
+        XML fragment, starting with a newline
+    """
+    return _format_values(
+        point["latitude"], point["longitude"], point.get('altitude', 0),
+        point.get('timestamp'), point.get('name', 'Unknown'),
+        tag, indent, with_name
+    )
+
+
+def _format_values(
+    latitude: float,
+    longitude: float,
+    elevation: Optional[float],
+    timestamp: Optional[datetime],
+    name: Optional[str],
+    tag: str,
+    indent: str,
+    with_name: bool
+) -> str:
+    """Serialize a point given as separate values (see _format_point)."""
+    parts = [
+        f'\n{indent}<{tag} lat="{_format_number(latitude or 0)}"'
+        f' lon="{_format_number(longitude or 0)}">'
+    ]
+    
+    if elevation is not None:
+        parts.append(f'\n{indent}  <ele>{escape(_format_number(elevation))}</ele>')
+    
+    if timestamp:
+        parts.append(f'\n{indent}  <time>{escape(timestamp.isoformat().replace("+00:00", "Z"))}</time>')
+    
+    if with_name and name is not None:
+        parts.append(f'\n{indent}  <name>{escape(name)}</name>')
+    
+    parts.append(f'\n{indent}</{tag}>')
+    return ''.join(parts)
+
+
+def _sort_by_time(gps_data_list: Union[List[Dict[str, Any]], PointTable]) -> Any:
+    """Sort points by timestamp, placing points without one last."""
+    if isinstance(gps_data_list, PointTable):
+        return gps_data_list.sorted_by_time()
+    now = datetime.now()
+    return sorted(gps_data_list, key=lambda x: x.get('timestamp', now))
+
+
+def _write_points(
+    output: TextIO,
+    points: Union[Iterable[Dict[str, Any]], PointTable],
+    tag: str,
+    indent: str,
+    with_name: bool
+) -> None:
+    """Write points to a file in batches, skipping points without coordinates."""
+    if isinstance(points, PointTable):
+        # Read the columns directly; a missing name is written as 'Unknown'
+        fragments = (
+            _format_values(
+                latitude, longitude, elevation, timestamp,
+                'Unknown' if name is None else name, tag, indent, with_name
+            )
+            for latitude, longitude, elevation, timestamp, name in points.rows()
+        )
+    else:
+        fragments = (
+            _format_point(point, tag, indent, with_name)
+            for point in points
+            if 'latitude' in point and 'longitude' in point
+        )
+    
+    batch = []
+    for fragment in fragments:
+        batch.append(fragment)
+        if len(batch) >= WRITE_BATCH_SIZE:
+            output.write(''.join(batch))
+            batch = []
+    if batch:
+        output.write(''.join(batch))
+
+
+def _add_append_layout(xml: str) -> Optional[str]:
+    """
+    Insert the append marker and whitespace gap into a serialized GPX file.
+    
+    Args:
+        xml: GPX document as produced by gpxpy or the streaming writer
+        
+    Returns:
+        Document with the append layout, or None if it has an unexpected shape
+        (e.g. several tracks or extensions), in which case appends fall back
+        to parsing the file
+    """
+    data = xml.encode('utf-8')
+    if not data.endswith(APPEND_TAIL) or data.count(APPEND_TRACK_START) != 1:
+        return None
+    
+    header_end = data.index(b'>', data.index(b'<gpx')) + 1
+    track_start = data.index(APPEND_TRACK_START)
+    marker_length = len(b'\n  ') + len(APPEND_MARKER_FORMAT.format(0, 0))
+    gap = _append_gap(len(data))
+    gap_start = track_start + marker_length
+    marker = '\n  ' + APPEND_MARKER_FORMAT.format(gap_start, gap_start + gap)
+    
+    return (
+        data[:header_end] + marker.encode('utf-8') + data[header_end:track_start]
+        + b' ' * gap + data[track_start:]
+    ).decode('utf-8')
+
+
+def _append_gap(size: int) -> int:
+    """Get the size of the gap to leave in a file of the given size."""
+    return min(MAX_APPEND_GAP, max(MIN_APPEND_GAP, size // 4))
+
+
+def _copy_range(source: BinaryIO, target: BinaryIO, start: int, end: int) -> None:
+    """Copy bytes start to end of source to the current position of target."""
+    source.seek(start)
+    while start < end:
+        chunk = source.read(min(COPY_CHUNK_SIZE, end - start))
+        if not chunk:
+            raise OSError("File shrank while it was being copied")
+        target.write(chunk)
+        start += len(chunk)
+
+
+def _read_append_layout(gpx_file: Any) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Read and validate the append layout of an open GPX file.
+    
+    Args:
+        gpx_file: GPX file opened in binary read/write mode
+        
+    Returns:
+        Tuple of (marker offset, gap start, gap end, file size), or None if the
+        file has no valid append layout
+    """
+    try:
+        head = gpx_file.read(4096)
+        marker_offset = head.find(APPEND_MARKER)
+        if marker_offset < 0:
+            return None
+        fields = head[marker_offset + len(APPEND_MARKER):].split(None, 2)
+        gap_start, gap_end = int(fields[0]), int(fields[1])
+        
+        size = gpx_file.seek(0, os.SEEK_END)
+        if not marker_offset < gap_start <= gap_end <= size - len(APPEND_TAIL):
+            return None
+        
+        # The track must follow the gap and the file must end with the track
+        gpx_file.seek(size - len(APPEND_TAIL))
+        if gpx_file.read() != APPEND_TAIL:
+            return None
+        gpx_file.seek(gap_end)
+        if gpx_file.read(len(APPEND_TRACK_START)) != APPEND_TRACK_START:
+            return None
+        gpx_file.seek(gap_start - 1)
+        edge = gpx_file.read(2)
+        if edge[:1] != b'>' or (gap_start < gap_end and edge[1:2] != b' '):
+            return None
+        
+        return marker_offset, gap_start, gap_end, size
+    except Exception:
+        return None
+
+
+def _append_in_place(gpx_file: str, points: List[Dict[str, Any]]) -> bool:
+    """
+    Append points to a GPX file that has the append layout, without parsing it.
+    
+    Waypoints are written into the whitespace gap before the track and track
+    points just before the closing tags. Only when the gap is used up is the
+    file rewritten, to a temporary file that then replaces it, with the track
+    behind a new gap proportional to the file size (up to MAX_APPEND_GAP).
+    The file is locked for the whole update, so concurrent appends from
+    several processes are serialized.
+    
+    Args:
+        gpx_file: Path to the GPX file
+        points: Dictionaries containing GPS data
+        
+    Returns:
+        True if the points were appended, False if the file has no valid
+        append layout (the file is left untouched in that case)
+    """
+    while True:
+        with open(gpx_file, 'r+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                # The file may have been replaced while we waited for the lock
+                if os.fstat(f.fileno()).st_ino != os.stat(gpx_file).st_ino:
+                    continue
+            return _append_locked(f, gpx_file, points)
+
+
+def _append_locked(f: BinaryIO, gpx_file: str, points: List[Dict[str, Any]]) -> bool:
+    """
+    Append points to an open and locked GPX file, see _append_in_place.
+    
+    Args:
+        f: GPX file opened in binary read/write mode
+        gpx_file: Path to the GPX file
+        points: Dictionaries containing GPS data
+        
+    Returns:
+        True if the points were appended, False if the file has no valid
+        append layout
+    """
+    layout = _read_append_layout(f)
+    if layout is None:
+        return False
+    marker_offset, gap_start, gap_end, size = layout
+    
+    waypoints = ''.join(
+        _format_point(point, 'wpt', '  ', True) for point in points
+    ).encode('utf-8')
+    track_points = ''.join(
+        _format_point(point, 'trkpt', '      ', False) for point in points
+    ).encode('utf-8')
+    track_end = size - len(APPEND_TAIL)
+    
+    if len(waypoints) > gap_end - gap_start:
+        # Gap is used up: write the file again with the track behind a new
+        # gap, so a crash leaves either the old or the new file
+        gap = max(len(waypoints), _append_gap(size))
+        marker = APPEND_MARKER_FORMAT.format(gap_start + len(waypoints), gap_start + len(waypoints) + gap)
+        output_dir = os.path.dirname(os.path.abspath(gpx_file))
+        with tempfile.NamedTemporaryFile('wb', dir=output_dir, prefix='.pixtrail-', delete=False) as new_file:
+            try:
+                _copy_range(f, new_file, 0, marker_offset)
+                new_file.write(marker.encode('utf-8'))
+                _copy_range(f, new_file, marker_offset + len(marker), gap_start)
+                new_file.write(waypoints + b' ' * gap)
+                _copy_range(f, new_file, gap_end, track_end)
+                new_file.write(track_points + APPEND_TAIL)
+                new_file.flush()
+                os.fsync(new_file.fileno())
+                shutil.copymode(gpx_file, new_file.name)
+                os.replace(new_file.name, gpx_file)
+            except BaseException:
+                os.remove(new_file.name)
+                raise
+        return True
+    
+    f.seek(track_end)
+    f.write(track_points + APPEND_TAIL)
+    f.seek(gap_start)
+    f.write(waypoints)
+    f.seek(marker_offset)
+    f.write(APPEND_MARKER_FORMAT.format(gap_start + len(waypoints), gap_end).encode('utf-8'))
+    return True
+
 
 class GPXGenerator:
     """Class for generating GPX files from GPS data."""
     
     @staticmethod
-    def create_gpx(gps_data_list: List[Dict[str, Any]], output_path: str) -> bool:
+    def create_gpx(
+        gps_data_list: Union[List[Dict[str, Any]], PointTable],
+        output_path: str,
+        use_gpxpy: bool = False
+    ) -> bool:
         """
         Create a GPX file from a list of GPS data points.
         
+        Points are sorted by timestamp and written with the streaming writer,
+        which produces the same bytes as gpxpy without building its object model.
+        
         Args:
             gps_data_list: List of dictionaries containing GPS data
-                           (latitude, longitude, altitude, timestamp, name)
+                           (latitude, longitude, altitude, timestamp, name),
+                           or a PointTable
             output_path: Path where the GPX file will be saved
+            use_gpxpy: Build the file with the gpxpy object model instead
             
         Returns:
             bool: True if the GPX file was created successfully, False otherwise
@@ -29,16 +356,38 @@ class GPXGenerator:
         if not gps_data_list:
             print("No GPS data available to create GPX file.")
             return False
+        
+        if not use_gpxpy:
+            # Sort data points by timestamp if available
+            sorted_data = _sort_by_time(gps_data_list)
+            
+            try:
+                # Normalize and validate the output path
+                normalized_path = os.path.normpath(output_path)
+                
+                # Create output directory if it doesn't exist
+                output_dir = os.path.dirname(os.path.abspath(normalized_path))
+                os.makedirs(output_dir, exist_ok=True)
+                
+                # Write waypoints, then the track from the same sorted list
+                with open(normalized_path, 'w') as gpx_file:
+                    gpx_file.write(GPX_HEADER)
+                    _write_points(gpx_file, sorted_data, 'wpt', '  ', True)
+                    gpx_file.write(GPX_TRACK_START)
+                    _write_points(gpx_file, sorted_data, 'trkpt', '      ', False)
+                    gpx_file.write(GPX_TRACK_END + GPX_FOOTER)
+                
+                return True
+            except Exception as e:
+                print(f"Error creating GPX file: {e}")
+                return False
             
         # Create the GPX structure
         gpx = gpxpy.gpx.GPX()
-        gpx.creator = "PixTrail - GPS Photo Tracker"
+        gpx.creator = GPX_CREATOR
         
         # Sort data points by timestamp if available
-        sorted_data = sorted(
-            gps_data_list, 
-            key=lambda x: x.get('timestamp', datetime.now())
-        )
+        sorted_data = _sort_by_time(gps_data_list)
         
         # Create waypoints
         for point in sorted_data:
@@ -99,6 +448,66 @@ class GPXGenerator:
             print(f"Error creating GPX file: {e}")
             return False
             
+    @staticmethod
+    def write_gpx_stream(points: Iterable[Dict[str, Any]], output_path: str) -> bool:
+        """
+        Write a GPX file from a stream of points in a single pass.
+        
+        Waypoints are written to the output file as they arrive, while track
+        points are spooled to a temporary file that is appended once the
+        stream ends, so memory use does not depend on the number of points.
+        Points are written in the order they are received.
+        
+        Args:
+            points: Iterable of dictionaries containing GPS data
+            output_path: Path where the GPX file will be saved
+            
+        Returns:
+            bool: True if the GPX file was created successfully, False otherwise
+        """
+        # Find the first usable point before touching the output file
+        points = iter(points)
+        first_point = next(
+            (p for p in points if 'latitude' in p and 'longitude' in p), None
+        )
+        if first_point is None:
+            print("No GPS data available to create GPX file.")
+            return False
+        
+        try:
+            normalized_path = os.path.normpath(output_path)
+            output_dir = os.path.dirname(os.path.abspath(normalized_path))
+            os.makedirs(output_dir, exist_ok=True)
+            
+            with open(normalized_path, 'w') as gpx_file, \
+                    tempfile.TemporaryFile('w+', dir=output_dir) as track_file:
+                gpx_file.write(GPX_HEADER)
+                waypoints = []
+                track_points = []
+                for point in itertools.chain([first_point], points):
+                    if 'latitude' not in point or 'longitude' not in point:
+                        continue
+                    waypoints.append(_format_point(point, 'wpt', '  ', True))
+                    track_points.append(_format_point(point, 'trkpt', '      ', False))
+                    if len(waypoints) >= WRITE_BATCH_SIZE:
+                        gpx_file.write(''.join(waypoints))
+                        track_file.write(''.join(track_points))
+                        waypoints = []
+                        track_points = []
+                gpx_file.write(''.join(waypoints))
+                track_file.write(''.join(track_points))
+                
+                # Append the spooled track
+                gpx_file.write(GPX_TRACK_START)
+                track_file.seek(0)
+                shutil.copyfileobj(track_file, gpx_file)
+                gpx_file.write(GPX_TRACK_END + GPX_FOOTER)
+            
+            return True
+        except Exception as e:
+            print(f"Error creating GPX file: {e}")
+            return False
+    
     @staticmethod
     def add_waypoint_to_gpx(
         gpx_file: str, 
@@ -122,11 +531,51 @@ class GPXGenerator:
         Returns:
             bool: True if the waypoint was added successfully, False otherwise
         """
+        return GPXGenerator.add_waypoints_to_gpx(gpx_file, [{
+            'latitude': latitude,
+            'longitude': longitude,
+            'altitude': altitude,
+            'timestamp': timestamp,
+            'name': name
+        }])
+    
+    @staticmethod
+    def add_waypoints_to_gpx(gpx_file: str, points: List[Dict[str, Any]]) -> bool:
+        """
+        Add waypoints (and matching track points) to a GPX file. If the file
+        doesn't exist, create it.
+        
+        Files created or updated by this method keep a whitespace gap before
+        the track, so later calls append in place without parsing or
+        rewriting the whole file. Other GPX files are parsed with gpxpy once
+        and converted to that layout. The file is valid GPX after every call.
+        
+        Args:
+            gpx_file: Path to the GPX file
+            points: List of dictionaries containing GPS data
+                    (latitude, longitude, altitude, timestamp, name)
+            
+        Returns:
+            bool: True if the waypoints were added successfully, False otherwise
+        """
         # Normalize the file path
         normalized_gpx_file = os.path.normpath(gpx_file)
         
+        points = [p for p in points if 'latitude' in p and 'longitude' in p]
+        if not points:
+            print("No GPS data available to add to GPX file.")
+            return False
+        
         # Check if the GPX file exists
         if os.path.isfile(normalized_gpx_file):
+            try:
+                # Fast path: append in place
+                if _append_in_place(normalized_gpx_file, points):
+                    return True
+            except OSError as e:
+                print(f"Error writing GPX file: {e}")
+                return False
+            
             try:
                 # Open and parse existing GPX file
                 with open(normalized_gpx_file, 'r') as f:
@@ -137,19 +586,7 @@ class GPXGenerator:
         else:
             # Create a new GPX file
             gpx = gpxpy.gpx.GPX()
-            gpx.creator = "PixTrail - GPS Photo Tracker"
-        
-        # Create a waypoint
-        waypoint = gpxpy.gpx.GPXWaypoint(
-            latitude=latitude,
-            longitude=longitude,
-            elevation=altitude,
-            time=timestamp,
-            name=name
-        )
-        
-        # Add waypoint to the GPX file
-        gpx.waypoints.append(waypoint)
+            gpx.creator = GPX_CREATOR
         
         # Add track point if there's a track
         if gpx.tracks:
@@ -166,23 +603,33 @@ class GPXGenerator:
             segment = gpxpy.gpx.GPXTrackSegment()
             track.segments.append(segment)
         
-        # Add a track point
-        track_point = gpxpy.gpx.GPXTrackPoint(
-            latitude=latitude,
-            longitude=longitude,
-            elevation=altitude,
-            time=timestamp
-        )
-        segment.points.append(track_point)
+        for point in points:
+            # Add waypoint to the GPX file
+            gpx.waypoints.append(gpxpy.gpx.GPXWaypoint(
+                latitude=point['latitude'],
+                longitude=point['longitude'],
+                elevation=point.get('altitude'),
+                time=point.get('timestamp'),
+                name=point.get('name')
+            ))
+            
+            # Add a track point
+            segment.points.append(gpxpy.gpx.GPXTrackPoint(
+                latitude=point['latitude'],
+                longitude=point['longitude'],
+                elevation=point.get('altitude'),
+                time=point.get('timestamp')
+            ))
         
         try:
             # Create output directory if it doesn't exist
             output_dir = os.path.dirname(os.path.abspath(normalized_gpx_file))
             os.makedirs(output_dir, exist_ok=True)
             
-            # Write the GPX file
+            # Write the GPX file, with the append layout when possible
+            xml = gpx.to_xml()
             with open(normalized_gpx_file, 'w') as f:
-                f.write(gpx.to_xml())
+                f.write(_add_append_layout(xml) or xml)
                 
             return True
         except Exception as e:
@@ -0,0 +1,297 @@
+"""
+Compact columnar storage for GPS points.
+"""
+
+import math
+import sys
+from array import array
+from collections.abc import Mapping
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .utils import parse_timestamp
+
+# Reference points for converting datetimes to integer microseconds
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+# Stored in the timestamp column for points without a timestamp
+NO_TIMESTAMP = -2 ** 63
+
+# Stored in the UTC offset column for naive timestamps
+NAIVE_OFFSET = -2 ** 31
+
+# Fixed-offset timezones by UTC offset in seconds, shared between rows
+_TIMEZONES = {0: timezone.utc}
+
+
+def _timezone(offset: int) -> timezone:
+    """Get the timezone of a UTC offset in seconds."""
+    tz = _TIMEZONES.get(offset)
+    if tz is None:
+        tz = _TIMEZONES[offset] = timezone(timedelta(seconds=offset))
+    return tz
+
+
+class PointView(Mapping):
+    """
+    Read-only dictionary view of one row of a PointTable.
+
+    Supports the same access patterns as the GPS data dictionaries returned
+    by ExifReader (point['latitude'], point.get('timestamp'), 'name' in point).
+    The 'timestamp' and 'name' keys are absent when the point has none.
+    """
+
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table: 'PointTable', index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        table = self._table
+        index = self._index
+        if key == 'latitude':
+            return table.latitudes[index]
+        if key == 'longitude':
+            return table.longitudes[index]
+        if key == 'altitude':
+            altitude = table.altitudes[index]
+            return None if math.isnan(altitude) else altitude
+        if key == 'timestamp':
+            timestamp = table.timestamp(index)
+            if timestamp is not None:
+                return timestamp
+        elif key == 'name':
+            name = table.names[index]
+            if name is not None:
+                return name
+        raise KeyError(key)
+
+    def _keys(self) -> List[str]:
+        keys = ['latitude', 'longitude', 'altitude']
+        if self._table.timestamps[self._index] != NO_TIMESTAMP:
+            keys.append('timestamp')
+        if self._table.names[self._index] is not None:
+            keys.append('name')
+        return keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __repr__(self) -> str:
+        return f"PointView({dict(self)!r})"
+
+
+class PointTable:
+    """
+    Columnar table of GPS points.
+
+    Latitude, longitude and altitude are stored in float64 arrays and
+    timestamps as int64 microseconds since the epoch, with interned names.
+    Timezone-aware timestamps are stored as UTC together with their UTC
+    offset, so they are read back in their original offset.
+    This takes a few dozen bytes per point instead of a dictionary and a
+    datetime object. Rows are read through PointView objects, so code
+    written for lists of GPS data dictionaries keeps working.
+    """
+
+    __slots__ = ('latitudes', 'longitudes', 'altitudes', 'timestamps', 'utc_offsets', 'names')
+
+    def __init__(self):
+        """Initialize an empty table."""
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+        self.altitudes = array('d')
+        self.timestamps = array('q')
+        # UTC offset in seconds of timezone-aware timestamps (stored as UTC),
+        # NAIVE_OFFSET for naive ones
+        self.utc_offsets = array('i')
+        self.names: List[Optional[str]] = []
+
+    @classmethod
+    def from_dicts(cls, gps_data_list: Iterable[Mapping]) -> 'PointTable':
+        """
+        Build a table from GPS data dictionaries.
+
+        Args:
+            gps_data_list: Dictionaries containing GPS data
+                           (latitude, longitude, altitude, timestamp, name)
+
+        Returns:
+            New PointTable
+        """
+        table = cls()
+        for point in gps_data_list:
+            table.append_dict(point)
+        return table
+
+    def append(
+        self,
+        latitude: float,
+        longitude: float,
+        altitude: Optional[float] = 0.0,
+        timestamp: Optional[Union[datetime, str]] = None,
+        name: Optional[str] = None
+    ) -> None:
+        """
+        Append a point to the table.
+
+        Args:
+            latitude: Latitude in decimal degrees
+            longitude: Longitude in decimal degrees
+            altitude: Altitude in meters (None if unknown)
+            timestamp: Timestamp as a datetime or ISO 8601 string (None if unknown)
+            name: Point name, e.g. the image filename
+
+        Raises:
+            ValueError: If timestamp is a string that isn't valid ISO 8601
+        """
+        if isinstance(timestamp, str):
+            timestamp = parse_timestamp(timestamp)
+
+        offset = timestamp.utcoffset() if timestamp is not None else None
+        if timestamp is None:
+            micros, offset = NO_TIMESTAMP, NAIVE_OFFSET
+        elif offset is not None:
+            micros, offset = (timestamp - EPOCH_UTC) // MICROSECOND, int(offset.total_seconds())
+        else:
+            micros, offset = (timestamp - EPOCH) // MICROSECOND, NAIVE_OFFSET
+
+        self.latitudes.append(latitude)
+        self.longitudes.append(longitude)
+        self.altitudes.append(math.nan if altitude is None else altitude)
+        self.timestamps.append(micros)
+        self.utc_offsets.append(offset)
+        self.names.append(sys.intern(name) if isinstance(name, str) else None)
+
+    def append_dict(self, point: Mapping) -> None:
+        """
+        Append a point given as a GPS data dictionary.
+
+        Args:
+            point: Dictionary containing GPS data
+        """
+        self.append(
+            point['latitude'],
+            point['longitude'],
+            point.get('altitude', 0.0),
+            point.get('timestamp'),
+            point.get('name')
+        )
+
+    def timestamp(self, index: int) -> Optional[datetime]:
+        """
+        Get the timestamp of a row as a datetime.
+
+        Args:
+            index: Row index
+
+        Returns:
+            Naive datetime, datetime with the original UTC offset for
+            timezone-aware input, or None
+        """
+        micros = self.timestamps[index]
+        if micros == NO_TIMESTAMP:
+            return None
+        offset = self.utc_offsets[index]
+        if offset == NAIVE_OFFSET:
+            return EPOCH + timedelta(microseconds=micros)
+        return (EPOCH + timedelta(microseconds=micros, seconds=offset)).replace(tzinfo=_timezone(offset))
+
+    def sorted_by_time(self) -> 'PointTable':
+        """
+        Return a copy of the table sorted by timestamp.
+
+        Points without a timestamp are placed last, keeping their order,
+        which matches GPXGenerator's sorting of dictionaries.
+
+        Returns:
+            New sorted PointTable
+        """
+        timestamps = self.timestamps
+        if NO_TIMESTAMP in timestamps:
+            order = sorted(
+                range(len(self)),
+                key=lambda i: (timestamps[i] == NO_TIMESTAMP, timestamps[i])
+            )
+        else:
+            order = sorted(range(len(self)), key=timestamps.__getitem__)
+
+        latitudes, longitudes, altitudes = self.latitudes, self.longitudes, self.altitudes
+        utc_offsets, names = self.utc_offsets, self.names
+        table = PointTable()
+        table.latitudes = array('d', [latitudes[i] for i in order])
+        table.longitudes = array('d', [longitudes[i] for i in order])
+        table.altitudes = array('d', [altitudes[i] for i in order])
+        table.timestamps = array('q', [timestamps[i] for i in order])
+        table.utc_offsets = array('i', [utc_offsets[i] for i in order])
+        table.names = [names[i] for i in order]
+        return table
+
+    def rows(self) -> Iterator[Tuple[float, float, Optional[float], Optional[datetime], Optional[str]]]:
+        """
+        Iterate over the rows as plain tuples.
+
+        This is much faster than reading through PointView objects.
+
+        Yields:
+            (latitude, longitude, altitude or None, timestamp or None, name or None)
+        """
+        one_microsecond = MICROSECOND
+        for latitude, longitude, altitude, micros, offset, name in zip(
+            self.latitudes, self.longitudes, self.altitudes,
+            self.timestamps, self.utc_offsets, self.names
+        ):
+            if micros == NO_TIMESTAMP:
+                timestamp = None
+            elif offset == NAIVE_OFFSET:
+                timestamp = EPOCH + micros * one_microsecond
+            else:
+                timestamp = (EPOCH + (micros + offset * 1000000) * one_microsecond).replace(tzinfo=_timezone(offset))
+            yield latitude, longitude, None if altitude != altitude else altitude, timestamp, name
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """
+        Convert the table to a list of GPS data dictionaries.
+
+        Returns:
+            List of dictionaries
+        """
+        return [dict(view) for view in self]
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+    def __getitem__(self, index: int) -> PointView:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PointTable index out of range")
+        return PointView(self, index)
+
+    def __iter__(self) -> Iterator[PointView]:
+        for index in range(len(self)):
+            yield PointView(self, index)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, PointTable):
+            return NotImplemented
+        return (
+            self.latitudes == other.latitudes
+            and self.longitudes == other.longitudes
+            and self.timestamps == other.timestamps
+            and self.utc_offsets == other.utc_offsets
+            and self.names == other.names
+            and all(
+                a == b or (math.isnan(a) and math.isnan(b))
+                for a, b in zip(self.altitudes, other.altitudes)
+            )
+        )
+
+    def __repr__(self) -> str:
+        return f"PointTable({len(self)} points)"
@@ -0,0 +1,150 @@
+"""
+Progress reporting for long-running extraction.
+"""
+
+import sys
+import time
+from typing import Any, Callable, Dict, Optional, TextIO
+
+# Number of files between progress reports
+PROGRESS_EVERY = 100
+
+# Seconds between progress reports
+PROGRESS_INTERVAL = 0.25
+
+# Width of the command-line progress bar in characters
+PROGRESS_BAR_WIDTH = 30
+
+# Function receiving progress reports (see ProgressReporter.report)
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+class ProgressReporter:
+    """
+    Rate-limited progress reports for a callback.
+
+    The caller counts files in the 'total', 'processed' and 'skipped'
+    entries of a statistics dictionary and calls tick() once per file.
+    The callback only runs every `every` files or `interval` seconds,
+    whichever comes first, so tick() is cheap enough for the extraction
+    loop.
+    """
+
+    __slots__ = ('callback', 'stats', 'every', 'interval', '_start', '_next_time', '_count')
+
+    def __init__(
+        self,
+        callback: ProgressCallback,
+        stats: Dict[str, Any],
+        every: int = PROGRESS_EVERY,
+        interval: float = PROGRESS_INTERVAL
+    ):
+        """
+        Initialize the reporter.
+
+        Args:
+            callback: Function receiving the progress reports
+            stats: Statistics dictionary with 'total', 'processed' and 'skipped'
+                   counts, updated by the caller
+            every: Number of files between reports
+            interval: Seconds between reports
+        """
+        self.callback = callback
+        self.stats = stats
+        self.every = every
+        self.interval = interval
+        self._start = time.perf_counter()
+        self._next_time = self._start + interval
+        self._count = 0
+
+    def tick(self) -> None:
+        """Count one finished file, reporting progress if one is due."""
+        self._count += 1
+        if self._count >= self.every or time.perf_counter() >= self._next_time:
+            self.report()
+
+    def report(self, finished: bool = False) -> None:
+        """
+        Send a progress report to the callback.
+
+        The report is a dictionary with the 'total', 'processed' and 'skipped'
+        counts, 'done' (processed + skipped), 'elapsed' seconds,
+        'files_per_sec', 'eta' (estimated seconds left, None while unknown)
+        and 'finished'. While files are still being discovered, 'total' and
+        'eta' only cover the files found so far.
+
+        Args:
+            finished: Whether this is the final report
+        """
+        now = time.perf_counter()
+        self._count = 0
+        self._next_time = now + self.interval
+
+        stats = self.stats
+        done = stats['processed'] + stats['skipped']
+        elapsed = now - self._start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        if finished:
+            eta = 0.0
+        elif rate > 0:
+            eta = max(stats['total'] - done, 0) / rate
+        else:
+            eta = None
+
+        self.callback({
+            'total': stats['total'],
+            'processed': stats['processed'],
+            'skipped': stats['skipped'],
+            'done': done,
+            'elapsed': elapsed,
+            'files_per_sec': rate,
+            'eta': eta,
+            'finished': finished
+        })
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """
+    Format a number of seconds as H:MM:SS.
+
+    Args:
+        seconds: Number of seconds (None if unknown)
+
+    Returns:
+        Formatted duration, or '?' if unknown
+    """
+    if seconds is None:
+        return '?'
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def make_progress_bar(stream: Optional[TextIO] = None, width: int = PROGRESS_BAR_WIDTH) -> ProgressCallback:
+    """
+    Create a progress callback that draws a one-line progress bar.
+
+    Args:
+        stream: Stream to draw on (default: standard error)
+        width: Width of the bar in characters
+
+    Returns:
+        Progress callback for PixTrail
+    """
+    def draw(progress: Dict[str, Any]) -> None:
+        out = stream or sys.stderr
+        total = progress['total']
+        done = progress['done']
+        fraction = min(done / total, 1.0) if total else 0.0
+        filled = int(fraction * width)
+        line = (
+            f"[{'#' * filled}{'.' * (width - filled)}] {done}/{total} files "
+            f"({fraction:.0%}) {progress['files_per_sec']:.1f} files/sec, "
+            f"ETA {format_duration(progress['eta'])}"
+        )
+        out.write('\r' + line)
+        if progress['finished']:
+            out.write('\n')
+        out.flush()
+
+    return draw
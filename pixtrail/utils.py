@@ -3,48 +3,103 @@ Utility functions for the PixTrail package.
 """
 
 import os
-import glob
-from typing import List, Tuple
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Tuple
 
+# Supported image file extensions (matched case-insensitively)
+IMAGE_EXTENSIONS = frozenset((
+    '.jpg', '.jpeg', '.png', '.tiff', '.bmp',
+    '.cr2', '.nef', '.arw', '.dng', '.orf', '.rw2', '.pef', '.srw'
+))
 
-def get_image_files(directory: str, recursive: bool = False) -> List[str]:
+# Size suffixes accepted by parse_size (powers of 1024)
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+# ISO 8601 timestamps accepted by parse_timestamp: the formats written by
+# datetime.isoformat(), with 'T' or ' ' as separator and 'Z' for UTC
+_ISO_TIMESTAMP = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6}))?)?)?'
+    r'(Z|[+-]\d{2}:?\d{2})?$'
+)
+
+
+def iter_image_entries(
+    directory: str,
+    recursive: bool = False,
+    max_depth: Optional[int] = None
+) -> Iterator[os.DirEntry]:
     """
-    Get a list of image files from a directory.
+    Walk a directory once and yield the image files it contains.
+    
+    Entries are yielded in directory order, not sorted. Their cached stat
+    information (entry.stat(), entry.inode()) can be reused by later stages.
+    Hidden files and directories (names starting with '.') are skipped.
     
     Args:
         directory: Directory to search for image files
         recursive: Whether to search recursively in subdirectories
+        max_depth: Maximum number of subdirectory levels to descend when
+                   recursive (None for no limit)
         
-    Returns:
-        List of paths to image files
+    Yields:
+        os.DirEntry for each image file
     """
     # Normalize the directory path to resolve any '..' and ensure consistent format
     normalized_directory = os.path.normpath(directory)
     
-    # Supported image file extensions
-    image_extensions = ('*.jpg', '*.jpeg', '*.png', '*.tiff', '*.bmp',
-                   '*.cr2', '*.nef', '*.arw', '*.dng', '*.orf', '*.rw2', '*.pef', '*.srw')
-    
     # Check if directory exists
     if not os.path.isdir(normalized_directory):
         raise FileNotFoundError(f"Directory not found: {normalized_directory}")
     
-    # List to store found image files
-    image_files = []
-    
-    # Search pattern
-    pattern = os.path.join(normalized_directory, '**') if recursive else normalized_directory
+    # Real paths of visited symlinked directories, to avoid loops
+    visited_links = set()
+    stack = [(normalized_directory, 0)]
     
-    # Find image files
-    for ext in image_extensions:
-        if recursive:
-            search_pattern = os.path.join(pattern, ext)
-            image_files.extend(glob.glob(search_pattern, recursive=True))
-        else:
-            search_pattern = os.path.join(pattern, ext)
-            image_files.extend(glob.glob(search_pattern))
+    while stack:
+        current, depth = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    
+                    if entry.is_dir():
+                        if not recursive or (max_depth is not None and depth >= max_depth):
+                            continue
+                        if entry.is_symlink():
+                            real_path = os.path.realpath(entry.path)
+                            if real_path in visited_links:
+                                continue
+                            visited_links.add(real_path)
+                        stack.append((entry.path, depth + 1))
+                    elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS and entry.is_file():
+                        yield entry
+        except OSError as e:
+            if current == normalized_directory:
+                raise
+            print(f"Warning: Could not read directory {current}: {e}")
+
+
+def get_image_files(
+    directory: str,
+    recursive: bool = False,
+    max_depth: Optional[int] = None
+) -> List[str]:
+    """
+    Get a list of image files from a directory.
     
-    return sorted(image_files)
+    Args:
+        directory: Directory to search for image files
+        recursive: Whether to search recursively in subdirectories
+        max_depth: Maximum number of subdirectory levels to descend when
+                   recursive (None for no limit)
+        
+    Returns:
+        Sorted list of paths to image files
+    """
+    return sorted(entry.path for entry in iter_image_entries(directory, recursive, max_depth))
 
 
 def ensure_directory(directory: str) -> bool:
@@ -112,3 +167,61 @@ def validate_coordinates(latitude: float, longitude: float) -> Tuple[bool, str]:
         return False, f"Invalid longitude value: {longitude}. Must be between -180 and 180."
         
     return True, ""
+
+
+def parse_size(value: str) -> int:
+    """
+    Parse a byte size such as '500M' or '2G'.
+    
+    Args:
+        value: Number of bytes, optionally followed by K, M, G or T
+               (powers of 1024; a trailing 'B' is ignored)
+        
+    Returns:
+        Number of bytes
+        
+    Raises:
+        ValueError: If the size can't be parsed or is negative
+    """
+    text = value.strip().upper()
+    if text.endswith('B'):
+        text = text[:-1]
+    unit = text[-1:] if text[-1:] in _SIZE_UNITS else ''
+    number = float(text[:len(text) - len(unit)])
+    if number < 0:
+        raise ValueError(f"Negative size: {value}")
+    return int(number * _SIZE_UNITS[unit])
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parse an ISO 8601 timestamp such as '2023-01-01T12:00:00+02:00'.
+    
+    Unlike datetime.fromisoformat, this works on Python 3.6 and accepts a
+    trailing 'Z' for UTC.
+    
+    Args:
+        value: Timestamp string
+        
+    Returns:
+        Datetime, timezone-aware if the string has a UTC offset
+        
+    Raises:
+        ValueError: If the timestamp can't be parsed
+    """
+    match = _ISO_TIMESTAMP.match(value)
+    if not match:
+        raise ValueError(f"Invalid ISO 8601 timestamp: {value}")
+    year, month, day, hour, minute, second, fraction, offset = match.groups()
+    tzinfo = None
+    if offset == 'Z':
+        tzinfo = timezone.utc
+    elif offset:
+        sign = -1 if offset[0] == '-' else 1
+        digits = offset[1:].replace(':', '')
+        tzinfo = timezone(sign * timedelta(hours=int(digits[:2]), minutes=int(digits[2:])))
+    return datetime(
+        int(year), int(month), int(day),
+        int(hour or 0), int(minute or 0), int(second or 0),
+        int((fraction or '0').ljust(6, '0')), tzinfo
+    )
@@ -0,0 +1,523 @@
+"""
+Background job queue for the PixTrail web interface.
+
+Jobs are kept in a small persistent queue: every job is a JSON file in the
+jobs directory, rewritten atomically on each state change and progress
+report. Jobs that were queued or running when the server stopped are
+queued again on restart.
+
+Several server processes can share a jobs directory. Each process runs
+the jobs submitted to it, status requests for other jobs are answered
+from the job files, and a job is claimed with a file lock before it runs,
+so a job recovered by several processes only runs once. A running job
+also holds one of max_jobs slot locks in the jobs directory, so the
+limit on running jobs applies to all processes together.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single server process, no claiming needed
+    fcntl = None
+
+# Job states
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+# Available memory required to start a job while another one is running
+MIN_FREE_MEMORY = 512 * 1024 * 1024
+
+# Seconds between admission checks while jobs wait for resources
+ADMISSION_INTERVAL = 0.5
+
+# Number of finished jobs kept before the oldest are forgotten
+MAX_FINISHED_JOBS = 1000
+
+# Seconds between checks of the job file while watching a job run by
+# another process
+REMOTE_POLL_INTERVAL = 0.25
+
+# Directory inside the jobs directory holding the concurrency slot locks
+SLOTS_DIR = 'slots'
+
+# Format of job IDs
+_JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# Function running a job: handler(params, progress) -> result. The handler
+# may update the JobProgress dictionary while it runs.
+JobHandler = Callable[[Dict[str, Any], 'JobProgress'], Dict[str, Any]]
+
+
+def available_memory() -> Optional[int]:
+    """
+    Get the memory available for new work.
+
+    Returns:
+        Available memory in bytes, or None if it can't be determined
+    """
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def system_load() -> Optional[float]:
+    """
+    Get the one-minute system load average.
+
+    Returns:
+        Load average, or None if it isn't available on this platform
+    """
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+
+class JobProgress(dict):
+    """
+    Progress dictionary of a running job.
+
+    Handlers can update it like any dictionary; updates made through
+    publish() are also saved and wake up anyone watching the job.
+    """
+
+    def __init__(self, condition: threading.Condition, on_publish: Optional[Callable[[], None]] = None):
+        """
+        Initialize the progress.
+
+        Args:
+            condition: Condition notified when progress is published
+            on_publish: Function called after each published update
+        """
+        super().__init__()
+        self.condition = condition
+        self.on_publish = on_publish
+        self.version = 0
+
+    def publish(self, values: Dict[str, Any]) -> None:
+        """
+        Update the progress and notify watchers.
+
+        Can be used directly as a PixTrail progress callback.
+
+        Args:
+            values: Progress values
+        """
+        with self.condition:
+            self.update(values)
+            self.version += 1
+            self.condition.notify_all()
+        if self.on_publish:
+            self.on_publish()
+
+
+class JobQueue:
+    """
+    Persistent queue of background jobs run by a bounded pool of threads.
+
+    A queued job only starts when the system has room for it: no more than
+    max_jobs run at once, and a job isn't started while the load average
+    is at or above the CPU count or available memory is below
+    min_free_memory. A single job is always allowed to run, so the queue
+    makes progress on a busy machine.
+
+    The limits hold across all processes sharing the jobs directory, which
+    should use the same max_jobs: a job runs in one of max_jobs slots, each
+    a lock file, and only the job in the first slot skips the resource checks.
+    """
+
+    def __init__(
+        self,
+        jobs_dir: str,
+        handler: JobHandler,
+        max_jobs: Optional[int] = None,
+        min_free_memory: int = MIN_FREE_MEMORY
+    ):
+        """
+        Open the queue, loading the jobs stored in jobs_dir.
+
+        Args:
+            jobs_dir: Directory holding one JSON file per job
+            handler: Function that runs a job and returns its result
+            max_jobs: Maximum number of jobs running at once in all processes
+                      sharing jobs_dir (None for one per CPU)
+            min_free_memory: Available memory in bytes required to start a
+                             job while another one is running
+        """
+        self.jobs_dir = jobs_dir
+        self.handler = handler
+        self.cpu_count = os.cpu_count() or 1
+        self.max_jobs = max_jobs or self.cpu_count
+        self.min_free_memory = min_free_memory
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._active_keys: Dict[str, str] = {}
+        self._pending = deque()
+        self._finished = deque()
+        self._running = 0
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._progress_condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+        os.makedirs(os.path.join(jobs_dir, SLOTS_DIR), exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        """Load stored jobs, queuing unfinished ones again."""
+        jobs = []
+        for name in os.listdir(self.jobs_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.jobs_dir, name)) as f:
+                    jobs.append(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not load job {name}: {e}")
+
+        for job in sorted(jobs, key=lambda job: job['created']):
+            self._jobs[job['id']] = job
+            if job['state'] in (JOB_QUEUED, JOB_RUNNING):
+                # Interrupted by a restart: run it again from the start
+                job['state'] = JOB_QUEUED
+                job['progress'] = {}
+                self._pending.append(job['id'])
+                if job.get('key') is not None:
+                    self._active_keys[job['key']] = job['id']
+            else:
+                self._finished.append(job['id'])
+
+    def _path(self, job_id: str, extension: str = '.json') -> str:
+        """Get the path of a job's file."""
+        return os.path.join(self.jobs_dir, job_id + extension)
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        """Write a job to its file atomically."""
+        path = self._path(job['id'])
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(job, f)
+        os.replace(temp_path, path)
+
+    def _read(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Read a job from its file (None if it doesn't exist)."""
+        if not _JOB_ID_PATTERN.match(job_id):
+            return None
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _claim(self, job_id: str) -> Any:
+        """
+        Take the lock that allows a process to run a job.
+
+        Returns:
+            Open lock file to close when the job is finished, True where
+            locking isn't supported, or None if another process holds the lock
+        """
+        if fcntl is None:
+            return True
+        lock_file = open(self._path(job_id, '.lock'), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def _release(self, job_id: str, lock_file: Any) -> None:
+        """Release a job's lock after its final state was saved."""
+        if lock_file is True:
+            return
+        try:
+            os.remove(self._path(job_id, '.lock'))
+        except OSError:
+            pass
+        lock_file.close()
+
+    def start(self) -> None:
+        """Start the worker threads."""
+        with self._condition:
+            if self._threads:
+                return
+            self._stopped = False
+            for i in range(self.max_jobs):
+                thread = threading.Thread(target=self._worker, name=f"pixtrail-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the worker threads after their current jobs.
+
+        Queued jobs stay stored and run when the queue is started again.
+
+        Args:
+            wait: Wait for running jobs to finish
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+            threads = self._threads
+            self._threads = []
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def submit(self, params: Dict[str, Any], key: Optional[str] = None) -> str:
+        """
+        Queue a job.
+
+        Args:
+            params: JSON-serializable parameters passed to the handler
+            key: Optional identifier of the work (for example a session ID);
+                 while a job with the same key is queued or running, its ID
+                 is returned instead of queuing a duplicate
+
+        Returns:
+            Job ID
+        """
+        with self._condition:
+            if key is not None and key in self._active_keys:
+                return self._active_keys[key]
+
+            job = {
+                'id': uuid.uuid4().hex,
+                'key': key,
+                'params': params,
+                'state': JOB_QUEUED,
+                'progress': {},
+                'result': None,
+                'error': None,
+                'created': time.time(),
+                'started': None,
+                'finished': None
+            }
+            self._save(job)
+            self._jobs[job['id']] = job
+            self._pending.append(job['id'])
+            if key is not None:
+                self._active_keys[key] = job['id']
+            self._condition.notify()
+            return job['id']
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the status of a job.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Dictionary with the job's 'job_id', 'state', 'progress', 'result'
+            and 'error' (plus 'queue_position' while queued here), or None if
+            the job is unknown
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job['state'] == JOB_QUEUED:
+                # Not run by this process (yet): another process may have
+                # submitted or claimed it, and its file is up to date
+                job = self._read(job_id) or job
+            if job is None:
+                return None
+            status = {
+                'job_id': job['id'],
+                'state': job['state'],
+                'progress': dict(job['progress']),
+                'result': job['result'],
+                'error': job['error'],
+                'created': job['created'],
+                'started': job['started'],
+                'finished': job['finished']
+            }
+            if job['state'] == JOB_QUEUED and job_id in self._pending:
+                status['queue_position'] = self._pending.index(job_id)
+            return status
+
+    def wait_for_change(
+        self,
+        job_id: str,
+        seen: Optional[Tuple[str, int]] = None,
+        timeout: Optional[float] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, int]]]:
+        """
+        Wait until a job's state or published progress changes.
+
+        Args:
+            job_id: Job ID
+            seen: Change token returned by the previous call (None to return at once)
+            timeout: Maximum number of seconds to wait
+
+        Returns:
+            Tuple of (job status as returned by get(), change token). The token
+            is unchanged if the timeout expired first; the status is None if
+            the job is unknown.
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job['state'] == JOB_QUEUED:
+            return self._wait_for_file_change(job_id, seen, timeout)
+
+        def token() -> Optional[Tuple[str, int]]:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return job['state'], getattr(job['progress'], 'version', 0)
+
+        with self._progress_condition:
+            if seen is not None:
+                self._progress_condition.wait_for(lambda: token() != seen, timeout)
+            current = token()
+        return self.get(job_id), current
+
+    def _wait_for_file_change(
+        self,
+        job_id: str,
+        seen: Optional[Tuple[str, int]],
+        timeout: Optional[float]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, int]]]:
+        """Wait for a change of a job that isn't run by this process."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                current = ('file', os.stat(self._path(job_id)).st_mtime_ns)
+            except (OSError, ValueError):
+                current = None
+            if seen is None or current != seen or current is None:
+                break
+            remaining = REMOTE_POLL_INTERVAL if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(REMOTE_POLL_INTERVAL, remaining))
+        return self.get(job_id), current
+
+    def _notify_watchers(self) -> None:
+        """Wake up callers of wait_for_change after a state change."""
+        with self._progress_condition:
+            self._progress_condition.notify_all()
+
+    def _acquire_slot(self) -> Any:
+        """
+        Take a free concurrency slot if the system has room for another job.
+
+        Slots are tried in order, so the first one is free whenever no job
+        runs in any process. Its job is admitted without checking resources.
+
+        Returns:
+            Open slot lock file to close when the job is finished, True where
+            locking isn't supported, or None if the job has to wait
+        """
+        if fcntl is None:
+            if self._running == 0 or (self._running < self.max_jobs and self._has_room()):
+                return True
+            return None
+        for index in range(self.max_jobs):
+            slot_file = open(os.path.join(self.jobs_dir, SLOTS_DIR, f'{index}.lock'), 'a')
+            try:
+                fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                slot_file.close()
+                continue
+            if index == 0 or self._has_room():
+                return slot_file
+            slot_file.close()
+            return None
+        return None
+
+    @staticmethod
+    def _release_slot(slot_file: Any) -> None:
+        """Free a slot taken by _acquire_slot."""
+        if slot_file is not True:
+            slot_file.close()
+
+    def _has_room(self) -> bool:
+        """Check whether load and memory allow another running job."""
+        load = system_load()
+        if load is not None and load >= self.cpu_count:
+            return False
+        memory = available_memory()
+        if memory is not None and memory < self.min_free_memory:
+            return False
+        return True
+
+    def _worker(self) -> None:
+        """Run queued jobs until the queue is shut down."""
+        while True:
+            with self._condition:
+                slot_file = None
+                while not self._stopped:
+                    if self._pending:
+                        slot_file = self._acquire_slot()
+                        if slot_file:
+                            break
+                    # Slots and resources are polled while jobs wait for admission
+                    self._condition.wait(ADMISSION_INTERVAL if self._pending else None)
+                if self._stopped:
+                    return
+                job = self._jobs[self._pending.popleft()]
+                lock_file = self._claim(job['id'])
+                stored = self._read(job['id']) if lock_file else None
+                if stored is None or stored['state'] in (JOB_DONE, JOB_FAILED):
+                    # Run or finished by another process
+                    self._release_slot(slot_file)
+                    if lock_file is not None:
+                        self._release(job['id'], lock_file)
+                    if stored is not None:
+                        self._jobs[job['id']] = stored
+                    if self._active_keys.get(job['key']) == job['id']:
+                        del self._active_keys[job['key']]
+                    continue
+                job['state'] = JOB_RUNNING
+                job['started'] = time.time()
+                job['progress'] = JobProgress(self._progress_condition, lambda job=job: self._save(job))
+                self._running += 1
+                self._save(job)
+            self._notify_watchers()
+
+            try:
+                result = self.handler(job['params'], job['progress'])
+                error = result.get('error') if not result.get('success', True) else None
+            except Exception as e:
+                result, error = None, str(e) or e.__class__.__name__
+
+            with self._condition:
+                self._running -= 1
+                job['state'] = JOB_FAILED if error else JOB_DONE
+                job['result'] = result
+                job['error'] = error
+                job['finished'] = time.time()
+                self._save(job)
+                if self._active_keys.get(job['key']) == job['id']:
+                    del self._active_keys[job['key']]
+                self._finished.append(job['id'])
+                self._forget_old_jobs()
+                self._release_slot(slot_file)
+                self._condition.notify_all()
+            self._release(job['id'], lock_file)
+            self._notify_watchers()
+
+    def _forget_old_jobs(self) -> None:
+        """Remove the oldest finished jobs beyond MAX_FINISHED_JOBS."""
+        while len(self._finished) > MAX_FINISHED_JOBS:
+            job_id = self._finished.popleft()
+            del self._jobs[job_id]
+            try:
+                os.remove(self._path(job_id))
+            except OSError:
+                pass
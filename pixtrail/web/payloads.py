@@ -0,0 +1,331 @@
+"""
+Compact encodings of GPS points for the web API.
+
+Points are exchanged as a JSON list of dictionaries by default. For large
+tracks the API also accepts and returns two compact variants, negotiated
+by content type:
+
+- columns (COLUMNS_TYPE): a JSON object of parallel arrays, with
+  delta-encoded timestamps;
+- binary (BINARY_TYPE): little-endian typed arrays that browsers read
+  with Float64Array views, without any parsing.
+
+Both decode straight into a PointTable, and validation runs over whole
+columns at once rather than point by point.
+"""
+
+import math
+import struct
+import sys
+from array import array
+from datetime import datetime
+from itertools import accumulate
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+
+from ..points import EPOCH, MICROSECOND, NAIVE_OFFSET, NO_TIMESTAMP, PointTable
+
+# Content type of the columnar JSON variant
+COLUMNS_TYPE = 'application/vnd.pixtrail.columns+json'
+
+# Content type of the binary variant
+BINARY_TYPE = 'application/vnd.pixtrail.points'
+
+# First bytes of a binary payload
+BINARY_MAGIC = b'PXT1'
+
+# Binary header: magic and point count, padded so the float64 columns
+# that follow are 8-byte aligned
+_BINARY_HEADER = struct.Struct('<4sI')
+
+# Separator of the names in a binary payload (not valid in filenames)
+_NAME_SEPARATOR = '\0'
+
+# Range of timestamps (microseconds since the epoch) that convert to a
+# datetime, a day inside datetime.min and datetime.max so UTC offsets fit
+_MIN_MICROS = (datetime(1, 1, 2) - EPOCH) // MICROSECOND
+_MAX_MICROS = (datetime(9999, 12, 31) - EPOCH) // MICROSECOND
+
+# Response formats, by the value of the 'format' query parameter
+FORMAT_RECORDS = 'records'
+FORMAT_COLUMNS = 'columns'
+FORMAT_BINARY = 'binary'
+
+# Content type answered for each compact format
+_FORMAT_TYPES = {FORMAT_COLUMNS: COLUMNS_TYPE, FORMAT_BINARY: BINARY_TYPE}
+
+Points = Union[PointTable, Iterable[Mapping[str, Any]]]
+
+
+def negotiate_format(accept_mimetypes: Any, format_param: Optional[str] = None) -> str:
+    """
+    Choose the format of the points in a response.
+
+    Args:
+        accept_mimetypes: The request's Accept header (werkzeug MIMEAccept)
+        format_param: Value of the 'format' query parameter, for clients
+                      that can't set headers (such as EventSource)
+
+    Returns:
+        FORMAT_RECORDS, FORMAT_COLUMNS or FORMAT_BINARY
+    """
+    if format_param in (FORMAT_RECORDS, FORMAT_COLUMNS, FORMAT_BINARY):
+        return format_param
+    # Compact formats must be named explicitly; wildcards keep the default
+    qualities = {value: quality for value, quality in accept_mimetypes}
+    fmt, best = FORMAT_RECORDS, qualities.get('application/json', 0)
+    for name, content_type in _FORMAT_TYPES.items():
+        if qualities.get(content_type, 0) > best:
+            fmt, best = name, qualities[content_type]
+    return fmt
+
+
+def content_type(fmt: str) -> str:
+    """Get the content type of a response format."""
+    return _FORMAT_TYPES.get(fmt, 'application/json')
+
+
+def _table(points: Points) -> PointTable:
+    """Get points as a PointTable."""
+    return points if isinstance(points, PointTable) else PointTable.from_dicts(points)
+
+
+def _utc_flags(table: PointTable) -> bytearray:
+    """Get 1 for each timezone-aware timestamp of a table and 0 for naive ones."""
+    return bytearray([offset != NAIVE_OFFSET for offset in table.utc_offsets])
+
+
+def _utc_offsets(flags: Iterable[Any]) -> array:
+    """Get the UTC offset column of timestamps sent as UTC flags."""
+    return array('i', [0 if flag else NAIVE_OFFSET for flag in flags])
+
+
+def _check_coordinates(latitudes: array, longitudes: array) -> None:
+    """
+    Validate whole coordinate columns.
+
+    Raises:
+        ValueError: If a coordinate is not finite or out of range
+    """
+    for column, limit, label in ((latitudes, 90.0, 'latitude'), (longitudes, 180.0, 'longitude')):
+        if not column:
+            continue
+        try:
+            # NaN and infinity make the exact sum non-finite
+            finite = math.isfinite(math.fsum(column))
+        except (OverflowError, ValueError):
+            finite = False
+        if not finite or min(column) < -limit or max(column) > limit:
+            raise ValueError(f"Invalid {label} values")
+
+
+def _check_timestamps(timestamps: array) -> None:
+    """
+    Validate a whole timestamp column.
+
+    Raises:
+        ValueError: If a timestamp is outside the range of datetime
+    """
+    if NO_TIMESTAMP in timestamps:
+        timestamps = [micros for micros in timestamps if micros != NO_TIMESTAMP]
+    if timestamps and (min(timestamps) < _MIN_MICROS or max(timestamps) > _MAX_MICROS):
+        raise ValueError("Invalid timestamps")
+
+
+def _check_lengths(count: int, **columns: Any) -> None:
+    """Check that all columns have one value per point."""
+    for label, column in columns.items():
+        if len(column) != count:
+            raise ValueError(f"Column '{label}' has {len(column)} values, expected {count}")
+
+
+def encode_columns(points: Points) -> Dict[str, Any]:
+    """
+    Encode points as parallel arrays.
+
+    Timestamps are milliseconds since the epoch, delta-encoded: the first
+    non-null value is absolute and each following one is the difference
+    to the previous non-null timestamp. Null marks a point without a
+    timestamp. 'utc' tells whether the timestamps were timezone-aware
+    (true) or local times (false), as one value or one value per point;
+    timezone-aware timestamps are sent as UTC, without their offset.
+
+    Args:
+        points: PointTable or GPS data dictionaries
+
+    Returns:
+        JSON-serializable dictionary
+    """
+    table = _table(points)
+    timestamps: List[Optional[int]] = []
+    previous = 0
+    for micros in table.timestamps:
+        if micros == NO_TIMESTAMP:
+            timestamps.append(None)
+        else:
+            millis = micros // 1000
+            timestamps.append(millis - previous)
+            previous = millis
+
+    flags = _utc_flags(table)
+    if not flags or flags.count(flags[0]) == len(flags):
+        utc: Any = bool(flags and flags[0])
+    else:
+        utc = list(flags)
+
+    return {
+        'count': len(table),
+        'latitude': table.latitudes.tolist(),
+        'longitude': table.longitudes.tolist(),
+        'altitude': [None if altitude != altitude else altitude for altitude in table.altitudes],
+        'timestamps': timestamps,
+        'utc': utc,
+        'name': list(table.names)
+    }
+
+
+def decode_columns(data: Any) -> PointTable:
+    """
+    Decode points encoded by encode_columns.
+
+    'altitude', 'timestamps', 'utc' and 'name' are optional.
+
+    Args:
+        data: Decoded JSON object
+
+    Returns:
+        New PointTable
+
+    Raises:
+        ValueError: If the payload is malformed or has invalid coordinates
+                    or timestamps
+    """
+    if not isinstance(data, Mapping):
+        raise ValueError("Expected a JSON object")
+    try:
+        table = PointTable()
+        table.latitudes = array('d', data['latitude'])
+        table.longitudes = array('d', data['longitude'])
+        count = len(table.latitudes)
+
+        altitudes = data.get('altitude')
+        if altitudes is None:
+            table.altitudes = array('d', bytes(8 * count))
+        elif None in altitudes:
+            table.altitudes = array('d', [math.nan if altitude is None else altitude for altitude in altitudes])
+        else:
+            table.altitudes = array('d', altitudes)
+
+        deltas = data.get('timestamps')
+        if deltas is None:
+            table.timestamps = array('q', [NO_TIMESTAMP]) * count
+        elif None in deltas:
+            micros, previous = [], 0
+            for delta in deltas:
+                if delta is None:
+                    micros.append(NO_TIMESTAMP)
+                else:
+                    previous += delta
+                    micros.append(previous * 1000)
+            table.timestamps = array('q', micros)
+        else:
+            table.timestamps = array('q', [millis * 1000 for millis in accumulate(deltas)])
+
+        utc = data.get('utc', False)
+        table.utc_offsets = _utc_offsets(utc) if isinstance(utc, list) else _utc_offsets([utc]) * count
+
+        names = data.get('name')
+        if names is None:
+            table.names = [None] * count
+        else:
+            if not all(name is None or isinstance(name, str) for name in names):
+                raise ValueError("Names must be strings")
+            table.names = [None if name is None else sys.intern(name) for name in names]
+    except (KeyError, TypeError, OverflowError) as e:
+        raise ValueError(f"Malformed columns: {e}")
+
+    _check_lengths(count, longitude=table.longitudes, altitude=table.altitudes,
+                   timestamps=table.timestamps, utc=table.utc_offsets, name=table.names)
+    _check_coordinates(table.latitudes, table.longitudes)
+    _check_timestamps(table.timestamps)
+    return table
+
+
+def encode_binary(points: Points) -> bytes:
+    """
+    Encode points as little-endian typed arrays.
+
+    Layout after the 8-byte header (magic, uint32 point count): float64
+    latitudes, longitudes, altitudes (NaN if unknown) and timestamps in
+    milliseconds since the epoch (NaN if unknown), one uint8 UTC flag per
+    point, and the UTF-8 names separated by NUL bytes.
+
+    Args:
+        points: PointTable or GPS data dictionaries
+
+    Returns:
+        Encoded bytes
+    """
+    table = _table(points)
+    millis = array('d', [math.nan if micros == NO_TIMESTAMP else micros / 1000 for micros in table.timestamps])
+    columns = [array('d', table.latitudes), array('d', table.longitudes), array('d', table.altitudes), millis]
+    if sys.byteorder == 'big':
+        for column in columns:
+            column.byteswap()
+    names = _NAME_SEPARATOR.join(name or '' for name in table.names).encode('utf-8')
+    return b''.join([_BINARY_HEADER.pack(BINARY_MAGIC, len(table))]
+                    + [column.tobytes() for column in columns]
+                    + [bytes(_utc_flags(table)), names])
+
+
+def decode_binary(data: bytes) -> PointTable:
+    """
+    Decode points encoded by encode_binary.
+
+    Args:
+        data: Encoded bytes
+
+    Returns:
+        New PointTable
+
+    Raises:
+        ValueError: If the payload is malformed or has invalid coordinates
+                    or timestamps
+    """
+    if len(data) < _BINARY_HEADER.size:
+        raise ValueError("Payload too short")
+    magic, count = _BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC:
+        raise ValueError("Not a PixTrail points payload")
+    end = _BINARY_HEADER.size + 33 * count
+    if len(data) < end:
+        raise ValueError("Payload too short")
+
+    columns = []
+    offset = _BINARY_HEADER.size
+    for _ in range(4):
+        column = array('d')
+        column.frombytes(data[offset:offset + 8 * count])
+        if sys.byteorder == 'big':
+            column.byteswap()
+        columns.append(column)
+        offset += 8 * count
+
+    table = PointTable()
+    table.latitudes, table.longitudes, table.altitudes, millis = columns
+    try:
+        # NaN compares unequal to itself
+        table.timestamps = array('q', [NO_TIMESTAMP if value != value else round(value * 1000) for value in millis])
+    except OverflowError:
+        raise ValueError("Invalid timestamps")
+    table.utc_offsets = _utc_offsets(data[offset:end])
+
+    try:
+        names = data[end:].decode('utf-8').split(_NAME_SEPARATOR) if count else []
+    except UnicodeDecodeError as e:
+        raise ValueError(f"Invalid names: {e}")
+    _check_lengths(count, name=names)
+    table.names = [sys.intern(name) if name else None for name in names]
+
+    _check_coordinates(table.latitudes, table.longitudes)
+    _check_timestamps(table.timestamps)
+    return table
@@ -0,0 +1,364 @@
+"""
+Content-addressed cache of extraction results and GPX files for the web interface.
+
+Users often upload the same photos again, each time into a new session,
+so results can't be keyed by path like the extraction cache does.
+Photos the header-only fast path can read are never looked up, since
+the lookup would have to read the same header. The others are keyed by
+a hash of their size, their first HEADER_BYTES bytes and the bytes the
+fast path read before giving up, such as IFDs beyond the header. GPX
+files are keyed by a hash of the sorted point set they were generated
+from. Least recently used entries are evicted when the cache exceeds
+its size.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..cache import MISS
+from ..exif_reader import TIFF_HEADER_BLOCK, ExifReader
+from ..utils import parse_timestamp
+
+# Bytes hashed at the start of each photo the fast path can't read
+HEADER_BYTES = TIFF_HEADER_BLOCK
+
+# Default maximum total size of the cache entries in bytes
+DEFAULT_RESULT_CACHE_SIZE = 256 * 1024 * 1024
+
+# Name of the cache database inside the data directory
+RESULT_CACHE_FILE = '.result-cache.sqlite3'
+
+# Entry kinds
+_PHOTO = 'photo'
+_GPX = 'gpx'
+
+
+def content_key(size: int, header: bytes) -> bytes:
+    """
+    Compute the cache key of a photo.
+
+    Args:
+        size: Size of the photo in bytes
+        header: First HEADER_BYTES bytes of the photo (or all of it),
+                followed by the bytes read by the fast path
+
+    Returns:
+        16-byte key
+    """
+    digest = hashlib.blake2b(digest_size=16, person=b'pixtrail-photo')
+    digest.update(size.to_bytes(8, 'little'))
+    digest.update(header)
+    return digest.digest()
+
+
+def read_header(image_path: str, size: Optional[int] = None) -> Tuple[Any, Optional[bytes]]:
+    """
+    Read the GPS data of a photo on disk from its header, or compute its cache key.
+
+    Args:
+        image_path: Path to the photo
+        size: Size of the photo, if already known
+
+    Returns:
+        Tuple of (GPS data or None, None) if the header-only fast path
+        reads the photo, otherwise (MISS, 16-byte key from content_key())
+
+    Raises:
+        OSError: If the photo can't be read
+    """
+    fast_bytes = bytearray()
+    try:
+        return ExifReader.extract_gps_fast(image_path, fast_bytes), None
+    except ValueError:
+        pass
+    with open(image_path, 'rb') as f:
+        if size is None:
+            size = os.fstat(f.fileno()).st_size
+        header = f.read(HEADER_BYTES)
+    return MISS, content_key(size, header + fast_bytes)
+
+
+def points_key(points: Iterable[Dict[str, Any]]) -> bytes:
+    """
+    Compute the cache key of the GPX file for a set of points.
+
+    Args:
+        points: GPS data dictionaries, in any order
+
+    Returns:
+        16-byte key
+    """
+    rows = []
+    for point in points:
+        timestamp = point.get('timestamp')
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.isoformat()
+        rows.append([
+            timestamp or '', point['latitude'], point['longitude'],
+            point.get('altitude', 0.0), point.get('name', '')
+        ])
+    rows.sort()
+    digest = hashlib.blake2b(digest_size=16, person=b'pixtrail-gpx')
+    digest.update(json.dumps(rows).encode('utf-8'))
+    return digest.digest()
+
+
+def _encode_gps(gps_data: Optional[Dict[str, Any]]) -> bytes:
+    """Serialize GPS data without the photo's name."""
+    if not gps_data:
+        return b'null'
+    timestamp = gps_data.get('timestamp')
+    return json.dumps([
+        gps_data['latitude'], gps_data['longitude'], gps_data.get('altitude', 0.0),
+        timestamp.isoformat() if isinstance(timestamp, datetime) else None
+    ]).encode('utf-8')
+
+
+def _decode_gps(value: bytes, name: str) -> Optional[Dict[str, Any]]:
+    """Deserialize GPS data stored by _encode_gps."""
+    row = json.loads(value)
+    if row is None:
+        return None
+    return {
+        'latitude': row[0],
+        'longitude': row[1],
+        'altitude': row[2],
+        'timestamp': parse_timestamp(row[3]) if row[3] else None,
+        'name': name
+    }
+
+
+class ResultCache:
+    """
+    SQLite-backed cache of photo GPS data and GPX files, keyed by content.
+
+    get() and put_many() have the signatures of ExtractionCache, so the
+    cache can be passed to PixTrail as its cache_class; put_many() only
+    stores the photos that get() looked up. Each instance has its own
+    connection; the database uses WAL mode so the threads and worker
+    processes of the server can share it. Lookups only mark entries as
+    used in memory; the marks are written with the next write or on
+    close().
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = DEFAULT_RESULT_CACHE_SIZE):
+        """
+        Open (and create if needed) the cache database.
+
+        Args:
+            db_path: Path to the SQLite database file
+            max_bytes: Maximum total size of the entries in bytes
+        """
+        self.db_path = os.path.normpath(db_path)
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self.connection = sqlite3.connect(self.db_path, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            ' key BLOB PRIMARY KEY,'
+            ' kind TEXT NOT NULL,'
+            ' value BLOB NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' used REAL NOT NULL'
+            ')'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+        )
+        self.connection.commit()
+
+        # Keys of the photos looked up by get(), for put_many()
+        self._file_keys: Dict[str, bytes] = {}
+        self._used: List[bytes] = []
+        self._counts = {'hits': 0, 'misses': 0}
+
+    def __enter__(self) -> 'ResultCache':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Write pending usage marks and close the database connection."""
+        try:
+            with self.connection:
+                self._flush()
+        finally:
+            self.connection.close()
+
+    def get(self, image_path: str, stat_result: Optional[os.stat_result] = None) -> Any:
+        """
+        Look up the GPS data of a photo on disk by its content.
+
+        Photos the header-only fast path can read are returned without a
+        lookup and aren't stored, as the lookup would cost as much.
+
+        Args:
+            image_path: Path to the photo
+            stat_result: os.stat() result of the photo, if available
+
+        Returns:
+            Dictionary containing GPS data, None for a "no GPS data" result,
+            or MISS if the photo must be extracted
+        """
+        try:
+            gps_data, key = read_header(image_path, stat_result.st_size if stat_result else None)
+        except OSError:
+            return MISS
+        if key is None:
+            return gps_data
+        self._file_keys[image_path] = key
+        return self.get_key(key, os.path.basename(image_path))
+
+    def put_many(
+        self,
+        entries: Iterable[Tuple[str, Any, Optional[Dict[str, Any]]]]
+    ) -> None:
+        """
+        Store the GPS data of photos looked up with get().
+
+        Args:
+            entries: Iterable of (image path, os.stat() result, GPS data or None)
+        """
+        self.put_keys(
+            (self._file_keys.pop(image_path), gps_data)
+            for image_path, _, gps_data in entries
+            if image_path in self._file_keys
+        )
+
+    def get_key(self, key: bytes, name: str) -> Any:
+        """
+        Look up the GPS data of a photo by its content key.
+
+        Args:
+            key: Key from content_key()
+            name: Name to report in the GPS data
+
+        Returns:
+            Dictionary containing GPS data, None for a cached "no GPS data"
+            result, or MISS if the photo is not cached
+        """
+        row = self.connection.execute(
+            'SELECT value FROM results WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            self._counts['misses'] += 1
+            return MISS
+        self._counts['hits'] += 1
+        self._used.append(key)
+        return _decode_gps(row[0], name)
+
+    def put_keys(self, entries: Iterable[Tuple[bytes, Optional[Dict[str, Any]]]]) -> None:
+        """
+        Store the GPS data of photos by their content keys.
+
+        Args:
+            entries: Iterable of (key from content_key(), GPS data or None)
+        """
+        now = time.time()
+        rows = []
+        for key, gps_data in entries:
+            value = _encode_gps(gps_data)
+            rows.append((key, _PHOTO, value, len(key) + len(value), now))
+        self._write(rows)
+
+    def get_gpx(self, points: Iterable[Dict[str, Any]]) -> Optional[bytes]:
+        """
+        Look up the GPX file generated from a set of points.
+
+        Args:
+            points: GPS data dictionaries, in any order
+
+        Returns:
+            Contents of the GPX file, or None if it is not cached
+        """
+        key = points_key(points)
+        row = self.connection.execute(
+            'SELECT value FROM results WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            self._counts['misses'] += 1
+            return None
+        self._counts['hits'] += 1
+        self._used.append(key)
+        return bytes(row[0])
+
+    def put_gpx(self, points: Iterable[Dict[str, Any]], data: bytes) -> None:
+        """
+        Store the GPX file generated from a set of points.
+
+        Args:
+            points: GPS data dictionaries, in any order
+            data: Contents of the GPX file
+        """
+        key = points_key(points)
+        self._write([(key, _GPX, data, len(key) + len(data), time.time())])
+
+    def _write(self, rows: List[Tuple[bytes, str, bytes, int, float]]) -> None:
+        """Insert entries and evict the least recently used entries over the size."""
+        with self.connection:
+            if rows:
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)', rows
+                )
+            self._flush()
+            total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evicted = []
+            for key, size in self.connection.execute('SELECT key, size FROM results ORDER BY used'):
+                if total <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                total -= size
+            self.connection.executemany('DELETE FROM results WHERE key = ?', evicted)
+            self._count('evictions', len(evicted))
+
+    def _flush(self) -> None:
+        """Write usage marks and hit counts (inside a transaction)."""
+        if self._used:
+            now = time.time()
+            self.connection.executemany(
+                'UPDATE results SET used = ? WHERE key = ?', [(now, key) for key in self._used]
+            )
+            self._used = []
+        for name, value in self._counts.items():
+            self._count(name, value)
+        self._counts = {'hits': 0, 'misses': 0}
+
+    def _count(self, name: str, value: int) -> None:
+        """Add to a persistent counter (inside a transaction)."""
+        if value:
+            self.connection.execute(
+                'INSERT INTO counters VALUES (?, ?)'
+                ' ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+                (name, value)
+            )
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Get the size and counters of the cache.
+
+        Returns:
+            Dictionary with the number of 'photos' and 'gpx_files', the
+            'bytes' they use, the 'max_bytes', and the total 'hits',
+            'misses' and 'evictions'
+        """
+        metrics = {'photos': 0, 'gpx_files': 0, 'bytes': 0, 'max_bytes': self.max_bytes,
+                   'hits': 0, 'misses': 0, 'evictions': 0}
+        for kind, count, size in self.connection.execute(
+                'SELECT kind, COUNT(*), SUM(size) FROM results GROUP BY kind'):
+            metrics['photos' if kind == _PHOTO else 'gpx_files'] = count
+            metrics['bytes'] += size
+        for name, value in self.connection.execute('SELECT name, value FROM counters'):
+            metrics[name] = value
+        return metrics
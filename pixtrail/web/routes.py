@@ -4,17 +4,54 @@ API routes for the PixTrail web interface.
 
 import os
 import json
+import sqlite3
 import tempfile
 import shutil
+import threading
 from datetime import datetime
+from functools import partial
 from flask import (
-    Blueprint, render_template, request, jsonify, 
+    Blueprint, Response, render_template, request, jsonify, 
     current_app, send_file, abort, redirect, url_for
 )
 from werkzeug.utils import secure_filename
 import logging
 from ..core import PixTrail
-from ..utils import get_image_files, ensure_directory, get_default_output_path
+from ..points import PointTable
+from ..progress import ProgressReporter
+from ..utils import get_image_files, ensure_directory, get_default_output_path, parse_timestamp
+from .jobs import JOB_DONE, JOB_FAILED, JobQueue
+from .payloads import (
+    BINARY_TYPE, COLUMNS_TYPE, FORMAT_BINARY, FORMAT_RECORDS,
+    decode_binary, decode_columns, encode_binary, encode_columns, negotiate_format
+)
+from .result_cache import DEFAULT_RESULT_CACHE_SIZE, RESULT_CACHE_FILE, ResultCache
+from .sessions import new_session, session_lock
+from .sweeper import DEFAULT_SESSION_TTL, DEFAULT_SWEEP_INTERVAL, SessionSweeper
+from .track import encode_track
+from .upload import receive_upload
+
+# Session file holding the GPS data of a streaming upload
+STREAMED_POINTS_FILE = '.points.json'
+
+# Session file holding the response of the process step
+RESULT_FILE = '.result.json'
+
+# Session file holding the route statistics computed from RESULT_FILE
+STATS_FILE = '.stats.json'
+
+# Directory inside the data directory holding the background job queue
+JOBS_DIR = '.jobs'
+
+# Guards the creation of each app's job queue and session sweeper
+_background_lock = threading.Lock()
+
+# Seconds between keep-alive comments on an idle event stream
+EVENT_STREAM_KEEPALIVE = 15
+
+# Response header carrying the rest of the result when the waypoints are
+# sent as a binary body
+RESULT_HEADER = 'X-PixTrail-Result'
 
 main_bp = Blueprint('main', __name__)
 
@@ -43,97 +80,353 @@ def receive_photos():
     # Get source type (file or directory)
     source_type = request.form.get('source_type', 'file')
     
-    # Create a session ID based on timestamp
-    session_id = datetime.now().strftime('%Y%m%d%H%M%S')
-    
-    # Secure and normalize data directory path
+    # Create a new session with its own processing directory
     data_dir = os.path.normpath(current_app.config['PIXTRAIL_DATA_DIR'])
-    process_dir = os.path.normpath(os.path.join(data_dir, session_id))
+    with new_session(data_dir) as (session_id, process_dir):
+        try:
+            # Save submitted files
+            saved_files = []
+            for file in files:
+                if file and file.filename:
+                    # For directory submissions, maintain relative paths
+                    if source_type == 'directory':
+                        # Get relative path from the filename
+                        rel_path = file.filename
+                        # Create subdirectories if they don't exist
+                        file_dir = os.path.dirname(rel_path)
+                        if file_dir:
+                            # Secure the file directory
+                            secure_file_dir = os.path.normpath(os.path.join(process_dir, 
+                                                              *[secure_filename(part) for part in file_dir.split(os.sep)]))
+                            # Ensure it's still within process_dir
+                            if not secure_file_dir.startswith(process_dir):
+                                continue
+                            ensure_directory(secure_file_dir)
+                        
+                        # Secure the filename
+                        secure_rel_path = os.path.join(
+                            os.path.dirname(rel_path),
+                            secure_filename(os.path.basename(rel_path))
+                        )
+                        # Save file with its secured relative path
+                        file_path = os.path.normpath(os.path.join(process_dir, secure_rel_path))
+                    else:
+                        # For individual file submissions, just use the filename
+                        filename = secure_filename(file.filename)
+                        file_path = os.path.normpath(os.path.join(process_dir, filename))
+                    
+                    # Final safety check
+                    if not file_path.startswith(process_dir):
+                        continue
+                    
+                    file.save(file_path)
+                    saved_files.append({
+                        'name': os.path.basename(file_path),
+                        'path': file_path
+                    })
+            
+            # Store processing options for the process step
+            depth = request.form.get('depth', '0')
+            with open(os.path.join(process_dir, '.session_info'), 'w') as f:
+                json.dump({
+                    'recursive': request.form.get('recursive') == '1',
+                    'max_depth': int(depth) if depth.isdigit() else 0
+                }, f)
+            
+            return jsonify({
+                'success': True,
+                'session_id': session_id,
+                'message': f'Successfully received {len(saved_files)} files',
+                'file_count': len(saved_files)
+            })
+        
+        except Exception as e:
+            # Clean up on error
+            if os.path.exists(process_dir):
+                shutil.rmtree(process_dir)
+            logging.error("Exception occurred", exc_info=True)
+            return jsonify({'error': 'An internal error has occurred!'}), 500
+
+
+@main_bp.route('/api/submit-stream', methods=['POST'])
+def receive_photos_streaming():
+    """
+    Handle photo submissions without storing the photos.
     
-    # Ensure process_dir is within data_dir
-    if not process_dir.startswith(data_dir):
-        return jsonify({'error': 'Invalid session path'}), 400
+    Accepts the same form as /api/submit, but reads the GPS data of each
+    photo from its header while the upload is still arriving and discards
+    the image data. Only the extracted GPS data is stored in the session.
+    """
+    boundary = request.mimetype_params.get('boundary')
+    if request.mimetype != 'multipart/form-data' or not boundary:
+        return jsonify({'error': 'No files submitted'}), 400
     
-    try:
-        # Create processing directory
-        os.makedirs(process_dir, exist_ok=True)
-        
-        # Save submitted files
-        saved_files = []
-        for file in files:
-            if file and file.filename:
-                # For directory submissions, maintain relative paths
-                if source_type == 'directory':
-                    # Get relative path from the filename
-                    rel_path = file.filename
-                    # Create subdirectories if they don't exist
-                    file_dir = os.path.dirname(rel_path)
-                    if file_dir:
-                        # Secure the file directory
-                        secure_file_dir = os.path.normpath(os.path.join(process_dir, 
-                                                          *[secure_filename(part) for part in file_dir.split(os.sep)]))
-                        # Ensure it's still within process_dir
-                        if not secure_file_dir.startswith(process_dir):
-                            continue
-                        ensure_directory(secure_file_dir)
-                    
-                    # Secure the filename
-                    secure_rel_path = os.path.join(
-                        os.path.dirname(rel_path),
-                        secure_filename(os.path.basename(rel_path))
-                    )
-                    # Save file with its secured relative path
-                    file_path = os.path.normpath(os.path.join(process_dir, secure_rel_path))
-                else:
-                    # For individual file submissions, just use the filename
-                    filename = secure_filename(file.filename)
-                    file_path = os.path.normpath(os.path.join(process_dir, filename))
-                
-                # Final safety check
-                if not file_path.startswith(process_dir):
+    # Create a new session; its directory is only used for photos that
+    # must be spooled
+    data_dir = os.path.normpath(current_app.config['PIXTRAIL_DATA_DIR'])
+    with new_session(data_dir) as (session_id, process_dir):
+        try:
+            cache = _open_result_cache(data_dir, _result_cache_size())
+            try:
+                fields, photos = receive_upload(request.stream, boundary, process_dir, cache=cache)
+            except ValueError:
+                shutil.rmtree(process_dir)
+                return jsonify({'error': 'Invalid form data'}), 400
+            finally:
+                if cache:
+                    cache.close()
+            
+            if not photos:
+                shutil.rmtree(process_dir)
+                return jsonify({'error': 'No files selected'}), 400
+            
+            # Keep each photo's directory depth so the recursion options apply as
+            # they would to saved files
+            source_type = fields.get('source_type', 'file')
+            points = []
+            for photo in photos:
+                parts = [secure_filename(part) for part in photo['filename'].replace('\\', '/').split('/')]
+                parts = [part for part in parts if part]
+                if not parts:
                     continue
-                
-                file.save(file_path)
-                saved_files.append({
-                    'name': os.path.basename(file_path),
-                    'path': file_path
+                gps_data = photo['gps']
+                if gps_data:
+                    timestamp = gps_data.get('timestamp')
+                    gps_data = dict(gps_data, timestamp=timestamp.isoformat() if timestamp else None)
+                points.append({
+                    'depth': len(parts) - 1 if source_type == 'directory' else 0,
+                    'gps': gps_data
                 })
+            
+            # Store the GPS data and processing options for the process step
+            depth = fields.get('depth', '0')
+            with open(os.path.join(process_dir, STREAMED_POINTS_FILE), 'w') as f:
+                f.write(json.dumps(points))
+            with open(os.path.join(process_dir, '.session_info'), 'w') as f:
+                json.dump({
+                    'recursive': fields.get('recursive') == '1',
+                    'max_depth': int(depth) if depth.isdigit() else 0
+                }, f)
+            
+            return jsonify({
+                'success': True,
+                'session_id': session_id,
+                'message': f'Successfully received {len(points)} files',
+                'file_count': len(points)
+            })
         
-        return jsonify({
-            'success': True,
-            'session_id': session_id,
-            'message': f'Successfully received {len(saved_files)} files',
-            'file_count': len(saved_files)
-        })
+        except Exception as e:
+            # Clean up on error
+            if os.path.exists(process_dir):
+                shutil.rmtree(process_dir)
+            logging.error("Exception occurred", exc_info=True)
+            return jsonify({'error': 'An internal error has occurred!'}), 500
+
+
+def _load_streamed_points(points_file, recursive, max_depth):
+    """
+    Load the GPS data stored by a streaming upload.
     
-    except Exception as e:
-        # Clean up on error
-        if os.path.exists(process_dir):
-            shutil.rmtree(process_dir)
-        logging.error("Exception occurred", exc_info=True)
-        return jsonify({'error': 'An internal error has occurred!'}), 500
+    Args:
+        points_file: Path to the session's points file
+        recursive: Whether photos in subdirectories are included
+        max_depth: Maximum subdirectory depth when recursive (None for no limit)
+        
+    Returns:
+        Dictionary with 'gps_data' and 'stats', like PixTrail.process_directory
+    """
+    with open(points_file, 'r') as f:
+        points = json.load(f)
+    
+    gps_data = PointTable()
+    total = 0
+    for point in points:
+        depth = point['depth']
+        if depth and not (recursive and (max_depth is None or depth <= max_depth)):
+            continue
+        total += 1
+        if point['gps']:
+            gps_data.append_dict(point['gps'])
+    
+    return {
+        'gps_data': gps_data,
+        'stats': {'total': total, 'processed': len(gps_data), 'skipped': total - len(gps_data)}
+    }
 
 
-@main_bp.route('/api/process/<session_id>', methods=['POST'])
-def process_photos(session_id):
+def _result_cache_size(app=None):
+    """Get the configured result cache size in bytes (0 if disabled)."""
+    app = app or current_app
+    return app.config.get('PIXTRAIL_RESULT_CACHE_SIZE', DEFAULT_RESULT_CACHE_SIZE) or 0
+
+
+def _open_result_cache(data_dir, cache_size):
     """
-    Process submitted photos and extract GPS data.
+    Open the result cache of a data directory.
+    
+    Args:
+        data_dir: Normalized data directory
+        cache_size: Maximum cache size in bytes (0 to disable the cache)
+        
+    Returns:
+        ResultCache, or None if the cache is disabled or unavailable
+    """
+    if not cache_size:
+        return None
+    try:
+        return ResultCache(os.path.join(data_dir, RESULT_CACHE_FILE), cache_size)
+    except (sqlite3.Error, OSError) as e:
+        logging.warning("Result cache unavailable: %s", e)
+        return None
+
+
+def _write_gpx(pixtrail, gpx_file, points, cache):
+    """
+    Write the GPX file for a set of points, reusing a cached copy if possible.
+    
+    Args:
+        pixtrail: PixTrail object generating the file
+        gpx_file: Path of the GPX file
+        points: GPS data of the points
+        cache: Open ResultCache (None to always generate the file)
+        
+    Returns:
+        bool: True if the file was written
+    """
+    data = cache.get_gpx(points) if cache else None
+    if data is not None:
+        with open(gpx_file, 'wb') as f:
+            f.write(data)
+        return True
+    
+    if not pixtrail.generate_gpx(gpx_file, points):
+        return False
+    if cache:
+        with open(gpx_file, 'rb') as f:
+            cache.put_gpx(points, f.read())
+    return True
+
+
+def _waypoint_records(points):
+    """Convert GPS data to the waypoint dictionaries of the JSON responses."""
+    return [{
+        'latitude': point['latitude'],
+        'longitude': point['longitude'],
+        'name': point.get('name'),
+        'timestamp': point['timestamp'].isoformat() if isinstance(point.get('timestamp'), datetime) else point.get('timestamp'),
+        'altitude': point.get('altitude', 0)
+    } for point in points]
+
+
+def _points_response(data, status=200):
+    """
+    Send a response whose 'waypoints' use the format the client accepts.
+    
+    Clients choose the columnar or binary format of payloads.py with the
+    Accept header or the 'format' query parameter. Binary responses carry
+    the waypoints as the body and the rest of the data as JSON in the
+    RESULT_HEADER header, without the track, which would not fit in a
+    header.
+    
+    Args:
+        data: Response data, with waypoints as dictionaries or a PointTable
+        status: HTTP status code
+    """
+    waypoints = data.get('waypoints')
+    fmt = negotiate_format(request.accept_mimetypes, request.args.get('format'))
+    if waypoints is None or fmt == FORMAT_RECORDS:
+        if isinstance(waypoints, PointTable):
+            data = dict(data, waypoints=_waypoint_records(waypoints))
+        return jsonify(data), status
+    
+    if fmt == FORMAT_BINARY:
+        result = {key: value for key, value in data.items() if key not in ('waypoints', 'track')}
+        return Response(encode_binary(waypoints), status, mimetype=BINARY_TYPE,
+                        headers={RESULT_HEADER: json.dumps(result)})
+    
+    body = json.dumps(dict(data, waypoints=encode_columns(waypoints)))
+    return Response(body, status, mimetype=COLUMNS_TYPE)
+
+
+def _job_response(job, fmt):
+    """
+    Convert a job's result waypoints to columns if the client asked for them.
+    
+    Args:
+        job: Job status
+        fmt: Format negotiated with negotiate_format
+    """
+    result = job.get('result')
+    if result and result.get('waypoints') and fmt != FORMAT_RECORDS:
+        # Job statuses are JSON, so binary falls back to columns
+        job['result'] = dict(result, waypoints=encode_columns(result['waypoints']))
+    return job
+
+
+def _session_dir(session_id):
+    """
+    Resolve the directory of a session.
     
     Args:
         session_id: Session ID from the submission step
+        
+    Returns:
+        Tuple of (secured session ID, session directory), with a directory
+        of None if the path would leave the data directory
     """
-    # Secure and normalize paths
     secure_session_id = secure_filename(session_id)
     data_dir = os.path.normpath(current_app.config['PIXTRAIL_DATA_DIR'])
     process_dir = os.path.normpath(os.path.join(data_dir, secure_session_id))
+    if not secure_session_id or not process_dir.startswith(data_dir):
+        return secure_session_id, None
+    return secure_session_id, process_dir
+
+
+def _process_session(process_dir, secure_session_id, progress_callback=None,
+                     cache_size=DEFAULT_RESULT_CACHE_SIZE):
+    """
+    Extract GPS data from a session and generate its GPX file.
     
-    # Ensure process_dir is within data_dir
-    if not process_dir.startswith(data_dir):
-        return jsonify({'error': 'Invalid session path'}), 400
-    
-    if not os.path.exists(process_dir):
-        return jsonify({'error': 'Session not found'}), 404
+    Runs under the session's lock. A session that was already processed
+    returns its stored result again, since its photos are gone. Photos and
+    GPX files seen before are resolved from the data directory's result
+    cache.
     
+    Args:
+        process_dir: Session directory
+        secure_session_id: Secured session ID
+        progress_callback: Optional PixTrail progress callback receiving
+                           reports while the photos are processed
+        cache_size: Maximum result cache size in bytes (0 to disable the cache)
+        
+    Returns:
+        Tuple of (response data, HTTP status code)
+    """
+    data_dir = os.path.dirname(process_dir)
+    with session_lock(data_dir, secure_session_id):
+        # The session may have been cleaned up while waiting for the lock
+        if not os.path.isdir(process_dir):
+            return {'success': False, 'error': 'Session not found'}, 404
+        
+        # Mark the session as recently used for the sweeper
+        os.utime(process_dir)
+        
+        result_file = os.path.join(process_dir, RESULT_FILE)
+        if os.path.exists(result_file):
+            with open(result_file, 'r') as f:
+                return json.load(f), 200
+        
+        data, status = _extract_session(process_dir, secure_session_id, progress_callback, cache_size)
+        if status == 200:
+            # json.dumps uses the C encoder, json.dump the pure-Python one
+            with open(result_file, 'w') as f:
+                f.write(json.dumps(data))
+        return data, status
+
+
+def _extract_session(process_dir, secure_session_id, progress_callback, cache_size):
+    """Extract GPS data and generate the GPX file for _process_session."""
+    data_dir = os.path.dirname(process_dir)
     try:
         # Get processing options from session
         session_file = os.path.normpath(os.path.join(process_dir, ".session_info"))
@@ -146,16 +439,26 @@ def process_photos(session_id):
         recursive = processing_options.get('recursive', False)
         max_depth = processing_options.get('max_depth', None)
         
-        # Process photos in the directory
-        pixtrail = PixTrail()
+        # A max_depth of 0 (all levels) means no limit
+        max_depth = int(max_depth) if max_depth and int(max_depth) > 0 else None
         
-        # If max_depth is provided and not 0 (all levels), customize recursive depth
-        if recursive and max_depth and int(max_depth) > 0:
-            # TODO: Implement custom max_depth in PixTrail core
-            # For now, we're just using simple recursive flag
-            result = pixtrail.process_directory(process_dir, recursive=True)
+        # Use the GPS data of a streaming upload, or process the saved photos
+        pixtrail = PixTrail(
+            progress_callback=progress_callback,
+            cache_path=os.path.join(data_dir, RESULT_CACHE_FILE) if cache_size else None,
+            cache_class=partial(ResultCache, max_bytes=cache_size)
+        )
+        points_file = os.path.join(process_dir, STREAMED_POINTS_FILE)
+        if os.path.exists(points_file):
+            result = _load_streamed_points(points_file, recursive, max_depth)
+            if progress_callback:
+                ProgressReporter(progress_callback, result['stats']).report(finished=True)
         else:
-            result = pixtrail.process_directory(process_dir, recursive=recursive)
+            stats = {}
+            gps_data = PointTable()
+            for point in pixtrail.iter_points(process_dir, recursive, max_depth, stats):
+                gps_data.append_dict(point)
+            result = {'gps_data': gps_data, 'stats': stats}
             
         gps_data = result['gps_data']
         stats = result['stats']
@@ -163,11 +466,11 @@ def process_photos(session_id):
         if not gps_data:
             # No GPS data found, clear all
             shutil.rmtree(process_dir)
-            return jsonify({
+            return {
                 'success': False,
                 'error': 'No GPS data found in any of the submitted photos',
                 'stats': stats
-            }), 400
+            }, 400
         
         # Generate GPX file with secured filename
         gpx_filename = f"pixtrail_{secure_session_id}.gpx"
@@ -176,22 +479,27 @@ def process_photos(session_id):
         # Verify path is still within process_dir
         if not gpx_file.startswith(process_dir):
             shutil.rmtree(process_dir)
-            return jsonify({
+            return {
                 'success': False,
                 'error': 'Invalid GPX file path',
                 'stats': stats
-            }), 400
+            }, 400
             
-        success = pixtrail.generate_gpx(gpx_file, gps_data)
+        cache = _open_result_cache(data_dir, cache_size)
+        try:
+            success = _write_gpx(pixtrail, gpx_file, gps_data, cache)
+        finally:
+            if cache:
+                cache.close()
         
         if not success:
             # Clear, if GPX file couldn't be generated
             shutil.rmtree(process_dir)
-            return jsonify({
+            return {
                 'success': False,
                 'error': 'Failed to generate GPX file',
                 'stats': stats
-            }), 500
+            }, 500
         
         # Remove cached image files
         for item in os.listdir(process_dir):
@@ -208,22 +516,14 @@ def process_photos(session_id):
                 elif os.path.isdir(item_path):
                     shutil.rmtree(item_path)
         
-        # Prepare response data
-        waypoints = [{
-            'latitude': point['latitude'],
-            'longitude': point['longitude'],
-            'name': point['name'],
-            'timestamp': point['timestamp'].isoformat() if 'timestamp' in point else None,
-            'altitude': point.get('altitude', 0)
-        } for point in gps_data]
-        
-        return jsonify({
+        return {
             'success': True,
-            'waypoints': waypoints,
+            'waypoints': _waypoint_records(gps_data),
+            'track': encode_track(gps_data),
             'gpx_file': os.path.basename(gpx_file),
             'session_id': secure_session_id,
             'stats': stats
-        })
+        }, 200
     
     except Exception as e:
         import traceback
@@ -232,7 +532,258 @@ def process_photos(session_id):
         # Clear when error
         if os.path.exists(process_dir):
             shutil.rmtree(process_dir)
-        return jsonify({'error': "Processing failed due to an internal error.", 'success': False}), 500
+        return {'error': "Processing failed due to an internal error.", 'success': False}, 500
+
+
+def _run_process_job(params, progress):
+    """Run a background processing job (see get_job_queue)."""
+    data, _ = _process_session(
+        params['process_dir'], params['session_id'], progress.publish,
+        params.get('cache_size', DEFAULT_RESULT_CACHE_SIZE)
+    )
+    return data
+
+
+def get_job_queue(app=None):
+    """
+    Get the background job queue of an app, starting it on first use.
+    
+    The queue is stored in the jobs directory inside PIXTRAIL_DATA_DIR, and
+    PIXTRAIL_MAX_JOBS limits the number of jobs running at once.
+    
+    Args:
+        app: Flask application (defaults to the current app)
+        
+    Returns:
+        JobQueue: The running job queue
+    """
+    app = app or current_app._get_current_object()
+    with _background_lock:
+        job_queue = app.extensions.get('pixtrail_jobs')
+        if job_queue is None:
+            data_dir = os.path.normpath(app.config['PIXTRAIL_DATA_DIR'])
+            job_queue = JobQueue(
+                os.path.join(data_dir, JOBS_DIR),
+                _run_process_job,
+                max_jobs=app.config.get('PIXTRAIL_MAX_JOBS')
+            )
+            job_queue.start()
+            app.extensions['pixtrail_jobs'] = job_queue
+    return job_queue
+
+
+def get_sweeper(app=None):
+    """
+    Get the session sweeper of an app, starting it on first use.
+    
+    PIXTRAIL_SESSION_TTL sets the seconds a session is kept after its last
+    use, PIXTRAIL_CACHE_QUOTA the maximum total size of the sessions in
+    bytes and PIXTRAIL_SWEEP_INTERVAL the seconds between sweeps (None
+    disables the TTL and the quota respectively).
+    
+    Args:
+        app: Flask application (defaults to the current app)
+        
+    Returns:
+        SessionSweeper: The running sweeper
+    """
+    app = app or current_app._get_current_object()
+    with _background_lock:
+        sweeper = app.extensions.get('pixtrail_sweeper')
+        if sweeper is None:
+            sweeper = SessionSweeper(
+                os.path.normpath(app.config['PIXTRAIL_DATA_DIR']),
+                ttl=app.config.get('PIXTRAIL_SESSION_TTL', DEFAULT_SESSION_TTL),
+                quota=app.config.get('PIXTRAIL_CACHE_QUOTA'),
+                interval=app.config.get('PIXTRAIL_SWEEP_INTERVAL', DEFAULT_SWEEP_INTERVAL)
+            )
+            sweeper.start()
+            app.extensions['pixtrail_sweeper'] = sweeper
+    return sweeper
+
+
+@main_bp.route('/api/metrics', methods=['GET'])
+def metrics():
+    """
+    Report the disk usage of the sessions, the evictions of the sweeper
+    and the state of the result cache.
+    
+    Byte and session counts are those of the last sweep; eviction counts
+    are those of the serving process since it started. Result cache
+    counters are shared by all server processes.
+    """
+    report = get_sweeper().metrics()
+    data_dir = os.path.normpath(current_app.config['PIXTRAIL_DATA_DIR'])
+    cache = _open_result_cache(data_dir, _result_cache_size())
+    if cache:
+        try:
+            report['result_cache'] = cache.metrics()
+        finally:
+            cache.close()
+    return jsonify(report)
+
+
+@main_bp.route('/api/process/<session_id>', methods=['POST'])
+def process_photos(session_id):
+    """
+    Process submitted photos and extract GPS data.
+    
+    The photos are processed within the request; use /api/jobs for large
+    sessions.
+    
+    Args:
+        session_id: Session ID from the submission step
+    """
+    secure_session_id, process_dir = _session_dir(session_id)
+    if process_dir is None:
+        return jsonify({'error': 'Invalid session path'}), 400
+    
+    if not os.path.exists(process_dir):
+        return jsonify({'error': 'Session not found'}), 404
+    
+    data, status = _process_session(process_dir, secure_session_id, cache_size=_result_cache_size())
+    return _points_response(data, status)
+
+
+@main_bp.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue the processing of a session as a background job.
+    
+    Expects JSON with the 'session_id' from the submission step and returns
+    the job ID at once. Poll /api/jobs/<job_id> for the result.
+    """
+    data = request.get_json(silent=True) or {}
+    session_id = data.get('session_id')
+    if not isinstance(session_id, str) or not session_id:
+        return jsonify({'error': 'No session ID provided'}), 400
+    
+    secure_session_id, process_dir = _session_dir(session_id)
+    if process_dir is None:
+        return jsonify({'error': 'Invalid session path'}), 400
+    
+    if not os.path.exists(process_dir):
+        return jsonify({'error': 'Session not found'}), 404
+    
+    job_id = get_job_queue().submit(
+        {'session_id': secure_session_id, 'process_dir': process_dir, 'cache_size': _result_cache_size()},
+        key=secure_session_id
+    )
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('main.job_status', job_id=job_id)
+    }), 202
+
+
+@main_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    Report the state, progress and result of a background job.
+    
+    Args:
+        job_id: Job ID returned by /api/jobs
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(_job_response(job, negotiate_format(request.accept_mimetypes, request.args.get('format'))))
+
+
+@main_bp.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Stream the progress of a background job as Server-Sent Events.
+    
+    A 'progress' event carries the job status each time new progress is
+    reported (processed and skipped counts, files/sec and ETA). The stream
+    ends with a 'done' or 'failed' event that includes the result; with
+    ?format=columns, its waypoints are sent as columns (see payloads.py).
+    
+    Args:
+        job_id: Job ID returned by /api/jobs
+    """
+    job_queue = get_job_queue()
+    if job_queue.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    fmt = negotiate_format(request.accept_mimetypes, request.args.get('format'))
+    
+    def events():
+        seen = None
+        while True:
+            job, token = job_queue.wait_for_change(job_id, seen, EVENT_STREAM_KEEPALIVE)
+            if job is None:
+                return
+            if token == seen:
+                yield ': keep-alive\n\n'
+                continue
+            seen = token
+            
+            finished = job['state'] in (JOB_DONE, JOB_FAILED)
+            if not finished:
+                # Results only come with the final event
+                del job['result']
+            event = job['state'] if finished else 'progress'
+            yield f"event: {event}\ndata: {json.dumps(_job_response(job, fmt))}\n\n"
+            if finished:
+                return
+    
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@main_bp.route('/api/stats/<session_id>', methods=['GET'])
+def route_stats(session_id):
+    """
+    Report the route statistics of a processed session.
+    
+    The statistics are computed with pixtrail.analysis from the session's
+    stored result the first time they are requested, and stored in the
+    session for the following requests.
+    
+    Args:
+        session_id: Session ID of a processed session or created GPX file
+    """
+    secure_session_id, process_dir = _session_dir(session_id)
+    if process_dir is None:
+        return jsonify({'error': 'Invalid session path'}), 400
+    
+    try:
+        from ..analysis import route_statistics
+    except ImportError:
+        return jsonify({
+            'error': 'Route statistics require NumPy. Install with: pip install pixtrail[analysis]'
+        }), 501
+    
+    data_dir = os.path.dirname(process_dir)
+    with session_lock(data_dir, secure_session_id):
+        if not os.path.isdir(process_dir):
+            return jsonify({'error': 'Session not found'}), 404
+        
+        # Mark the session as recently used for the sweeper
+        os.utime(process_dir)
+        
+        stats_file = os.path.join(process_dir, STATS_FILE)
+        if os.path.exists(stats_file):
+            with open(stats_file, 'r') as f:
+                return Response(f.read(), mimetype='application/json')
+        
+        result_file = os.path.join(process_dir, RESULT_FILE)
+        if not os.path.exists(result_file):
+            return jsonify({'error': 'Session has not been processed'}), 404
+        with open(result_file, 'r') as f:
+            waypoints = json.load(f).get('waypoints') or []
+        
+        body = json.dumps({
+            'success': True,
+            'session_id': secure_session_id,
+            'statistics': route_statistics(waypoints)
+        })
+        with open(stats_file, 'w') as f:
+            f.write(body)
+        return Response(body, mimetype='application/json')
 
 
 @main_bp.route('/api/download/<session_id>/<filename>', methods=['GET'])
@@ -253,18 +804,24 @@ def download_gpx(session_id, filename):
     file_path = os.path.normpath(os.path.join(data_dir, secure_session_id, secure_name))
     
     # Security check: ensure the path is still within the data directory
-    if not file_path.startswith(data_dir):
-        abort(404)
-    
-    if not os.path.exists(file_path):
+    if not secure_session_id or not file_path.startswith(data_dir):
         abort(404)
     
-    return send_file(
-        file_path,
-        as_attachment=True,
-        download_name=secure_name,
-        mimetype='application/gpx+xml'
-    )
+    # The file is opened under the lock, so a cleanup can't remove it
+    # before the download starts
+    with session_lock(data_dir, secure_session_id, shared=True):
+        if not os.path.exists(file_path):
+            abort(404)
+        
+        # Mark the session as recently used for the sweeper
+        os.utime(os.path.dirname(file_path))
+        
+        return send_file(
+            file_path,
+            as_attachment=True,
+            download_name=secure_name,
+            mimetype='application/gpx+xml'
+        )
 
 
 @main_bp.route('/api/cleanup/<session_id>', methods=['POST'])
@@ -283,16 +840,18 @@ def cleanup_session(session_id):
     session_dir = os.path.normpath(os.path.join(data_dir, secure_session_id))
     
     # Verify session_dir is within data_dir
-    if not session_dir.startswith(data_dir):
+    if not secure_session_id or not session_dir.startswith(data_dir):
         return jsonify({'error': 'Invalid session path'}), 400
     
-    if os.path.exists(session_dir):
-        try:
-            shutil.rmtree(session_dir)
-            return jsonify({'success': True, 'message': 'Session cleaned up successfully'})
-        except Exception as e:
-            current_app.logger.error('Error during session cleanup: %s', e)
-            return jsonify({'error': 'An internal error has occurred. Please try again later.'}), 500
+    # Wait for processing and downloads of the session to finish
+    with session_lock(data_dir, secure_session_id):
+        if os.path.exists(session_dir):
+            try:
+                shutil.rmtree(session_dir)
+                return jsonify({'success': True, 'message': 'Session cleaned up successfully'})
+            except Exception as e:
+                current_app.logger.error('Error during session cleanup: %s', e)
+                return jsonify({'error': 'An internal error has occurred. Please try again later.'}), 500
     
     return jsonify({'success': True, 'message': 'Nothing to clean up'})
 
@@ -303,89 +862,97 @@ def create_gpx():
     Create a GPX file from GPS data extracted in the browser.
     
     The GPS data is extracted client-side and only the coordinate information
-    is sent to the server to generate the GPX file.
+    is sent to the server to generate the GPX file. It is sent as JSON
+    ({'gps_data': [...]}), or as a columnar JSON (COLUMNS_TYPE) or binary
+    (BINARY_TYPE) body; see payloads.py.
     """
-    if not request.is_json:
-        return jsonify({'error': 'No files submitted'}), 400
-    
-    data = request.get_json()
-    
-    if 'gps_data' not in data or not data['gps_data']:
-        return jsonify({'error': 'No GPS data provided'}), 400
-    
-    gps_data_list = data['gps_data']
-    
-    # Convert string timestamps to datetime objects
-    for point in gps_data_list:
-        if 'timestamp' in point and point['timestamp']:
-            try:
-                point['timestamp'] = datetime.fromisoformat(point['timestamp'].replace('Z', '+00:00'))
-            except (ValueError, TypeError):
-                point['timestamp'] = datetime.now()
-    
-    try:
-        # Create a session ID based on timestamp
-        session_id = datetime.now().strftime('%Y%m%d%H%M%S')
+    if request.mimetype in (COLUMNS_TYPE, BINARY_TYPE):
+        try:
+            if request.mimetype == COLUMNS_TYPE:
+                gps_data_list = decode_columns(request.get_json(force=True, silent=True))
+            else:
+                gps_data_list = decode_binary(request.get_data())
+        except ValueError as e:
+            return jsonify({'error': f'Invalid GPS data: {e}'}), 400
+        if not gps_data_list:
+            return jsonify({'error': 'No GPS data provided'}), 400
+    else:
+        if not request.is_json:
+            return jsonify({'error': 'No files submitted'}), 400
         
-        # Construct and normalize paths
-        data_dir = os.path.normpath(current_app.config['PIXTRAIL_DATA_DIR'])
-        process_dir = os.path.normpath(os.path.join(data_dir, session_id))
+        data = request.get_json()
         
-        # Verify process_dir is within data_dir
-        if not process_dir.startswith(data_dir):
-            return jsonify({'error': 'Invalid session path'}), 400
+        if 'gps_data' not in data or not data['gps_data']:
+            return jsonify({'error': 'No GPS data provided'}), 400
         
-        # Create output directory only, no image files are copied
-        os.makedirs(process_dir, exist_ok=True)
+        gps_data_list = data['gps_data']
         
-        # Generate GPX file
-        pixtrail = PixTrail()
-        gpx_filename = f"pixtrail_{session_id}.gpx"
-        gpx_file = os.path.normpath(os.path.join(process_dir, gpx_filename))
-        
-        # Final security check
-        if not gpx_file.startswith(process_dir):
-            if os.path.exists(process_dir):
-                shutil.rmtree(process_dir)
-            return jsonify({
-                'success': False,
-                'error': 'Invalid GPX file path'
-            }), 400
+        # Convert string timestamps to datetime objects
+        for point in gps_data_list:
+            if 'timestamp' in point and point['timestamp']:
+                try:
+                    point['timestamp'] = parse_timestamp(point['timestamp'])
+                except (ValueError, TypeError):
+                    point['timestamp'] = datetime.now()
+    
+    # Create a new session for the output only, no image files are copied
+    data_dir = os.path.normpath(current_app.config['PIXTRAIL_DATA_DIR'])
+    with new_session(data_dir) as (session_id, process_dir):
+        try:
+            # Generate GPX file
+            pixtrail = PixTrail()
+            gpx_filename = f"pixtrail_{session_id}.gpx"
+            gpx_file = os.path.normpath(os.path.join(process_dir, gpx_filename))
             
-        success = pixtrail.generate_gpx(gpx_file, gps_data_list)
-        
-        if not success:
+            # Final security check
+            if not gpx_file.startswith(process_dir):
+                if os.path.exists(process_dir):
+                    shutil.rmtree(process_dir)
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid GPX file path'
+                }), 400
+                
+            cache = _open_result_cache(data_dir, _result_cache_size())
+            try:
+                success = _write_gpx(pixtrail, gpx_file, gps_data_list, cache)
+            finally:
+                if cache:
+                    cache.close()
+            
+            if not success:
+                # Clean up on error
+                if os.path.exists(process_dir):
+                    shutil.rmtree(process_dir)
+                return jsonify({
+                    'success': False,
+                    'error': 'Failed to generate GPX file'
+                }), 500
+            
+            result = {
+                'success': True,
+                'waypoints': _waypoint_records(gps_data_list),
+                'track': encode_track(gps_data_list),
+                'gpx_file': os.path.basename(gpx_file),
+                'session_id': session_id
+            }
+            
+            # Keep the result like the process step does, for /api/stats
+            with open(os.path.join(process_dir, RESULT_FILE), 'w') as f:
+                f.write(json.dumps(result))
+            
+            # Compact requests keep their PointTable for compact responses
+            if isinstance(gps_data_list, PointTable):
+                result = dict(result, waypoints=gps_data_list)
+            return _points_response(result)
+            
+        except Exception as e:
+            import traceback
+            error_details = str(e)
+            traceback_details = traceback.format_exc()
+            logging.error(f"Error creating GPX: {error_details}")
+            logging.error(f"Traceback: {traceback_details}")
             # Clean up on error
             if os.path.exists(process_dir):
                 shutil.rmtree(process_dir)
-            return jsonify({
-                'success': False,
-                'error': 'Failed to generate GPX file'
-            }), 500
-        
-        # Prepare response data
-        waypoints = [{
-            'latitude': point['latitude'],
-            'longitude': point['longitude'],
-            'name': point['name'],
-            'timestamp': point['timestamp'].isoformat() if isinstance(point['timestamp'], datetime) else point['timestamp'],
-            'altitude': point.get('altitude', 0)
-        } for point in gps_data_list]
-        
-        return jsonify({
-            'success': True,
-            'waypoints': waypoints,
-            'gpx_file': os.path.basename(gpx_file),
-            'session_id': session_id
-        })
-        
-    except Exception as e:
-        import traceback
-        error_details = str(e)
-        traceback_details = traceback.format_exc()
-        logging.error(f"Error creating GPX: {error_details}")
-        logging.error(f"Traceback: {traceback_details}")
-        # Clean up on error
-        if os.path.exists(process_dir):
-            shutil.rmtree(process_dir)
-        return jsonify({'error': 'An internal error has occurred. Please try again later.', 'success': False}), 500
+            return jsonify({'error': 'An internal error has occurred. Please try again later.', 'success': False}), 500
@@ -3,17 +3,45 @@ Flask server for the PixTrail web interface.
 """
 
 import os
+import signal
+import socket
 import webbrowser
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask
-from werkzeug.serving import make_server
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler, make_server, select_address_family
 
+# Request threads per worker process of the production server
+DEFAULT_THREADS = 16
 
-def create_app():
+# Seconds to wait before replacing a worker process that exited
+WORKER_RESTART_DELAY = 1.0
+
+
+def get_default_data_dir():
+    """
+    Get the default data directory of the web interface.
+    
+    Returns:
+        str: $PIXTRAIL_DATA_DIR if set, otherwise a directory inside
+             $XDG_CACHE_HOME (or ~/.cache)
+    """
+    if os.environ.get('PIXTRAIL_DATA_DIR'):
+        return os.environ['PIXTRAIL_DATA_DIR']
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'pixtrail', 'web-sessions')
+
+
+def create_app(config=None):
     """
     Create and configure the Flask application.
     
+    Args:
+        config: Optional dictionary of settings overriding the defaults,
+                such as PIXTRAIL_DATA_DIR, PIXTRAIL_SESSION_TTL or
+                PIXTRAIL_CACHE_QUOTA
+    
     Returns:
         Flask: Configured Flask application
     """
@@ -27,7 +55,9 @@ def create_app():
     # Set configuration
     app.config['SECRET_KEY'] = os.urandom(24)
     app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024 * 1024  # 64 GB max file size
-    app.config['PIXTRAIL_DATA_DIR'] = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '__pixtrail-cache__')
+    app.config['PIXTRAIL_DATA_DIR'] = get_default_data_dir()
+    if config:
+        app.config.update(config)
     
     # Ensure storage folder exists
     os.makedirs(app.config['PIXTRAIL_DATA_DIR'], exist_ok=True)
@@ -52,7 +82,8 @@ class ServerThread(threading.Thread):
             port: Server port
         """
         threading.Thread.__init__(self)
-        self.server = make_server(host, port, app)
+        # Threaded, so a long-lived event stream doesn't block other requests
+        self.server = make_server(host, port, app, threaded=True)
         self.ctx = app.app_context()
         self.ctx.push()
         self.daemon = True
@@ -66,7 +97,167 @@ class ServerThread(threading.Thread):
         self.server.shutdown()
 
 
-def start_server(host='127.0.0.1', port=5000, open_browser=True):
+class PooledRequestHandler(WSGIRequestHandler):
+    """Request handler for the production server."""
+    
+    # Close connections after each response, so idle keep-alive
+    # connections don't hold on to pool threads
+    protocol_version = 'HTTP/1.0'
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """WSGI server handling requests on a fixed pool of threads."""
+    
+    multithread = True
+    
+    def __init__(self, host, port, app, threads=DEFAULT_THREADS, fd=None):
+        """
+        Initialize the server.
+        
+        Args:
+            host: Server host
+            port: Server port
+            app: Flask application
+            threads: Number of request threads
+            fd: Already listening socket to use instead of binding a new one
+        """
+        super().__init__(host, port, app, handler=PooledRequestHandler, fd=fd)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='pixtrail-http')
+    
+    def process_request(self, request, client_address):
+        """Hand an accepted connection to the thread pool."""
+        self.executor.submit(self._handle_request, request, client_address)
+    
+    def _handle_request(self, request, client_address):
+        """Handle a connection on a pool thread."""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+    
+    def server_close(self):
+        """Close the socket and stop the thread pool."""
+        super().server_close()
+        # Also called by BaseWSGIServer.__init__ before the pool exists
+        if getattr(self, 'executor', None) is not None:
+            self.executor.shutdown(wait=False)
+
+
+def _raise_interrupt(signum, frame):
+    """Signal handler turning SIGTERM into a KeyboardInterrupt."""
+    raise KeyboardInterrupt
+
+
+def _run_worker(app, host, port, threads, fd=None):
+    """
+    Serve requests in the current process until it is interrupted.
+    
+    Args:
+        app: Flask application
+        host: Server host
+        port: Server port
+        threads: Number of request threads
+        fd: Listening socket shared with other worker processes
+    """
+    from .routes import get_job_queue, get_sweeper
+    
+    server = PooledWSGIServer(host, port, app, threads, fd=fd)
+    # Each process runs its own job queue over the shared jobs directory,
+    # resuming unfinished jobs that no other process has claimed, and its
+    # own sweeper (evictions are safe to race thanks to the session locks)
+    queue = get_job_queue(app)
+    sweeper = get_sweeper(app)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        sweeper.shutdown()
+        queue.shutdown(wait=False)
+
+
+def run_server(host='127.0.0.1', port=5000, workers=1, threads=DEFAULT_THREADS, open_browser=False, config=None):
+    """
+    Run the production server until it is interrupted.
+    
+    The server listens on one socket shared by `workers` processes, each
+    handling requests on a pool of `threads` threads. Sessions and jobs are
+    kept in the data directory, so any process can answer any request.
+    Worker processes that exit are replaced. Where processes can't be
+    forked, all requests are handled by the current process.
+    
+    Args:
+        host: Server host
+        port: Server port
+        workers: Number of worker processes
+        threads: Number of request threads per worker process
+        open_browser: Whether to open a browser window
+        config: Optional app settings (see create_app)
+    """
+    # Created before forking, so all workers share the same secret key
+    app = create_app(config)
+    url = f"http://{host}:{port}"
+    
+    if workers <= 1 or not hasattr(os, 'fork'):
+        print(f"PixTrail web interface started at {url} ({threads} threads)")
+        if open_browser:
+            threading.Timer(0.5, webbrowser.open, [url]).start()
+        _run_worker(app, host, port, threads)
+        return
+    
+    listener = socket.create_server((host, port), family=select_address_family(host, port), backlog=128)
+    children = set()
+    
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+                signal.signal(signal.SIGTERM, _raise_interrupt)
+                _run_worker(app, host, port, threads, fd=listener.fileno())
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        children.add(pid)
+    
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    try:
+        for _ in range(workers):
+            spawn()
+        print(f"PixTrail web interface started at {url} ({workers} workers, {threads} threads each)")
+        if open_browser:
+            threading.Timer(0.5, webbrowser.open, [url]).start()
+        
+        while True:
+            pid, _ = os.wait()
+            if pid in children:
+                children.discard(pid)
+                print(f"Warning: Worker process {pid} exited, starting a new one")
+                time.sleep(WORKER_RESTART_DELAY)
+                spawn()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except OSError:
+                pass
+        listener.close()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def start_server(host='127.0.0.1', port=5000, open_browser=True, config=None):
     """
     Start the Flask server in a separate thread and optionally open a browser.
     
@@ -74,14 +265,21 @@ def start_server(host='127.0.0.1', port=5000, open_browser=True):
         host: Server host
         port: Server port
         open_browser: Whether to open a browser window
+        config: Optional app settings (see create_app)
         
     Returns:
         tuple: (Flask app, server thread)
     """
-    app = create_app()
+    app = create_app(config)
     server = ServerThread(app, host, port)
     server.start()
     
+    # Resume background jobs left unfinished by the previous run and start
+    # evicting abandoned sessions
+    from .routes import get_job_queue, get_sweeper
+    get_job_queue(app)
+    get_sweeper(app)
+    
     url = f"http://{host}:{port}"
     print(f"PixTrail web interface started at {url}")
     
@@ -0,0 +1,118 @@
+"""
+Session directories of the web interface.
+
+Each submission gets its own directory in the data directory, named by a
+session ID that is unique even for submissions in the same second or in
+different server processes. Requests that fill, read or change a session
+take its lock first, so a session isn't removed while it is being
+uploaded, processed or downloaded.
+"""
+
+import os
+import secrets
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single server process, see session_lock
+    fcntl = None
+
+# Directory inside the data directory holding the session lock files
+LOCKS_DIR = '.locks'
+
+# Number of random bytes in a session ID
+SESSION_ID_BYTES = 8
+
+# Lock used for all sessions where file locks aren't available
+_fallback_lock = threading.RLock()
+
+
+def new_session_id() -> str:
+    """
+    Create a session ID.
+
+    The ID starts with the current time, so GPX file names stay readable
+    and sort by date, followed by a random part that makes it unique.
+
+    Returns:
+        Session ID of letters, digits and an underscore
+    """
+    return f"{datetime.now():%Y%m%d%H%M%S}_{secrets.token_hex(SESSION_ID_BYTES)}"
+
+
+@contextmanager
+def new_session(data_dir: str) -> Iterator[Tuple[str, str]]:
+    """
+    Create the directory of a new session, holding its lock while it is filled.
+
+    Args:
+        data_dir: Normalized data directory
+
+    Yields:
+        Tuple of (session ID, session directory)
+    """
+    while True:
+        session_id = new_session_id()
+        with session_lock(data_dir, session_id):
+            session_dir = os.path.join(data_dir, session_id)
+            try:
+                # Fails rather than sharing a directory with another session
+                os.makedirs(session_dir)
+            except FileExistsError:
+                continue
+            yield session_id, session_dir
+            return
+
+
+@contextmanager
+def session_lock(data_dir: str, session_id: str, shared: bool = False, blocking: bool = True) -> Iterator[bool]:
+    """
+    Hold the lock of a session.
+
+    The lock is a file lock, so it works between the threads of a process
+    and between worker processes. Where file locks aren't available, one
+    lock is shared by all sessions. The lock file is removed on release
+    once the session directory is gone; session IDs are never reused, so
+    requests still waiting on the old file only find the session gone.
+
+    Args:
+        data_dir: Normalized data directory
+        session_id: Secured session ID
+        shared: Whether to take a shared lock, for requests that only read
+                the session, instead of an exclusive one
+        blocking: Whether to wait for the lock
+
+    Yields:
+        Whether the lock is held (always True when blocking)
+    """
+    if fcntl is None:
+        if not _fallback_lock.acquire(blocking):
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            _fallback_lock.release()
+        return
+
+    locks_dir = os.path.join(data_dir, LOCKS_DIR)
+    os.makedirs(locks_dir, exist_ok=True)
+    with open(os.path.join(locks_dir, session_id + '.lock'), 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                        | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            if not os.path.isdir(os.path.join(data_dir, session_id)):
+                try:
+                    os.remove(lock_file.name)
+                except OSError:
+                    pass
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
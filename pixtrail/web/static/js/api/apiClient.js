@@ -1,8 +1,13 @@
 /**
  * API Client
  * Handles all API requests to the server
+ *
+ * Waypoints are exchanged in the columnar format of PointCodec, which is
+ * much smaller than a list of objects for large tracks.
  */
 
+import PointCodec, { COLUMNS_TYPE } from '../utils/pointCodec.js';
+
 const APIClient = {
     /**
      * Submit photos for processing
@@ -41,31 +46,103 @@ const APIClient = {
                 reject(new Error('Network error during upload'));
             });
             
-            xhr.open('POST', '/api/submit');
+            xhr.open('POST', '/api/submit-stream');
             xhr.send(formData);
         });
     },
     
     /**
      * Process uploaded photos to extract GPS data
+     * Processing runs as a background job on the server, which is polled
+     * until it finishes.
      * @param {string} sessionId - Session ID from the submission
+     * @param {Function} progressCallback - Callback receiving the job's progress counts
      * @returns {Promise<Object>} Promise resolving to the extracted GPS data
      */
-    processPhotos: (sessionId) => {
-        return fetch(`/api/process/${sessionId}`, {
-            method: 'POST'
+    processPhotos: (sessionId, progressCallback) => {
+        return fetch('/api/jobs', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ session_id: sessionId })
         })
         .then(response => {
-            if (!response.ok) {
-                return response.json()
-                    .then(data => {
+            return response.json()
+                .catch(() => {
+                    throw new Error(`Server error: ${response.statusText || 'Unknown'}`);
+                })
+                .then(data => {
+                    if (!response.ok) {
                         throw new Error(data.error || 'Unknown server error');
+                    }
+                    return APIClient.waitForJob(data.job_id, progressCallback);
+                });
+        });
+    },
+    
+    /**
+     * Wait for a background job to finish
+     * Progress is streamed with Server-Sent Events when the browser supports
+     * them, with polling as the fallback.
+     * @param {string} jobId - Job ID returned by the server
+     * @param {Function} progressCallback - Callback receiving the job's progress
+     * @param {number} interval - Milliseconds between polls
+     * @returns {Promise<Object>} Promise resolving to the job result
+     */
+    waitForJob: (jobId, progressCallback, interval = 500) => {
+        const reportProgress = (progress) => {
+            if (progressCallback && typeof progressCallback === 'function') {
+                progressCallback(progress || {});
+            }
+        };
+        
+        return new Promise((resolve, reject) => {
+            const poll = () => {
+                fetch(`/api/jobs/${jobId}?format=columns`)
+                    .then(response => {
+                        if (!response.ok) {
+                            throw new Error(`Server error: ${response.statusText || 'Unknown'}`);
+                        }
+                        return response.json();
                     })
-                    .catch(jsonError => {
-                        throw new Error(`Server error: ${response.statusText || 'Unknown'}`);
-                    });
+                    .then(job => {
+                        reportProgress(job.progress);
+                        if (job.state === 'done') {
+                            resolve(PointCodec.decodeResult(job.result));
+                        } else if (job.state === 'failed') {
+                            reject(new Error(job.error || 'Processing failed'));
+                        } else {
+                            setTimeout(poll, interval);
+                        }
+                    })
+                    .catch(reject);
+            };
+            
+            if (typeof EventSource === 'undefined') {
+                poll();
+                return;
             }
-            return response.json();
+            
+            const source = new EventSource(`/api/jobs/${jobId}/events?format=columns`);
+            source.addEventListener('progress', (event) => {
+                reportProgress(JSON.parse(event.data).progress);
+            });
+            source.addEventListener('done', (event) => {
+                source.close();
+                const job = JSON.parse(event.data);
+                reportProgress(job.progress);
+                resolve(PointCodec.decodeResult(job.result));
+            });
+            source.addEventListener('failed', (event) => {
+                source.close();
+                reject(new Error(JSON.parse(event.data).error || 'Processing failed'));
+            });
+            source.onerror = () => {
+                // Connection lost or not supported by the server: poll instead
+                source.close();
+                poll();
+            };
         });
     },
     
@@ -78,11 +155,10 @@ const APIClient = {
         return fetch('/api/create-gpx', {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json',
+                'Content-Type': COLUMNS_TYPE,
+                'Accept': COLUMNS_TYPE
             },
-            body: JSON.stringify({
-                gps_data: gpsData
-            })
+            body: JSON.stringify(PointCodec.encodeColumns(gpsData))
         })
         .then(response => {
             if (!response.ok) {
@@ -94,10 +170,32 @@ const APIClient = {
                         throw new Error(`Processing failed: Server error (${response.status})`);
                     });
             }
-            return response.json();
+            return response.json().then(PointCodec.decodeResult);
         });
     },
     
+    /**
+     * Get the route statistics of a session, computed on the server
+     * @param {string} sessionId - Session ID
+     * @returns {Promise<Object>} Promise resolving to the statistics, or null
+     *     if the route has too few points
+     */
+    getStatistics: (sessionId) => {
+        return fetch(`/api/stats/${sessionId}`)
+            .then(response => {
+                return response.json()
+                    .catch(() => {
+                        throw new Error(`Server error: ${response.statusText || 'Unknown'}`);
+                    })
+                    .then(data => {
+                        if (!response.ok) {
+                            throw new Error(data.error || `Server returned status ${response.status}`);
+                        }
+                        return data.statistics;
+                    });
+            });
+    },
+    
     /**
      * Get download URL for a GPX file
      * @param {string} sessionId - Session ID
@@ -100,6 +100,8 @@ document.addEventListener('DOMContentLoaded', function () {
                 directoryInput: this.directoryInput,
                 recursiveCheckbox: this.recursiveCheckbox,
                 depthSelect: this.recursiveCheckbox && DOMHelpers.get('select', this.depthSelector),
+                onStart: this.handleProcessStart.bind(this),
+                onPoints: this.handlePointsExtracted.bind(this),
                 onSuccess: this.handleProcessSuccess.bind(this),
                 onError: this.handleProcessError.bind(this)
             });
@@ -142,6 +144,7 @@ document.addEventListener('DOMContentLoaded', function () {
                     'min-elevation': DOMHelpers.getById('min-elevation'),
                     'max-elevation': DOMHelpers.getById('max-elevation'),
                     'elevation-gain': DOMHelpers.getById('elevation-gain'),
+                    'elevation-loss': DOMHelpers.getById('elevation-loss'),
                     'photo-count': DOMHelpers.getById('photo-count')
                 },
                 elevationChartContainer: this.elevationChart,
@@ -325,12 +328,28 @@ document.addEventListener('DOMContentLoaded', function () {
             return dataTransfer.files;
         },
         
+        /**
+         * Handle the start of processing
+         */
+        handleProcessStart: function() {
+            this.mapVisualization.clearMapLayers();
+        },
+        
+        /**
+         * Handle GPS data extracted in the browser, before processing finishes
+         * @param {Array} points - Waypoints of the latest batch of files
+         */
+        handlePointsExtracted: function(points) {
+            this.mapVisualization.addWaypoints(points);
+        },
+        
         /**
          * Handle successful processing
          * @param {Object} result - Processing result
          * @param {string} result.sessionId - Session ID
          * @param {string} result.gpxFilename - GPX filename
          * @param {Array} result.waypoints - Waypoints array
+         * @param {Object} [result.track] - Route polylines at several levels of detail
          */
         handleProcessSuccess: function(result) {
             // Store results
@@ -339,7 +358,7 @@ document.addEventListener('DOMContentLoaded', function () {
             this.waypoints = result.waypoints;
     
             // Update map
-            this.mapVisualization.setWaypoints(this.waypoints);
+            this.mapVisualization.setWaypoints(this.waypoints, result.track);
     
             // Update heatmap module with new waypoints
             this.heatmap.setWaypoints(this.waypoints);
@@ -349,7 +368,7 @@ document.addEventListener('DOMContentLoaded', function () {
             this.clustering.setMarkers(this.mapVisualization.markers);
     
             // Update statistics
-            this.statistics.setWaypoints(this.waypoints);
+            this.statistics.setWaypoints(this.waypoints, this.sessionId);
         },
         
         /**
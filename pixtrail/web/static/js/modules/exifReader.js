@@ -1,11 +1,192 @@
 /**
  * EXIF Reader Module
  * Extracts GPS and other metadata from image files
+ *
+ * Only the header of each file is read: a bounded slice from the start of
+ * the file, plus small slices at the offsets the TIFF structure points to
+ * when the GPS IFD lies beyond it. Photos are never loaded whole.
  */
 
 import GPSUtils from '../utils/gpsUtils.js';
 import FileUtils from '../utils/fileUtils.js';
 
+// Bytes read from the start of each file; holds the EXIF segment of
+// JPEG photos and the IFDs of most TIFF files
+const HEADER_SLICE_SIZE = 128 * 1024;
+
+// Maximum number of JPEG marker segments inspected before giving up on
+// finding the APP1 EXIF segment
+const MAX_JPEG_SEGMENTS = 32;
+
+// EXIF tag IDs read from IFD0 and the GPS IFD
+const TAG_DATETIME = 0x0132;
+const TAG_GPS_IFD = 0x8825;
+const GPS_TAGS = {
+    1: 'GPSLatitudeRef',
+    2: 'GPSLatitude',
+    3: 'GPSLongitudeRef',
+    4: 'GPSLongitude',
+    5: 'GPSAltitudeRef',
+    6: 'GPSAltitude'
+};
+
+// Byte size of each TIFF field type
+const TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8};
+
+/**
+ * Reads byte ranges of a file, serving them from the header slice when
+ * possible and slicing the file for anything beyond it
+ */
+class SliceReader {
+    /**
+     * @param {Blob} file - File to read
+     * @param {ArrayBuffer} head - Bytes from the start of the file
+     */
+    constructor(file, head) {
+        this.file = file;
+        this.head = head;
+    }
+
+    /**
+     * Read a byte range
+     * @param {number} offset - Start of the range in the file
+     * @param {number} length - Length of the range
+     * @returns {Promise<DataView>} View of exactly `length` bytes
+     */
+    async read(offset, length) {
+        if (offset < 0 || length < 0 || offset + length > this.file.size) {
+            throw new Error('Offset outside file');
+        }
+        if (offset + length <= this.head.byteLength) {
+            return new DataView(this.head, offset, length);
+        }
+        return new DataView(await this.file.slice(offset, offset + length).arrayBuffer());
+    }
+}
+
+/**
+ * Minimal TIFF structure reader for IFD0 and the GPS IFD
+ */
+class TiffReader {
+    /**
+     * @param {SliceReader} reader - Reader of the file
+     * @param {number} base - File offset of the TIFF header
+     * @param {number} limit - File offset the TIFF data must end before
+     */
+    constructor(reader, base, limit) {
+        this.reader = reader;
+        this.base = base;
+        this.limit = limit;
+    }
+
+    /**
+     * Read the byte order of the TIFF header
+     * @returns {Promise<number>} Offset of IFD0
+     */
+    async open() {
+        const header = await this.read(0, 8);
+        const order = header.getUint16(0);
+        if (order !== 0x4949 && order !== 0x4D4D) {
+            throw new Error('Not a TIFF header');
+        }
+        this.littleEndian = order === 0x4949;
+        if (header.getUint16(2, this.littleEndian) !== 42) {
+            throw new Error('Unsupported TIFF version');
+        }
+        return header.getUint32(4, this.littleEndian);
+    }
+
+    /**
+     * Read bytes at an offset relative to the TIFF header
+     * @param {number} offset - Offset relative to the TIFF header
+     * @param {number} length - Number of bytes
+     * @returns {Promise<DataView>} View of the bytes
+     */
+    read(offset, length) {
+        if (this.base + offset + length > this.limit) {
+            return Promise.reject(new Error('Offset outside EXIF data'));
+        }
+        return this.reader.read(this.base + offset, length);
+    }
+
+    /**
+     * Read the entries of an IFD
+     * @param {number} offset - Offset of the IFD
+     * @returns {Promise<Map>} Map of tag IDs to {type, count, view} entries,
+     *     where view holds the 4-byte value or offset field
+     */
+    async readIfd(offset) {
+        const count = (await this.read(offset, 2)).getUint16(0, this.littleEndian);
+        const data = await this.read(offset + 2, count * 12);
+        const entries = new Map();
+        for (let i = 0; i < count; i++) {
+            entries.set(data.getUint16(i * 12, this.littleEndian), {
+                type: data.getUint16(i * 12 + 2, this.littleEndian),
+                count: data.getUint32(i * 12 + 4, this.littleEndian),
+                view: new DataView(data.buffer, data.byteOffset + i * 12 + 8, 4)
+            });
+        }
+        return entries;
+    }
+
+    /**
+     * Get the bytes of an entry's value, inline or at its offset
+     * @param {Object} entry - IFD entry
+     * @returns {Promise<DataView>} View of the value
+     */
+    value(entry) {
+        const size = (TIFF_TYPE_SIZES[entry.type] || 0) * entry.count;
+        if (!size) {
+            return Promise.reject(new Error('Unknown TIFF field type'));
+        }
+        if (size <= 4) {
+            return Promise.resolve(new DataView(entry.view.buffer, entry.view.byteOffset, size));
+        }
+        return this.read(entry.view.getUint32(0, this.littleEndian), size);
+    }
+
+    /**
+     * Decode an entry the way EXIF.js reports it
+     * @param {Object} entry - IFD entry
+     * @returns {Promise<string|number|number[]>} ASCII string, number, or
+     *     array of numbers for multi-valued entries
+     */
+    async decode(entry) {
+        const view = await this.value(entry);
+        if (entry.type === 2) {
+            let text = '';
+            for (let i = 0; i < view.byteLength && view.getUint8(i) !== 0; i++) {
+                text += String.fromCharCode(view.getUint8(i));
+            }
+            return text;
+        }
+        const values = [];
+        for (let i = 0; i < entry.count; i++) {
+            switch (entry.type) {
+                case 3:
+                    values.push(view.getUint16(i * 2, this.littleEndian));
+                    break;
+                case 4:
+                    values.push(view.getUint32(i * 4, this.littleEndian));
+                    break;
+                case 5: {
+                    const denominator = view.getUint32(i * 8 + 4, this.littleEndian);
+                    values.push(denominator ? view.getUint32(i * 8, this.littleEndian) / denominator : 0);
+                    break;
+                }
+                case 10: {
+                    const denominator = view.getInt32(i * 8 + 4, this.littleEndian);
+                    values.push(denominator ? view.getInt32(i * 8, this.littleEndian) / denominator : 0);
+                    break;
+                }
+                default:
+                    values.push(view.getUint8(i));
+            }
+        }
+        return values.length === 1 ? values[0] : values;
+    }
+}
+
 const ExifReader = {
     /**
      * Extract GPS data from images directly in the browser
@@ -13,100 +194,99 @@ const ExifReader = {
      * @param {Function} progressCallback - Callback for processing progress updates
      * @returns {Promise<Array>} Promise resolving to extracted GPS data
      */
-    extractGpsDataFromImages: (files, progressCallback) => {
-        return new Promise((resolve, reject) => {
-            const gpsDataList = [];
-            let processedCount = 0;
-            let totalFiles = files.length;
-
-            if (totalFiles === 0) {
-                resolve([]);
-                return;
-            }
-
-            // Process each file sequentially to avoid memory issues
-            const processFile = (index) => {
-                if (index >= totalFiles) {
-                    resolve(gpsDataList);
-                    return;
-                }
+    extractGpsDataFromImages: async (files, progressCallback) => {
+        const gpsDataList = [];
+        const totalFiles = files.length;
 
-                const file = files[index];
+        // Process each file sequentially to avoid memory issues
+        for (let index = 0; index < totalFiles; index++) {
+            const file = files[index];
 
-                // Skip non-image files
-                if (!FileUtils.isImageFile(file)) {
-                    processedCount++;
-                    if (progressCallback) progressCallback(processedCount, totalFiles);
-                    processFile(index + 1);
-                    return;
+            // Skip non-image files
+            if (FileUtils.isImageFile(file)) {
+                try {
+                    const tags = await ExifReader.readTags(file);
+                    const gpsData = ExifReader.extractGpsFromExif(tags, file);
+                    if (gpsData) {
+                        gpsDataList.push(gpsData);
+                    }
+                } catch (err) {
+                    console.error(`Error reading EXIF from ${file.name}:`, err);
                 }
+            }
 
-                const reader = new FileReader();
-
-                reader.onload = function () {
-                    try {
-                        // Use EXIF.js to extract EXIF data
-                        const exifReader = new FileReader();
-
-                        exifReader.onload = function () {
-                            try {
-                                // Extract EXIF data using the EXIF.js library
-                                // EXIF.js is loaded from a CDN in the HTML
-                                const tags = EXIF.readFromBinaryFile(this.result);
-
-                                // Extract GPS data if available
-                                if (tags) {
-                                    const gpsData = ExifReader.extractGpsFromExif(tags, file);
-
-                                    if (gpsData) {
-                                        gpsDataList.push(gpsData);
-                                    }
-                                }
-                            } catch (exifErr) {
-                                console.error(`Error reading EXIF from ${file.name}:`, exifErr);
-                            }
-
-                            // Process next file
-                            processedCount++;
-                            if (progressCallback) progressCallback(processedCount, totalFiles);
-                            processFile(index + 1);
-                        };
-
-                        exifReader.onerror = function () {
-                            console.error(`Error reading EXIF binary data from ${file.name}`);
-                            processedCount++;
-                            if (progressCallback) progressCallback(processedCount, totalFiles);
-                            processFile(index + 1);
-                        };
-
-                        // Read file as binary for EXIF.js
-                        exifReader.readAsArrayBuffer(file);
-                    } catch (err) {
-                        console.error(`Error setting up EXIF reader for ${file.name}:`, err);
-                        processedCount++;
-                        if (progressCallback) progressCallback(processedCount, totalFiles);
-                        processFile(index + 1);
-                    }
-                };
+            if (progressCallback) progressCallback(index + 1, totalFiles);
+        }
 
-                reader.onerror = function () {
-                    console.error(`Error reading file ${file.name}`);
-                    processedCount++;
-                    if (progressCallback) progressCallback(processedCount, totalFiles);
-                    processFile(index + 1);
-                };
+        return gpsDataList;
+    },
 
-                reader.readAsDataURL(file);
-            };
+    /**
+     * Read the GPS and DateTime tags from the header of a JPEG or TIFF file
+     * @param {Blob} file - Image file
+     * @returns {Promise<Object|null>} Tags named as by EXIF.js, or null if
+     *     the file has no EXIF data
+     */
+    readTags: async (file) => {
+        const head = await file.slice(0, HEADER_SLICE_SIZE).arrayBuffer();
+        const reader = new SliceReader(file, head);
+        const start = await reader.read(0, 4);
 
-            // Start processing with the first file
-            processFile(0);
-        });
+        let tiff;
+        if (start.getUint16(0) === 0xFFD8) {
+            // JPEG: walk the marker segments looking for APP1 "Exif\0\0"
+            let offset = 2;
+            for (let i = 0; i < MAX_JPEG_SEGMENTS && !tiff; i++) {
+                const header = await reader.read(offset, 4);
+                if (header.getUint8(0) !== 0xFF) {
+                    throw new Error('Invalid JPEG marker');
+                }
+                const marker = header.getUint8(1);
+                if (marker === 0xFF) {
+                    // Skip fill bytes
+                    offset++;
+                    continue;
+                }
+                if (marker === 0xD9 || marker === 0xDA) {
+                    // End of image or start of scan: no EXIF segment
+                    return null;
+                }
+                const length = header.getUint16(2);
+                if (marker === 0xE1 && length > 8) {
+                    const signature = await reader.read(offset + 4, 6);
+                    if (signature.getUint32(0) === 0x45786966 && signature.getUint16(4) === 0) {
+                        tiff = new TiffReader(reader, offset + 10, offset + 2 + length);
+                    }
+                }
+                offset += 2 + length;
+            }
+            if (!tiff) {
+                return null;
+            }
+        } else {
+            // TIFF: offsets may point anywhere in the file
+            tiff = new TiffReader(reader, 0, file.size);
+        }
+
+        const ifd0 = await tiff.readIfd(await tiff.open());
+        const tags = {};
+        if (ifd0.has(TAG_DATETIME)) {
+            tags.DateTime = await tiff.decode(ifd0.get(TAG_DATETIME));
+        }
+        if (ifd0.has(TAG_GPS_IFD)) {
+            const gps = await tiff.readIfd(await tiff.decode(ifd0.get(TAG_GPS_IFD)));
+            for (const [tag, name] of Object.entries(GPS_TAGS)) {
+                if (gps.has(Number(tag))) {
+                    tags[name] = await tiff.decode(gps.get(Number(tag)));
+                }
+            }
+        }
+        return tags;
     },
 
     /**
      * Extract GPS data from EXIF metadata tags
-     * @param {Object} tags - EXIF tags extracted by EXIF.js
+     * @param {Object} tags - EXIF tags extracted by readTags
      * @param {File} file - Original file
      * @returns {Object|null} Extracted GPS data or null if not available
      */
@@ -184,4 +364,4 @@ const ExifReader = {
     }
 };
 
-export default ExifReader;
\ No newline at end of file
+export default ExifReader;
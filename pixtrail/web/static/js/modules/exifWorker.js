@@ -0,0 +1,60 @@
+/**
+ * EXIF Worker
+ * Module worker run by ExifWorkerPool: parses the EXIF headers of a batch
+ * of files and posts the GPS data back as transferable typed arrays
+ *
+ * Message in:  {batch, files}
+ * Message out: {batch, count, index, latitude, longitude, altitude, time}
+ *   index: Uint32Array of the positions in `files` that have GPS data
+ *   latitude, longitude, altitude: Float64Array in degrees and meters
+ *   time: Float64Array of milliseconds since the epoch
+ */
+
+import ExifReader from './exifReader.js';
+import FileUtils from '../utils/fileUtils.js';
+
+self.onmessage = async (event) => {
+    const { batch, files } = event.data;
+    const index = new Uint32Array(files.length);
+    const latitude = new Float64Array(files.length);
+    const longitude = new Float64Array(files.length);
+    const altitude = new Float64Array(files.length);
+    const time = new Float64Array(files.length);
+    let found = 0;
+
+    for (let i = 0; i < files.length; i++) {
+        const file = files[i];
+        if (!FileUtils.isImageFile(file)) continue;
+        try {
+            const gpsData = ExifReader.extractGpsFromExif(await ExifReader.readTags(file), file);
+            if (gpsData) {
+                index[found] = i;
+                latitude[found] = gpsData.latitude;
+                longitude[found] = gpsData.longitude;
+                altitude[found] = gpsData.altitude;
+                time[found] = Date.parse(gpsData.timestamp);
+                found++;
+            }
+        } catch (err) {
+            console.error(`Error reading EXIF from ${file.name}:`, err);
+        }
+    }
+
+    // Copies trimmed to the points found, so their buffers can be transferred
+    const result = {
+        batch,
+        count: files.length,
+        index: index.slice(0, found),
+        latitude: latitude.slice(0, found),
+        longitude: longitude.slice(0, found),
+        altitude: altitude.slice(0, found),
+        time: time.slice(0, found)
+    };
+    self.postMessage(result, [
+        result.index.buffer,
+        result.latitude.buffer,
+        result.longitude.buffer,
+        result.altitude.buffer,
+        result.time.buffer
+    ]);
+};
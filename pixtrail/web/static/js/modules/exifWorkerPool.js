@@ -0,0 +1,155 @@
+/**
+ * EXIF Worker Pool Module
+ * Parses EXIF headers in parallel Web Workers, off the main thread
+ */
+
+import ExifReader from './exifReader.js';
+
+// Files sent to a worker per message; small batches keep progress and
+// map updates flowing while large selections are parsed
+const WORKER_BATCH_SIZE = 16;
+
+// Workers used when the browser doesn't report its core count
+const DEFAULT_WORKER_COUNT = 4;
+
+class ExifWorkerPool {
+    /**
+     * Initialize the pool; workers are started on first use
+     * @param {number} [size] - Number of workers (default: navigator.hardwareConcurrency)
+     */
+    constructor(size) {
+        this.size = size || navigator.hardwareConcurrency || DEFAULT_WORKER_COUNT;
+        this.workers = [];
+    }
+
+    /**
+     * Start the workers if needed
+     * @returns {boolean} True if workers are available
+     */
+    start() {
+        if (this.workers.length > 0) return true;
+        if (typeof Worker === 'undefined') return false;
+        try {
+            for (let i = 0; i < this.size; i++) {
+                this.workers.push(new Worker(new URL('./exifWorker.js', import.meta.url), { type: 'module' }));
+            }
+        } catch (err) {
+            console.warn('EXIF workers unavailable, parsing on the main thread:', err);
+            this.terminate();
+            return false;
+        }
+        return true;
+    }
+
+    /**
+     * Stop all workers
+     */
+    terminate() {
+        this.workers.forEach(worker => worker.terminate());
+        this.workers = [];
+    }
+
+    /**
+     * Extract GPS data from images in the workers
+     * @param {File[]} files - Array of image files
+     * @param {Function} [progressCallback] - Called with (processed, total) after each batch
+     * @param {Function} [pointsCallback] - Called with the GPS data of each batch as it arrives
+     * @returns {Promise<Array>} Promise resolving to the GPS data of all files, in file order
+     */
+    extractGpsData(files, progressCallback, pointsCallback) {
+        if (!this.start()) {
+            return ExifReader.extractGpsDataFromImages(files, progressCallback)
+                .then(points => {
+                    if (pointsCallback && points.length > 0) pointsCallback(points);
+                    return points;
+                });
+        }
+
+        return new Promise((resolve) => {
+            const totalFiles = files.length;
+            const batches = [];
+            for (let start = 0; start < totalFiles; start += WORKER_BATCH_SIZE) {
+                batches.push(start);
+            }
+            const results = new Array(batches.length);
+            // Batch each worker is parsing
+            const assigned = new Map();
+            let nextBatch = 0;
+            let pendingBatches = batches.length;
+            let processedCount = 0;
+
+            if (pendingBatches === 0) {
+                resolve([]);
+                return;
+            }
+
+            const finishBatch = (batch, count, points) => {
+                results[batch] = points;
+                processedCount += count;
+                if (pointsCallback && points.length > 0) pointsCallback(points);
+                if (progressCallback) progressCallback(processedCount, totalFiles);
+                if (--pendingBatches === 0) {
+                    resolve(results.flat());
+                }
+            };
+
+            const batchFiles = (batch) => {
+                return files.slice(batches[batch], batches[batch] + WORKER_BATCH_SIZE);
+            };
+
+            const dispatch = (worker) => {
+                if (nextBatch >= batches.length) {
+                    assigned.delete(worker);
+                    return;
+                }
+                const batch = nextBatch++;
+                assigned.set(worker, batch);
+                worker.postMessage({ batch, files: batchFiles(batch) });
+            };
+
+            this.workers.forEach(worker => {
+                worker.onmessage = (event) => {
+                    const { batch, count, index, latitude, longitude, altitude, time } = event.data;
+                    const start = batches[batch];
+                    const points = [];
+                    for (let i = 0; i < index.length; i++) {
+                        points.push({
+                            name: files[start + index[i]].name,
+                            latitude: latitude[i],
+                            longitude: longitude[i],
+                            altitude: altitude[i],
+                            timestamp: new Date(time[i]).toISOString()
+                        });
+                    }
+                    // Hand out the next batch before rendering this one
+                    dispatch(worker);
+                    finishBatch(batch, count, points);
+                };
+                worker.onerror = (event) => {
+                    // The worker's current batch is lost: parse it here instead
+                    event.preventDefault();
+                    console.error('EXIF worker failed:', event.message);
+                    worker.terminate();
+                    this.workers = this.workers.filter(other => other !== worker);
+                    const batch = assigned.get(worker);
+                    assigned.delete(worker);
+                    if (batch !== undefined) {
+                        ExifReader.extractGpsDataFromImages(batchFiles(batch))
+                            .then(points => finishBatch(batch, batchFiles(batch).length, points));
+                    }
+                    if (this.workers.length === 0) {
+                        // No worker left: parse the remaining batches here
+                        while (nextBatch < batches.length) {
+                            const remaining = nextBatch++;
+                            ExifReader.extractGpsDataFromImages(batchFiles(remaining))
+                                .then(points => finishBatch(remaining, batchFiles(remaining).length, points));
+                        }
+                    }
+                };
+                dispatch(worker);
+            });
+        });
+    }
+}
+
+export default ExifWorkerPool;
@@ -7,7 +7,7 @@ import APIClient from '../api/apiClient.js';
 import FileUtils from '../utils/fileUtils.js';
 import DOMHelpers from '../utils/domHelpers.js';
 import UIUtils from '../utils/uiUtils.js';
-import ExifReader from './exifReader.js';
+import ExifWorkerPool from './exifWorkerPool.js';
 
 class FileUpload {
     /**
@@ -24,6 +24,9 @@ class FileUpload {
      * @param {HTMLInputElement} config.directoryInput - Directory input element
      * @param {HTMLInputElement} config.recursiveCheckbox - Recursive processing checkbox
      * @param {HTMLSelectElement} config.depthSelect - Recursive depth select element
+     * @param {Function} [config.onStart] - Callback when processing starts
+     * @param {Function} [config.onPoints] - Callback receiving GPS data extracted
+     *     in the browser as it arrives, before the GPX file is created
      * @param {Function} config.onSuccess - Callback on successful processing
      * @param {Function} config.onError - Callback on error
      */
@@ -40,6 +43,7 @@ class FileUpload {
         this.directoryInput = config.directoryInput;
         this.recursiveCheckbox = config.recursiveCheckbox;
         this.depthSelect = config.depthSelect;
+        this.exifPool = new ExifWorkerPool();
         
         this.init();
     }
@@ -104,6 +108,9 @@ class FileUpload {
         // Show progress
         this.showProgress();
         this.submitButton.disabled = true;
+        if (this.config.onStart) {
+            this.config.onStart();
+        }
         
         // Sort files into client-side and server-side processable
         const clientSideFiles = [];
@@ -143,12 +150,14 @@ class FileUpload {
             if (clientSideFiles.length > 0) {
                 this.updateProgress(0, 100, 'Extracting GPS data from JPEG/TIFF files...');
                 
-                clientSideGpsData = await ExifReader.extractGpsDataFromImages(
+                // Parsed in parallel Web Workers; points are shown as they arrive
+                clientSideGpsData = await this.exifPool.extractGpsData(
                     clientSideFiles,
                     (current, total) => {
                         const percentComplete = Math.round((current / total) * 50); // 50% for client-side processing
-                        this.updateProgress(percentComplete, 100, `Processing client-side files... ${percentComplete}%`);
-                    }
+                        this.updateProgress(percentComplete, 100, `Processing client-side files... ${current} of ${total}`);
+                    },
+                    this.config.onPoints
                 );
                 
                 this.updateProgress(50, 100, 'Client-side processing complete');
@@ -191,7 +200,18 @@ class FileUpload {
                 // Process the server-side files
                 this.updateProgress(75, 100, 'Processing RAW/PNG files on server...');
                 
-                const serverData = await APIClient.processPhotos(sessionId);
+                const serverData = await APIClient.processPhotos(sessionId, (progress) => {
+                    if (progress.total) {
+                        const done = (progress.processed || 0) + (progress.skipped || 0);
+                        let message = `Processing RAW/PNG files on server... ${done} of ${progress.total}`;
+                        if (progress.files_per_sec) {
+                            message += ` (${progress.files_per_sec.toFixed(1)} files/sec`;
+                            message += progress.eta != null ? `, ${Math.ceil(progress.eta)}s left)` : ')';
+                        }
+                        const percentComplete = Math.round((done / progress.total) * 15); // 15% for server processing
+                        this.updateProgress(75 + percentComplete, 100, message);
+                    }
+                });
                 if (serverData.success) {
                     serverSideGpsData = serverData.waypoints;
                 } else {
@@ -228,7 +248,8 @@ class FileUpload {
                     this.config.onSuccess({
                         sessionId,
                         gpxFilename,
-                        waypoints: response.waypoints
+                        waypoints: response.waypoints,
+                        track: response.track
                     });
                 }
                 
@@ -7,6 +7,9 @@ import DOMHelpers from '../utils/domHelpers.js';
 import UIUtils from '../utils/uiUtils.js';
 import GPSUtils from '../utils/gpsUtils.js';
 
+// Meters per pixel of a 256-pixel web map tile at zoom 0 on the equator
+const METERS_PER_PIXEL_ZOOM_0 = 156543.034;
+
 class MapVisualization {
     /**
      * Initialize map visualization
@@ -25,9 +28,13 @@ class MapVisualization {
         this.map = null;
         this.markers = [];
         this.routeLine = null;
+        this.routeBounds = null;
+        this.previewBounds = null;
         
         // Internal state
         this.waypoints = [];
+        this.track = null;
+        this.trackLevel = null;
         
         // Initialize the map if the element is available
         if (this.mapElement) {
@@ -65,6 +72,9 @@ class MapVisualization {
         // Add the base layer
         L.tileLayer(tileLayerUrl, tileLayerOptions).addTo(this.map);
         
+        // Redraw the route at the level of detail of the new zoom
+        this.map.on('zoomend', () => this.updateRouteDetail());
+        
         return this.map;
     }
     
@@ -88,9 +98,13 @@ class MapVisualization {
     /**
      * Set waypoints and display them on the map
      * @param {Array} waypoints - Array of waypoint objects
+     * @param {Object} [track] - Route as encoded polylines at several levels
+     *     of detail, as returned by the server; the route is drawn through
+     *     the waypoints in their order without it
      */
-    setWaypoints(waypoints) {
+    setWaypoints(waypoints, track) {
         this.waypoints = waypoints;
+        this.track = track && track.levels && track.levels.length > 0 ? track : null;
         this.showWaypoints();
     }
     
@@ -120,64 +134,34 @@ class MapVisualization {
                 return;
             }
             
-            const latLng = L.latLng(point.latitude, point.longitude);
-            latLngs.push(latLng);
-
-            // Create marker with popup
-            const marker = L.marker(latLng);
-
-            // Format timestamp if available
-            let timestampStr = 'Unknown time';
-            if (point.timestamp) {
-                const timestamp = new Date(point.timestamp);
-                timestampStr = timestamp.toLocaleString();
-            }
-
-            // Create popup content
-            marker.bindPopup(`
-                <strong>${point.name}</strong><br>
-                Lat: ${point.latitude.toFixed(6)}<br>
-                Lng: ${point.longitude.toFixed(6)}<br>
-                ${point.altitude ? `Altitude: ${point.altitude.toFixed(2)} m<br>` : ''}
-                Time: ${timestampStr}
-            `);
+            const marker = this.createMarker(point);
+            latLngs.push(marker.getLatLng());
 
             // Add to map
             marker.addTo(this.map);
             this.markers.push(marker);
         });
 
-        // Add route line
-        this.routeLine = L.polyline(latLngs, {
-            color: 'blue',
-            weight: 3
-        }).addTo(this.map);
-
-        // Fit map to the route with increased padding
-        if (this.routeLine && this.routeLine.getBounds().isValid()) {
+        // Fit map to the waypoints with increased padding
+        this.routeBounds = L.latLngBounds(latLngs);
+        if (this.routeBounds.isValid()) {
             // Use larger padding for better overview
-            this.map.fitBounds(this.routeLine.getBounds(), {
+            this.map.fitBounds(this.routeBounds, {
                 padding: [100, 100]  // Increased padding (100px on all sides)
             });
         
-            // Zoom out slightly for a better overview
-            setTimeout(() => {
-                const currentZoom = this.map.getZoom();
-                this.map.setZoom(currentZoom - 1);
-            }, 100);
-        } else if (this.markers.length > 0) {
-            // Fallback if route bounds are invalid: fit to marker bounds
-            const markerGroup = L.featureGroup(this.markers);
-            this.map.fitBounds(markerGroup.getBounds(), {
-                padding: [100, 100]
-            });
-        
             // Zoom out slightly for a better overview
             setTimeout(() => {
                 const currentZoom = this.map.getZoom();
                 this.map.setZoom(currentZoom - 1);
             }, 100);
         }
+
+        // Add route line, simplified for the zoom it was fitted to
+        this.routeLine = L.polyline(this.track ? this.selectTrackLevel() : latLngs, {
+            color: 'blue',
+            weight: 3
+        }).addTo(this.map);
     
         // Show the map container
         this.showMapContainer();
@@ -195,6 +179,113 @@ class MapVisualization {
         }
     }
     
+    /**
+     * Get the route at the level of detail of the current zoom
+     * 
+     * Picks the coarsest level of the track whose simplification tolerance
+     * is at most one pixel at the map's center.
+     * @returns {Array<Array<number>>} [latitude, longitude] pairs of the level
+     */
+    selectTrackLevel() {
+        const levels = this.track.levels;
+        const latitude = this.map.getCenter().lat * Math.PI / 180;
+        const metersPerPixel = METERS_PER_PIXEL_ZOOM_0 * Math.cos(latitude) / Math.pow(2, this.map.getZoom());
+        
+        let level = levels[0];
+        levels.forEach(candidate => {
+            if (candidate.tolerance <= metersPerPixel && candidate.tolerance >= level.tolerance) {
+                level = candidate;
+            }
+        });
+        
+        // Levels are decoded once, the first time they are shown
+        if (!level.latLngs) {
+            level.latLngs = GPSUtils.decodePolyline(level.polyline, this.track.precision);
+        }
+        this.trackLevel = level;
+        return level.latLngs;
+    }
+    
+    /**
+     * Redraw the route if the current zoom needs another level of detail
+     */
+    updateRouteDetail() {
+        if (!this.track || !this.routeLine) return;
+        
+        const previous = this.trackLevel;
+        const latLngs = this.selectTrackLevel();
+        if (this.trackLevel !== previous) {
+            this.routeLine.setLatLngs(latLngs);
+        }
+    }
+    
+    /**
+     * Create a marker with a popup for a waypoint
+     * @param {Object} point - Waypoint object
+     * @returns {Object} Leaflet marker
+     */
+    createMarker(point) {
+        const marker = L.marker(L.latLng(point.latitude, point.longitude));
+
+        // Format timestamp if available
+        let timestampStr = 'Unknown time';
+        if (point.timestamp) {
+            const timestamp = new Date(point.timestamp);
+            timestampStr = timestamp.toLocaleString();
+        }
+
+        // Create popup content
+        marker.bindPopup(`
+            <strong>${point.name}</strong><br>
+            Lat: ${point.latitude.toFixed(6)}<br>
+            Lng: ${point.longitude.toFixed(6)}<br>
+            ${point.altitude ? `Altitude: ${point.altitude.toFixed(2)} m<br>` : ''}
+            Time: ${timestampStr}
+        `);
+
+        return marker;
+    }
+    
+    /**
+     * Add waypoints to the map while they are still being extracted
+     * 
+     * Only markers are added; the route is drawn by setWaypoints once all
+     * waypoints are known and sorted.
+     * @param {Array} waypoints - Array of waypoint objects
+     */
+    addWaypoints(waypoints) {
+        if (!this.map) {
+            this.initMap();
+        }
+        if (!this.map) return;
+        
+        const firstPoints = this.markers.length === 0;
+        waypoints.forEach(point => {
+            if (!GPSUtils.validateCoordinates(point.latitude, point.longitude)) {
+                return;
+            }
+            const marker = this.createMarker(point);
+            marker.addTo(this.map);
+            this.markers.push(marker);
+            
+            if (this.previewBounds) {
+                this.previewBounds.extend(marker.getLatLng());
+            } else {
+                this.previewBounds = L.latLngBounds(marker.getLatLng(), marker.getLatLng());
+            }
+        });
+        
+        if (this.previewBounds) {
+            if (firstPoints) {
+                this.showMapContainer();
+            }
+            this.map.fitBounds(this.previewBounds, {
+                padding: [100, 100],
+                animate: false
+            });
+        }
+    }
+    
     /**
      * Clear all map layers (markers and route)
      */
@@ -204,12 +295,15 @@ class MapVisualization {
             if (this.map) this.map.removeLayer(marker);
         });
         this.markers = [];
+        this.previewBounds = null;
         
         // Remove route line
         if (this.routeLine && this.map) {
             this.map.removeLayer(this.routeLine);
             this.routeLine = null;
         }
+        this.routeBounds = null;
+        this.trackLevel = null;
     }
     
     /**
@@ -299,8 +393,8 @@ class MapVisualization {
      * @returns {Object|null} Leaflet bounds object or null
      */
     getBounds() {
-        if (this.routeLine) {
-            return this.routeLine.getBounds();
+        if (this.routeBounds && this.routeBounds.isValid()) {
+            return this.routeBounds;
         } else if (this.markers.length > 0) {
             const bounds = L.latLngBounds();
             this.markers.forEach(marker => {
@@ -6,6 +6,7 @@
 import DOMHelpers from '../utils/domHelpers.js';
 import UIUtils from '../utils/uiUtils.js';
 import GPSUtils from '../utils/gpsUtils.js';
+import APIClient from '../api/apiClient.js';
 import ChartManager from './charts.js';
 
 class Statistics {
@@ -25,6 +26,7 @@ class Statistics {
         this.elements = config.elements || {};
         this.statisticsVisible = false;
         this.routeStatistics = null;
+        this.statisticsRequest = null;
         this.waypoints = [];
         
         // Chart managers
@@ -117,15 +119,26 @@ class Statistics {
     
     /**
      * Set waypoints data and calculate statistics
+     * 
+     * With a session ID, the statistics are requested from the server,
+     * which computes and stores them once per session; they are calculated
+     * in the browser if the request fails.
      * @param {Array} waypoints - Array of waypoint objects
+     * @param {string} [sessionId] - Session ID of the waypoints on the server
      */
-    setWaypoints(waypoints) {
+    setWaypoints(waypoints, sessionId) {
         if (!waypoints || waypoints.length === 0) {
             console.warn('No waypoints provided to Statistics module');
             return;
         }
             
         this.waypoints = waypoints;
+        this.routeStatistics = null;
+        
+        if (sessionId) {
+            this.loadStatistics(sessionId);
+            return;
+        }
         
         try {
             this.calculateStatistics();
@@ -139,6 +152,65 @@ class Statistics {
         }
     }
     
+    /**
+     * Load the statistics of a session from the server
+     * @param {string} sessionId - Session ID
+     * @returns {Promise<void>} Promise resolving once statistics are available
+     */
+    loadStatistics(sessionId) {
+        const request = APIClient.getStatistics(sessionId)
+            .then(stats => {
+                if (this.statisticsRequest !== request) return;
+                if (stats) {
+                    this.routeStatistics = Statistics.fromServerStatistics(stats);
+                } else {
+                    this.createDefaultStatistics();
+                }
+            })
+            .catch(error => {
+                if (this.statisticsRequest !== request) return;
+                console.warn('Server statistics unavailable, calculating in the browser:', error.message);
+                this.calculateStatistics();
+            })
+            .then(() => {
+                if (this.statisticsRequest !== request) return;
+                this.statisticsRequest = null;
+                if (this.statisticsVisible) {
+                    this.updateDisplay();
+                }
+            });
+        this.statisticsRequest = request;
+        return request;
+    }
+    
+    /**
+     * Convert statistics of the server API to the format of calculateRouteStatistics
+     * @param {Object} stats - Statistics returned by /api/stats
+     * @returns {Object} Statistics object
+     */
+    static fromServerStatistics(stats) {
+        return {
+            totalDistance: stats.total_distance,
+            totalDuration: stats.total_duration,
+            startTime: GPSUtils.parseTimestamp(stats.start_time),
+            endTime: GPSUtils.parseTimestamp(stats.end_time),
+            avgSpeed: stats.avg_speed,
+            maxSpeed: stats.max_speed,
+            speeds: stats.segments.speed.filter(speed => speed !== null),
+            minElevation: stats.min_elevation,
+            maxElevation: stats.max_elevation,
+            elevationGain: stats.elevation_gain,
+            elevationLoss: stats.elevation_loss,
+            photoCount: stats.photo_count,
+            elevationProfile: stats.elevation_profile
+                .map((elevation, index) => ({ index, elevation }))
+                .filter(point => point.elevation !== null),
+            speedProfile: stats.segments.speed
+                .map((speed, index) => ({ index: index + 1, speed }))
+                .filter(point => point.speed !== null)
+        };
+    }
+    
     /**
      * Calculate statistics from waypoints
      */
@@ -177,6 +249,7 @@ class Statistics {
             minElevation: 0,
             maxElevation: 0,
             elevationGain: 0,
+            elevationLoss: 0,
             photoCount: this.waypoints ? this.waypoints.length : 0,
             elevationProfile: [],
             speedProfile: []
@@ -200,13 +273,16 @@ class Statistics {
     show() {
         if (!this.container) return;
         
-        // Calculate statistics if needed
-        if (!this.routeStatistics) {
+        // Calculate statistics if needed; server statistics still loading
+        // are displayed when they arrive
+        if (!this.routeStatistics && !this.statisticsRequest) {
             this.calculateStatistics();
         }
         
         // Update the display
-        this.updateDisplay();
+        if (this.routeStatistics) {
+            this.updateDisplay();
+        }
         
         // Show the container
         DOMHelpers.show(this.container);
@@ -280,6 +356,7 @@ class Statistics {
         this.updateElement('min-elevation', `${stats.minElevation.toFixed(1)} m`);
         this.updateElement('max-elevation', `${stats.maxElevation.toFixed(1)} m`);
         this.updateElement('elevation-gain', `${stats.elevationGain.toFixed(1)} m`);
+        this.updateElement('elevation-loss', `${stats.elevationLoss.toFixed(1)} m`);
         this.updateElement('photo-count', stats.photoCount.toString());
         
         // Create or update charts
@@ -412,6 +489,7 @@ class Statistics {
             `- Minimum: ${stats.minElevation.toFixed(1)} m`,
             `- Maximum: ${stats.maxElevation.toFixed(1)} m`,
             `- Gain: ${stats.elevationGain.toFixed(1)} m`,
+            `- Loss: ${stats.elevationLoss.toFixed(1)} m`,
             '',
             'Generated by PixTrail - GPS Photo Tracker'
         ];
@@ -19,7 +19,7 @@ const FileUtils = {
      * @returns {boolean} True if the file can be processed client-side
      */
     canProcessClientSide: (file) => {
-        // JPEG/JFIF and TIFF files can be processed client-side with EXIF.js
+        // JPEG/JFIF and TIFF files can be processed client-side by exifReader.js
         const jpegTypes = ['image/jpeg', 'image/jpg'];
         const tiffTypes = ['image/tiff', 'image/tif'];
         
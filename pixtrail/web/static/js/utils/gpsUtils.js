@@ -97,6 +97,39 @@ const GPSUtils = {
                longitude >= -180 && longitude <= 180;
     },
     
+    /**
+     * Decode an encoded polyline (Google polyline algorithm format)
+     * @param {string} encoded - Encoded polyline
+     * @param {number} [precision=5] - Number of decimal digits of the encoding
+     * @returns {Array<Array<number>>} Array of [latitude, longitude] pairs
+     */
+    decodePolyline: (encoded, precision = 5) => {
+        const factor = Math.pow(10, precision);
+        const coordinates = [];
+        let index = 0;
+        let lat = 0;
+        let lng = 0;
+        
+        const nextValue = () => {
+            let result = 0;
+            let shift = 0;
+            let byte;
+            do {
+                byte = encoded.charCodeAt(index++) - 63;
+                result |= (byte & 0x1f) << shift;
+                shift += 5;
+            } while (byte >= 0x20);
+            return (result & 1) ? ~(result >> 1) : (result >> 1);
+        };
+        
+        while (index < encoded.length) {
+            lat += nextValue();
+            lng += nextValue();
+            coordinates.push([lat / factor, lng / factor]);
+        }
+        return coordinates;
+    },
+    
     /**
      * Get the center point of multiple coordinates
      * @param {Array<{latitude: number, longitude: number}>} points - Array of points with lat/lng
@@ -243,6 +276,7 @@ const GPSUtils = {
             minElevation: Infinity,
             maxElevation: -Infinity,
             elevationGain: 0,
+            elevationLoss: 0,
             photoCount: sortedWaypoints.length,
             elevationProfile: [],
             speedProfile: []
@@ -268,9 +302,11 @@ const GPSUtils = {
                 stats.minElevation = Math.min(stats.minElevation, elevation);
                 stats.maxElevation = Math.max(stats.maxElevation, elevation);
 
-                // Calculate elevation gain
+                // Calculate elevation gain and loss
                 if (prevElevation !== null && elevation > prevElevation) {
                     stats.elevationGain += (elevation - prevElevation);
+                } else if (prevElevation !== null && elevation < prevElevation) {
+                    stats.elevationLoss += (prevElevation - elevation);
                 }
                 prevElevation = elevation;
 
@@ -342,6 +378,7 @@ const GPSUtils = {
         stats.minElevation = parseFloat(stats.minElevation.toFixed(1));
         stats.maxElevation = parseFloat(stats.maxElevation.toFixed(1));
         stats.elevationGain = parseFloat(stats.elevationGain.toFixed(1));
+        stats.elevationLoss = parseFloat(stats.elevationLoss.toFixed(1));
 
         return stats;
     }
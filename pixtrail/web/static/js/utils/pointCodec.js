@@ -0,0 +1,99 @@
+/**
+ * Point Codec
+ * Converts waypoints to and from the columnar payload of the API
+ * (application/vnd.pixtrail.columns+json, see pixtrail/web/payloads.py)
+ */
+
+// Content type of columnar point payloads
+export const COLUMNS_TYPE = 'application/vnd.pixtrail.columns+json';
+
+// Timestamps that carry a UTC offset or 'Z'
+const ZONED_TIMESTAMP = /(Z|[+-]\d\d:?\d\d)$/i;
+
+const PointCodec = {
+    /**
+     * Encode waypoints as parallel arrays with delta-encoded timestamps
+     * @param {Array<Object>} waypoints - Waypoints with latitude, longitude,
+     *     altitude, timestamp (ISO 8601 string) and name
+     * @returns {Object} Columnar payload
+     */
+    encodeColumns: (waypoints) => {
+        const count = waypoints.length;
+        const columns = {
+            count,
+            latitude: new Array(count),
+            longitude: new Array(count),
+            altitude: new Array(count),
+            timestamps: new Array(count),
+            utc: new Array(count),
+            name: new Array(count)
+        };
+        let previous = 0;
+
+        for (let i = 0; i < count; i++) {
+            const point = waypoints[i];
+            columns.latitude[i] = point.latitude;
+            columns.longitude[i] = point.longitude;
+            columns.altitude[i] = point.altitude ?? null;
+            columns.name[i] = point.name ?? null;
+
+            // Local times are sent as their wall-clock time read as UTC
+            const zoned = typeof point.timestamp === 'string' && ZONED_TIMESTAMP.test(point.timestamp);
+            const millis = point.timestamp ? Date.parse(zoned ? point.timestamp : `${point.timestamp}Z`) : NaN;
+            if (Number.isNaN(millis)) {
+                columns.timestamps[i] = null;
+                columns.utc[i] = 0;
+            } else {
+                columns.timestamps[i] = millis - previous;
+                columns.utc[i] = zoned ? 1 : 0;
+                previous = millis;
+            }
+        }
+        return columns;
+    },
+
+    /**
+     * Decode a columnar payload into waypoint objects
+     * @param {Object} columns - Columnar payload
+     * @returns {Array<Object>} Waypoints, shaped like the JSON records of the API
+     */
+    decodeColumns: (columns) => {
+        const count = columns.latitude.length;
+        const waypoints = new Array(count);
+        const utc = columns.utc;
+        let millis = 0;
+
+        for (let i = 0; i < count; i++) {
+            let timestamp = null;
+            const delta = columns.timestamps ? columns.timestamps[i] : null;
+            if (delta !== null && delta !== undefined) {
+                millis += delta;
+                const iso = new Date(millis).toISOString();
+                // Drop the 'Z' of local times
+                timestamp = (Array.isArray(utc) ? utc[i] : utc) ? iso : iso.slice(0, -1);
+            }
+            waypoints[i] = {
+                latitude: columns.latitude[i],
+                longitude: columns.longitude[i],
+                name: columns.name ? columns.name[i] : null,
+                timestamp,
+                altitude: columns.altitude ? columns.altitude[i] : 0
+            };
+        }
+        return waypoints;
+    },
+
+    /**
+     * Replace the columnar waypoints of an API result with waypoint objects
+     * @param {Object} result - API result, possibly without waypoints
+     * @returns {Object} The same result
+     */
+    decodeResult: (result) => {
+        if (result && result.waypoints && !Array.isArray(result.waypoints)) {
+            result.waypoints = PointCodec.decodeColumns(result.waypoints);
+        }
+        return result;
+    }
+};
+
+export default PointCodec;
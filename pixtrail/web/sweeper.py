@@ -0,0 +1,197 @@
+"""
+Eviction of abandoned sessions from the web interface's data directory.
+
+Sessions are normally removed when the browser calls /api/cleanup. A
+closed tab or a crashed browser leaves them behind, so a background
+sweeper removes sessions that haven't been used for longer than a TTL,
+then the least recently used sessions until the data directory fits a
+byte quota. Sessions that are being uploaded, processed or downloaded
+hold their lock and are skipped.
+"""
+
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .sessions import session_lock
+
+# Seconds a session is kept after its last use
+DEFAULT_SESSION_TTL = 24 * 60 * 60
+
+# Seconds between sweeps
+DEFAULT_SWEEP_INTERVAL = 60.0
+
+
+def _directory_size(path: str) -> int:
+    """Get the total size of the files in a directory tree."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class SessionSweeper:
+    """
+    Background thread evicting sessions by TTL and byte quota.
+
+    A session's last use is the modification time of its directory, which
+    changes when files are added or removed and is refreshed by the routes
+    on every process and download request.
+    """
+
+    def __init__(
+        self,
+        data_dir: str,
+        ttl: Optional[float] = DEFAULT_SESSION_TTL,
+        quota: Optional[int] = None,
+        interval: float = DEFAULT_SWEEP_INTERVAL
+    ):
+        """
+        Initialize the sweeper.
+
+        Args:
+            data_dir: Normalized data directory
+            ttl: Seconds a session is kept after its last use (None to keep
+                 sessions until the quota is exceeded)
+            quota: Maximum total size of the sessions in bytes (None for no limit)
+            interval: Seconds between sweeps
+        """
+        self.data_dir = data_dir
+        self.ttl = ttl
+        self.quota = quota
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._metrics = {
+            'sessions': 0,
+            'bytes_in_use': 0,
+            'evicted_sessions': 0,
+            'evicted_bytes': 0,
+            'ttl_evictions': 0,
+            'quota_evictions': 0,
+            'last_sweep': None
+        }
+
+    def start(self) -> None:
+        """Start sweeping in a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='pixtrail-sweeper', daemon=True)
+            self._thread.start()
+
+    def shutdown(self) -> None:
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        """Sweep every interval until stopped."""
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Warning: Session sweep failed: {e}")
+            self._stop.wait(self.interval)
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        """List the sessions as (last use, size, session ID) tuples."""
+        sessions = []
+        try:
+            names = os.listdir(self.data_dir)
+        except OSError:
+            return sessions
+        for name in names:
+            # Skip the job queue and lock directories
+            if name.startswith('.'):
+                continue
+            path = os.path.join(self.data_dir, name)
+            try:
+                if not os.path.isdir(path):
+                    continue
+                last_use = os.stat(path).st_mtime
+            except OSError:
+                continue
+            sessions.append((last_use, _directory_size(path), name))
+        return sessions
+
+    def _evict(self, session_id: str) -> bool:
+        """Remove a session unless a request holds its lock."""
+        with session_lock(self.data_dir, session_id, blocking=False) as acquired:
+            if not acquired:
+                return False
+            path = os.path.join(self.data_dir, session_id)
+            if not os.path.isdir(path):
+                return False
+            shutil.rmtree(path, ignore_errors=True)
+            return not os.path.exists(path)
+
+    def sweep(self, now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Evict expired sessions, then least recently used sessions over the quota.
+
+        Args:
+            now: Current time (default: time.time())
+
+        Returns:
+            Dictionary with the number of 'ttl' and 'quota' evictions and the
+            'bytes' they freed
+        """
+        now = time.time() if now is None else now
+        sessions = sorted(self._scan())
+        bytes_in_use = sum(size for _, size, _ in sessions)
+        evicted = {'ttl': 0, 'quota': 0, 'bytes': 0}
+
+        kept = []
+        for last_use, size, session_id in sessions:
+            if self.ttl is not None and now - last_use > self.ttl and self._evict(session_id):
+                evicted['ttl'] += 1
+                evicted['bytes'] += size
+                bytes_in_use -= size
+            else:
+                kept.append((last_use, size, session_id))
+
+        if self.quota is not None:
+            # Oldest first; sessions in use are skipped and may keep the
+            # directory over the quota until the next sweep
+            for last_use, size, session_id in list(kept):
+                if bytes_in_use <= self.quota:
+                    break
+                if self._evict(session_id):
+                    evicted['quota'] += 1
+                    evicted['bytes'] += size
+                    bytes_in_use -= size
+                    kept.remove((last_use, size, session_id))
+
+        with self._lock:
+            metrics = self._metrics
+            metrics['sessions'] = len(kept)
+            metrics['bytes_in_use'] = bytes_in_use
+            metrics['evicted_sessions'] += evicted['ttl'] + evicted['quota']
+            metrics['evicted_bytes'] += evicted['bytes']
+            metrics['ttl_evictions'] += evicted['ttl']
+            metrics['quota_evictions'] += evicted['quota']
+            metrics['last_sweep'] = now
+        return evicted
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get the sweeper's metrics.
+
+        Returns:
+            Dictionary with the 'sessions' and 'bytes_in_use' found by the
+            last sweep, the eviction counts since startup ('evicted_sessions',
+            'evicted_bytes', 'ttl_evictions', 'quota_evictions'), the time of
+            the 'last_sweep' and the configured 'ttl' and 'quota'
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics['ttl'] = self.ttl
+        metrics['quota'] = self.quota
+        return metrics
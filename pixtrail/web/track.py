@@ -0,0 +1,204 @@
+"""
+Encoded-polyline tracks for the web map.
+
+The route of a session is sent to the browser as encoded polylines (the
+Google polyline algorithm format) at several levels of detail. Each level
+is simplified with the Douglas-Peucker algorithm to a tolerance close to
+one screen pixel at some zoom level, so the map draws a few hundred
+vertices of a large trip when zoomed out instead of every photo.
+"""
+
+import math
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple, Union
+
+from ..points import PointTable
+
+# Decimal digits of the encoded coordinates (1e-5 degrees is about 1 m)
+POLYLINE_PRECISION = 5
+
+# Simplification tolerances in meters, finest first. One map pixel is
+# 156543 m * cos(latitude) / 2**zoom, so each level is about one pixel at
+# zoom 18, 16, 14, ... 6; level 0 keeps every point.
+TRACK_TOLERANCES = (0.0, 2.5, 10.0, 40.0, 150.0, 600.0, 2500.0)
+
+# Mean Earth radius in meters
+EARTH_RADIUS = 6371008.8
+
+Points = Union[PointTable, Iterable[Mapping[str, Any]]]
+
+
+def encode_polyline(latitudes: Sequence[float], longitudes: Sequence[float],
+                    precision: int = POLYLINE_PRECISION) -> str:
+    """
+    Encode coordinates with the polyline algorithm.
+
+    Args:
+        latitudes: Latitudes in decimal degrees
+        longitudes: Longitudes in decimal degrees
+        precision: Number of decimal digits kept
+
+    Returns:
+        Encoded polyline
+    """
+    factor = 10 ** precision
+    chunks = []
+    previous_lat = previous_lon = 0
+    for latitude, longitude in zip(latitudes, longitudes):
+        lat = round(latitude * factor)
+        lon = round(longitude * factor)
+        for delta in (lat - previous_lat, lon - previous_lon):
+            # Zig-zag the sign into the lowest bit, then emit 5-bit groups
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        previous_lat, previous_lon = lat, lon
+    return ''.join(chunks)
+
+
+def decode_polyline(encoded: str, precision: int = POLYLINE_PRECISION) -> List[Tuple[float, float]]:
+    """
+    Decode a polyline made by encode_polyline.
+
+    Args:
+        encoded: Encoded polyline
+        precision: Number of decimal digits of the encoding
+
+    Returns:
+        List of (latitude, longitude) tuples
+
+    Raises:
+        ValueError: If the polyline is truncated or has invalid characters
+    """
+    factor = 10 ** precision
+    coordinates = []
+    values = []
+    value = shift = 0
+    for char in encoded:
+        byte = ord(char) - 63
+        if not 0 <= byte < 64:
+            raise ValueError(f"Invalid polyline character {char!r}")
+        value |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    if shift or len(values) % 2:
+        raise ValueError("Truncated polyline")
+
+    lat = lon = 0
+    for i in range(0, len(values), 2):
+        lat += values[i]
+        lon += values[i + 1]
+        coordinates.append((lat / factor, lon / factor))
+    return coordinates
+
+
+def simplify(xs: Sequence[float], ys: Sequence[float], tolerance: float) -> List[int]:
+    """
+    Simplify a line with the Douglas-Peucker algorithm.
+
+    Args:
+        xs: X coordinates in meters
+        ys: Y coordinates in meters
+        tolerance: Maximum distance in meters of a dropped point to the
+                   simplified line
+
+    Returns:
+        Sorted indexes of the points kept, always including both ends
+    """
+    count = len(xs)
+    if count < 3 or tolerance <= 0:
+        return list(range(count))
+    tolerance_sq = tolerance * tolerance
+
+    # Drop points closer than the tolerance to the last point kept first:
+    # a cheap pass that leaves far fewer points for Douglas-Peucker
+    candidates = [0]
+    last_x, last_y = xs[0], ys[0]
+    for i in range(1, count - 1):
+        dx, dy = xs[i] - last_x, ys[i] - last_y
+        if dx * dx + dy * dy > tolerance_sq:
+            candidates.append(i)
+            last_x, last_y = xs[i], ys[i]
+    candidates.append(count - 1)
+    cx = [xs[i] for i in candidates]
+    cy = [ys[i] for i in candidates]
+
+    keep = bytearray(len(candidates))
+    keep[0] = keep[-1] = 1
+    # Iterative, so long tracks don't hit the recursion limit
+    stack = [(0, len(candidates) - 1)]
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = cx[first], cy[first]
+        dx, dy = cx[last] - x1, cy[last] - y1
+        length_sq = dx * dx + dy * dy
+        farthest = 0
+        if length_sq:
+            # Squared distance to the line times length_sq, from the cross product
+            max_cross = tolerance_sq * length_sq
+            for i in range(first + 1, last):
+                cross = (cx[i] - x1) * dy - (cy[i] - y1) * dx
+                cross *= cross
+                if cross > max_cross:
+                    farthest, max_cross = i, cross
+        else:
+            # Closed loop: distance to the end point
+            max_sq = tolerance_sq
+            for i in range(first + 1, last):
+                px, py = cx[i] - x1, cy[i] - y1
+                distance_sq = px * px + py * py
+                if distance_sq > max_sq:
+                    farthest, max_sq = i, distance_sq
+        if farthest:
+            keep[farthest] = 1
+            if farthest - first > 1:
+                stack.append((first, farthest))
+            if last - farthest > 1:
+                stack.append((farthest, last))
+    return [candidates[i] for i in range(len(candidates)) if keep[i]]
+
+
+def encode_track(points: Points, tolerances: Sequence[float] = TRACK_TOLERANCES) -> Dict[str, Any]:
+    """
+    Encode the route through points as a level-of-detail pyramid.
+
+    The route follows the points in timestamp order, like the track of the
+    GPX file. Each level is simplified from the previous one, and levels
+    that drop no further point are left out.
+
+    Args:
+        points: PointTable or GPS data dictionaries
+        tolerances: Simplification tolerances in meters, finest first
+
+    Returns:
+        JSON-serializable dictionary with the 'precision' of the polylines
+        and the 'levels', each with its 'tolerance' in meters, its point
+        'count' and its encoded 'polyline'
+    """
+    table = points if isinstance(points, PointTable) else PointTable.from_dicts(points)
+    table = table.sorted_by_time()
+    latitudes, longitudes = table.latitudes, table.longitudes
+
+    # Equirectangular projection around the mean latitude, accurate enough
+    # for the distances compared with the tolerances
+    scale = math.radians(EARTH_RADIUS)
+    scale_x = scale * math.cos(math.radians(math.fsum(latitudes) / len(table))) if table else scale
+    xs = [longitude * scale_x for longitude in longitudes]
+    ys = [latitude * scale for latitude in latitudes]
+
+    levels = []
+    indexes = list(range(len(table)))
+    for tolerance in tolerances:
+        kept = simplify([xs[i] for i in indexes], [ys[i] for i in indexes], tolerance)
+        if levels and len(kept) == len(indexes):
+            continue
+        indexes = [indexes[i] for i in kept]
+        levels.append({
+            'tolerance': tolerance,
+            'count': len(indexes),
+            'polyline': encode_polyline([latitudes[i] for i in indexes], [longitudes[i] for i in indexes])
+        })
+    return {'precision': POLYLINE_PRECISION, 'levels': levels}
@@ -0,0 +1,202 @@
+"""
+Streaming photo uploads for the PixTrail web interface.
+
+GPS data is read from the header of each uploaded photo while the request
+body is still arriving. The image data that follows the header is
+discarded without being written to disk. With a result cache, photos that
+must be spooled are resolved from the cache when they were seen before,
+and new results are added to it.
+"""
+
+import os
+import tempfile
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+from ..cache import MISS
+from ..exif_reader import ExifReader
+from ..utils import IMAGE_EXTENSIONS
+from .result_cache import ResultCache, read_header
+
+# Size of the chunks read from the request body
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Header size of the first GPS extraction attempt; doubled on each retry
+HEADER_START = 8 * 1024
+
+# Largest header kept in memory. Photos whose GPS data isn't found within
+# this many bytes (or whose format the header parser doesn't handle) are
+# spooled to a temporary file and read with the regular fallbacks.
+HEADER_LIMIT = 256 * 1024
+
+# Largest form field value accepted in a streaming upload
+MAX_FIELD_SIZE = 64 * 1024
+
+
+class _PhotoPart:
+    """GPS extraction state of one uploaded photo."""
+
+    def __init__(self, filename: str, spool_dir: str, cache: Optional[ResultCache] = None):
+        """
+        Initialize the state.
+
+        Args:
+            filename: Filename sent by the client (may include a relative path)
+            spool_dir: Directory for the temporary file if the photo is spooled
+            cache: Result cache to resolve spooled photos from (None to disable)
+        """
+        self.filename = filename
+        self.name = os.path.basename(filename.replace('\\', '/'))
+        self.spool_dir = spool_dir
+        self.cache = cache
+        # Cache key of a spooled photo the fast path can't read
+        self.key: Optional[bytes] = None
+        self.cached = False
+        self.header = bytearray()
+        self.next_attempt = HEADER_START
+        self.spool: Optional[BinaryIO] = None
+        self.done = False
+        self.gps_data: Optional[Dict[str, Any]] = None
+
+    def feed(self, data: bytes, more_data: bool) -> None:
+        """
+        Receive the next piece of the photo.
+
+        Args:
+            data: Bytes received
+            more_data: Whether more bytes of this photo follow
+        """
+        if self.done:
+            return
+        if self.spool is not None:
+            self.spool.write(data)
+        else:
+            self.header += data
+            if len(self.header) >= self.next_attempt or not more_data:
+                self._read_header(final=not more_data)
+        if not more_data and not self.done:
+            self._read_spool()
+
+    def _read_header(self, final: bool) -> None:
+        """Try to extract GPS data from the bytes received so far."""
+        try:
+            self.gps_data = ExifReader.extract_gps_from_header(bytes(self.header), self.name)
+            self.done = True
+            self.header = None
+        except ValueError:
+            if final or len(self.header) >= HEADER_LIMIT:
+                self.spool = tempfile.NamedTemporaryFile(
+                    dir=self.spool_dir, prefix='.upload-',
+                    suffix=os.path.splitext(self.name)[1], delete=False
+                )
+                self.spool.write(self.header)
+                self.header = None
+            else:
+                while self.next_attempt <= len(self.header):
+                    self.next_attempt *= 2
+
+    def _read_spool(self) -> None:
+        """Extract GPS data from the complete spooled photo and delete it."""
+        self.spool.close()
+        try:
+            cached = MISS
+            if self.cache is not None:
+                cached, self.key = read_header(self.spool.name)
+                if self.key is not None:
+                    cached = self.cache.get_key(self.key, self.name)
+            if cached is not MISS:
+                self.gps_data = cached
+                self.cached = True
+            else:
+                self.gps_data = ExifReader.extract_gps_data(self.spool.name)
+        finally:
+            os.remove(self.spool.name)
+        if self.gps_data:
+            self.gps_data['name'] = self.name
+        self.done = True
+
+    def discard(self) -> None:
+        """Delete the temporary file of an unfinished photo."""
+        if self.spool is not None and not self.done:
+            self.spool.close()
+            os.remove(self.spool.name)
+
+
+def receive_upload(
+    stream: BinaryIO,
+    boundary: str,
+    spool_dir: str,
+    file_field: str = 'photos',
+    cache: Optional[ResultCache] = None
+) -> Tuple[Dict[str, str], List[Dict[str, Any]]]:
+    """
+    Read a multipart/form-data upload, extracting GPS data from photos as they arrive.
+
+    Files that don't have an image extension are skipped.
+
+    Args:
+        stream: Request body
+        boundary: Multipart boundary from the Content-Type header
+        spool_dir: Directory for photos that must be spooled to disk
+        file_field: Name of the form field holding the photos
+        cache: Result cache for the GPS data of the photos (None to disable)
+
+    Returns:
+        Tuple of (form field values, list of dictionaries with the 'filename'
+        sent by the client and the extracted 'gps' data, or None if the photo
+        has no GPS data)
+
+    Raises:
+        ValueError: If the request body is not valid multipart data
+    """
+    decoder = MultipartDecoder(boundary.encode('latin-1'), MAX_FIELD_SIZE)
+    fields = {}
+    photos = []
+    field_name = None
+    field_value = bytearray()
+    part = None
+    cache_writes = []
+
+    try:
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                if isinstance(event, File):
+                    field_name = None
+                    part = None
+                    filename = event.filename or ''
+                    if (event.name == file_field
+                            and os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS):
+                        part = _PhotoPart(filename, spool_dir, cache)
+                elif isinstance(event, Field):
+                    field_name = event.name
+                    field_value = bytearray()
+                    part = None
+                elif isinstance(event, Data):
+                    if part is not None:
+                        part.feed(event.data, event.more_data)
+                        if not event.more_data:
+                            photos.append({'filename': part.filename, 'gps': part.gps_data})
+                            if part.key is not None and not part.cached:
+                                cache_writes.append((part.key, part.gps_data))
+                            part = None
+                    elif field_name is not None:
+                        field_value += event.data
+                        if not event.more_data:
+                            fields[field_name] = field_value.decode('utf-8', 'replace')
+                            field_name = None
+                event = decoder.next_event()
+            if isinstance(event, Epilogue):
+                break
+            if not chunk:
+                raise ValueError("Unexpected end of form data")
+    finally:
+        if part is not None:
+            part.discard()
+
+    if cache_writes:
+        cache.put_keys(cache_writes)
+    return fields, photos
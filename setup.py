@@ -29,6 +29,9 @@ setup(
             "flask>=2.0.0",
             "werkzeug>=2.0.0",
         ],
+        "analysis": [
+            "numpy>=1.17",
+        ],
         "dev": [
             "pytest>=6.0.0",
             "black>=21.5b2",
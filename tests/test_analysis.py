@@ -0,0 +1,147 @@
+"""
+Tests for the analysis module.
+"""
+
+import json
+import os
+import shutil
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from pixtrail.analysis import format_report, haversine, route_statistics
+from pixtrail.points import PointTable
+from pixtrail.web import create_app
+from pixtrail.web.routes import STATS_FILE, get_sweeper
+
+
+def build_route():
+    """Build a route north along a meridian, one point per minute, given out of order."""
+    start = datetime(2023, 6, 1, 8, 0)
+    points = [{
+        'latitude': 48.0 + i * 0.01,
+        'longitude': 11.0,
+        'altitude': [500.0, 520.0, 510.0, 530.0, 530.0][i],
+        'timestamp': start + timedelta(minutes=i),
+        'name': f"photo{i}.jpg"
+    } for i in range(5)]
+    return [points[3], points[0], points[4], points[1], points[2]]
+
+
+class TestAnalysis(unittest.TestCase):
+    """Test cases for route statistics."""
+
+    def test_haversine(self):
+        """Test distances against known values."""
+        distances = haversine(np.array([0.0, 48.8566]), np.array([0.0, 2.3522]),
+                              np.array([1.0, 51.5074]), np.array([0.0, -0.1278]))
+
+        # Assertions
+        self.assertAlmostEqual(distances[0], 111.195, places=3)
+        self.assertAlmostEqual(distances[1], 343.5, delta=0.5)
+
+    def test_route_statistics(self):
+        """Test the totals and series of a route."""
+        stats = route_statistics(build_route())
+        segment = 0.01 * 111.195
+
+        # Assertions
+        self.assertEqual(stats['photo_count'], 5)
+        self.assertAlmostEqual(stats['total_distance'], 4 * segment, places=2)
+        self.assertEqual(stats['total_duration'], 240.0)
+        self.assertEqual(stats['start_time'], '2023-06-01T08:00:00')
+        self.assertEqual(stats['end_time'], '2023-06-01T08:04:00')
+        self.assertAlmostEqual(stats['avg_speed'], segment * 60, places=1)
+        self.assertAlmostEqual(stats['max_speed'], segment * 60, places=1)
+        self.assertEqual(stats['min_elevation'], 500.0)
+        self.assertEqual(stats['max_elevation'], 530.0)
+        self.assertEqual(stats['elevation_gain'], 40.0)
+        self.assertEqual(stats['elevation_loss'], 10.0)
+        self.assertEqual(stats['segments']['duration'], [60.0] * 4)
+        self.assertEqual(stats['segments']['elevation_change'], [20.0, -10.0, 20.0, 0.0])
+        self.assertEqual(stats['elevation_profile'], [500.0, 520.0, 510.0, 530.0, 530.0])
+        self.assertEqual(route_statistics(PointTable.from_dicts(build_route())), stats)
+
+    def test_jumps_and_unknown_values(self):
+        """Test that GPS jumps, missing timestamps and altitudes are left out."""
+        start = datetime(2023, 6, 1, 8, 0)
+        stats = route_statistics([
+            {'latitude': 48.0, 'longitude': 11.0, 'altitude': 100.0, 'timestamp': start},
+            {'latitude': 48.01, 'longitude': 11.0, 'altitude': None, 'timestamp': start + timedelta(minutes=1)},
+            {'latitude': 49.0, 'longitude': 11.0, 'altitude': 90.0, 'timestamp': start + timedelta(minutes=2)},
+            {'latitude': 10.0, 'longitude': 10.0, 'altitude': 0.0},
+            {'latitude': 95.0, 'longitude': 11.0, 'timestamp': start}
+        ])
+
+        # Assertions
+        self.assertEqual(stats['photo_count'], 3)
+        self.assertAlmostEqual(stats['total_distance'], 1.11, places=2)
+        self.assertEqual(stats['segments']['speed'][1], None)
+        self.assertEqual(stats['elevation_loss'], 10.0)
+        self.assertEqual(stats['segments']['elevation_change'], [None, None])
+        self.assertEqual(stats['elevation_profile'], [100.0, None, 90.0])
+
+    def test_untimed_route(self):
+        """Test a route without timestamps, taken in its given order."""
+        stats = route_statistics([
+            {'latitude': 48.0, 'longitude': 11.0},
+            {'latitude': 48.01, 'longitude': 11.0}
+        ])
+
+        # Assertions
+        self.assertEqual(stats['total_duration'], 0.0)
+        self.assertIsNone(stats['start_time'])
+        self.assertEqual(stats['avg_speed'], 0.0)
+        self.assertEqual(stats['segments']['speed'], [None])
+        self.assertIn("Distance: 1.11 km", format_report(stats))
+
+    def test_too_few_points(self):
+        """Test that routes with fewer than two valid points have no statistics."""
+        # Assertions
+        self.assertIsNone(route_statistics([]))
+        self.assertIsNone(route_statistics([{'latitude': 48.0, 'longitude': 11.0}]))
+        self.assertIn("not enough points", format_report(None))
+
+
+class TestStatsRoute(unittest.TestCase):
+    """Test cases for the route statistics API."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.app = create_app({'PIXTRAIL_DATA_DIR': self.test_dir})
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        get_sweeper(self.app).shutdown()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_stats(self):
+        """Test statistics of a created GPX file, stored after the first request."""
+        gps_data = [dict(point, timestamp=point['timestamp'].isoformat()) for point in build_route()]
+        session_id = self.client.post('/api/create-gpx', json={'gps_data': gps_data}).get_json()['session_id']
+        first = self.client.get(f'/api/stats/{session_id}')
+        second = self.client.get(f'/api/stats/{session_id}')
+
+        # Assertions
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.get_json()['statistics'], route_statistics(build_route()))
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, session_id, STATS_FILE)))
+        self.assertEqual(second.get_data(), first.get_data())
+
+    def test_stats_errors(self):
+        """Test unknown and unprocessed sessions."""
+        os.makedirs(os.path.join(self.test_dir, "unprocessed"))
+
+        # Assertions
+        self.assertEqual(self.client.get('/api/stats/missing').status_code, 404)
+        self.assertEqual(self.client.get('/api/stats/unprocessed').status_code, 404)
+        self.assertEqual(self.client.get('/api/stats/..').status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Tests for the bench module.
+"""
+
+import io
+import json
+import os
+import shutil
+import unittest
+from contextlib import redirect_stdout
+
+from pixtrail.bench import _percentile, run_benchmark
+from pixtrail.cli import main
+from tests.test_exif_reader import build_exif_tiff, build_jpeg
+
+
+class TestBench(unittest.TestCase):
+    """Test cases for the throughput benchmark."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        self.photo_dir = os.path.join(self.test_dir, "photos")
+        os.makedirs(self.photo_dir, exist_ok=True)
+        for i in range(4):
+            tiff = build_exif_tiff(52.5 + i / 100, 13.4, 34.0, f"2023:05:01 12:00:0{i}")
+            with open(os.path.join(self.photo_dir, f"photo{i}.jpg"), "wb") as f:
+                f.write(build_jpeg(tiff, payload_size=4096))
+        with open(os.path.join(self.photo_dir, "nogps.jpg"), "wb") as f:
+            f.write(b"\xff\xd8\xff\xd9")
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        values = [float(i) for i in range(1, 101)]
+
+        # Assertions
+        self.assertEqual(_percentile(values, 0.50), 50.0)
+        self.assertEqual(_percentile(values, 0.95), 95.0)
+        self.assertEqual(_percentile([3.0], 0.95), 3.0)
+        self.assertEqual(_percentile([], 0.5), 0.0)
+
+    def test_run_benchmark(self):
+        """Test the report of a benchmark run."""
+        report = run_benchmark(self.photo_dir, parsers=("fast", "exifread"))
+
+        # Assertions
+        self.assertEqual(report["discovery"]["files"], 5)
+        self.assertEqual(report["end_to_end"]["files"], 5)
+        self.assertEqual(report["end_to_end"]["with_gps"], 4)
+        self.assertEqual(report["gpx"]["points"], 4)
+        self.assertGreater(report["gpx"]["bytes"], 0)
+        self.assertEqual(set(report["extraction"]), {"fast", "exifread"})
+
+        fast = report["extraction"]["fast"]
+        self.assertEqual(fast["gps"], 4)
+        self.assertEqual(fast["no_gps"] + fast["unsupported"], 1)
+        self.assertLessEqual(fast["p50_ms"], fast["p95_ms"])
+        # The fast path never reads the image payload
+        self.assertLess(fast["bytes_read_per_file"], 4096)
+
+        # The report must be JSON serializable
+        json.dumps(report)
+
+    def test_run_benchmark_sample(self):
+        """Test limiting the per-parser runs to a sample of files."""
+        report = run_benchmark(self.photo_dir, parsers=("fast",), sample=2)
+
+        # Assertions
+        self.assertEqual(report["extraction"]["fast"]["files"], 2)
+        self.assertEqual(report["end_to_end"]["files"], 5)
+
+    def test_cli_bench(self):
+        """Test the bench mode of the command-line interface."""
+        report_path = os.path.join(self.test_dir, "report.json")
+
+        with redirect_stdout(io.StringIO()):
+            exit_code = main(["bench", self.photo_dir, "--parsers", "fast", "-o", report_path])
+
+        # Assertions
+        self.assertEqual(exit_code, 0)
+        with open(report_path) as f:
+            report = json.load(f)
+        self.assertEqual(report["discovery"]["files"], 5)
+        self.assertIn("fast", report["extraction"])
+
+    def test_cli_bench_missing_directory(self):
+        """Test the bench mode with a missing directory."""
+        with redirect_stdout(io.StringIO()):
+            exit_code = main(["bench", os.path.join(self.test_dir, "missing")])
+
+        # Assertions
+        self.assertEqual(exit_code, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
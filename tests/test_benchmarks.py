@@ -0,0 +1,140 @@
+"""
+Tests for the benchmark corpus generator and regression check.
+"""
+
+import hashlib
+import os
+import shutil
+import unittest
+
+from benchmarks.corpus import build_tiff, ensure_corpus, generate_corpus
+from benchmarks.run import compare, discover, relative_time
+from pixtrail.exif_reader import ExifReader
+
+
+def _digest(paths):
+    """Hash the names and contents of a list of files."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class TestCorpus(unittest.TestCase):
+    """Test cases for the synthetic corpus generator."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        self.corpus_dir = os.path.join(self.test_dir, "corpus")
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_deterministic(self):
+        """Test that the same parameters produce the same files."""
+        first = _digest(generate_corpus(self.corpus_dir, 12, seed=3, payload_size=(100, 500)))
+        second = _digest(generate_corpus(self.corpus_dir, 12, seed=3, payload_size=(100, 500)))
+        other = _digest(generate_corpus(self.corpus_dir, 12, seed=4, payload_size=(100, 500)))
+
+        # Assertions
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_layout(self):
+        """Test directory fan-out and file formats."""
+        paths = generate_corpus(self.corpus_dir, 20, fan_out=2, depth=2, payload_size=100)
+
+        # Assertions
+        self.assertEqual(len(paths), 20)
+        leaves = {os.path.relpath(os.path.dirname(path), self.corpus_dir) for path in paths}
+        self.assertEqual(len(leaves), 4)
+        extensions = {os.path.splitext(path)[1] for path in paths}
+        self.assertEqual(extensions, {'.jpg', '.tiff', '.dng'})
+
+    def test_files_are_readable(self):
+        """Test that every generated format is read by the fast path and exifread."""
+        paths = generate_corpus(self.corpus_dir, 30, seed=1, payload_size=70000, gps_fraction=1.0)
+
+        for path in paths:
+            io_stats = {}
+            gps_data = ExifReader.extract_gps_data(path, io_stats)
+            with open(path, 'rb') as f:
+                reference = ExifReader._extract_gps_with_exifread(f, path)
+
+            # Assertions
+            self.assertEqual(io_stats['parser'], 'fast', path)
+            self.assertAlmostEqual(gps_data['latitude'], reference['latitude'], places=6)
+            self.assertAlmostEqual(gps_data['longitude'], reference['longitude'], places=6)
+            self.assertEqual(gps_data['timestamp'], reference['timestamp'])
+
+    def test_big_endian_tiff_with_trailing_ifd(self):
+        """Test a big-endian TIFF whose IFDs follow the image data."""
+        path = os.path.join(self.test_dir, "photo.tiff")
+        os.makedirs(self.test_dir, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(build_tiff(-33.8568, 151.2153, -12.0, '2023:06:01 09:30:00',
+                               byte_order='>', payload_size=100000, ifd_at_end=True))
+
+        gps_data = ExifReader.extract_gps_data(path)
+
+        # Assertions
+        self.assertAlmostEqual(gps_data['latitude'], -33.8568, places=4)
+        self.assertAlmostEqual(gps_data['longitude'], 151.2153, places=4)
+        self.assertAlmostEqual(gps_data['altitude'], -12.0)
+
+    def test_ensure_corpus_reuses_existing(self):
+        """Test that an existing corpus with the same parameters is kept."""
+        ensure_corpus(self.corpus_dir, 5, seed=0, payload_size=100)
+        marker = os.path.join(self.corpus_dir, "marker")
+        open(marker, 'w').close()
+
+        ensure_corpus(self.corpus_dir, 5, seed=0, payload_size=100)
+        self.assertTrue(os.path.exists(marker))
+
+        ensure_corpus(self.corpus_dir, 6, seed=0, payload_size=100)
+        self.assertFalse(os.path.exists(marker))
+
+
+class TestRegressionCheck(unittest.TestCase):
+    """Test cases for comparing results against a baseline."""
+
+    def test_compare(self):
+        """Test that only benchmarks over the threshold are reported."""
+        baseline = {'benchmarks': {
+            'Suite.time_fast': {'relative': 1.0},
+            'Suite.time_slow': {'relative': 1.0}
+        }}
+        results = {
+            'Suite.time_fast': {'relative': 1.2},
+            'Suite.time_slow': {'relative': 2.0},
+            'Suite.time_new': {'relative': 5.0},
+            'Suite.time_reference': {'seconds': 1.0}
+        }
+
+        regressions = compare(results, baseline, 1.5)
+
+        # Assertions
+        self.assertEqual(regressions, [('Suite.time_slow', 2.0)])
+
+    def test_relative_time(self):
+        """Test that each round is divided by the reference's time in the same round."""
+        relative = relative_time([2.0, 4.0, 30.0], [1.0, 2.0, 10.0])
+
+        # Assertions
+        self.assertEqual(relative, 2.0)
+
+    def test_discover_includes_reference(self):
+        """Test that a suite's reference runs first, also when the filter excludes it."""
+        found = [(suite.__name__, method_names) for suite, method_names in discover('Extract.time_iter')]
+
+        # Assertions
+        self.assertEqual(found, [('Extract', ['time_extract_exifread', 'time_iter_points'])])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Tests for the cache module.
+"""
+
+import os
+import shutil
+import unittest
+from datetime import datetime
+
+from pixtrail.cache import MISS, ExtractionCache, get_default_cache_path
+
+
+class TestExtractionCache(unittest.TestCase):
+    """Test cases for the ExtractionCache class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.db_path = os.path.join(self.test_dir, "cache.sqlite3")
+        self.test_image = os.path.join(self.test_dir, "test.jpg")
+        with open(self.test_image, "wb") as f:
+            f.write(b"\xff\xd8\xff\xd9")
+        self.cache = ExtractionCache(self.db_path)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        self.cache.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_get_miss(self):
+        """Test looking up a file that is not cached."""
+        result = self.cache.get(self.test_image, os.stat(self.test_image))
+        self.assertIs(result, MISS)
+
+    def test_put_and_get(self):
+        """Test storing and retrieving a GPS result."""
+        gps_data = {
+            'latitude': 52.52,
+            'longitude': 13.405,
+            'altitude': 34.0,
+            'timestamp': datetime(2023, 1, 1, 12, 0, 0),
+            'name': 'test.jpg'
+        }
+        stat_result = os.stat(self.test_image)
+        self.cache.put_many([(self.test_image, stat_result, gps_data)])
+        
+        # Assertions
+        self.assertEqual(self.cache.get(self.test_image, stat_result), gps_data)
+
+    def test_negative_result(self):
+        """Test that images without GPS data are cached as None."""
+        stat_result = os.stat(self.test_image)
+        self.cache.put_many([(self.test_image, stat_result, None)])
+        
+        # Assertions
+        self.assertIsNone(self.cache.get(self.test_image, stat_result))
+
+    def test_changed_file_is_a_miss(self):
+        """Test that a modified file invalidates its cache entry."""
+        self.cache.put_many([(self.test_image, os.stat(self.test_image), None)])
+        
+        # Modify the file
+        with open(self.test_image, "ab") as f:
+            f.write(b"\x00")
+        
+        # Assertions
+        self.assertIs(self.cache.get(self.test_image, os.stat(self.test_image)), MISS)
+
+    def test_shared_between_connections(self):
+        """Test that results written by one connection are seen by another."""
+        stat_result = os.stat(self.test_image)
+        self.cache.put_many([(self.test_image, stat_result, None)])
+        
+        with ExtractionCache(self.db_path) as other:
+            self.assertIsNone(other.get(self.test_image, stat_result))
+
+    def test_get_default_cache_path(self):
+        """Test the default cache location."""
+        self.assertTrue(get_default_cache_path().endswith(
+            os.path.join("pixtrail", "extraction-cache.sqlite3")
+        ))
+
+
+if __name__ == "__main__":
+    unittest.main()
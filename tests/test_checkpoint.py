@@ -0,0 +1,160 @@
+"""
+Tests for the checkpoint module.
+"""
+
+import io
+import os
+import shutil
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime
+from unittest.mock import patch
+
+from pixtrail.cache import MISS
+from pixtrail.checkpoint import BatchCheckpoint
+from pixtrail.cli import main
+from pixtrail.exif_reader import ExifReader
+from tests.test_exif_reader import build_exif_tiff, build_jpeg
+
+
+class TestBatchCheckpoint(unittest.TestCase):
+    """Test cases for the BatchCheckpoint class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.path = os.path.join(self.test_dir, "batch.checkpoint")
+        self.gps_data = {
+            'latitude': 35.0394,
+            'longitude': 135.7292,
+            'altitude': 50.0,
+            'timestamp': datetime(2023, 4, 1, 9, 0, 0),
+            'name': 'a.jpg'
+        }
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_record_and_reload(self):
+        """Test that recorded results are available after reopening."""
+        with BatchCheckpoint(self.path, {'recursive': False}) as checkpoint:
+            checkpoint.record_file("/photos/a.jpg", self.gps_data)
+            checkpoint.record_file("/photos/b.jpg", None)
+            checkpoint.record_done("/photos", "/photos/photos.gpx", True)
+
+        checkpoint = BatchCheckpoint(self.path, {'recursive': False})
+        try:
+            # Assertions
+            self.assertEqual(checkpoint.get("/photos/a.jpg"), self.gps_data)
+            self.assertIsNone(checkpoint.get("/photos/b.jpg"))
+            self.assertIs(checkpoint.get("/photos/c.jpg"), MISS)
+            self.assertTrue(checkpoint.is_done("/photos"))
+            self.assertFalse(checkpoint.is_done("/other"))
+        finally:
+            checkpoint.close()
+
+    def test_append_only(self):
+        """Test that reopening a manifest only appends to it."""
+        with BatchCheckpoint(self.path) as checkpoint:
+            checkpoint.record_file("/photos/a.jpg", self.gps_data)
+        with open(self.path) as f:
+            first = f.read()
+
+        with BatchCheckpoint(self.path) as checkpoint:
+            checkpoint.record_file("/photos/b.jpg", None)
+        with open(self.path) as f:
+            second = f.read()
+
+        # Assertions
+        self.assertTrue(second.startswith(first))
+        self.assertEqual(len(second.splitlines()), 3)
+
+    def test_truncated_record(self):
+        """Test that a record cut short by a crash is ignored."""
+        with BatchCheckpoint(self.path) as checkpoint:
+            checkpoint.record_file("/photos/a.jpg", self.gps_data)
+        with open(self.path, "a") as f:
+            f.write('{"file":"/photos/b.jp')
+
+        with BatchCheckpoint(self.path) as checkpoint:
+            # Assertions
+            self.assertEqual(checkpoint.get("/photos/a.jpg"), self.gps_data)
+            self.assertIs(checkpoint.get("/photos/b.jpg"), MISS)
+            checkpoint.record_file("/photos/b.jpg", None)
+
+        with BatchCheckpoint(self.path) as checkpoint:
+            self.assertIsNone(checkpoint.get("/photos/b.jpg"))
+
+    def test_different_options_start_over(self):
+        """Test that progress recorded with other options is discarded."""
+        with BatchCheckpoint(self.path, {'recursive': False}) as checkpoint:
+            checkpoint.record_done("/photos", None, False)
+
+        with redirect_stdout(io.StringIO()):
+            checkpoint = BatchCheckpoint(self.path, {'recursive': True})
+        try:
+            # Assertions
+            self.assertFalse(checkpoint.is_done("/photos"))
+        finally:
+            checkpoint.close()
+
+
+class TestResumableBatch(unittest.TestCase):
+    """Test cases for resuming batch mode from a checkpoint."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        self.checkpoint_path = os.path.join(self.test_dir, "batch.checkpoint")
+        self.dirs = []
+        for name in ("first", "second"):
+            dir_path = os.path.join(self.test_dir, name)
+            os.makedirs(dir_path)
+            for i in range(3):
+                with open(os.path.join(dir_path, f"{name}{i}.jpg"), "wb") as f:
+                    f.write(build_jpeg(build_exif_tiff(40.0 + i, 10.0, 100.0)))
+            self.dirs.append(dir_path)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def run_batch(self):
+        """Run batch mode with the checkpoint, counting extractions."""
+        args = ["-b"] + self.dirs + ["--checkpoint", self.checkpoint_path, "--no-cache"]
+        with patch("pixtrail.core.ExifReader.extract_gps_data",
+                   wraps=ExifReader.extract_gps_data) as mock_extract:
+            with redirect_stdout(io.StringIO()):
+                exit_code = main(args)
+        return exit_code, mock_extract.call_count
+
+    def test_resume(self):
+        """Test that a restarted run skips finished directories and files."""
+        # Simulate a run that finished the first directory and one file of the second
+        with BatchCheckpoint(self.checkpoint_path, {'recursive': False}) as checkpoint:
+            checkpoint.record_done(self.dirs[0], "first.gpx", True)
+            first_file = os.path.join(self.dirs[1], "second0.jpg")
+            checkpoint.record_file(first_file, ExifReader.extract_gps_data(first_file))
+
+        exit_code, extractions = self.run_batch()
+
+        # Assertions
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(extractions, 2)
+        gpx_files = [name for name in os.listdir(self.dirs[1]) if name.endswith(".gpx")]
+        self.assertEqual(len(gpx_files), 1)
+        with open(os.path.join(self.dirs[1], gpx_files[0])) as f:
+            self.assertEqual(f.read().count("<wpt"), 3)
+
+        # A second restart has nothing left to do
+        exit_code, extractions = self.run_batch()
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(extractions, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Tests for the cli module.
+"""
+
+import io
+import os
+import shutil
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+
+import gpxpy
+
+from pixtrail.cli import get_batch_output_path, main
+from tests.test_exif_reader import build_exif_tiff, build_jpeg
+
+
+class TestBatchMode(unittest.TestCase):
+    """Test cases for batch mode."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        self.output_dir = os.path.join(self.test_dir, "output")
+        self.dirs = []
+        for name, count in (("trip one", 3), ("trip-two", 1), ("no gps", 0)):
+            dir_path = os.path.join(self.test_dir, name)
+            os.makedirs(dir_path)
+            for i in range(count):
+                with open(os.path.join(dir_path, f"photo{i}.jpg"), "wb") as f:
+                    f.write(build_jpeg(build_exif_tiff(48.0 + i, 11.0, 500.0)))
+            self.dirs.append(dir_path)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_get_batch_output_path(self):
+        """Test output naming for batch mode."""
+        # Assertions
+        self.assertEqual(
+            get_batch_output_path("/photos/trip: one/", "/out"),
+            os.path.join("/out", "trip one.gpx")
+        )
+        self.assertEqual(
+            get_batch_output_path("/photos/...", "/out"),
+            os.path.join("/out", "PixTrail.gpx")
+        )
+
+    def test_batch(self):
+        """Test writing one GPX file per directory with a summary."""
+        output = io.StringIO()
+        with redirect_stdout(output):
+            exit_code = main(["-b"] + self.dirs + ["-d", self.output_dir, "-j", "2", "--no-cache"])
+
+        # Assertions
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ["trip one.gpx", "trip-two.gpx"])
+        text = output.getvalue()
+        self.assertIn("3 of 3 images with GPS data", text)
+        self.assertIn("Batch processing completed: 2 succeeded, 1 failed", text)
+        self.assertIn("Processed 4 files in", text)
+        self.assertIn("files/sec", text)
+
+    def test_batch_progress(self):
+        """Test the progress bar on standard error."""
+        progress = io.StringIO()
+        with redirect_stdout(io.StringIO()), redirect_stderr(progress):
+            exit_code = main(["-b"] + self.dirs + ["-d", self.output_dir, "--progress", "--no-cache"])
+
+        # Assertions
+        self.assertEqual(exit_code, 0)
+        self.assertTrue(progress.getvalue().endswith("\n"))
+        self.assertIn("4/4 files (100%)", progress.getvalue())
+
+    def test_batch_stats(self):
+        """Test the route statistics report of each directory."""
+        output = io.StringIO()
+        with redirect_stdout(output):
+            exit_code = main(["-b"] + self.dirs + ["-d", self.output_dir, "--stats", "--no-cache"])
+
+        # Assertions
+        self.assertEqual(exit_code, 0)
+        text = output.getvalue()
+        self.assertEqual(text.count("Route statistics"), 2)
+        self.assertIn("Photos: 3", text)
+        self.assertIn("Distance: 0.00 km", text)
+        self.assertIn("Route statistics: not enough points", text)
+
+    def test_stream(self):
+        """Test streaming a single directory to a GPX file."""
+        output_path = os.path.join(self.output_dir, "trip.gpx")
+        output = io.StringIO()
+        with redirect_stdout(output):
+            exit_code = main(["-i", self.dirs[0], "-o", output_path, "--stream", "--no-cache"])
+
+        # Assertions
+        self.assertEqual(exit_code, 0)
+        self.assertIn("Processed 3 images with GPS data", output.getvalue())
+        with open(output_path) as f:
+            gpx = gpxpy.parse(f)
+        self.assertEqual(sorted(w.name for w in gpx.waypoints), ["photo0.jpg", "photo1.jpg", "photo2.jpg"])
+        self.assertEqual(len(gpx.tracks[0].segments[0].points), 3)
+
+    def test_stream_rejects_batch_and_stats(self):
+        """Test that --stream only applies to a single directory without --stats."""
+        with redirect_stdout(io.StringIO()):
+            batch_exit_code = main(["-b"] + self.dirs + ["--stream", "--no-cache"])
+            stats_exit_code = main(["-i", self.dirs[0], "--stream", "--stats", "--no-cache"])
+
+        # Assertions
+        self.assertEqual(batch_exit_code, 1)
+        self.assertEqual(stats_exit_code, 1)
+        self.assertFalse(os.path.exists(self.output_dir))
+
+    def test_batch_no_valid_directories(self):
+        """Test batch mode without any existing directory."""
+        with redirect_stdout(io.StringIO()):
+            exit_code = main(["-b", os.path.join(self.test_dir, "missing"), "--no-cache"])
+
+        # Assertions
+        self.assertEqual(exit_code, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
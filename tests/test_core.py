@@ -2,11 +2,19 @@
 Tests for the core module.
 """
 
+import io
 import os
+import shutil
+import time
 import unittest
+from contextlib import redirect_stdout
 from unittest.mock import patch, MagicMock
 
+import gpxpy
+
+from pixtrail.cache import ExtractionCache
 from pixtrail.core import PixTrail
+from tests.test_exif_reader import build_exif_tiff, build_jpeg
 
 
 class TestPixTrail(unittest.TestCase):
@@ -21,11 +29,7 @@ class TestPixTrail(unittest.TestCase):
     def tearDown(self):
         """Clean up test fixtures."""
         if os.path.exists(self.test_dir):
-            # Remove test files
-            for file in os.listdir(self.test_dir):
-                os.remove(os.path.join(self.test_dir, file))
-            # Remove test directory
-            os.rmdir(self.test_dir)
+            shutil.rmtree(self.test_dir)
 
     @patch("pixtrail.core.get_image_files")
     @patch("pixtrail.core.ExifReader.extract_gps_data")
@@ -49,10 +53,12 @@ class TestPixTrail(unittest.TestCase):
         result = self.pixtrail.process_directory(self.test_dir)
 
         # Assertions
-        self.assertEqual(len(result), 2)  # Only two images have GPS data
-        self.assertEqual(result[0]["latitude"], 52.5200)
-        self.assertEqual(result[1]["longitude"], 2.3522)
-        mock_get_image_files.assert_called_once_with(self.test_dir, False)
+        gps_data = result["gps_data"]
+        self.assertEqual(len(gps_data), 2)  # Only two images have GPS data
+        self.assertEqual(gps_data[0]["latitude"], 52.5200)
+        self.assertEqual(gps_data[1]["longitude"], 2.3522)
+        self.assertEqual(result["stats"], {"total": 3, "processed": 2, "skipped": 1})
+        mock_get_image_files.assert_called_once_with(self.test_dir, False, None)
         self.assertEqual(mock_extract_gps.call_count, 3)
 
     @patch("pixtrail.core.GPXGenerator.create_gpx")
@@ -89,7 +95,10 @@ class TestPixTrail(unittest.TestCase):
         ]
         
         # Set mock return values
-        mock_process_directory.return_value = gps_data
+        mock_process_directory.return_value = {
+            "gps_data": gps_data,
+            "stats": {"total": 2, "processed": 2, "skipped": 0}
+        }
         mock_generate_gpx.return_value = True
         
         # Set GPS data list
@@ -116,6 +125,226 @@ class TestPixTrail(unittest.TestCase):
         # Assertions
         self.assertFalse(result)
 
+    def test_process_directory_parallel(self):
+        """Test that parallel extraction matches sequential extraction."""
+        # Create geotagged images and one image without EXIF data
+        for i in range(12):
+            with open(os.path.join(self.test_dir, f"img{i:02d}.jpg"), "wb") as f:
+                f.write(build_jpeg(build_exif_tiff(40.0 + i / 10.0, 10.0 - i / 10.0, 100.0 + i)))
+        with open(os.path.join(self.test_dir, "no_gps.jpg"), "wb") as f:
+            f.write(b"\xff\xd8\xff\xd9")
+        
+        sequential = PixTrail().process_directory(self.test_dir)
+        parallel = PixTrail(workers=3).process_directory(self.test_dir)
+        
+        # Assertions
+        self.assertEqual(parallel["stats"], {"total": 13, "processed": 12, "skipped": 1})
+        self.assertEqual(parallel["stats"], sequential["stats"])
+        self.assertEqual(
+            [p["name"] for p in parallel["gps_data"]],
+            [p["name"] for p in sequential["gps_data"]]
+        )
+        self.assertEqual(
+            [(p["latitude"], p["longitude"], p["altitude"]) for p in parallel["gps_data"]],
+            [(p["latitude"], p["longitude"], p["altitude"]) for p in sequential["gps_data"]]
+        )
+
+    @patch("pixtrail.core.get_image_files")
+    def test_process_directory_io_concurrency(self, mock_get_image_files):
+        """Test that concurrent reads overlap simulated filesystem latency."""
+        image_files = [os.path.join(self.test_dir, f"img{i:02d}.jpg") for i in range(20)]
+        mock_get_image_files.return_value = image_files
+        
+        def slow_extract(image_path, **kwargs):
+            # Simulate a high-latency network filesystem
+            time.sleep(0.05)
+            return {"latitude": 1.0, "longitude": 2.0, "name": os.path.basename(image_path)}
+        
+        with patch("pixtrail.core.ExifReader.extract_gps_data", side_effect=slow_extract):
+            start = time.perf_counter()
+            sequential = PixTrail().process_directory(self.test_dir)
+            sequential_time = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            concurrent = PixTrail(io_concurrency=20).process_directory(self.test_dir)
+            concurrent_time = time.perf_counter() - start
+        
+        # Assertions
+        self.assertEqual(concurrent["stats"], sequential["stats"])
+        self.assertEqual(
+            [p["name"] for p in concurrent["gps_data"]],
+            [os.path.basename(f) for f in image_files]
+        )
+        self.assertLess(concurrent_time, sequential_time / 3)
+
+    def test_process_directory_with_cache(self):
+        """Test that a second run is served from the extraction cache."""
+        for i in range(3):
+            with open(os.path.join(self.test_dir, f"img{i}.jpg"), "wb") as f:
+                f.write(build_jpeg(build_exif_tiff(40.0 + i, 10.0, 100.0)))
+        with open(os.path.join(self.test_dir, "no_gps.jpg"), "wb") as f:
+            f.write(b"\xff\xd8\xff\xd9")
+        cache_path = os.path.join(self.test_dir, "cache.sqlite3")
+        
+        first = PixTrail(cache_path=cache_path).process_directory(self.test_dir)
+        with patch("pixtrail.core.ExifReader.extract_gps_data") as mock_extract:
+            second = PixTrail(cache_path=cache_path).process_directory(self.test_dir)
+        
+        # Assertions
+        self.assertEqual(first["stats"]["cache_misses"], 4)
+        self.assertEqual(first["stats"]["cache_hits"], 0)
+        self.assertEqual(second["stats"]["cache_hits"], 4)
+        self.assertEqual(second["stats"]["cache_misses"], 0)
+        self.assertEqual(second["stats"]["processed"], 3)
+        self.assertEqual(second["stats"]["skipped"], 1)
+        self.assertEqual(second["gps_data"], first["gps_data"])
+        mock_extract.assert_not_called()
+
+    def test_cache_keeps_undated_photos_undated(self):
+        """Test that the current-time fallback is applied after the cache lookup."""
+        with open(os.path.join(self.test_dir, "undated.jpg"), "wb") as f:
+            f.write(build_jpeg(build_exif_tiff(40.0, 10.0, 100.0, date_str='unknown')))
+        cache_path = os.path.join(self.test_dir, "cache.sqlite3")
+        
+        first = PixTrail(cache_path=cache_path).process_directory(self.test_dir)
+        time.sleep(0.01)
+        second = PixTrail(cache_path=cache_path).process_directory(self.test_dir)
+        
+        # Assertions
+        self.assertEqual(second["stats"]["cache_hits"], 1)
+        self.assertGreater(second["gps_data"][0]["timestamp"], first["gps_data"][0]["timestamp"])
+        with ExtractionCache(cache_path) as cache:
+            image_path = os.path.join(self.test_dir, "undated.jpg")
+            cached = cache.get(image_path, os.stat(image_path))
+        self.assertIsNone(cached["timestamp"])
+
+    def test_iter_points(self):
+        """Test streaming points in every extraction mode."""
+        for i in range(10):
+            with open(os.path.join(self.test_dir, f"img{i:02d}.jpg"), "wb") as f:
+                f.write(build_jpeg(build_exif_tiff(40.0 + i / 10.0, 10.0, 100.0)))
+        with open(os.path.join(self.test_dir, "no_gps.jpg"), "wb") as f:
+            f.write(b"\xff\xd8\xff\xd9")
+        cache_path = os.path.join(self.test_dir, "cache.sqlite3")
+        expected = {"img%02d.jpg" % i for i in range(10)}
+        
+        for pixtrail in (
+            PixTrail(),
+            PixTrail(workers=2),
+            PixTrail(io_concurrency=4),
+            PixTrail(workers=2, cache_path=cache_path),
+            PixTrail(io_concurrency=4, cache_path=cache_path),
+        ):
+            stats = {}
+            points = list(pixtrail.iter_points(self.test_dir, stats=stats))
+            
+            # Assertions
+            self.assertEqual({p["name"] for p in points}, expected)
+            self.assertEqual(stats["total"], 11)
+            self.assertEqual(stats["processed"], 10)
+            self.assertEqual(stats["skipped"], 1)
+        
+        # The last run was served from the cache
+        self.assertEqual(stats["cache_hits"], 11)
+
+    def test_stream_and_generate(self):
+        """Test writing a GPX file from streamed points."""
+        for i in range(5):
+            with open(os.path.join(self.test_dir, f"img{i}.jpg"), "wb") as f:
+                f.write(build_jpeg(build_exif_tiff(40.0 + i, 10.0, 100.0)))
+        with open(os.path.join(self.test_dir, "no_gps.jpg"), "wb") as f:
+            f.write(b"\xff\xd8\xff\xd9")
+        output_path = os.path.join(self.test_dir, "out", "track.gpx")
+        
+        with redirect_stdout(io.StringIO()):
+            result = PixTrail(workers=2).stream_and_generate(self.test_dir, output_path)
+            empty = PixTrail().stream_and_generate(os.path.join(self.test_dir, "out"))
+        
+        # Assertions
+        self.assertEqual(result["output_path"], output_path)
+        self.assertEqual(result["stats"]["processed"], 5)
+        self.assertEqual(result["stats"]["skipped"], 1)
+        with open(output_path) as f:
+            gpx = gpxpy.parse(f)
+        self.assertEqual(sorted(w.name for w in gpx.waypoints), [f"img{i}.jpg" for i in range(5)])
+        self.assertFalse(empty)
+
+    def test_iter_points_early_exit(self):
+        """Test that abandoning the stream stops discovery and extraction."""
+        for i in range(20):
+            with open(os.path.join(self.test_dir, f"img{i:02d}.jpg"), "wb") as f:
+                f.write(build_jpeg(build_exif_tiff(40.0, 10.0, 100.0)))
+        
+        points = PixTrail(io_concurrency=4).iter_points(self.test_dir)
+        first = next(points)
+        points.close()
+        
+        # Assertions
+        self.assertIn("latitude", first)
+
+    def test_iter_points_directory_not_found(self):
+        """Test that a missing directory raises FileNotFoundError."""
+        with self.assertRaises(FileNotFoundError):
+            list(PixTrail().iter_points(os.path.join(self.test_dir, "missing")))
+
+    def _make_batch_dirs(self):
+        """Create directories of different sizes for batch processing."""
+        sizes = {"big": 9, "empty": 0, "small": 2}
+        dirs = []
+        for name, count in sizes.items():
+            dir_path = os.path.join(self.test_dir, name)
+            os.makedirs(dir_path)
+            for i in range(count):
+                with open(os.path.join(dir_path, f"{name}{i}.jpg"), "wb") as f:
+                    f.write(build_jpeg(build_exif_tiff(40.0 + i, 10.0, 100.0)))
+            dirs.append(dir_path)
+        with open(os.path.join(dirs[0], "no_gps.jpg"), "wb") as f:
+            f.write(b"\xff\xd8\xff\xd9")
+        return dirs
+
+    def test_process_directories(self):
+        """Test that batch results are regrouped per directory in input order."""
+        dirs = self._make_batch_dirs()
+        missing = os.path.join(self.test_dir, "missing")
+
+        for workers in (1, 2):
+            with redirect_stdout(io.StringIO()):
+                results = list(PixTrail(workers=workers).process_directories(dirs + [missing]))
+
+            # Assertions
+            self.assertEqual([dir_path for dir_path, _ in results], dirs + [missing])
+            self.assertEqual(
+                [result["stats"] for _, result in results],
+                [
+                    {"total": 10, "processed": 9, "skipped": 1},
+                    {"total": 0, "processed": 0, "skipped": 0},
+                    {"total": 2, "processed": 2, "skipped": 0},
+                    {"total": 0, "processed": 0, "skipped": 0}
+                ]
+            )
+            self.assertEqual(
+                [p["name"] for p in results[2][1]["gps_data"]],
+                ["small0.jpg", "small1.jpg"]
+            )
+            self.assertTrue(all(result["seconds"] >= 0 for _, result in results))
+
+    def test_process_directories_yields_each_directory_when_done(self):
+        """Test that a directory is yielded before later directories are extracted."""
+        dirs = self._make_batch_dirs()
+        extracted = []
+        original = PixTrail._extract_stream
+
+        def recording_stream(pixtrail, image_files, *args, **kwargs):
+            for image_path, gps_data in zip(image_files, original(pixtrail, image_files, *args, **kwargs)):
+                extracted.append(image_path)
+                yield gps_data
+
+        with patch.object(PixTrail, "_extract_stream", recording_stream):
+            for dir_path, result in PixTrail().process_directories(dirs):
+                if dir_path == dirs[0]:
+                    # Assertions
+                    self.assertEqual(len(extracted), 10)
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
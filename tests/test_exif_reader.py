@@ -3,6 +3,7 @@ Tests for the exif_reader module.
 """
 
 import os
+import struct
 import unittest
 from datetime import datetime
 from unittest.mock import patch, MagicMock, mock_open
@@ -10,6 +11,61 @@ from unittest.mock import patch, MagicMock, mock_open
 from pixtrail.exif_reader import ExifReader
 
 
+def build_exif_tiff(lat, lon, alt, date_str='2023:01:01 12:00:00'):
+    """Build a little-endian TIFF structure with IFD0 DateTime and a GPS IFD."""
+    def rationals(values):
+        return b''.join(struct.pack('<II', int(round(v * 1000)), 1000) for v in values)
+
+    def dms(value):
+        value = abs(value)
+        degrees = int(value)
+        minutes = int((value - degrees) * 60)
+        seconds = (value - degrees - minutes / 60.0) * 3600
+        return [degrees, minutes, seconds]
+
+    ifd0_offset = 8
+    ifd0_size = 2 + 2 * 12 + 4
+    gps_offset = ifd0_offset + ifd0_size
+    gps_size = 2 + 6 * 12 + 4
+    data_offset = gps_offset + gps_size
+
+    date_bytes = date_str.encode('ascii') + b'\x00'
+    lat_bytes = rationals(dms(lat))
+    lon_bytes = rationals(dms(lon))
+    alt_bytes = rationals([abs(alt)])
+    date_off = data_offset
+    lat_off = date_off + len(date_bytes)
+    lon_off = lat_off + len(lat_bytes)
+    alt_off = lon_off + len(lon_bytes)
+
+    def entry(tag, field_type, count, value):
+        return struct.pack('<HHI', tag, field_type, count) + value
+
+    ifd0 = struct.pack('<H', 2)
+    ifd0 += entry(0x0132, 2, len(date_bytes), struct.pack('<I', date_off))
+    ifd0 += entry(0x8825, 4, 1, struct.pack('<I', gps_offset))
+    ifd0 += struct.pack('<I', 0)
+
+    gps = struct.pack('<H', 6)
+    gps += entry(1, 2, 2, (b'N' if lat >= 0 else b'S') + b'\x00\x00\x00')
+    gps += entry(2, 5, 3, struct.pack('<I', lat_off))
+    gps += entry(3, 2, 2, (b'E' if lon >= 0 else b'W') + b'\x00\x00\x00')
+    gps += entry(4, 5, 3, struct.pack('<I', lon_off))
+    gps += entry(5, 1, 1, (b'\x01' if alt < 0 else b'\x00') + b'\x00\x00\x00')
+    gps += entry(6, 5, 1, struct.pack('<I', alt_off))
+    gps += struct.pack('<I', 0)
+
+    return (b'II*\x00' + struct.pack('<I', ifd0_offset) + ifd0 + gps
+            + date_bytes + lat_bytes + lon_bytes + alt_bytes)
+
+
+def build_jpeg(tiff_bytes, payload_size=0):
+    """Wrap TIFF bytes in a JPEG APP1 segment followed by filler scan data."""
+    app1 = b'Exif\x00\x00' + tiff_bytes
+    return (b'\xff\xd8' + b'\xff\xe1' + struct.pack('>H', len(app1) + 2) + app1
+            + b'\xff\xda' + struct.pack('>H', 2) + b'\x00' * payload_size + b'\xff\xd9')
+
+
 class TestExifReader(unittest.TestCase):
     """Test cases for the ExifReader class."""
 
@@ -172,6 +228,119 @@ class TestExifReader(unittest.TestCase):
         result = ExifReader._convert_to_degrees(test_values)
         self.assertAlmostEqual(result, 52.5, places=4)
 
+    def test_extract_gps_fast_path_jpeg(self):
+        """Test the header-only parser on a JPEG file."""
+        with open(self.test_image, "wb") as f:
+            f.write(build_jpeg(build_exif_tiff(52.5, -13.4, -20.0), payload_size=100000))
+        
+        io_stats = {}
+        with patch("exifread.process_file") as mock_process_file:
+            result = ExifReader.extract_gps_data(self.test_image, io_stats)
+        
+        # Assertions
+        mock_process_file.assert_not_called()
+        self.assertEqual(io_stats['parser'], 'fast')
+        self.assertLess(io_stats['bytes_read'], 1000)
+        self.assertAlmostEqual(result['latitude'], 52.5, places=4)
+        self.assertAlmostEqual(result['longitude'], -13.4, places=4)
+        self.assertAlmostEqual(result['altitude'], -20.0)
+        self.assertEqual(result['timestamp'], datetime(2023, 1, 1, 12, 0, 0))
+        self.assertEqual(result['name'], os.path.basename(self.test_image))
+
+    def test_extract_gps_timestamp_fallback(self):
+        """Test that images without a valid DateTime get the current time."""
+        with open(self.test_image, "wb") as f:
+            f.write(build_jpeg(build_exif_tiff(52.5, -13.4, -20.0, date_str='unknown')))
+        
+        before = datetime.now()
+        result = ExifReader.extract_gps_data(self.test_image)
+        without_fallback = ExifReader.extract_gps_data(self.test_image, timestamp_fallback=False)
+        
+        # Assertions
+        self.assertGreaterEqual(result['timestamp'], before)
+        self.assertIsNone(without_fallback['timestamp'])
+        self.assertAlmostEqual(without_fallback['latitude'], 52.5, places=4)
+
+    def test_extract_gps_fast_path_tiff(self):
+        """Test the header-only parser on a TIFF-based raw file."""
+        with open(self.test_image, "wb") as f:
+            f.write(build_exif_tiff(-33.8688, 151.2093, 58.0))
+        
+        io_stats = {}
+        result = ExifReader.extract_gps_data(self.test_image, io_stats)
+        
+        # Assertions
+        self.assertEqual(io_stats['parser'], 'fast')
+        self.assertAlmostEqual(result['latitude'], -33.8688, places=4)
+        self.assertAlmostEqual(result['longitude'], 151.2093, places=4)
+        self.assertAlmostEqual(result['altitude'], 58.0)
+
+    def test_extract_gps_fast_path_matches_exifread(self):
+        """Test that the fast path and exifread agree on the same file."""
+        with open(self.test_image, "wb") as f:
+            f.write(build_jpeg(build_exif_tiff(48.8566, 2.3522, 35.0)))
+        
+        fast_result = ExifReader.extract_gps_data(self.test_image)
+        with patch("pixtrail.exif_reader.ExifReader._extract_gps_fast",
+                   side_effect=struct.error("unsupported")):
+            io_stats = {}
+            exifread_result = ExifReader.extract_gps_data(self.test_image, io_stats)
+        
+        # Assertions
+        self.assertEqual(io_stats['parser'], 'exifread')
+        self.assertEqual(fast_result, exifread_result)
+
+    @patch("exifread.process_file")
+    def test_extract_gps_fast_path_falls_back(self, mock_process_file):
+        """Test falling back to exifread for files the fast path can't handle."""
+        mock_process_file.return_value = {}
+        with open(self.test_image, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n" + b"\x00" * 32)
+        
+        io_stats = {}
+        result = ExifReader.extract_gps_data(self.test_image, io_stats)
+        
+        # Assertions
+        self.assertIsNone(result)
+        self.assertEqual(io_stats['parser'], 'exifread')
+        mock_process_file.assert_called_once()
+
+
+    def test_extract_gps_from_header(self):
+        """Test reading GPS data from the start of a file only."""
+        data = build_jpeg(build_exif_tiff(52.5, -13.4, -20.0), payload_size=100000)
+        header_size = data.index(b'\xff\xda')
+        
+        result = ExifReader.extract_gps_from_header(data[:header_size + 4], "photo.jpg")
+        
+        # Assertions
+        self.assertAlmostEqual(result['latitude'], 52.5, places=4)
+        self.assertAlmostEqual(result['longitude'], -13.4, places=4)
+        self.assertEqual(result['name'], "photo.jpg")
+        with self.assertRaises(ValueError):
+            ExifReader.extract_gps_from_header(data[:header_size - 40], "photo.jpg")
+        with self.assertRaises(ValueError):
+            ExifReader.extract_gps_from_header(b"\x89PNG\r\n\x1a\n", "photo.png")
+
+    def test_extract_gps_fast(self):
+        """Test the fast path alone, recording the bytes it reads."""
+        data = build_jpeg(build_exif_tiff(52.5, -13.4, -20.0), payload_size=100000)
+        with open(self.test_image, "wb") as f:
+            f.write(data)
+        record = bytearray()
+        
+        result = ExifReader.extract_gps_fast(self.test_image, record)
+        
+        # Assertions
+        self.assertAlmostEqual(result['latitude'], 52.5, places=4)
+        self.assertEqual(result['name'], "test.jpg")
+        self.assertLess(len(record), 1000)
+        self.assertTrue(data.startswith(bytes(record[:4])))
+        with open(self.test_image, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n")
+        with self.assertRaises(ValueError):
+            ExifReader.extract_gps_fast(self.test_image)
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
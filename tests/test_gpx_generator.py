@@ -3,6 +3,8 @@ Tests for the gpx_generator module.
 """
 
 import os
+import re
+import threading
 import unittest
 from datetime import datetime
 from unittest.mock import patch, mock_open, MagicMock
@@ -20,6 +22,7 @@ class TestGPXGenerator(unittest.TestCase):
         self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
         os.makedirs(self.test_dir, exist_ok=True)
         self.test_gpx = os.path.join(self.test_dir, "test.gpx")
+        self.reference_gpx = os.path.join(self.test_dir, "reference.gpx")
         
         # Sample GPS data for testing
         self.test_gps_data = [
@@ -41,8 +44,9 @@ class TestGPXGenerator(unittest.TestCase):
 
     def tearDown(self):
         """Clean up test fixtures."""
-        if os.path.exists(self.test_gpx):
-            os.remove(self.test_gpx)
+        for path in (self.test_gpx, self.reference_gpx):
+            if os.path.exists(path):
+                os.remove(path)
         if os.path.exists(self.test_dir):
             os.rmdir(self.test_dir)
 
@@ -82,6 +86,7 @@ class TestGPXGenerator(unittest.TestCase):
         self.assertFalse(result)
         self.assertFalse(os.path.exists(self.test_gpx))
 
+    @patch("pixtrail.gpx_generator.fcntl", None)
     @patch("os.path.isfile")
     @patch("builtins.open", new_callable=mock_open)
     @patch("gpxpy.parse")
@@ -141,6 +146,163 @@ class TestGPXGenerator(unittest.TestCase):
         handle = mock_file()
         self.assertTrue(handle.write.called)
 
+    def _read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_create_gpx_matches_gpxpy(self):
+        """Test that the streaming writer produces the same bytes as gpxpy."""
+        gps_data = self.test_gps_data + [
+            {
+                'latitude': -0.0000001,
+                'longitude': 0.0,
+                'altitude': None,
+                'timestamp': datetime(2023, 1, 1, 8, 30, 0, 250000),
+                'name': 'a & <b>.jpg'
+            },
+            {'latitude': 10, 'longitude': 20, 'timestamp': datetime(2023, 1, 3)},
+            {'latitude': 10.5, 'longitude': 20.5, 'altitude': 0, 'name': None},
+            {'name': 'no-coordinates.jpg'},
+        ]
+        
+        # Create GPX files with both writers
+        self.assertTrue(GPXGenerator.create_gpx(gps_data, self.test_gpx))
+        self.assertTrue(GPXGenerator.create_gpx(gps_data, self.reference_gpx, use_gpxpy=True))
+        
+        # Assertions
+        self.assertEqual(self._read(self.test_gpx), self._read(self.reference_gpx))
+        parsed = gpxpy.parse(self._read(self.test_gpx))
+        self.assertEqual(len(parsed.waypoints), 5)
+        self.assertEqual(len(parsed.tracks[0].segments[0].points), 5)
+
+    def test_write_gpx_stream(self):
+        """Test writing a GPX file from an iterator of points."""
+        points = iter(self.test_gps_data)
+        
+        # Write the stream and a reference file
+        self.assertTrue(GPXGenerator.write_gpx_stream(points, self.test_gpx))
+        GPXGenerator.create_gpx(self.test_gps_data, self.reference_gpx, use_gpxpy=True)
+        
+        # Assertions
+        self.assertEqual(self._read(self.test_gpx), self._read(self.reference_gpx))
+
+    def test_write_gpx_stream_empty(self):
+        """Test that an empty stream doesn't create a file."""
+        result = GPXGenerator.write_gpx_stream(iter([]), self.test_gpx)
+        
+        # Assertions
+        self.assertFalse(result)
+        self.assertFalse(os.path.exists(self.test_gpx))
+
+    def test_add_waypoints_appends_in_place(self):
+        """Test that repeated appends keep the file valid without re-parsing it."""
+        GPXGenerator.add_waypoint_to_gpx(self.test_gpx, 52.52, 13.405, name="first.jpg")
+        
+        with patch("gpxpy.parse") as mock_parse:
+            for i in range(200):
+                result = GPXGenerator.add_waypoint_to_gpx(
+                    self.test_gpx,
+                    40.0 + i / 1000.0,
+                    10.0,
+                    name=f"img{i}.jpg",
+                    altitude=float(i),
+                    timestamp=datetime(2023, 1, 1, 12, 0, i % 60)
+                )
+                self.assertTrue(result)
+        
+        # Assertions
+        mock_parse.assert_not_called()
+        with open(self.test_gpx) as f:
+            gpx = gpxpy.parse(f)
+        self.assertEqual(len(gpx.waypoints), 201)
+        self.assertEqual(len(gpx.tracks[0].segments[0].points), 201)
+        self.assertEqual(gpx.waypoints[0].name, "first.jpg")
+        self.assertEqual(gpx.waypoints[-1].name, "img199.jpg")
+        self.assertEqual(gpx.tracks[0].segments[0].points[-1].elevation, 199.0)
+
+    def test_add_waypoints_to_gpx_batch(self):
+        """Test adding a batch of waypoints to a file created by create_gpx."""
+        GPXGenerator.create_gpx(self.test_gps_data, self.test_gpx)
+        
+        result = GPXGenerator.add_waypoints_to_gpx(self.test_gpx, self.test_gps_data)
+        # A second call uses the in-place path
+        result_again = GPXGenerator.add_waypoints_to_gpx(self.test_gpx, self.test_gps_data)
+        
+        # Assertions
+        self.assertTrue(result)
+        self.assertTrue(result_again)
+        with open(self.test_gpx) as f:
+            gpx = gpxpy.parse(f)
+        self.assertEqual(len(gpx.waypoints), 6)
+        self.assertEqual(len(gpx.tracks[0].segments[0].points), 6)
+        self.assertEqual([w.name for w in gpx.waypoints[2:4]], ['test1.jpg', 'test2.jpg'])
+
+    @patch("pixtrail.gpx_generator.MAX_APPEND_GAP", 8192)
+    def test_add_waypoints_moves_track_to_new_file(self):
+        """Test that a used-up gap is replaced through a new file with a capped gap."""
+        GPXGenerator.add_waypoint_to_gpx(self.test_gpx, 52.52, 13.405, name="first.jpg")
+        points = [
+            {'latitude': 40.0, 'longitude': 10.0, 'name': f"img{i}.jpg"} for i in range(10)
+        ]
+        
+        with patch("os.replace", wraps=os.replace) as mock_replace:
+            results = [GPXGenerator.add_waypoints_to_gpx(self.test_gpx, points) for _ in range(50)]
+        
+        # Assertions
+        self.assertTrue(all(results))
+        self.assertTrue(mock_replace.called)
+        self.assertEqual(os.listdir(self.test_dir), ["test.gpx"])
+        content = self._read(self.test_gpx)
+        self.assertLessEqual(max(len(run) for run in re.findall(r' {10,}', content)), 8192)
+        with open(self.test_gpx) as f:
+            gpx = gpxpy.parse(f)
+        self.assertEqual(len(gpx.waypoints), 501)
+        self.assertEqual(len(gpx.tracks[0].segments[0].points), 501)
+
+    @patch("pixtrail.gpx_generator.MIN_APPEND_GAP", 512)
+    @patch("pixtrail.gpx_generator.MAX_APPEND_GAP", 1024)
+    def test_add_waypoints_concurrently(self):
+        """Test that concurrent appends to the same file are all kept."""
+        GPXGenerator.add_waypoint_to_gpx(self.test_gpx, 52.52, 13.405, name="first.jpg")
+        
+        def append(thread):
+            for i in range(25):
+                GPXGenerator.add_waypoint_to_gpx(self.test_gpx, 40.0, 10.0, name=f"t{thread}-{i}.jpg")
+        
+        threads = [threading.Thread(target=append, args=(thread,)) for thread in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        # Assertions
+        with open(self.test_gpx) as f:
+            gpx = gpxpy.parse(f)
+        self.assertEqual(len(gpx.waypoints), 101)
+        self.assertEqual(len(gpx.tracks[0].segments[0].points), 101)
+        self.assertEqual(
+            sorted(w.name for w in gpx.waypoints[1:]),
+            sorted(f"t{thread}-{i}.jpg" for thread in range(4) for i in range(25))
+        )
+
+    def test_add_waypoints_to_gpx_corrupted_layout(self):
+        """Test that a file with a stale append marker falls back to parsing."""
+        GPXGenerator.add_waypoint_to_gpx(self.test_gpx, 52.52, 13.405, name="first.jpg")
+        
+        # Rewrite the file without the gap but with the marker
+        with open(self.test_gpx) as f:
+            content = f.read()
+        with open(self.test_gpx, 'w') as f:
+            f.write(re.sub(r' {10,}', '', content))
+        
+        result = GPXGenerator.add_waypoint_to_gpx(self.test_gpx, 48.85, 2.35, name="second.jpg")
+        
+        # Assertions
+        self.assertTrue(result)
+        with open(self.test_gpx) as f:
+            gpx = gpxpy.parse(f)
+        self.assertEqual([w.name for w in gpx.waypoints], ["first.jpg", "second.jpg"])
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,297 @@
+"""
+Tests for the background job queue of the web interface.
+"""
+
+import io
+import json
+import os
+import shutil
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from pixtrail.web import create_app
+from pixtrail.web.jobs import JOB_DONE, JOB_FAILED, JOB_QUEUED, SLOTS_DIR, JobQueue
+from pixtrail.web.routes import get_job_queue
+from tests.test_exif_reader import build_exif_tiff, build_jpeg
+
+
+def wait_for(queue, job_id, timeout=10):
+    """Poll a job until it finishes."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['state'] in (JOB_DONE, JOB_FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+class TestJobQueue(unittest.TestCase):
+    """Test cases for the JobQueue class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        self.jobs_dir = os.path.join(self.test_dir, "jobs")
+        self.queues = []
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        for queue in self.queues:
+            queue.shutdown()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def open_queue(self, handler, **kwargs):
+        """Open a queue that is shut down after the test."""
+        queue = JobQueue(self.jobs_dir, handler, **kwargs)
+        self.queues.append(queue)
+        return queue
+
+    def test_run_jobs(self):
+        """Test results, failures and progress reporting."""
+        def handler(params, progress):
+            progress['processed'] = params['value']
+            if params['value'] < 0:
+                raise ValueError("negative")
+            if params['value'] == 0:
+                return {'success': False, 'error': 'Nothing to do'}
+            return {'success': True, 'double': params['value'] * 2}
+
+        queue = self.open_queue(handler, max_jobs=2)
+        queue.start()
+        ok = queue.submit({'value': 21})
+        failed = queue.submit({'value': -1})
+        rejected = queue.submit({'value': 0})
+
+        # Assertions
+        job = wait_for(queue, ok)
+        self.assertEqual(job['state'], JOB_DONE)
+        self.assertEqual(job['result'], {'success': True, 'double': 42})
+        self.assertEqual(job['progress'], {'processed': 21})
+        job = wait_for(queue, failed)
+        self.assertEqual(job['state'], JOB_FAILED)
+        self.assertEqual(job['error'], "negative")
+        job = wait_for(queue, rejected)
+        self.assertEqual(job['state'], JOB_FAILED)
+        self.assertEqual(job['error'], "Nothing to do")
+        self.assertIsNone(queue.get("unknown"))
+
+    def test_duplicate_key(self):
+        """Test that active work isn't queued twice."""
+        queue = self.open_queue(lambda params, progress: {})
+
+        first = queue.submit({}, key="session")
+        second = queue.submit({}, key="session")
+
+        # Assertions
+        self.assertEqual(first, second)
+        self.assertEqual(queue.get(first)['queue_position'], 0)
+
+    def test_resume_after_restart(self):
+        """Test that unfinished jobs run again when the queue is reopened."""
+        queue = self.open_queue(lambda params, progress: {'value': params['value']})
+        job_ids = [queue.submit({'value': i}) for i in range(3)]
+        self.assertEqual(queue.get(job_ids[2])['state'], JOB_QUEUED)
+
+        reopened = self.open_queue(lambda params, progress: {'value': params['value']})
+        reopened.start()
+
+        # Assertions
+        for i, job_id in enumerate(job_ids):
+            self.assertEqual(wait_for(reopened, job_id)['result'], {'value': i})
+
+        # Finished jobs are kept as they are
+        finished = self.open_queue(lambda params, progress: self.fail("Job ran twice"))
+        self.assertEqual(finished.get(job_ids[0])['state'], JOB_DONE)
+
+    def test_admission_control(self):
+        """Test that jobs wait while memory is low."""
+        release = threading.Event()
+        running = []
+
+        def handler(params, progress):
+            running.append(params['value'])
+            release.wait(5)
+            return {}
+
+        queue = self.open_queue(handler, max_jobs=2, min_free_memory=100)
+        with patch("pixtrail.web.jobs.available_memory", return_value=50), \
+                patch("pixtrail.web.jobs.ADMISSION_INTERVAL", 0.01):
+            queue.start()
+            first = queue.submit({'value': 1})
+            second = queue.submit({'value': 2})
+            time.sleep(0.2)
+
+            # Assertions: the first job is always admitted, the second waits
+            self.assertEqual(running, [1])
+            self.assertEqual(queue.get(second)['state'], JOB_QUEUED)
+
+        release.set()
+        self.assertEqual(wait_for(queue, first)['state'], JOB_DONE)
+        self.assertEqual(wait_for(queue, second)['state'], JOB_DONE)
+
+    def test_shared_jobs_directory(self):
+        """Test status and progress of jobs run by another queue."""
+        release = threading.Event()
+
+        def handler(params, progress):
+            progress.publish({'processed': 1})
+            release.wait(5)
+            return {'value': params['value']}
+
+        runner = self.open_queue(handler)
+        runner.start()
+        job_id = runner.submit({'value': 7})
+        while runner.get(job_id)['state'] == JOB_QUEUED:
+            time.sleep(0.01)
+        other = self.open_queue(lambda params, progress: self.fail("Job ran twice"))
+        other.start()
+
+        status, token = other.wait_for_change(job_id, None, 0)
+        deadline = time.time() + 5
+        while status['progress'] != {'processed': 1} and time.time() < deadline:
+            status, token = other.wait_for_change(job_id, token, 1)
+
+        # Assertions
+        self.assertEqual(status['state'], 'running')
+        self.assertEqual(status['progress'], {'processed': 1})
+        release.set()
+        self.assertEqual(wait_for(other, job_id)['result'], {'value': 7})
+        self.assertIsNone(other.get("../" + job_id))
+
+    def test_claimed_once(self):
+        """Test that a job recovered by several queues only runs once."""
+        runs = []
+
+        def handler(params, progress):
+            runs.append(params['value'])
+            time.sleep(0.1)
+            return {}
+
+        job_id = self.open_queue(handler).submit({'value': 1})
+        queues = [self.open_queue(handler) for _ in range(3)]
+        for queue in queues:
+            queue.start()
+
+        # Assertions
+        for queue in queues:
+            self.assertEqual(wait_for(queue, job_id)['state'], JOB_DONE)
+        self.assertEqual(runs, [1])
+        # Queues release their claims after saving the final state
+        for queue in queues:
+            queue.shutdown()
+        self.assertEqual(sorted(os.listdir(self.jobs_dir)), [job_id + '.json', SLOTS_DIR])
+
+    def test_slots_shared_between_queues(self):
+        """Test that max_jobs limits the running jobs of all queues together."""
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def handler(params, progress):
+            with lock:
+                running.append(params['value'])
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(params['value'])
+            return {}
+
+        with patch("pixtrail.web.jobs.ADMISSION_INTERVAL", 0.01):
+            queues = [self.open_queue(handler, max_jobs=2) for _ in range(3)]
+            job_ids = [(queue, queue.submit({'value': (i, j)})) for i, queue in enumerate(queues) for j in range(3)]
+            for queue in queues:
+                queue.start()
+
+            # Assertions
+            for queue, job_id in job_ids:
+                self.assertEqual(wait_for(queue, job_id)['state'], JOB_DONE)
+        self.assertEqual(len(peak), 9)
+        self.assertLessEqual(max(peak), 2)
+
+
+class TestJobRoutes(unittest.TestCase):
+    """Test cases for the job endpoints."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.app = create_app()
+        self.app.config['PIXTRAIL_DATA_DIR'] = self.test_dir
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        get_job_queue(self.app).shutdown()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_process_job(self):
+        """Test processing a session in the background."""
+        photos = [(io.BytesIO(build_jpeg(build_exif_tiff(40.0 + i, 10.0, 5.0))), f"photo{i}.jpg")
+                  for i in range(3)]
+        response = self.client.post('/api/submit', data={'photos': photos},
+                                    content_type='multipart/form-data')
+        session_id = response.get_json()['session_id']
+
+        response = self.client.post('/api/jobs', json={'session_id': session_id})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.get_json()['job_id']
+
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            job = self.client.get(f'/api/jobs/{job_id}').get_json()
+            if job['state'] in (JOB_DONE, JOB_FAILED):
+                break
+            time.sleep(0.01)
+
+        # Assertions
+        self.assertEqual(job['state'], JOB_DONE)
+        self.assertEqual(job['progress']['total'], 3)
+        self.assertEqual(job['progress']['processed'], 3)
+        self.assertEqual(job['progress']['skipped'], 0)
+        self.assertTrue(job['progress']['finished'])
+        self.assertEqual(len(job['result']['waypoints']), 3)
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, session_id, job['result']['gpx_file'])))
+
+    def test_job_events(self):
+        """Test streaming job progress as Server-Sent Events."""
+        photos = [(io.BytesIO(build_jpeg(build_exif_tiff(40.0 + i, 10.0, 5.0))), f"photo{i}.jpg")
+                  for i in range(3)]
+        response = self.client.post('/api/submit', data={'photos': photos},
+                                    content_type='multipart/form-data')
+        session_id = response.get_json()['session_id']
+        job_id = self.client.post('/api/jobs', json={'session_id': session_id}).get_json()['job_id']
+
+        response = self.client.get(f'/api/jobs/{job_id}/events')
+        events = [
+            dict(line.split(': ', 1) for line in block.split('\n'))
+            for block in response.get_data(as_text=True).strip().split('\n\n')
+        ]
+
+        # Assertions
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(events[-1]['event'], 'done')
+        final = json.loads(events[-1]['data'])
+        self.assertEqual(final['progress']['done'], 3)
+        self.assertIn('files_per_sec', final['progress'])
+        self.assertEqual(len(final['result']['waypoints']), 3)
+        for event in events[:-1]:
+            self.assertEqual(event['event'], 'progress')
+            self.assertNotIn('result', json.loads(event['data']))
+        self.assertEqual(self.client.get('/api/jobs/unknown/events').status_code, 404)
+
+    def test_unknown_session_and_job(self):
+        """Test errors for unknown sessions and jobs."""
+        # Assertions
+        self.assertEqual(self.client.post('/api/jobs', json={'session_id': 'missing'}).status_code, 404)
+        self.assertEqual(self.client.post('/api/jobs', json={}).status_code, 400)
+        self.assertEqual(self.client.get('/api/jobs/unknown').status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
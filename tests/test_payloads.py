@@ -0,0 +1,238 @@
+"""
+Tests for the compact point payloads of the web API.
+"""
+
+import json
+import os
+import shutil
+import unittest
+from datetime import datetime, timezone
+
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from pixtrail.points import PointTable
+from pixtrail.web import create_app
+from pixtrail.web.payloads import (
+    BINARY_TYPE, COLUMNS_TYPE, decode_binary, decode_columns,
+    encode_binary, encode_columns, negotiate_format
+)
+from pixtrail.web.routes import RESULT_HEADER, get_sweeper
+
+
+def build_points(count):
+    """Build a track of `count` points, one every 10 seconds."""
+    table = PointTable()
+    for i in range(count):
+        table.append(45.0 + i * 1e-4, 7.0 + i * 1e-4, 300.0 + i % 50,
+                     datetime.fromtimestamp(1685606400 + i * 10, timezone.utc), f"IMG_{i:05d}.jpg")
+    return table
+
+
+class TestPayloads(unittest.TestCase):
+    """Test cases for the columnar and binary encodings."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.points = PointTable.from_dicts([
+            {'latitude': 48.8566, 'longitude': 2.3522, 'altitude': 35.0,
+             'timestamp': datetime(2023, 5, 1, 12, 0), 'name': "a.jpg"},
+            {'latitude': -33.8568, 'longitude': 151.2153, 'altitude': None,
+             'timestamp': None, 'name': "b.jpg"},
+            {'latitude': 40.0, 'longitude': -74.0, 'altitude': 10.0,
+             'timestamp': datetime(2023, 5, 1, 12, 0, 30), 'name': None}
+        ])
+
+    def test_columns_round_trip(self):
+        """Test that columns keep every field and delta-encode timestamps."""
+        columns = encode_columns(self.points)
+        decoded = decode_columns(json.loads(json.dumps(columns)))
+
+        # Assertions
+        self.assertEqual(columns['timestamps'], [1682942400000, None, 30000])
+        self.assertEqual(columns['altitude'], [35.0, None, 10.0])
+        self.assertIs(columns['utc'], False)
+        self.assertEqual(decoded, self.points)
+
+    def test_binary_round_trip(self):
+        """Test that the binary layout keeps every field."""
+        data = encode_binary(self.points)
+
+        # Assertions
+        self.assertEqual(data[:4], b'PXT1')
+        self.assertEqual(len(data), 8 + 33 * 3 + len("a.jpg\0b.jpg\0"))
+        self.assertEqual(decode_binary(data), self.points)
+        self.assertEqual(decode_binary(encode_binary(PointTable())), PointTable())
+
+    def test_mixed_timezones(self):
+        """Test per-point UTC flags."""
+        points = PointTable.from_dicts([
+            {'latitude': 1.0, 'longitude': 2.0, 'timestamp': datetime(2023, 1, 1, tzinfo=timezone.utc)},
+            {'latitude': 1.0, 'longitude': 2.0, 'timestamp': datetime(2023, 1, 1)}
+        ])
+        columns = encode_columns(points)
+
+        # Assertions
+        self.assertEqual(columns['utc'], [1, 0])
+        self.assertEqual(decode_columns(columns), points)
+
+    def test_invalid_payloads(self):
+        """Test that malformed or out-of-range columns are rejected."""
+        invalid = [
+            [],
+            {'latitude': [1.0]},
+            {'latitude': [1.0, 2.0], 'longitude': [1.0]},
+            {'latitude': [91.0], 'longitude': [1.0]},
+            {'latitude': [1.0], 'longitude': [float('nan')]},
+            {'latitude': ["1"], 'longitude': [1.0]},
+            {'latitude': [1.0], 'longitude': [1.0], 'timestamps': [1.5]},
+            {'latitude': [1.0, 2.0], 'longitude': [1.0, 2.0], 'timestamps': [10 ** 15, 1]},
+            {'latitude': [1.0, 2.0], 'longitude': [1.0, 2.0], 'timestamps': [-10 ** 14, 1]},
+            {'latitude': [1.0, 2.0], 'longitude': [1.0, 2.0], 'timestamps': [None, 10 ** 15]},
+            {'latitude': [1.0], 'longitude': [1.0], 'name': [3]}
+        ]
+
+        # Assertions
+        for data in invalid:
+            with self.assertRaises(ValueError, msg=data):
+                decode_columns(data)
+        with self.assertRaises(ValueError):
+            decode_binary(b'PXT1')
+        with self.assertRaises(ValueError):
+            decode_binary(encode_binary(self.points)[:50])
+        with self.assertRaises(ValueError):
+            decode_binary(b'XXXX' + encode_binary(self.points)[4:])
+        for millis in (10 ** 15, -10 ** 14):
+            table = build_points(2)
+            table.timestamps[0] = millis * 1000
+            with self.assertRaises(ValueError, msg=millis):
+                decode_binary(encode_binary(table))
+
+    def test_minimal_columns(self):
+        """Test that only the coordinates are required."""
+        points = decode_columns({'latitude': [1.0, 2.0], 'longitude': [3.0, 4.0]})
+
+        # Assertions
+        self.assertEqual(len(points), 2)
+        self.assertEqual(points[1]['altitude'], 0.0)
+        self.assertNotIn('timestamp', points[1])
+        self.assertNotIn('name', points[1])
+
+    def test_negotiate_format(self):
+        """Test that compact formats are only used when asked for."""
+        def negotiate(header, format_param=None):
+            return negotiate_format(parse_accept_header(header, MIMEAccept), format_param)
+
+        # Assertions
+        self.assertEqual(negotiate('*/*'), 'records')
+        self.assertEqual(negotiate(''), 'records')
+        self.assertEqual(negotiate(COLUMNS_TYPE), 'columns')
+        self.assertEqual(negotiate(f'{BINARY_TYPE}, */*;q=0.1'), 'binary')
+        self.assertEqual(negotiate(f'application/json, {BINARY_TYPE};q=0.5'), 'records')
+        self.assertEqual(negotiate('*/*', 'columns'), 'columns')
+
+    def test_payload_size(self):
+        """Test the size reduction over per-point JSON for a large track."""
+        points = build_points(10000)
+        records = json.dumps([{
+            'latitude': point['latitude'], 'longitude': point['longitude'], 'name': point['name'],
+            'timestamp': point['timestamp'].isoformat(), 'altitude': point['altitude']
+        } for point in points])
+        columns = json.dumps(encode_columns(points))
+        binary = encode_binary(points)
+
+        # Assertions
+        self.assertLess(len(columns), len(records) * 0.6)
+        self.assertLess(len(binary), len(records) * 0.4)
+
+
+class TestPayloadRoutes(unittest.TestCase):
+    """Test cases for the negotiated formats of the API routes."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.app = create_app({'PIXTRAIL_DATA_DIR': self.test_dir})
+        self.client = self.app.test_client()
+        self.points = build_points(100)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        get_sweeper(self.app).shutdown()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def download(self, result):
+        """Download the GPX file of a result."""
+        return self.client.get(f"/api/download/{result['session_id']}/{result['gpx_file']}").get_data()
+
+    def test_create_gpx_columns(self):
+        """Test a columnar request answered with columns."""
+        response = self.client.post('/api/create-gpx', data=json.dumps(encode_columns(self.points)),
+                                    content_type=COLUMNS_TYPE, headers={'Accept': COLUMNS_TYPE})
+        result = json.loads(response.get_data())
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, COLUMNS_TYPE)
+        self.assertTrue(result['success'])
+        self.assertEqual(decode_columns(result['waypoints']), self.points)
+        self.assertEqual(self.download(result).count(b'<wpt '), 100)
+
+    def test_create_gpx_binary(self):
+        """Test a binary request answered with binary waypoints and JSON headers."""
+        response = self.client.post('/api/create-gpx', data=encode_binary(self.points),
+                                    content_type=BINARY_TYPE, headers={'Accept': BINARY_TYPE})
+        result = json.loads(response.headers[RESULT_HEADER])
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, BINARY_TYPE)
+        self.assertEqual(decode_binary(response.get_data()), self.points)
+        self.assertTrue(result['success'])
+        self.assertIn(b'<time>2023-06-01T08:00:10Z</time>', self.download(result))
+
+    def test_create_gpx_default_response(self):
+        """Test that compact requests get JSON records without an Accept header."""
+        response = self.client.post('/api/create-gpx', data=encode_binary(self.points),
+                                    content_type=BINARY_TYPE)
+        waypoints = response.get_json()['waypoints']
+
+        # Assertions
+        self.assertEqual(len(waypoints), 100)
+        self.assertEqual(waypoints[1]['name'], "IMG_00001.jpg")
+        self.assertEqual(waypoints[1]['timestamp'], '2023-06-01T08:00:10+00:00')
+
+    def test_create_gpx_json(self):
+        """Test that JSON requests get the same waypoint records as the stored result."""
+        response = self.client.post('/api/create-gpx', json={'gps_data': [
+            {'latitude': 48.8566, 'longitude': 2.3522, 'timestamp': '2023-01-01T12:00:00Z'}
+        ]})
+        waypoints = response.get_json()['waypoints']
+
+        # Assertions
+        self.assertEqual(waypoints[0]['timestamp'], '2023-01-01T12:00:00+00:00')
+        self.assertIsNone(waypoints[0]['name'])
+        self.assertEqual(waypoints[0]['altitude'], 0)
+
+    def test_create_gpx_invalid(self):
+        """Test that invalid compact payloads are rejected."""
+        bad_latitude = self.client.post('/api/create-gpx', content_type=COLUMNS_TYPE,
+                                        data=json.dumps({'latitude': [100.0], 'longitude': [0.0]}))
+        empty = self.client.post('/api/create-gpx', content_type=BINARY_TYPE,
+                                 data=encode_binary(PointTable()))
+        truncated = self.client.post('/api/create-gpx', content_type=BINARY_TYPE, data=b'PXT1')
+        bad_timestamp = self.client.post('/api/create-gpx', content_type=COLUMNS_TYPE,
+                                         data=json.dumps({'latitude': [0.0, 1.0], 'longitude': [0.0, 1.0],
+                                                          'timestamps': [10 ** 15, 1]}))
+
+        # Assertions
+        self.assertEqual(bad_latitude.status_code, 400)
+        self.assertEqual(bad_timestamp.status_code, 400)
+        self.assertEqual(empty.status_code, 400)
+        self.assertEqual(truncated.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
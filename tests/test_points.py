@@ -0,0 +1,167 @@
+"""
+Tests for the points module.
+"""
+
+import os
+import shutil
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from pixtrail.gpx_generator import GPXGenerator
+from pixtrail.points import PointTable
+
+
+class TestPointTable(unittest.TestCase):
+    """Test cases for the PointTable class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.gps_data = [
+            {
+                'latitude': 52.52,
+                'longitude': 13.405,
+                'altitude': 34.5,
+                'timestamp': datetime(2023, 5, 1, 12, 0, 0, 250000),
+                'name': 'b.jpg'
+            },
+            {
+                'latitude': 48.8566,
+                'longitude': 2.3522,
+                'altitude': 35.0,
+                'timestamp': datetime(2023, 5, 1, 10, 0, 0),
+                'name': 'a.jpg'
+            }
+        ]
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_dir, exist_ok=True)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_round_trip(self):
+        """Test that dictionaries survive conversion to a table and back."""
+        table = PointTable.from_dicts(self.gps_data)
+
+        # Assertions
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.to_dicts(), self.gps_data)
+
+    def test_view_behaves_like_dict(self):
+        """Test dictionary access on rows."""
+        table = PointTable.from_dicts(self.gps_data)
+        point = table[-1]
+
+        # Assertions
+        self.assertEqual(point['latitude'], 48.8566)
+        self.assertEqual(point.get('name'), 'a.jpg')
+        self.assertIn('timestamp', point)
+        self.assertEqual(point.get('missing', 'default'), 'default')
+        with self.assertRaises(KeyError):
+            point['missing']
+        with self.assertRaises(IndexError):
+            table[2]
+
+    def test_missing_values(self):
+        """Test points without timestamp, name or altitude."""
+        table = PointTable()
+        table.append(1.0, 2.0, altitude=None)
+
+        point = table[0]
+
+        # Assertions
+        self.assertEqual(dict(point), {'latitude': 1.0, 'longitude': 2.0, 'altitude': None})
+        self.assertNotIn('timestamp', point)
+        self.assertNotIn('name', point)
+
+    def test_timestamp_strings_and_timezones(self):
+        """Test ISO timestamps and timezone-aware datetimes."""
+        table = PointTable()
+        table.append(1.0, 2.0, timestamp="2023-01-01T12:00:00Z")
+        table.append(1.0, 2.0, timestamp=datetime(2023, 1, 1, 12, 0, 0, tzinfo=timezone.utc))
+
+        # Assertions
+        self.assertEqual(table[0]['timestamp'], datetime(2023, 1, 1, 12, 0, 0, tzinfo=timezone.utc))
+        self.assertEqual(table[0]['timestamp'], table[1]['timestamp'])
+        with self.assertRaises(ValueError):
+            table.append(1.0, 2.0, timestamp="not a date")
+
+    def test_utc_offsets_are_kept(self):
+        """Test that timezone-aware timestamps keep their UTC offset."""
+        plus_two = timezone(timedelta(hours=2))
+        minus_five = timezone(timedelta(hours=-5, minutes=-30))
+        table = PointTable()
+        table.append(1.0, 2.0, timestamp=datetime(2020, 1, 1, 11, 0, 0, tzinfo=plus_two))
+        table.append(1.0, 2.0, timestamp="2020-01-01T03:30:00-05:30")
+        table.append(1.0, 2.0, timestamp=datetime(2020, 1, 1, 9, 0, 0))
+
+        # Assertions
+        timestamps = [row[3] for row in table.rows()]
+        self.assertEqual(timestamps, [table.timestamp(i) for i in range(3)])
+        self.assertEqual(timestamps[0], datetime(2020, 1, 1, 9, 0, 0, tzinfo=timezone.utc))
+        self.assertEqual(timestamps[0].utcoffset(), timedelta(hours=2))
+        self.assertEqual(timestamps[0].isoformat(), '2020-01-01T11:00:00+02:00')
+        self.assertEqual(timestamps[1].tzinfo, minus_five)
+        self.assertEqual(timestamps[1].isoformat(), '2020-01-01T03:30:00-05:30')
+        self.assertIsNone(timestamps[2].tzinfo)
+        # Same instant, different offset
+        other = PointTable()
+        other.append(1.0, 2.0, timestamp="2020-01-01T09:00:00Z")
+        self.assertEqual(other.timestamps[0], table.timestamps[0])
+        self.assertNotEqual(other, PointTable.from_dicts([table[0]]))
+
+    def test_sorted_by_time(self):
+        """Test sorting with points without timestamps placed last."""
+        table = PointTable.from_dicts(self.gps_data)
+        table.append(0.0, 0.0, name='untimed.jpg')
+
+        sorted_table = table.sorted_by_time()
+
+        # Assertions
+        self.assertEqual([point['name'] for point in sorted_table], ['a.jpg', 'b.jpg', 'untimed.jpg'])
+        self.assertEqual(sorted_table[0]['latitude'], 48.8566)
+        self.assertEqual(table[0]['name'], 'b.jpg')
+
+    def test_equality(self):
+        """Test comparing tables."""
+        table = PointTable.from_dicts(self.gps_data)
+
+        # Assertions
+        self.assertEqual(table, PointTable.from_dicts(self.gps_data))
+        self.assertNotEqual(table, PointTable.from_dicts(self.gps_data[:1]))
+
+    def test_create_gpx_matches_dicts(self):
+        """Test that a table produces the same GPX file as dictionaries."""
+        dict_path = os.path.join(self.test_dir, "dicts.gpx")
+        table_path = os.path.join(self.test_dir, "table.gpx")
+
+        GPXGenerator.create_gpx(self.gps_data, dict_path)
+        GPXGenerator.create_gpx(PointTable.from_dicts(self.gps_data), table_path)
+
+        # Assertions
+        with open(dict_path) as dict_file, open(table_path) as table_file:
+            self.assertEqual(table_file.read(), dict_file.read())
+
+    def test_create_gpx_keeps_utc_offsets(self):
+        """Test that a table writes non-UTC offsets like dictionaries do."""
+        gps_data = [{
+            'latitude': 48.8566, 'longitude': 2.3522, 'altitude': 35.0,
+            'timestamp': datetime(2020, 1, 1, 11, 0, 0, tzinfo=timezone(timedelta(hours=2))),
+            'name': 'a.jpg'
+        }]
+        dict_path = os.path.join(self.test_dir, "dicts.gpx")
+        table_path = os.path.join(self.test_dir, "table.gpx")
+
+        GPXGenerator.create_gpx(gps_data, dict_path)
+        GPXGenerator.create_gpx(PointTable.from_dicts(gps_data), table_path)
+
+        # Assertions
+        with open(dict_path) as dict_file, open(table_path) as table_file:
+            table_gpx = table_file.read()
+            self.assertEqual(table_gpx, dict_file.read())
+        self.assertIn('2020-01-01T11:00:00+02:00', table_gpx)
+
+
+if __name__ == "__main__":
+    unittest.main()
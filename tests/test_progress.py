@@ -0,0 +1,117 @@
+"""
+Tests for the progress module.
+"""
+
+import io
+import os
+import shutil
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from pixtrail.core import PixTrail
+from pixtrail.progress import ProgressReporter, format_duration, make_progress_bar
+from tests.test_exif_reader import build_exif_tiff, build_jpeg
+
+
+class TestProgressReporter(unittest.TestCase):
+    """Test cases for the ProgressReporter class."""
+
+    def test_reports_every_n_files(self):
+        """Test that reports are batched by file count."""
+        reports = []
+        stats = {'total': 10, 'processed': 0, 'skipped': 0}
+        reporter = ProgressReporter(reports.append, stats, every=4, interval=3600)
+
+        for i in range(10):
+            stats['processed' if i % 2 else 'skipped'] += 1
+            reporter.tick()
+        reporter.report(finished=True)
+
+        # Assertions
+        self.assertEqual([report['done'] for report in reports], [4, 8, 10])
+        self.assertFalse(reports[0]['finished'])
+        self.assertEqual(reports[-1]['processed'], 5)
+        self.assertEqual(reports[-1]['skipped'], 5)
+        self.assertEqual(reports[-1]['eta'], 0.0)
+        self.assertTrue(reports[-1]['finished'])
+
+    def test_reports_every_interval(self):
+        """Test that reports are sent when the interval passes."""
+        reports = []
+        stats = {'total': 100, 'processed': 0, 'skipped': 0}
+        with patch("pixtrail.progress.time.perf_counter", side_effect=[0.0, 0.5, 1.5, 1.5]):
+            reporter = ProgressReporter(reports.append, stats, every=1000, interval=1.0)
+            stats['processed'] = 10
+            reporter.tick()
+            stats['processed'] = 30
+            reporter.tick()
+
+        # Assertions
+        self.assertEqual(len(reports), 1)
+        self.assertEqual(reports[0]['done'], 30)
+        self.assertAlmostEqual(reports[0]['files_per_sec'], 20.0)
+        self.assertAlmostEqual(reports[0]['eta'], 3.5)
+
+    def test_progress_bar(self):
+        """Test the command-line progress bar."""
+        output = io.StringIO()
+        draw = make_progress_bar(output, width=10)
+
+        draw({'total': 4, 'done': 2, 'files_per_sec': 2.0, 'eta': 61.0, 'finished': False})
+        draw({'total': 4, 'done': 4, 'files_per_sec': 2.0, 'eta': 0.0, 'finished': True})
+
+        # Assertions
+        self.assertEqual(
+            output.getvalue(),
+            "\r[#####.....] 2/4 files (50%) 2.0 files/sec, ETA 0:01:01"
+            "\r[##########] 4/4 files (100%) 2.0 files/sec, ETA 0:00:00\n"
+        )
+        self.assertEqual(format_duration(None), "?")
+
+
+class TestPixTrailProgress(unittest.TestCase):
+    """Test cases for the PixTrail progress callback."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_dir)
+        for i in range(5):
+            with open(os.path.join(self.test_dir, f"photo{i}.jpg"), "wb") as f:
+                f.write(build_jpeg(build_exif_tiff(40.0 + i, 10.0, 5.0)) if i else b'\xff\xd8')
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_process_directory(self):
+        """Test the final report of process_directory."""
+        reports = []
+        with redirect_stdout(io.StringIO()):
+            PixTrail(progress_callback=reports.append).process_directory(self.test_dir)
+
+        # Assertions
+        self.assertTrue(reports[-1]['finished'])
+        self.assertEqual(reports[-1]['total'], 5)
+        self.assertEqual(reports[-1]['processed'], 4)
+        self.assertEqual(reports[-1]['skipped'], 1)
+
+    def test_iter_points_and_process_directories(self):
+        """Test progress reports while streaming and in batch mode."""
+        reports = []
+        pixtrail = PixTrail(progress_callback=reports.append)
+        with redirect_stdout(io.StringIO()):
+            points = list(pixtrail.iter_points(self.test_dir))
+            batch_results = list(pixtrail.process_directories([self.test_dir, self.test_dir]))
+
+        # Assertions
+        self.assertEqual(len(points), 4)
+        self.assertEqual(len(batch_results), 2)
+        finished = [report for report in reports if report['finished']]
+        self.assertEqual([report['done'] for report in finished], [5, 10])
+
+
+if __name__ == "__main__":
+    unittest.main()
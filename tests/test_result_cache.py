@@ -0,0 +1,220 @@
+"""
+Tests for the result cache of the web interface.
+"""
+
+import io
+import os
+import shutil
+import struct
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from werkzeug.datastructures import FileStorage, MultiDict
+from werkzeug.test import encode_multipart
+
+from benchmarks.corpus import build_tiff
+from pixtrail.cache import MISS
+from pixtrail.exif_reader import ExifReader
+from pixtrail.web import create_app
+from pixtrail.web.result_cache import (
+    HEADER_BYTES, RESULT_CACHE_FILE, ResultCache, content_key, points_key, read_header
+)
+from pixtrail.web.routes import get_sweeper
+from pixtrail.web.upload import receive_upload
+from tests.test_exif_reader import build_exif_tiff, build_jpeg
+
+
+def build_late_exif_jpeg(latitude, date_str='2023:01:01 12:00:00', payload_size=0):
+    """Build a JPEG whose EXIF segment follows more segments than the fast path inspects."""
+    app1 = b'Exif\x00\x00' + build_exif_tiff(latitude, 2.3522, 35.0, date_str)
+    return (b'\xff\xd8' + (b'\xff\xe2' + struct.pack('>H', 12) + b'\x00' * 10) * 40
+            + b'\xff\xe1' + struct.pack('>H', len(app1) + 2) + app1
+            + b'\xff\xda' + struct.pack('>H', 2) + b'\x00' * payload_size + b'\xff\xd9')
+
+
+class TestResultCache(unittest.TestCase):
+    """Test cases for the ResultCache class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.db_path = os.path.join(self.test_dir, RESULT_CACHE_FILE)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def write_file(self, name, data):
+        """Write a file into the test directory and return its path."""
+        path = os.path.join(self.test_dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_keys(self):
+        """Test that keys depend on the content only."""
+        small = b"\x01" * 1000
+        large = b"\x02" * HEADER_BYTES + b"\x03" * 5000
+        photo = build_jpeg(build_exif_tiff(48.8566, 2.3522, 35.0))
+        points = [
+            {'latitude': 1.0, 'longitude': 2.0, 'altitude': 0.0, 'timestamp': datetime(2023, 1, 1), 'name': "a.jpg"},
+            {'latitude': 3.0, 'longitude': 4.0, 'altitude': 0.0, 'timestamp': None, 'name': "b.jpg"}
+        ]
+
+        # Assertions
+        self.assertEqual(read_header(self.write_file("a.jpg", small)), (MISS, content_key(1000, small + small[:4])))
+        self.assertEqual(read_header(self.write_file("b.jpg", large)),
+                         (MISS, content_key(len(large), large[:HEADER_BYTES] + large[:4])))
+        self.assertEqual(read_header(self.write_file("c.jpg", photo))[1], None)
+        self.assertNotEqual(content_key(1000, small), content_key(1001, small))
+        self.assertEqual(points_key(points), points_key(reversed(points)))
+        self.assertNotEqual(points_key(points), points_key(points[:1]))
+
+    def test_same_content_different_path(self):
+        """Test that photos are found again under another name."""
+        data = build_late_exif_jpeg(48.8566, '2023:05:01 12:00:00')
+        first = self.write_file("first.jpg", data)
+        second = self.write_file("second.jpg", data)
+        empty = self.write_file("empty.jpg", b"\x00" * 100)
+
+        with ResultCache(self.db_path) as cache:
+            self.assertIs(cache.get(first), MISS)
+            self.assertIs(cache.get(empty), MISS)
+            cache.put_many([(first, None, ExifReader.extract_gps_data(first)), (empty, None, None)])
+
+        with ResultCache(self.db_path) as cache:
+            gps_data = cache.get(second)
+            no_gps = cache.get(empty)
+            metrics = cache.metrics()
+
+        # Assertions
+        self.assertAlmostEqual(gps_data['latitude'], 48.8566, places=4)
+        self.assertEqual(gps_data['timestamp'], datetime(2023, 5, 1, 12, 0))
+        self.assertEqual(gps_data['name'], "second.jpg")
+        self.assertIsNone(no_gps)
+        self.assertEqual(metrics['photos'], 2)
+        self.assertEqual((metrics['hits'], metrics['misses']), (0, 2))
+
+    def test_header_not_looked_up(self):
+        """Test that photos read from their header are neither looked up nor stored."""
+        path = self.write_file("photo.jpg", build_jpeg(build_exif_tiff(48.8566, 2.3522, 35.0)))
+        # The IFDs follow the strip data, beyond the first HEADER_BYTES
+        raw = self.write_file("raw.tiff", build_tiff(-33.8568, 151.2153, payload_size=2 * HEADER_BYTES,
+                                                      ifd_at_end=True))
+
+        with ResultCache(self.db_path) as cache:
+            gps_data = cache.get(path)
+            raw_gps_data = cache.get(raw)
+            cache.put_many([(path, None, gps_data), (raw, None, raw_gps_data)])
+            metrics = cache.metrics()
+
+        # Assertions
+        self.assertAlmostEqual(gps_data['latitude'], 48.8566, places=4)
+        self.assertEqual(gps_data['name'], "photo.jpg")
+        self.assertAlmostEqual(raw_gps_data['latitude'], -33.8568, places=4)
+        self.assertEqual(metrics['photos'], 0)
+        self.assertEqual((metrics['hits'], metrics['misses']), (0, 0))
+
+    def test_gpx_eviction(self):
+        """Test that the least recently used entries are evicted over the size."""
+        tracks = [[{'latitude': float(i), 'longitude': 0.0, 'name': f"{i}.jpg"}] for i in range(3)]
+
+        with ResultCache(self.db_path, max_bytes=2500) as cache:
+            cache.put_gpx(tracks[0], b"0" * 1000)
+            cache.put_gpx(tracks[1], b"1" * 1000)
+            # Using the first track makes the second the least recently used
+            self.assertEqual(cache.get_gpx(tracks[0]), b"0" * 1000)
+            cache.put_gpx(tracks[2], b"2" * 1000)
+
+            # Assertions
+            self.assertEqual(cache.get_gpx(tracks[0]), b"0" * 1000)
+            self.assertIsNone(cache.get_gpx(tracks[1]))
+            self.assertEqual(cache.get_gpx(tracks[2]), b"2" * 1000)
+            cache.put_gpx([], b"")
+            metrics = cache.metrics()
+            self.assertEqual(metrics['gpx_files'], 3)
+            self.assertLessEqual(metrics['bytes'], 2500)
+            self.assertEqual(metrics['evictions'], 1)
+            self.assertEqual((metrics['hits'], metrics['misses']), (3, 1))
+
+
+class TestCachedUploads(unittest.TestCase):
+    """Test cases for uploads and processing with the result cache."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.app = create_app({'PIXTRAIL_DATA_DIR': self.test_dir})
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        get_sweeper(self.app).shutdown()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_spooled_upload(self):
+        """Test that a spooled photo uploaded again is not parsed again."""
+        data = build_late_exif_jpeg(-33.8568, '2023:06:01 09:30:00', payload_size=400000)
+        values = MultiDict()
+        values.add('photos', FileStorage(io.BytesIO(data), "late.jpg"))
+        boundary, body = encode_multipart(values)
+
+        results = []
+        with patch("pixtrail.web.upload.ExifReader.extract_gps_data",
+                   wraps=ExifReader.extract_gps_data) as mock_extract:
+            for _ in range(2):
+                with ResultCache(os.path.join(self.test_dir, RESULT_CACHE_FILE)) as cache:
+                    results.append(receive_upload(io.BytesIO(body), boundary, self.test_dir, cache=cache)[1])
+
+        # Assertions
+        mock_extract.assert_called_once()
+        self.assertEqual(results[0], results[1])
+        self.assertAlmostEqual(results[1][0]['gps']['latitude'], -33.8568, places=4)
+
+    def test_process_again(self):
+        """Test that photos and GPX files seen before are served from the cache."""
+        photos = [build_late_exif_jpeg(40.0 + i, f'2023:01:0{i + 1} 10:00:00') for i in range(3)]
+
+        results = []
+        for _ in range(2):
+            response = self.client.post(
+                '/api/submit',
+                data={'photos': [(io.BytesIO(photo), f"photo{i}.jpg") for i, photo in enumerate(photos)]},
+                content_type='multipart/form-data'
+            )
+            session_id = response.get_json()['session_id']
+            result = self.client.post(f'/api/process/{session_id}').get_json()
+            gpx = self.client.get(f"/api/download/{session_id}/{result['gpx_file']}").get_data()
+            results.append((result, gpx))
+
+        # Assertions
+        (first, first_gpx), (second, second_gpx) = results
+        self.assertEqual(first['stats']['cache_misses'], 3)
+        self.assertEqual(second['stats']['cache_hits'], 3)
+        self.assertEqual(second['waypoints'], first['waypoints'])
+        self.assertEqual(second_gpx, first_gpx)
+        metrics = self.client.get('/api/metrics').get_json()['result_cache']
+        self.assertEqual(metrics['photos'], 3)
+        self.assertEqual(metrics['gpx_files'], 1)
+        self.assertEqual(metrics['hits'], 4)
+
+    def test_disabled(self):
+        """Test that a cache size of 0 disables the cache."""
+        self.app.config['PIXTRAIL_RESULT_CACHE_SIZE'] = 0
+        response = self.client.post('/api/create-gpx', json={'gps_data': [
+            {'latitude': 1.0, 'longitude': 2.0, 'name': "a.jpg", 'timestamp': '2023-01-01T10:00:00Z'}
+        ]})
+
+        # Assertions
+        self.assertTrue(response.get_json()['success'])
+        self.assertFalse(os.path.exists(os.path.join(self.test_dir, RESULT_CACHE_FILE)))
+        self.assertNotIn('result_cache', self.client.get('/api/metrics').get_json())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Tests for the production server of the web interface.
+"""
+
+import http.client
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+from flask import Flask
+
+from pixtrail.web.server import PooledWSGIServer
+
+
+def get(port, path):
+    """Send a GET request and return (status, body)."""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+class TestPooledWSGIServer(unittest.TestCase):
+    """Test cases for the PooledWSGIServer class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.app = Flask(__name__)
+        self.barrier = threading.Barrier(4, timeout=5)
+
+        @self.app.route('/wait')
+        def wait():
+            # Only returns once four requests are handled at the same time
+            self.barrier.wait()
+            return 'ok'
+
+        self.server = PooledWSGIServer('127.0.0.1', 0, self.app, threads=4)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_concurrent_requests(self):
+        """Test that requests are handled concurrently by the pool."""
+        results = []
+        clients = [
+            threading.Thread(target=lambda: results.append(get(self.server.port, '/wait')))
+            for _ in range(4)
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+
+        # Assertions
+        self.assertEqual(results, [(200, b'ok')] * 4)
+        self.assertEqual(self.server.executor._max_workers, 4)
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), "Worker processes need os.fork")
+class TestWorkerProcesses(unittest.TestCase):
+    """Test cases for serving from several worker processes."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'pixtrail', '-w', '--no-browser', '--port', str(self.port),
+             '--workers', '2', '--threads', '2'],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+    def test_serve_and_stop(self):
+        """Test that the workers answer requests and stop with the server."""
+        deadline = time.time() + 15
+        status = None
+        while time.time() < deadline and status is None:
+            try:
+                status, _ = get(self.port, '/api/jobs/unknown')
+            except OSError:
+                time.sleep(0.1)
+
+        # Assertions
+        self.assertEqual(status, 404)
+        self.process.send_signal(signal.SIGTERM)
+        self.assertEqual(self.process.wait(15), 0)
+        with self.assertRaises(OSError):
+            get(self.port, '/api/jobs/unknown')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+Tests for the session handling of the web interface.
+"""
+
+import io
+import os
+import re
+import shutil
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from pixtrail.web import create_app
+from pixtrail.web.result_cache import RESULT_CACHE_FILE
+from pixtrail.web.sessions import LOCKS_DIR, new_session, new_session_id, session_lock
+from tests.test_exif_reader import build_exif_tiff, build_jpeg
+
+# Number of sessions in the stress tests
+SESSION_COUNT = 300
+
+# Concurrent clients in the stress tests
+CLIENT_COUNT = 64
+
+
+class TestSessionHelpers(unittest.TestCase):
+    """Test cases for session IDs and locks."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_dir, exist_ok=True)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_session_ids(self):
+        """Test that session IDs are unique within the same second."""
+        session_ids = [new_session_id() for _ in range(1000)]
+        with new_session(self.test_dir) as (session_id, session_dir):
+            # The new session is locked while it is filled
+            with session_lock(self.test_dir, session_id, blocking=False) as acquired:
+                self.assertFalse(acquired)
+
+        # Assertions
+        self.assertEqual(len(set(session_ids)), 1000)
+        self.assertRegex(session_ids[0], r'^\d{14}_[0-9a-f]{16}$')
+        self.assertTrue(os.path.isdir(session_dir))
+        self.assertEqual(os.path.basename(session_dir), session_id)
+
+    def test_exclusive_lock(self):
+        """Test that an exclusive lock waits for shared locks."""
+        events = []
+        reading = threading.Event()
+
+        def reader():
+            with session_lock(self.test_dir, "session", shared=True):
+                reading.set()
+                time.sleep(0.2)
+                events.append("read")
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        reading.wait(5)
+        with session_lock(self.test_dir, "session"):
+            events.append("write")
+        thread.join()
+
+        # Assertions
+        self.assertEqual(events, ["read", "write"])
+
+
+class TestConcurrentSessions(unittest.TestCase):
+    """Stress tests with many sessions at the same time."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.app = create_app()
+        self.app.config['PIXTRAIL_DATA_DIR'] = self.test_dir
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def submit(self, client, latitude):
+        """Submit one photo at a latitude and return the session ID."""
+        photo = build_jpeg(build_exif_tiff(latitude, 10.0, 5.0))
+        response = client.post('/api/submit-stream', data={'photos': [(io.BytesIO(photo), "photo.jpg")]},
+                               content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()['session_id']
+
+    def leftovers(self):
+        """List session directories and lock files left in the data directory."""
+        items = [name for name in os.listdir(self.test_dir)
+                 if name != LOCKS_DIR and not name.startswith(RESULT_CACHE_FILE)]
+        locks_dir = os.path.join(self.test_dir, LOCKS_DIR)
+        if os.path.isdir(locks_dir):
+            items += os.listdir(locks_dir)
+        return items
+
+    def test_full_sessions(self):
+        """Test that simultaneous sessions don't see each other's data."""
+        def run_session(index):
+            client = self.app.test_client()
+            latitude = 10.0 + index * 0.01
+            session_id = self.submit(client, latitude)
+            result = client.post(f'/api/process/{session_id}').get_json()
+            gpx = client.get(f"/api/download/{session_id}/{result['gpx_file']}").get_data(as_text=True)
+            cleanup = client.post(f'/api/cleanup/{session_id}').status_code
+            return session_id, latitude, result, gpx, cleanup
+
+        with ThreadPoolExecutor(CLIENT_COUNT) as executor:
+            sessions = list(executor.map(run_session, range(SESSION_COUNT)))
+
+        # Assertions
+        self.assertEqual(len({session[0] for session in sessions}), SESSION_COUNT)
+        for session_id, latitude, result, gpx, cleanup in sessions:
+            self.assertTrue(result['success'])
+            self.assertEqual(len(result['waypoints']), 1)
+            self.assertAlmostEqual(result['waypoints'][0]['latitude'], latitude, places=4)
+            waypoints = re.findall(r'<wpt lat="([^"]+)"', gpx)
+            self.assertEqual(len(waypoints), 1)
+            self.assertAlmostEqual(float(waypoints[0]), latitude, places=4)
+            self.assertEqual(cleanup, 200)
+        self.assertEqual(self.leftovers(), [])
+
+    def test_process_and_cleanup_race(self):
+        """Test processing, downloading and cleaning up the same session at once."""
+        client = self.app.test_client()
+        session_ids = [self.submit(client, 40.0) for _ in range(SESSION_COUNT // 3)]
+
+        def process(session_id):
+            response = self.app.test_client().post(f'/api/process/{session_id}')
+            if response.status_code == 200:
+                # Processing twice returns the stored result
+                again = self.app.test_client().post(f'/api/process/{session_id}')
+                if again.status_code == 200:
+                    self.assertEqual(again.get_json(), response.get_json())
+                gpx_file = response.get_json()['gpx_file']
+                download = self.app.test_client().get(f'/api/download/{session_id}/{gpx_file}')
+                return response.status_code, download.status_code
+            return response.status_code, None
+
+        def cleanup(session_id):
+            return self.app.test_client().post(f'/api/cleanup/{session_id}').status_code
+
+        with ThreadPoolExecutor(CLIENT_COUNT) as executor:
+            processed = executor.map(process, session_ids)
+            cleaned = executor.map(cleanup, session_ids)
+            results = list(zip(processed, cleaned))
+
+        # Assertions: each request either sees the whole session or none of it
+        for (process_status, download_status), cleanup_status in results:
+            self.assertIn(process_status, (200, 404))
+            self.assertIn(download_status, (200, 404, None))
+            self.assertEqual(cleanup_status, 200)
+        self.assertEqual(self.leftovers(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Tests for the session sweeper of the web interface.
+"""
+
+import os
+import shutil
+import time
+import unittest
+
+from pixtrail.web import create_app
+from pixtrail.web.routes import get_sweeper
+from pixtrail.web.sessions import session_lock
+from pixtrail.web.sweeper import SessionSweeper
+
+
+class TestSessionSweeper(unittest.TestCase):
+    """Test cases for the SessionSweeper class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(os.path.join(self.test_dir, ".jobs"))
+        self.now = time.time()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def create_session(self, session_id, size, age):
+        """Create a session directory with `size` bytes, last used `age` seconds ago."""
+        session_dir = os.path.join(self.test_dir, session_id)
+        os.makedirs(os.path.join(session_dir, "photos"))
+        with open(os.path.join(session_dir, "photos", "photo.jpg"), "wb") as f:
+            f.write(b"\x00" * size)
+        os.utime(session_dir, (self.now - age, self.now - age))
+
+    def sessions(self):
+        """List the remaining sessions."""
+        return sorted(name for name in os.listdir(self.test_dir) if not name.startswith('.'))
+
+    def test_ttl(self):
+        """Test that sessions unused for longer than the TTL are removed."""
+        self.create_session("old", 100, age=7200)
+        self.create_session("new", 100, age=60)
+
+        evicted = SessionSweeper(self.test_dir, ttl=3600).sweep(self.now)
+
+        # Assertions
+        self.assertEqual(evicted, {'ttl': 1, 'quota': 0, 'bytes': 100})
+        self.assertEqual(self.sessions(), ["new"])
+        self.assertTrue(os.path.isdir(os.path.join(self.test_dir, ".jobs")))
+
+    def test_quota(self):
+        """Test that the least recently used sessions are removed over the quota."""
+        self.create_session("a", 400, age=300)
+        self.create_session("b", 400, age=200)
+        self.create_session("c", 400, age=100)
+
+        sweeper = SessionSweeper(self.test_dir, ttl=None, quota=900)
+        evicted = sweeper.sweep(self.now)
+
+        # Assertions
+        self.assertEqual(evicted, {'ttl': 0, 'quota': 1, 'bytes': 400})
+        self.assertEqual(self.sessions(), ["b", "c"])
+        metrics = sweeper.metrics()
+        self.assertEqual(metrics['sessions'], 2)
+        self.assertEqual(metrics['bytes_in_use'], 800)
+        self.assertEqual(metrics['evicted_sessions'], 1)
+        self.assertEqual(metrics['quota_evictions'], 1)
+        self.assertEqual(metrics['quota'], 900)
+
+    def test_sessions_in_use(self):
+        """Test that locked sessions are skipped."""
+        self.create_session("busy", 400, age=7200)
+        self.create_session("idle", 400, age=7200)
+
+        sweeper = SessionSweeper(self.test_dir, ttl=3600)
+        with session_lock(self.test_dir, "busy", shared=True):
+            sweeper.sweep(self.now)
+
+        # Assertions
+        self.assertEqual(self.sessions(), ["busy"])
+        self.assertEqual(sweeper.metrics()['bytes_in_use'], 400)
+        self.assertEqual(sweeper.metrics()['ttl_evictions'], 1)
+
+        sweeper.sweep(self.now)
+        self.assertEqual(self.sessions(), [])
+        self.assertEqual(sweeper.metrics()['evicted_bytes'], 800)
+
+
+class TestMetricsRoute(unittest.TestCase):
+    """Test cases for the metrics endpoint."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        self.app = create_app({
+            'PIXTRAIL_DATA_DIR': self.test_dir,
+            'PIXTRAIL_SESSION_TTL': 3600,
+            'PIXTRAIL_CACHE_QUOTA': 1024
+        })
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        get_sweeper(self.app).shutdown()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_metrics(self):
+        """Test the configured data directory and the metrics report."""
+        session_dir = os.path.join(self.test_dir, "session")
+        os.makedirs(session_dir)
+        with open(os.path.join(session_dir, "track.gpx"), "wb") as f:
+            f.write(b"\x00" * 100)
+        get_sweeper(self.app).sweep()
+
+        response = self.app.test_client().get('/api/metrics')
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        metrics = response.get_json()
+        self.assertEqual(metrics['bytes_in_use'], 100)
+        self.assertEqual(metrics['sessions'], 1)
+        self.assertEqual(metrics['ttl'], 3600)
+        self.assertEqual(metrics['quota'], 1024)
+        self.assertEqual(metrics['evicted_sessions'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
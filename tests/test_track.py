@@ -0,0 +1,124 @@
+"""
+Tests for the encoded-polyline tracks of the web map.
+"""
+
+import json
+import os
+import shutil
+import unittest
+from datetime import datetime, timedelta
+
+from pixtrail.web import create_app
+from pixtrail.web.payloads import BINARY_TYPE
+from pixtrail.web.routes import RESULT_HEADER, get_sweeper
+from pixtrail.web.track import decode_polyline, encode_polyline, encode_track, simplify
+
+
+class TestTrack(unittest.TestCase):
+    """Test cases for polylines and simplification."""
+
+    def test_encode_polyline(self):
+        """Test the reference example of the polyline algorithm."""
+        encoded = encode_polyline([38.5, 40.7, 43.252], [-120.2, -120.95, -126.453])
+
+        # Assertions
+        self.assertEqual(encoded, '_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+        self.assertEqual(decode_polyline(encoded), [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)])
+        self.assertEqual(encode_polyline([], []), '')
+
+    def test_decode_polyline_invalid(self):
+        """Test that truncated or invalid polylines are rejected."""
+        # Assertions
+        with self.assertRaises(ValueError):
+            decode_polyline('_p~iF~ps|U_')
+        with self.assertRaises(ValueError):
+            decode_polyline('_p~iF')
+        with self.assertRaises(ValueError):
+            decode_polyline(' ')
+
+    def test_simplify(self):
+        """Test Douglas-Peucker simplification."""
+        xs = [0.0, 10.0, 20.0, 30.0, 40.0, 50.0, 60.0]
+        straight = [0.0] * 7
+        zigzag = [0.0, 1.0, 0.0, 50.0, 0.0, 1.0, 0.0]
+
+        # Assertions
+        self.assertEqual(simplify(xs, straight, 1.0), [0, 6])
+        self.assertEqual(simplify(xs, zigzag, 5.0), [0, 2, 3, 4, 6])
+        self.assertEqual(simplify(xs, zigzag, 0.0), list(range(7)))
+        self.assertEqual(simplify([0.0, 5.0, 0.0], [0.0, 0.0, 0.0], 1.0), [0, 1, 2])
+        self.assertEqual(simplify([0.0], [0.0], 1.0), [0])
+
+    def test_encode_track(self):
+        """Test the level-of-detail pyramid of a track."""
+        start = datetime(2023, 6, 1, 8, 0)
+        # A straight line with a detour, given in reverse time order
+        points = [{
+            'latitude': 45.0 + i * 1e-4 + (0.01 if i == 500 else 0.0),
+            'longitude': 7.0,
+            'timestamp': start + timedelta(seconds=i)
+        } for i in reversed(range(1000))]
+        track = encode_track(points)
+        levels = track['levels']
+        full = decode_polyline(levels[0]['polyline'])
+        coarse = decode_polyline(levels[-1]['polyline'])
+
+        # Assertions
+        self.assertEqual(track['precision'], 5)
+        self.assertEqual(levels[0]['tolerance'], 0.0)
+        self.assertEqual(levels[0]['count'], 1000)
+        self.assertEqual(full[0], (45.0, 7.0))
+        self.assertEqual(len(coarse), levels[-1]['count'])
+        self.assertLess(levels[-1]['count'], 10)
+        self.assertEqual(coarse[0], (45.0, 7.0))
+        self.assertEqual(coarse[-1], (45.0999, 7.0))
+        for finer, coarser in zip(levels, levels[1:]):
+            self.assertLess(finer['tolerance'], coarser['tolerance'])
+            self.assertLess(coarser['count'], finer['count'])
+        self.assertEqual(encode_track([])['levels'], [{'tolerance': 0.0, 'count': 0, 'polyline': ''}])
+
+
+class TestTrackRoutes(unittest.TestCase):
+    """Test cases for the track in API responses."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.app = create_app({'PIXTRAIL_DATA_DIR': self.test_dir})
+        self.client = self.app.test_client()
+        self.gps_data = [
+            {'latitude': 48.8566, 'longitude': 2.3522, 'timestamp': '2023-05-01T12:00:00', 'name': "a.jpg"},
+            {'latitude': 48.8584, 'longitude': 2.2945, 'timestamp': '2023-05-01T11:00:00', 'name': "b.jpg"}
+        ]
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        get_sweeper(self.app).shutdown()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_create_gpx_track(self):
+        """Test that create-gpx returns the route in timestamp order."""
+        response = self.client.post('/api/create-gpx', json={'gps_data': self.gps_data})
+        track = response.get_json()['track']
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(decode_polyline(track['levels'][0]['polyline']),
+                         [(48.8584, 2.2945), (48.8566, 2.3522)])
+
+    def test_binary_response_without_track(self):
+        """Test that binary responses leave the track out of the header."""
+        response = self.client.post('/api/create-gpx', json={'gps_data': self.gps_data},
+                                    headers={'Accept': BINARY_TYPE})
+        result = json.loads(response.headers[RESULT_HEADER])
+
+        # Assertions
+        self.assertEqual(response.mimetype, BINARY_TYPE)
+        self.assertTrue(result['success'])
+        self.assertNotIn('track', result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+"""
+Tests for the streaming upload module of the web interface.
+"""
+
+import io
+import os
+import shutil
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from werkzeug.datastructures import FileStorage, MultiDict
+from werkzeug.test import encode_multipart
+
+from benchmarks.corpus import build_tiff
+from pixtrail.exif_reader import ExifReader
+from pixtrail.web import create_app
+from pixtrail.web.result_cache import RESULT_CACHE_FILE
+from pixtrail.web.sessions import LOCKS_DIR
+from pixtrail.web.upload import receive_upload
+from tests.test_exif_reader import build_exif_tiff, build_jpeg
+
+
+class TestReceiveUpload(unittest.TestCase):
+    """Test cases for the receive_upload function."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_dir, exist_ok=True)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def upload(self, files, fields=None):
+        """Encode files and fields as multipart data and receive them."""
+        values = MultiDict(fields or {})
+        for filename, data in files:
+            values.add('photos', FileStorage(io.BytesIO(data), filename))
+        boundary, body = encode_multipart(values)
+        # Small chunks make the header arrive in pieces
+        with patch("pixtrail.web.upload.UPLOAD_CHUNK_SIZE", 1000):
+            return receive_upload(io.BytesIO(body), boundary, self.test_dir)
+
+    def test_header_only(self):
+        """Test that JPEG photos are read from their header without touching disk."""
+        files = [
+            ("a.jpg", build_jpeg(build_exif_tiff(52.5, -13.4, -20.0), payload_size=500000)),
+            ("b.jpg", build_jpeg(build_exif_tiff(48.8566, 2.3522, 35.0), payload_size=1000))
+        ]
+
+        with patch("pixtrail.web.upload.ExifReader.extract_gps_data") as mock_extract:
+            fields, photos = self.upload(files, {'source_type': 'file'})
+
+        # Assertions
+        mock_extract.assert_not_called()
+        self.assertEqual(fields, {'source_type': 'file'})
+        self.assertEqual([photo['filename'] for photo in photos], ["a.jpg", "b.jpg"])
+        self.assertAlmostEqual(photos[0]['gps']['latitude'], 52.5, places=4)
+        self.assertAlmostEqual(photos[1]['gps']['longitude'], 2.3522, places=4)
+        self.assertEqual(photos[0]['gps']['name'], "a.jpg")
+        self.assertEqual(os.listdir(self.test_dir), [])
+
+    def test_spooled_fallback(self):
+        """Test photos whose GPS data lies beyond the header limit."""
+        data = build_tiff(-33.8568, 151.2153, -12.0, '2023:06:01 09:30:00',
+                          byte_order='>', payload_size=400000, ifd_at_end=True)
+
+        with patch("pixtrail.web.upload.ExifReader.extract_gps_data",
+                   wraps=ExifReader.extract_gps_data) as mock_extract:
+            _, photos = self.upload([("trip/raw.tiff", data)])
+
+        # Assertions
+        mock_extract.assert_called_once()
+        self.assertEqual(photos[0]['filename'], "trip/raw.tiff")
+        self.assertAlmostEqual(photos[0]['gps']['latitude'], -33.8568, places=4)
+        self.assertEqual(photos[0]['gps']['name'], "raw.tiff")
+        self.assertEqual(os.listdir(self.test_dir), [])
+
+    def test_no_gps_and_non_images(self):
+        """Test photos without GPS data and files that aren't images."""
+        files = [
+            ("notes.txt", b"not a photo"),
+            ("plain.jpg", b'\xff\xd8\xff\xda\x00\x02' + b'\x00' * 100 + b'\xff\xd9')
+        ]
+
+        _, photos = self.upload(files)
+
+        # Assertions
+        self.assertEqual(photos, [{'filename': "plain.jpg", 'gps': None}])
+
+    def test_truncated_body(self):
+        """Test that an upload cut short is rejected."""
+        boundary, body = encode_multipart({'photos': FileStorage(io.BytesIO(b'\x00' * 5000), "a.png")})
+
+        # Assertions
+        with self.assertRaises(ValueError):
+            receive_upload(io.BytesIO(body[:3000]), boundary, self.test_dir)
+        self.assertEqual(os.listdir(self.test_dir), [])
+
+
+class TestStreamingRoutes(unittest.TestCase):
+    """Test cases for the streaming upload endpoint."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_dir, exist_ok=True)
+        app = create_app()
+        app.config['PIXTRAIL_DATA_DIR'] = self.test_dir
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def submit(self, files, **fields):
+        """Submit files to the streaming endpoint."""
+        data = dict(fields)
+        data['photos'] = [(io.BytesIO(content), filename) for filename, content in files]
+        return self.client.post('/api/submit-stream', data=data,
+                                content_type='multipart/form-data')
+
+    def test_submit_and_process(self):
+        """Test that only GPS data is stored and the process step uses it."""
+        files = [
+            ("trip/day1.jpg", build_jpeg(build_exif_tiff(40.0, 10.0, 5.0, '2023:01:01 10:00:00'), 20000)),
+            ("trip/more/day2.jpg", build_jpeg(build_exif_tiff(41.0, 11.0, 5.0, '2023:01:02 10:00:00'), 20000)),
+            ("trip/more/deeper/day3.jpg", build_jpeg(build_exif_tiff(42.0, 12.0, 5.0), 20000)),
+            ("trip/empty.png", b"\x89PNG\r\n\x1a\n" + b"\x00" * 64)
+        ]
+
+        with redirect_stdout(io.StringIO()):
+            response = self.submit(files, source_type='directory', recursive='1', depth='2')
+        session_id = response.get_json()['session_id']
+        session_dir = os.path.join(self.test_dir, session_id)
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['file_count'], 4)
+        self.assertEqual(sorted(os.listdir(session_dir)), ['.points.json', '.session_info'])
+
+        response = self.client.post(f'/api/process/{session_id}')
+        result = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([point['name'] for point in result['waypoints']], ["day1.jpg", "day2.jpg"])
+        self.assertEqual(result['waypoints'][0]['timestamp'], '2023-01-01T10:00:00')
+        self.assertEqual(result['stats'], {'total': 3, 'processed': 2, 'skipped': 1})
+        self.assertTrue(os.path.exists(os.path.join(session_dir, result['gpx_file'])))
+
+    def test_submit_without_photos(self):
+        """Test submissions without any photo."""
+        response = self.submit([("notes.txt", b"text")])
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/submit-stream', json={'photos': []})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([name for name in os.listdir(self.test_dir)
+                          if name != LOCKS_DIR and not name.startswith(RESULT_CACHE_FILE)], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
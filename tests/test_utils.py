@@ -3,15 +3,18 @@ Tests for the utils module.
 """
 
 import os
+import shutil
 import unittest
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch, mock_open, MagicMock
 
-import glob
-
 from pixtrail.utils import (
     get_image_files,
+    iter_image_entries,
     ensure_directory,
     get_default_output_path,
+    parse_size,
+    parse_timestamp,
     validate_coordinates
 )
 
@@ -27,71 +30,83 @@ class TestUtils(unittest.TestCase):
     def tearDown(self):
         """Clean up test fixtures."""
         if os.path.exists(self.test_dir):
-            # Remove test files
-            for file in os.listdir(self.test_dir):
-                os.remove(os.path.join(self.test_dir, file))
-            # Remove test directory
-            os.rmdir(self.test_dir)
-
-    @patch("glob.glob")
-    def test_get_image_files(self, mock_glob):
+            shutil.rmtree(self.test_dir)
+
+    def _create_files(self, *relative_paths):
+        """Create empty files below the test directory."""
+        for relative_path in relative_paths:
+            path = os.path.join(self.test_dir, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb"):
+                pass
+
+    def test_get_image_files(self):
         """Test getting image files from a directory."""
-        # Mock glob.glob return values
-        mock_returns = {
-            os.path.join(self.test_dir, "*.jpg"): [
-                os.path.join(self.test_dir, "test1.jpg"),
-                os.path.join(self.test_dir, "test2.jpg")
-            ],
-            os.path.join(self.test_dir, "*.jpeg"): [
-                os.path.join(self.test_dir, "test3.jpeg")
-            ],
-            os.path.join(self.test_dir, "*.png"): [
-                os.path.join(self.test_dir, "test4.png")
-            ],
-            os.path.join(self.test_dir, "*.tiff"): [],
-            os.path.join(self.test_dir, "*.bmp"): []
-        }
-        mock_glob.side_effect = lambda path, **kwargs: mock_returns.get(path, [])
+        self._create_files(
+            "test1.jpg", "test2.JPG", "test3.jpeg", "test4.png",
+            "notes.txt", ".hidden.jpg", os.path.join("subdir", "test5.jpg")
+        )
         
         # Get image files
         result = get_image_files(self.test_dir)
         
         # Assertions
-        self.assertEqual(len(result), 4)
-        self.assertIn(os.path.join(self.test_dir, "test1.jpg"), result)
-        self.assertIn(os.path.join(self.test_dir, "test3.jpeg"), result)
-        self.assertIn(os.path.join(self.test_dir, "test4.png"), result)
-        self.assertEqual(mock_glob.call_count, 5)  # 5 extensions
-
-    @patch("glob.glob")
-    def test_get_image_files_recursive(self, mock_glob):
+        self.assertEqual(result, [
+            os.path.join(self.test_dir, "test1.jpg"),
+            os.path.join(self.test_dir, "test2.JPG"),
+            os.path.join(self.test_dir, "test3.jpeg"),
+            os.path.join(self.test_dir, "test4.png"),
+        ])
+
+    def test_get_image_files_recursive(self):
         """Test getting image files recursively."""
-        # Mock glob.glob return values for recursive search
-        mock_returns = {
-            os.path.join(self.test_dir, "**", "*.jpg"): [
-                os.path.join(self.test_dir, "test1.jpg"),
-                os.path.join(self.test_dir, "subdir", "test2.jpg")
-            ],
-            os.path.join(self.test_dir, "**", "*.jpeg"): [
-                os.path.join(self.test_dir, "subdir", "test3.jpeg")
-            ],
-            os.path.join(self.test_dir, "**", "*.png"): [
-                os.path.join(self.test_dir, "test4.png")
-            ],
-            os.path.join(self.test_dir, "**", "*.tiff"): [],
-            os.path.join(self.test_dir, "**", "*.bmp"): []
-        }
-        mock_glob.side_effect = lambda path, **kwargs: mock_returns.get(path, [])
+        self._create_files(
+            "test1.jpg",
+            os.path.join("subdir", "test2.jpg"),
+            os.path.join("subdir", "test3.NEF"),
+            os.path.join("subdir", "deeper", "test4.dng"),
+            os.path.join(".hidden", "test5.jpg")
+        )
         
         # Get image files recursively
         result = get_image_files(self.test_dir, recursive=True)
         
         # Assertions
-        self.assertEqual(len(result), 4)
-        self.assertIn(os.path.join(self.test_dir, "test1.jpg"), result)
-        self.assertIn(os.path.join(self.test_dir, "subdir", "test2.jpg"), result)
-        self.assertIn(os.path.join(self.test_dir, "subdir", "test3.jpeg"), result)
-        self.assertEqual(mock_glob.call_count, 5)  # 5 extensions
+        self.assertEqual(result, [
+            os.path.join(self.test_dir, "subdir", "deeper", "test4.dng"),
+            os.path.join(self.test_dir, "subdir", "test2.jpg"),
+            os.path.join(self.test_dir, "subdir", "test3.NEF"),
+            os.path.join(self.test_dir, "test1.jpg"),
+        ])
+
+    def test_get_image_files_max_depth(self):
+        """Test limiting the recursion depth."""
+        self._create_files(
+            "test1.jpg",
+            os.path.join("subdir", "test2.jpg"),
+            os.path.join("subdir", "deeper", "test3.jpg")
+        )
+        
+        # Get image files one level deep
+        result = get_image_files(self.test_dir, recursive=True, max_depth=1)
+        
+        # Assertions
+        self.assertEqual(result, [
+            os.path.join(self.test_dir, "subdir", "test2.jpg"),
+            os.path.join(self.test_dir, "test1.jpg"),
+        ])
+
+    def test_iter_image_entries(self):
+        """Test that the walker yields directory entries with stat info."""
+        self._create_files("test1.jpg", os.path.join("subdir", "test2.jpg"))
+        
+        entries = list(iter_image_entries(self.test_dir, recursive=True))
+        
+        # Assertions
+        self.assertEqual(len(entries), 2)
+        for entry in entries:
+            self.assertEqual(entry.stat().st_size, 0)
+            self.assertEqual(entry.inode(), os.stat(entry.path).st_ino)
 
     def test_get_image_files_directory_not_found(self):
         """Test error handling when directory is not found."""
@@ -154,6 +169,40 @@ class TestUtils(unittest.TestCase):
         self.assertFalse(valid)
         self.assertIn("numeric", error.lower())
 
+    def test_parse_size(self):
+        """Test parsing byte sizes."""
+        # Assertions
+        self.assertEqual(parse_size("1024"), 1024)
+        self.assertEqual(parse_size("1.5K"), 1536)
+        self.assertEqual(parse_size("500MB"), 500 * 1024 ** 2)
+        self.assertEqual(parse_size("2g"), 2 * 1024 ** 3)
+        for value in ("", "G", "ten", "-1M"):
+            with self.assertRaises(ValueError):
+                parse_size(value)
+
+    def test_parse_timestamp(self):
+        """Test parsing ISO 8601 timestamps."""
+        plus_two = timezone(timedelta(hours=2))
+        
+        # Assertions
+        self.assertEqual(parse_timestamp("2023-01-01T12:00:00"), datetime(2023, 1, 1, 12, 0, 0))
+        self.assertEqual(parse_timestamp("2023-01-01 12:00:00.5"), datetime(2023, 1, 1, 12, 0, 0, 500000))
+        self.assertEqual(parse_timestamp("2023-01-01"), datetime(2023, 1, 1))
+        self.assertEqual(
+            parse_timestamp("2023-01-01T12:00:00Z"),
+            datetime(2023, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+        )
+        parsed = parse_timestamp("2023-01-01T12:00:00.123456+02:00")
+        self.assertEqual(parsed, datetime(2023, 1, 1, 12, 0, 0, 123456, tzinfo=plus_two))
+        self.assertEqual(parsed.utcoffset(), timedelta(hours=2))
+        self.assertEqual(parse_timestamp("2023-01-01T12:00:00-0530").utcoffset(), -timedelta(hours=5, minutes=30))
+        # Round trip of datetime.isoformat()
+        for value in (datetime(2023, 6, 1, 8, 30, 15, 250), datetime(2023, 6, 1, tzinfo=plus_two)):
+            self.assertEqual(parse_timestamp(value.isoformat()), value)
+        for value in ("", "2023-01-01T", "01/01/2023", "2023-13-01T00:00:00"):
+            with self.assertRaises(ValueError):
+                parse_timestamp(value)
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file